@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import logging
+from abc import ABC, abstractmethod
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+# Загружаем переменные окружения
+load_dotenv()
+BROWSER_BACKEND = os.getenv("BROWSER_BACKEND", "cdp")  # cdp | selenium | playwright
+
+log_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs")
+screenshots_dir = os.path.join(log_dir, "screenshots")
+os.makedirs(screenshots_dir, exist_ok=True)
+
+# Интерфейс браузера асинхронного сценария проверки (flows.py). Его реализуют CDP
+# (cdp_backend.py), Selenium (selenium_backend.py, тот же драйвер, что у заданий)
+# и Playwright (playwright_backend.py). Проверка в режиме AUTOMATION_MODE=async
+# идет через get_backend(BROWSER_BACKEND); задания с удержанием сессии и бронированием
+# (check_flow.py) по-прежнему работают с драйвером Selenium напрямую.
+
+
+class AsyncBrowserBackend(ABC):
+    """
+    Минимальный асинхронный интерфейс браузера, от которого зависит flows.py.
+
+    Локаторы передаются в формате locators.py: ("css" | "xpath", выражение).
+    """
+
+    name = "base-async"
+
+    @abstractmethod
+    async def launch(self):
+        """Запускает браузер. Возвращает True при успехе."""
+
+    @abstractmethod
+    async def navigate(self, url):
+        """Открывает страницу."""
+
+    @abstractmethod
+    async def wait_any(self, locators, timeout):
+        """
+        Ждет появления любого из локаторов.
+
+        Returns:
+            int: Индекс первого найденного локатора или None по таймауту
+        """
+
+    @abstractmethod
+    async def extract(self, locator):
+        """Возвращает тексты всех элементов, подходящих под локатор."""
+
+    @abstractmethod
+    async def click(self, locator, timeout=5):
+        """Кликает по первому кликабельному элементу. Возвращает True при успехе."""
+
+    @abstractmethod
+    async def fill(self, locator, value):
+        """Очищает поле ввода и вводит значение."""
+
+    @abstractmethod
+    async def snapshot(self, name):
+        """
+        Сохраняет скриншот и HTML страницы в logs/screenshots.
+
+        Returns:
+            str: HTML страницы на момент снимка
+        """
+
+    @abstractmethod
+    async def current_url(self):
+        """Возвращает адрес текущей страницы."""
+
+    @abstractmethod
+    async def close(self):
+        """Закрывает браузер и освобождает ресурсы."""
+
+
+def snapshot_paths(backend_name, name):
+    """Возвращает пути скриншота и HTML для снимка страницы."""
+    stamp = int(time.time())
+    return (
+        os.path.join(screenshots_dir, f"{name}_{backend_name}_{stamp}.png"),
+        os.path.join(screenshots_dir, f"{name}_source_{backend_name}_{stamp}.html"),
+    )
+
+
+def get_backend(name=None, **kwargs):
+    """
+    Создает асинхронный бэкенд по имени из конфигурации.
+
+    Args:
+        name (str): cdp, selenium или playwright (по умолчанию BROWSER_BACKEND)
+        **kwargs: Аргументы конструктора бэкенда (headless; browser - общий Chrome для cdp)
+
+    Returns:
+        AsyncBrowserBackend: Бэкенд, готовый к launch()
+    """
+    name = name or BROWSER_BACKEND
+    if name == "selenium":
+        from selenium_backend import SeleniumBackend
+        kwargs.pop("browser", None)
+        return SeleniumBackend(**kwargs)
+    if name == "playwright":
+        from playwright_backend import PlaywrightBackend
+        kwargs.pop("browser", None)
+        return PlaywrightBackend(**kwargs)
+    if name == "cdp":
+        from cdp_backend import AsyncCDPBackend
+        return AsyncCDPBackend(**kwargs)
+    raise ValueError(f"Неизвестный бэкенд браузера: {name}")
@@ -8,12 +8,10 @@ import logging
 import tempfile
 import shutil
 import subprocess
-import datetime
 from pathlib import Path
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 
@@ -23,14 +21,7 @@ os.makedirs(log_dir, exist_ok=True)
 screenshots_dir = os.path.join(log_dir, "screenshots")
 os.makedirs(screenshots_dir, exist_ok=True)
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(os.path.join(log_dir, "browser.log")),
-        logging.StreamHandler()
-    ]
-)
+# Обработчики логов настраивает log_setup.setup_logging (файл browser.log - по имени логгера)
 logger = logging.getLogger(__name__)
 
 # Загрузка учетных данных из .env
@@ -44,11 +35,21 @@ CITY = os.getenv("CITY", "Минск")
 VISA_TYPE = os.getenv("VISA_TYPE", "Шенген виза")
 CHECK_INTERVAL = int(os.getenv("CHECK_INTERVAL", "60"))
 MAX_DATES_TO_SHOW = int(os.getenv("MAX_DATES_TO_SHOW", "5"))
+# Каталог для временных профилей Chrome; супервизор задает его каждому исполнителю
+# (supervisor.py), чтобы удалить профили убитого исполнителя. Пусто - системный /tmp
+CHROME_PROFILE_ROOT = os.getenv("CHROME_PROFILE_ROOT") or None
 
 # URL для страниц VFS Global
-LOGIN_URL = "https://visa.vfsglobal.com/blr/ru/pol/login"
-DASHBOARD_URL = "https://visa.vfsglobal.com/blr/ru/pol/dashboard"
-NEW_BOOKING_URL = "https://visa.vfsglobal.com/blr/ru/pol/book-an-appointment"
+from locators import LOGIN_URL, DASHBOARD_URL, NEW_BOOKING_URL, NO_SLOTS_MESSAGE
+from locators import CENTER_DROPDOWN, CITY_CENTERS
+from locators import FIRST_NAME_INPUT, LAST_NAME_INPUT, PERSONAL_BIRTH_DATE_INPUT, SUBMIT_BUTTON_TEXTS
+
+# Время ожиданий элементов обучается по замерам (wait_budget.py)
+from wait_budget import wait_budget
+# Длительности и исходы этапов (metrics.py)
+from metrics import timed_stage
+# Разбор снимка страницы без драйвера (page_parsers.py)
+from page_parsers import parse_calendar
 
 def cleanup_chrome():
     """Очистка процессов Chrome и временных файлов."""
@@ -76,19 +77,26 @@ def cleanup_chrome():
         logger.error(f"Ошибка при очистке Chrome: {str(e)}")
         return False
 
-def setup_driver():
+@timed_stage("setup_driver")
+def setup_driver(headless=False, cleanup=True):
     """
     Настраивает и возвращает драйвер браузера Chrome.
 
+    Args:
+        headless (bool): Без окна - только для локального стенда (mocks/vfs_site.py), VFS блокирует headless
+        cleanup (bool): Завершить перед запуском все процессы Chrome; False - рядом работают
+            другие браузеры процесса (запасные, spare_browsers.py)
+
     Returns:
         webdriver.Chrome: Настроенный драйвер Chrome или None в случае ошибки
     """
     # Очищаем предыдущие процессы Chrome
-    cleanup_chrome()
+    if cleanup:
+        cleanup_chrome()
 
     try:
         # Создаем временную директорию для профиля
-        profile_dir = tempfile.mkdtemp(prefix=f"chrome_profile_{int(time.time())}_")
+        profile_dir = tempfile.mkdtemp(prefix=f"chrome_profile_{int(time.time())}_", dir=CHROME_PROFILE_ROOT)
         logger.info(f"Создана временная директория для профиля: {profile_dir}")
 
         # Настраиваем опции Chrome
@@ -98,6 +106,8 @@ def setup_driver():
         options.add_argument(f"--user-data-dir={profile_dir}")
         options.add_argument("--disable-blink-features=AutomationControlled")
         options.add_argument("--window-size=1920,1080")
+        if headless:
+            options.add_argument("--headless=new")
 
         # Режим инкогнито (помогает обойти ограничения сайта)
         options.add_argument("--incognito")
@@ -142,6 +152,16 @@ def setup_driver():
                 pass
         return None
 
+def reset_to_dashboard(driver):
+    """
+    Возвращает переиспользуемый драйвер на dashboard между сессиями.
+
+    Args:
+        driver (webdriver.Chrome): Драйвер Chrome
+    """
+    driver.get(DASHBOARD_URL)
+
+@timed_stage("login_vfs_global")
 def login_vfs_global(driver):
     """
     Выполняет вход в аккаунт VFS Global.
@@ -157,12 +177,17 @@ def login_vfs_global(driver):
         if not VFS_EMAIL or not VFS_PASSWORD:
             logger.error("Не найдены учетные данные VFS Global в переменных окружения")
             return False
+
+        # Переиспользуемый драйвер может быть уже авторизован после прошлой сессии
+        if "dashboard" in driver.current_url:
+            logger.info("Сессия уже авторизована, вход не требуется")
+            return True
         
         logger.info(f"Открываю страницу авторизации: {LOGIN_URL}")
         driver.get(LOGIN_URL)
         
         # Ждем загрузки формы авторизации
-        WebDriverWait(driver, 15).until(
+        wait_budget.wait(driver, "login_form",
             EC.presence_of_element_located((By.ID, "mat-input-0"))
         )
         
@@ -197,12 +222,12 @@ def login_vfs_global(driver):
         # Ищем и нажимаем кнопку входа
         # Сначала пробуем найти по тексту на русском
         try:
-            login_button = WebDriverWait(driver, 5).until(
+            login_button = wait_budget.wait(driver, "login_button_ru",
                 EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'Войти')]"))
             )
         except:
             # Если не найдена кнопка на русском, ищем на английском
-            login_button = WebDriverWait(driver, 5).until(
+            login_button = wait_budget.wait(driver, "login_button_en",
                 EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'Login')]"))
             )
         
@@ -211,7 +236,7 @@ def login_vfs_global(driver):
         
         # Ждем перехода на страницу после авторизации
         try:
-            WebDriverWait(driver, 20).until(
+            wait_budget.wait(driver, "login_redirect",
                 EC.url_contains("dashboard")
             )
             logger.info("Успешный вход! Перешли на dashboard")
@@ -238,38 +263,52 @@ def login_vfs_global(driver):
             pass
         return False
 
-def start_new_appointment(driver):
+@timed_stage("start_new_appointment")
+def start_new_appointment(driver, city=None):
     """
     Начинает новую запись на прием и заполняет все необходимые поля.
 
+    Если сессия уже на страницах записи (например, открыт календарь другого
+    центра), форма открывается сразу по адресу, без dashboard.
+
     Args:
         driver (webdriver.Chrome): Драйвер Chrome
+        city (str): Город визового центра (ключ locators.CITY_CENTERS); по умолчанию CITY
 
     Returns:
         bool: True, если запись успешно начата, иначе False
     """
+    center = CITY_CENTERS.get(city or CITY)
+    if center is None:
+        logger.error(f"Нет визового центра для города {city or CITY}")
+        return False
     try:
-        # Сначала проверяем, находимся ли мы уже на странице dashboard
-        if not "dashboard" in driver.current_url:
-            # Переходим на dashboard
-            logger.info("Переходим на dashboard")
-            driver.get(DASHBOARD_URL)
-            time.sleep(2)
-
-        # Ищем кнопку "Записаться на прием" и нажимаем на нее
-        try:
-            book_button = WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'Записаться на прием')]"))
-            )
-            book_button.click()
-            logger.info("Нажата кнопка 'Записаться на прием'")
-        except:
-            # Возможно, мы уже перешли на страницу заполнения формы
-            logger.warning("Не найдена кнопка 'Записаться на прием', пробуем перейти напрямую")
+        if "book-an-appointment" in driver.current_url:
+            # Проверка другого центра в той же сессии: вход и dashboard не нужны
+            logger.info("Открываем форму записи для другого центра")
             driver.get(NEW_BOOKING_URL)
+        else:
+            # Сначала проверяем, находимся ли мы уже на странице dashboard
+            if not "dashboard" in driver.current_url:
+                # Переходим на dashboard
+                logger.info("Переходим на dashboard")
+                driver.get(DASHBOARD_URL)
+                time.sleep(2)
+
+            # Ищем кнопку "Записаться на прием" и нажимаем на нее
+            try:
+                book_button = wait_budget.wait(driver, "appointment_button",
+                    EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'Записаться на прием')]"))
+                )
+                book_button.click()
+                logger.info("Нажата кнопка 'Записаться на прием'")
+            except:
+                # Возможно, мы уже перешли на страницу заполнения формы
+                logger.warning("Не найдена кнопка 'Записаться на прием', пробуем перейти напрямую")
+                driver.get(NEW_BOOKING_URL)
 
         # Ждем загрузки формы записи
-        WebDriverWait(driver, 15).until(
+        wait_budget.wait(driver, "appointment_form",
             EC.presence_of_element_located((By.XPATH, "//*[contains(text(), 'Выберите свой Центр приложений')]"))
         )
 
@@ -278,37 +317,45 @@ def start_new_appointment(driver):
         driver.save_screenshot(screenshot_path)
         logger.info("Загружена страница записи")
 
-        # Выбираем центр в Минске
+        # Выбираем центр города
         try:
             # Находим dropdown для выбора центра
-            center_dropdown = WebDriverWait(driver, 5).until(
+            center_dropdown = wait_budget.wait(driver, "form_control",
                 EC.element_to_be_clickable((By.XPATH, "//mat-select[contains(@aria-labelledby, 'mat-form-field') and contains(@formcontrolname, 'center')]"))
             )
             center_dropdown.click()
             time.sleep(1)
 
-            # Выбираем Poland Visa Application Center-Minsk
-            center_option = WebDriverWait(driver, 5).until(
-                EC.element_to_be_clickable((By.XPATH, "//mat-option//span[contains(text(), 'Poland Visa Application Center-Minsk')]"))
+            # Выбираем центр из списка
+            center_option = wait_budget.wait(driver, "form_control",
+                EC.element_to_be_clickable((By.XPATH, f"//mat-option//span[contains(text(), '{center}')]"))
             )
             center_option.click()
-            logger.info("Выбран центр: Poland Visa Application Center-Minsk")
+            logger.info(f"Выбран центр: {center}")
             time.sleep(1)
         except Exception as e:
+            # Возможно, центр уже выбран - это проверяется ниже
             logger.warning(f"Ошибка при выборе центра: {str(e)}")
-            # Возможно, центр уже выбран, продолжаем
+
+        # Без нужного центра в списке календарь был бы чужого города
+        selected = driver.find_elements(By.XPATH, CENTER_DROPDOWN[1])
+        selected_text = selected[0].text if selected else None
+        if not selected_text or center not in selected_text:
+            logger.error(f"Центр {center} не выбран (в списке: {selected_text or 'список не найден'})")
+            _save_error_screenshot(driver, "center_not_selected")
+            return False
 
         # Выбираем категорию визы (National Visa D)
         try:
             # Находим dropdown для выбора категории
-            category_dropdown = WebDriverWait(driver, 5).until(
+            category_dropdown = wait_budget.wait(driver, "form_control",
                 EC.element_to_be_clickable((By.XPATH, "//mat-select[contains(@aria-labelledby, 'mat-form-field') and contains(@formcontrolname, 'category')]"))
             )
             category_dropdown.click()
             time.sleep(1)
 
             # Выбираем National Visa D
-            category_option = WebDriverWait(driver, 5).until(
+            category_option = wait_budget.wait(driver, "form_control",
                 EC.element_to_be_clickable((By.XPATH, "//mat-option//span[contains(text(), 'National Visa D')]"))
             )
             category_option.click()
@@ -321,7 +368,7 @@ def start_new_appointment(driver):
         # Выбираем подкатегорию (на скриншоте видно Praca - Oswiadczenie)
         try:
             # Находим dropdown для выбора подкатегории
-            subcategory_dropdown = WebDriverWait(driver, 5).until(
+            subcategory_dropdown = wait_budget.wait(driver, "form_control",
                 EC.element_to_be_clickable((By.XPATH, "//mat-select[contains(@aria-labelledby, 'mat-form-field') and contains(@formcontrolname, 'subCategory')]"))
             )
             subcategory_dropdown.click()
@@ -338,7 +385,7 @@ def start_new_appointment(driver):
             # Если не нашли конкретную опцию, выбираем первую доступную
             if not "Praca - Oswiadczenie" in [option.text for option in subcategory_options]:
                 # Выбираем первую подкатегорию в списке
-                first_option = WebDriverWait(driver, 5).until(
+                first_option = wait_budget.wait(driver, "form_control",
                     EC.element_to_be_clickable((By.XPATH, "//mat-option[1]"))
                 )
                 first_option.click()
@@ -350,7 +397,7 @@ def start_new_appointment(driver):
 
         # Вводим дату рождения
         try:
-            birth_date_input = WebDriverWait(driver, 5).until(
+            birth_date_input = wait_budget.wait(driver, "form_control",
                 EC.presence_of_element_located((By.XPATH, "//input[@formcontrolname='dateOfBirth']"))
             )
             birth_date_input.clear()
@@ -376,7 +423,7 @@ def start_new_appointment(driver):
 
         # Нажимаем на кнопку "Продолжить", если она есть
         try:
-            continue_button = WebDriverWait(driver, 5).until(
+            continue_button = wait_budget.wait(driver, "continue_button",
                 EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'Продолжить')]"))
             )
             continue_button.click()
@@ -398,6 +445,7 @@ def start_new_appointment(driver):
             pass
         return False
 
+@timed_stage("check_available_dates")
 def check_available_dates(driver):
     """
     Проверяет доступные даты для записи на прием.
@@ -409,106 +457,56 @@ def check_available_dates(driver):
         tuple: (bool, list|str) - (успех, список дат или сообщение об ошибке)
     """
     try:
-        # Проверяем наличие сообщения об отсутствии слотов на текущей странице
+        # Ждем календарь или сообщение об отсутствии слотов: что появится раньше
         try:
-            no_slots_message = driver.find_element(By.XPATH,
-                "//div[contains(text(), 'нет доступных слотов') or contains(text(), 'Приносим извинения') or contains(text(), 'Места для регистрации')]")
-            message_text = no_slots_message.text
-            logger.info(f"Найдено сообщение об отсутствии слотов: {message_text}")
+            wait_budget.wait(driver, "calendar", EC.any_of(
+                EC.presence_of_element_located((By.CSS_SELECTOR, ".mat-calendar-body, .calendar-container, mat-calendar, .date-selection")),
+                EC.presence_of_element_located(NO_SLOTS_MESSAGE)
+            ))
+        except Exception as e:
+            logger.warning(f"Ошибка при поиске календаря: {str(e)}")
 
-            # Делаем скриншот страницы с сообщением
-            screenshot_path = os.path.join(screenshots_dir, f"no_slots_available_{int(time.time())}.png")
+            # Если календарь не найден, это может означать, что доступных дат нет
+            # или что сайт показал сообщение об отсутствии слотов
+            screenshot_path = os.path.join(screenshots_dir, f"no_calendar_{int(time.time())}.png")
             driver.save_screenshot(screenshot_path)
 
-            # Возвращаем пустой список дат, но с успешным статусом
             return True, []
-        except:
-            logger.info("Сообщение об отсутствии слотов не найдено, ищем доступные даты")
 
-        # Проверяем, есть ли календарь с датами
-        try:
-            # Ищем элементы календаря
-            WebDriverWait(driver, 5).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, ".mat-calendar-body, .calendar-container, mat-calendar, .date-selection"))
-            )
+        # Страница снимается один раз и разбирается без обращений к драйверу
+        page = parse_calendar(driver.page_source)
 
-            # Делаем скриншот календаря
-            calendar_screenshot = os.path.join(screenshots_dir, f"calendar_{int(time.time())}.png")
-            driver.save_screenshot(calendar_screenshot)
-            logger.info("Найден календарь с датами")
+        if page["no_slots"]:
+            logger.info(f"Найдено сообщение об отсутствии слотов: {page['no_slots']}")
 
-            # Ищем все доступные дни (не заблокированные)
-            available_dates = []
+            # Делаем скриншот страницы с сообщением
+            screenshot_path = os.path.join(screenshots_dir, f"no_slots_available_{int(time.time())}.png")
+            driver.save_screenshot(screenshot_path)
 
-            # Проверяем доступные даты различными способами (под разные версии UI)
+            # Возвращаем пустой список дат, но с успешным статусом
+            return True, []
 
-            # Способ 1: Ищем стандартные ячейки календаря
-            try:
-                calendar_cells = driver.find_elements(By.CSS_SELECTOR,
-                    ".mat-calendar-body-cell:not(.mat-calendar-body-disabled), .date-available, td.selectable:not(.disabled)")
-
-                month_name = ""
-                try:
-                    month_element = driver.find_element(By.CSS_SELECTOR, ".mat-calendar-period-button, .current-month")
-                    month_name = month_element.text.strip()
-                except:
-                    month_name = datetime.datetime.now().strftime("%B %Y")
-
-                for cell in calendar_cells:
-                    try:
-                        date_text = cell.find_element(By.CSS_SELECTOR,
-                            ".mat-calendar-body-cell-content, .date-text").text
-                        full_date = f"{date_text} {month_name}"
-                        available_dates.append(full_date)
-                        logger.info(f"Найдена доступная дата: {full_date}")
-
-                        # Сохраняем атрибуты для возможного клика в будущем
-                        cell.location_once_scrolled_into_view
-
-                    except:
-                        continue
-            except Exception as e:
-                logger.warning(f"Ошибка при проверке ячеек календаря (способ 1): {str(e)}")
-
-            # Способ 2: Ищем любые элементы, которые могут содержать даты и быть кликабельными
-            if not available_dates:
-                try:
-                    date_elements = driver.find_elements(By.CSS_SELECTOR,
-                        "[class*='date']:not([class*='disabled']), [class*='calendar']:not([class*='disabled'])")
-
-                    for elem in date_elements:
-                        try:
-                            if elem.is_displayed() and elem.is_enabled():
-                                date_text = elem.text.strip()
-                                if date_text and any(c.isdigit() for c in date_text):
-                                    available_dates.append(date_text)
-                                    logger.info(f"Найдена доступная дата (способ 2): {date_text}")
-                        except:
-                            continue
-                except Exception as e:
-                    logger.warning(f"Ошибка при проверке элементов дат (способ 2): {str(e)}")
-
-            # Если нашли доступные даты, возвращаем их
-            if available_dates:
-                logger.info(f"Найдено {len(available_dates)} доступных дат")
-
-                # Сохраняем доп. скриншот страницы с календарем для проверки
-                bonus_screenshot = os.path.join(screenshots_dir, f"available_dates_{int(time.time())}.png")
-                driver.save_screenshot(bonus_screenshot)
-
-                return True, available_dates
-            else:
-                logger.info("Календарь найден, но доступных дат нет")
-                return True, []
+        # Делаем скриншот календаря
+        calendar_screenshot = os.path.join(screenshots_dir, f"calendar_{int(time.time())}.png")
+        driver.save_screenshot(calendar_screenshot)
+        logger.info("Найден календарь с датами")
 
-        except Exception as e:
-            logger.warning(f"Ошибка при поиске календаря: {str(e)}")
+        # Способ 1: стандартные ячейки календаря; способ 2 (другие версии UI): элементы с датой в классе
+        available_dates = page["dates"] or page["labels"]
+        for date in available_dates:
+            logger.info(f"Найдена доступная дата: {date}")
 
-            # Если календарь не найден, это может означать, что доступных дат нет
-            # или что сайт показал сообщение об отсутствии слотов
-            screenshot_path = os.path.join(screenshots_dir, f"no_calendar_{int(time.time())}.png")
-            driver.save_screenshot(screenshot_path)
+        # Если нашли доступные даты, возвращаем их
+        if available_dates:
+            logger.info(f"Найдено {len(available_dates)} доступных дат")
+
+            # Сохраняем доп. скриншот страницы с календарем для проверки
+            bonus_screenshot = os.path.join(screenshots_dir, f"available_dates_{int(time.time())}.png")
+            driver.save_screenshot(bonus_screenshot)
 
+            return True, available_dates
+        else:
+            logger.info("Календарь найден, но доступных дат нет")
             return True, []
 
     except Exception as e:
@@ -520,76 +518,148 @@ def check_available_dates(driver):
             pass
         return False, str(e)
 
+# Заполнение формы личных данных одним вызовом execute_async_script: ждет первое поле
+# (MutationObserver вместо опроса), записывает значения через setter прототипа и
+# отправляет input/change/blur - так значения получают контролы Angular (DefaultValueAccessor,
+# MatDatepickerInput) и проходят валидацию. После обнаружения изменений (следующая задача)
+# проверяет статус формы и нажимает кнопку продолжения, если форма валидна.
+FILL_FORM_JS = """
+const [fields, buttonTexts, timeout, done] = arguments;
+const started = Date.now();
+const setter = Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, 'value').set;
+const first = () => document.querySelector(fields[0][1]);
+const fill = () => {
+    const waited = Date.now() - started;
+    const filled = [], missing = [];
+    for (const [name, selector, value] of fields) {
+        const input = document.querySelector(selector);
+        if (!input) { missing.push(name); continue; }
+        input.focus();
+        setter.call(input, value);
+        input.dispatchEvent(new Event('input', {bubbles: true}));
+        input.dispatchEvent(new Event('change', {bubbles: true}));
+        input.dispatchEvent(new Event('blur'));
+        filled.push(name);
+    }
+    setTimeout(() => {
+        const form = first().closest('form') || document;
+        const invalid = Array.from(form.querySelectorAll('.ng-invalid[formcontrolname]'))
+            .map((el) => el.getAttribute('formcontrolname'));
+        const button = Array.from(form.querySelectorAll('button'))
+            .find((el) => buttonTexts.some((text) => el.textContent.includes(text)));
+        const result = {waited, filled, missing, invalid, button: button ? button.textContent.trim() : null,
+                        disabled: button ? button.disabled : null, clicked: false};
+        if (!missing.length && !invalid.length && button && !button.disabled) {
+            button.click();
+            result.clicked = true;
+        }
+        done(result);
+    }, 0);
+};
+if (first()) return fill();
+const observer = new MutationObserver(() => {
+    if (first()) { observer.disconnect(); clearTimeout(timer); fill(); }
+});
+observer.observe(document, {childList: true, subtree: true});
+const timer = setTimeout(() => { observer.disconnect(); done({waited: Date.now() - started, timeout: true}); }, timeout);
+"""
+
+
 def fill_personal_data(driver, first_name, last_name, birth_date):
     """
     Заполняет личные данные в форме записи.
-    
+
+    Все поля заполняются, проверяются и отправляются одним скриптом (FILL_FORM_JS);
+    если скрипт не смог отправить форму (нет поля, поле не прошло валидацию,
+    кнопка неактивна), поля вводятся с клавиатуры, как раньше.
+
     Args:
         driver (webdriver.Chrome): Драйвер Chrome
         first_name (str): Имя
         last_name (str): Фамилия
         birth_date (str): Дата рождения в формате DD.MM.YYYY
-        
+
     Returns:
         bool: True, если данные успешно заполнены, иначе False
     """
+    fields = [
+        ["firstName", FIRST_NAME_INPUT[1], first_name],
+        ["lastName", LAST_NAME_INPUT[1], last_name],
+        ["dateOfBirth", PERSONAL_BIRTH_DATE_INPUT[1], birth_date],
+    ]
+    timeout = wait_budget.budget("personal_form")
     try:
-        # Ожидаем загрузки формы с личными данными
-        WebDriverWait(driver, 15).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "input[formcontrolname='firstName']"))
-        )
-        
-        # Заполняем поля формы
-        first_name_input = driver.find_element(By.CSS_SELECTOR, "input[formcontrolname='firstName']")
-        last_name_input = driver.find_element(By.CSS_SELECTOR, "input[formcontrolname='lastName']")
-        
+        # Ожидание формы идет внутри скрипта: лимит скрипта - бюджет ожидания с запасом
+        driver.set_script_timeout(timeout + 5)
+        result = driver.execute_async_script(FILL_FORM_JS, fields, list(SUBMIT_BUTTON_TEXTS), int(timeout * 1000))
+    except Exception as e:
+        logger.warning(f"Скрипт заполнения личных данных не выполнен: {str(e)}")
+        return _fill_personal_data_by_keys(driver, first_name, last_name, birth_date)
+
+    if result.get("timeout"):
+        wait_budget.record("personal_form", timed_out=True)
+        logger.error(f"Форма личных данных не появилась за {timeout:.1f} с")
+        _save_error_screenshot(driver, "personal_data_error")
+        return False
+    wait_budget.record("personal_form", result["waited"] / 1000)
+
+    if result["clicked"]:
+        logger.info(f"Личные данные заполнены одним вызовом ({', '.join(result['filled'])}), "
+                    f"нажата кнопка «{result['button']}»")
+        return True
+
+    logger.warning(f"Форма не отправлена скриптом: нет полей {result['missing']}, "
+                   f"не прошли проверку {result['invalid']}, кнопка {result['button']!r} "
+                   f"(неактивна: {result['disabled']}); ввожу с клавиатуры")
+    return _fill_personal_data_by_keys(driver, first_name, last_name, birth_date)
+
+
+def _save_error_screenshot(driver, name):
+    try:
+        driver.save_screenshot(os.path.join(screenshots_dir, f"{name}_{int(time.time())}.png"))
+    except Exception:
+        pass
+
+
+def _fill_personal_data_by_keys(driver, first_name, last_name, birth_date):
+    """Запасной путь fill_personal_data: ввод полей с клавиатуры и ожидание кнопки продолжения."""
+    try:
+        first_name_input = driver.find_element(By.CSS_SELECTOR, FIRST_NAME_INPUT[1])
+        last_name_input = driver.find_element(By.CSS_SELECTOR, LAST_NAME_INPUT[1])
+
         # Очищаем поля и заполняем новыми данными
         first_name_input.clear()
         first_name_input.send_keys(first_name)
         logger.info(f"Введено имя: {first_name}")
-        
+
         last_name_input.clear()
         last_name_input.send_keys(last_name)
         logger.info(f"Введена фамилия: {last_name}")
-        
-        # Ищем поле для даты рождения (может иметь разный формат ввода)
-        try:
-            # Вариант 1: Если это обычное текстовое поле
-            birth_date_input = driver.find_element(By.CSS_SELECTOR, "input[formcontrolname='dateOfBirth']")
-            birth_date_input.clear()
-            birth_date_input.send_keys(birth_date)
-        except:
-            # Вариант 2: Если это поле с датапикером
-            birth_date_input = driver.find_element(By.CSS_SELECTOR, "input.mat-datepicker-input")
-            birth_date_input.clear()
-            birth_date_input.send_keys(birth_date)
-        
+
+        # Текстовое поле или поле с датапикером - первое найденное
+        birth_date_input = driver.find_element(By.CSS_SELECTOR, PERSONAL_BIRTH_DATE_INPUT[1])
+        birth_date_input.clear()
+        birth_date_input.send_keys(birth_date)
         logger.info(f"Введена дата рождения: {birth_date}")
-        
-        # Сохраняем скриншот заполненной формы
-        screenshot_path = os.path.join(screenshots_dir, f"personal_data_form_{int(time.time())}.png")
-        driver.save_screenshot(screenshot_path)
-        
+
         # Нажимаем кнопку продолжения
-        continue_button = WebDriverWait(driver, 10).until(
+        continue_button = wait_budget.wait(driver, "submit_button",
             EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'Продолжить') or contains(text(), 'Continue')]"))
         )
         continue_button.click()
         logger.info("Нажата кнопка продолжения после заполнения личных данных")
-        
+
         return True
-        
+
     except Exception as e:
         logger.error(f"Ошибка при заполнении личных данных: {str(e)}")
-        error_screenshot = os.path.join(screenshots_dir, f"personal_data_error_{int(time.time())}.png")
-        try:
-            driver.save_screenshot(error_screenshot)
-        except:
-            pass
+        _save_error_screenshot(driver, "personal_data_error")
         return False
 
 # Тест функций, если скрипт запущен напрямую
 if __name__ == "__main__":
+    from log_setup import setup_logging
+    setup_logging()
     try:
         # Тестируем функции
         print("Тестирование функций для работы с браузером...")
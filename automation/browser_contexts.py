@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import logging
+import threading
+
+from dotenv import load_dotenv
+
+from memory_watchdog import MemoryWatchdog
+
+# Команда WebDriver переключения окна: после нее активна уже не вкладка контекста
+SWITCH_TO_WINDOW = "switchToWindow"
+
+logger = logging.getLogger(__name__)
+
+# Загружаем переменные окружения
+load_dotenv()
+MAX_BROWSER_CONTEXTS = int(os.getenv("MAX_BROWSER_CONTEXTS", "4"))  # Сколько изолированных контекстов держит один Chrome
+
+
+class BrowserContextSession:
+    """
+    Изолированный контекст (отдельные cookies и storage) внутри общего Chrome.
+
+    Контекст создается через CDP Target.createBrowserContext и имеет собственную
+    вкладку. Атрибут driver - обычный WebDriver, все команды которого выполняются
+    в этой вкладке, поэтому его можно передавать в существующие функции
+    (login_vfs_global, start_new_appointment и т.д.) без изменений.
+    """
+
+    def __init__(self, browser, context_id, handle):
+        self.browser = browser
+        self.context_id = context_id
+        self.handle = handle
+        self.closed = False
+        self.driver = _bind_driver_to_context(browser.driver, self)
+
+    def activate(self):
+        """Переключает общий драйвер на вкладку контекста (вызывается под блокировкой)."""
+        if self.closed:
+            raise RuntimeError(f"Контекст браузера {self.context_id} уже закрыт")
+        if self.browser.active_handle != self.handle:
+            self.browser.driver.switch_to.window(self.handle)
+            self.browser.active_handle = self.handle
+
+    def close(self):
+        """Закрывает вкладку и уничтожает контекст вместе с его cookies."""
+        if self.closed:
+            return
+        self.browser.close_context(self)
+
+
+def _bind_driver_to_context(base_driver, context):
+    """
+    Создает копию WebDriver, которая перед каждой командой переключается на вкладку контекста.
+
+    Копия разделяет с базовым драйвером сессию chromedriver, но является настоящим
+    экземпляром WebDriver, поэтому WebElement, WebDriverWait и expected_conditions
+    работают с ней как обычно, а команды элементов тоже проходят через execute().
+    Помощники, привязанные к базовому драйверу (switch_to, mobile), пересоздаются
+    для копии, иначе их команды шли бы мимо переключения на вкладку контекста.
+    """
+    base_class = type(base_driver)
+
+    def execute(self, driver_command, params=None):
+        with context.browser.lock:
+            context.activate()
+            response = base_class.execute(self, driver_command, params)
+            if driver_command == SWITCH_TO_WINDOW:
+                # Задание само перешло в другое окно: следующая команда контекста вернет его вкладку
+                context.browser.active_handle = (params or {}).get("handle")
+            return response
+
+    def quit(self):
+        context.close()
+
+    def close(self):
+        context.close()
+
+    bound_class = type(f"Context{base_class.__name__}", (base_class,), {
+        "execute": execute,
+        "quit": quit,
+        "close": close,
+    })
+    bound = object.__new__(bound_class)
+    bound.__dict__.update(base_driver.__dict__)
+    for name, value in base_driver.__dict__.items():
+        # SwitchTo и Mobile хранят драйвер (слабой ссылкой) и создаются от него одного
+        if hasattr(value, "_driver"):
+            bound.__dict__[name] = type(value)(bound)
+    return bound
+
+
+class SharedBrowser:
+    """
+    Один процесс Chrome, в котором задания разных чатов получают изолированные контексты.
+
+    Повторяет интерфейс DriverRecycler (acquire/release/shutdown/watchdog), поэтому
+    main.py может использовать любой из них. Команды разных контекстов
+    сериализуются блокировкой: сессия chromedriver обрабатывает одну команду за раз.
+    """
+
+    def __init__(self, driver_factory, watchdog=None, max_contexts=MAX_BROWSER_CONTEXTS):
+        self.driver_factory = driver_factory
+        # Общий браузер живет долго, поэтому по умолчанию ограничиваем только память
+        self.watchdog = watchdog or MemoryWatchdog(max_sessions=0)
+        self.max_contexts = max_contexts
+        self.driver = None
+        self.active_handle = None
+        self.lock = threading.RLock()
+        self._slots = threading.BoundedSemaphore(max_contexts)
+        self._contexts = {}
+        self._home_handle = None
+
+    def _ensure_browser(self):
+        """Запускает общий Chrome или пересоздает его, если лимиты превышены и контекстов нет."""
+        if self.driver is not None and not self._contexts:
+            reason = self.watchdog.check(self.driver)
+            if reason:
+                self._quit_browser(reason)
+        if self.driver is None:
+            driver = self.driver_factory()
+            if driver is None:
+                return False
+            self.driver = driver
+            self._home_handle = driver.current_window_handle
+            self.active_handle = self._home_handle
+            self.watchdog.register(driver)
+        return True
+
+    def open_context(self):
+        """
+        Создает новый изолированный контекст с собственной вкладкой.
+
+        Returns:
+            BrowserContextSession: Контекст или None, если браузер не удалось запустить
+        """
+        self._slots.acquire()
+        try:
+            with self.lock:
+                if not self._ensure_browser():
+                    self._slots.release()
+                    return None
+
+                context_id = self.driver.execute_cdp_cmd(
+                    "Target.createBrowserContext", {"disposeOnDetach": False}
+                )["browserContextId"]
+                handles_before = set(self.driver.window_handles)
+                target_id = self.driver.execute_cdp_cmd(
+                    "Target.createTarget", {"url": "about:blank", "browserContextId": context_id}
+                )["targetId"]
+                handle = self._find_handle(target_id, handles_before)
+
+                context = BrowserContextSession(self, context_id, handle)
+                self._contexts[context_id] = context
+                session = self.watchdog.get_session(self.driver)
+                if session:
+                    session.sessions_served += 1
+
+                # Маскировка navigator.webdriver действует на страницу, поэтому повторяем ее для вкладки
+                try:
+                    context.driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
+                        "source": "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+                    })
+                except Exception as e:
+                    logger.warning(f"Не удалось скрыть navigator.webdriver в контексте: {str(e)}")
+                logger.info(f"Открыт контекст браузера {context_id} (активных: {len(self._contexts)})")
+                return context
+        except Exception as e:
+            logger.error(f"Ошибка при создании контекста браузера: {str(e)}")
+            self._slots.release()
+            return None
+
+    def _find_handle(self, target_id, handles_before):
+        """Находит дескриптор окна WebDriver для созданной CDP-вкладки."""
+        handles = self.driver.window_handles
+        for handle in handles:
+            if handle == target_id or handle.endswith(target_id):
+                return handle
+        new_handles = [handle for handle in handles if handle not in handles_before]
+        if not new_handles:
+            raise RuntimeError(f"Не найдено окно для вкладки {target_id}")
+        return new_handles[0]
+
+    def close_context(self, context):
+        """Закрывает вкладку контекста и освобождает слот."""
+        with self.lock:
+            if context.closed:
+                return
+            context.closed = True
+            self._contexts.pop(context.context_id, None)
+            try:
+                if self.active_handle != context.handle:
+                    self.driver.switch_to.window(context.handle)
+                self.driver.close()
+                self.driver.switch_to.window(self._home_handle)
+                self.active_handle = self._home_handle
+                self.driver.execute_cdp_cmd("Target.disposeBrowserContext", {"browserContextId": context.context_id})
+                logger.info(f"Закрыт контекст браузера {context.context_id}")
+            except Exception as e:
+                logger.warning(f"Ошибка при закрытии контекста браузера: {str(e)}")
+            finally:
+                self._slots.release()
+
+    def acquire(self):
+        """Совместимость с DriverRecycler: возвращает драйвер нового контекста."""
+        context = self.open_context()
+        return context.driver if context else None
+
+    def release(self, driver, broken=False):
+        """Совместимость с DriverRecycler: закрывает контекст, к которому привязан драйвер."""
+        driver.quit()
+        if broken:
+            logger.info("Сессия в контексте завершилась ошибкой, общий браузер сохраняется")
+
+    def _quit_browser(self, reason):
+        session = self.watchdog.unregister(self.driver)
+        session_id = session.session_id if session else "?"
+        logger.info(f"Пересоздаю общий браузер {session_id}: {reason}")
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+        self.driver = None
+        self.active_handle = None
+
+    def shutdown(self):
+        """Закрывает все контексты и сам браузер."""
+        with self.lock:
+            for context in list(self._contexts.values()):
+                self.close_context(context)
+            if self.driver is not None:
+                self._quit_browser("остановка")
+        self.watchdog.stop()
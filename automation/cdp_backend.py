@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import base64
+import asyncio
+import logging
+
+from dotenv import load_dotenv
+
+from backends import AsyncBrowserBackend, snapshot_paths, get_backend, BROWSER_BACKEND
+from cdp_client import CDPConnection, CDPError, ChromeProcess
+from flows import run_check_flow
+
+logger = logging.getLogger(__name__)
+
+# Загружаем переменные окружения
+load_dotenv()
+MAX_ASYNC_SESSIONS = int(os.getenv("MAX_ASYNC_SESSIONS", "4"))  # Одновременных сессий в общем Chrome
+
+
+def parse_stage_timeouts(value):
+    """Разбирает строку вида "login=60,form=60" в словарь таймаутов этапов (секунды)."""
+    timeouts = {}
+    for item in (value or "").split(","):
+        if "=" in item:
+            stage, seconds = item.split("=", 1)
+            timeouts[stage.strip()] = float(seconds)
+    return timeouts
+
+
+ASYNC_STAGE_TIMEOUTS = parse_stage_timeouts(
+    os.getenv("ASYNC_STAGE_TIMEOUTS", "launch=30,login=60,form=60,calendar=30")
+)
+
+# Поиск элементов по локатору ("css" | "xpath", выражение) внутри страницы.
+# Скрипты оборачиваются в функцию (см. page_script), чтобы повторные вызовы не конфликтовали по const.
+FIND_JS = """
+const __find = (kind, expr) => {
+    if (kind === 'xpath') {
+        const r = document.evaluate(expr, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        const out = [];
+        for (let i = 0; i < r.snapshotLength; i++) out.push(r.snapshotItem(i));
+        return out;
+    }
+    return Array.from(document.querySelectorAll(expr));
+};
+const __visible = (el) => {
+    const rect = el.getBoundingClientRect();
+    return rect.width > 0 && rect.height > 0 && !el.disabled;
+};
+"""
+
+# Ожидание любого из локаторов одним вызовом: MutationObserver вместо опроса из Python
+WAIT_ANY_JS = """
+new Promise((resolve) => {
+    const locators = %s;
+    const check = () => {
+        for (let i = 0; i < locators.length; i++) {
+            if (__find(locators[i][0], locators[i][1]).length) return i;
+        }
+        return -1;
+    };
+    const found = check();
+    if (found >= 0) return resolve(found);
+    const observer = new MutationObserver(() => {
+        const index = check();
+        if (index >= 0) { observer.disconnect(); clearTimeout(timer); resolve(index); }
+    });
+    observer.observe(document, {childList: true, subtree: true, characterData: true, attributes: true});
+    const timer = setTimeout(() => { observer.disconnect(); resolve(-1); }, %d);
+})
+"""
+
+# Поиск кликабельного элемента: возвращает координаты центра для Input.dispatchMouseEvent
+CLICK_TARGET_JS = """
+new Promise((resolve) => {
+    const deadline = Date.now() + %d;
+    const attempt = () => {
+        const el = __find(%s, %s).find(__visible);
+        if (el) {
+            el.scrollIntoView({block: 'center'});
+            const rect = el.getBoundingClientRect();
+            return resolve({x: rect.left + rect.width / 2, y: rect.top + rect.height / 2});
+        }
+        if (Date.now() > deadline) return resolve(null);
+        setTimeout(attempt, 100);
+    };
+    attempt();
+})
+"""
+
+
+def page_script(body):
+    """Оборачивает выражение body вместе с FIND_JS в самовызывающуюся функцию."""
+    return f"(() => {{ {FIND_JS} return ({body}); }})()"
+
+
+READY_JS = """
+document.readyState !== 'loading' ? true :
+    new Promise((resolve) => document.addEventListener('DOMContentLoaded', () => resolve(true)))
+"""
+
+WEBDRIVER_MASK_JS = "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+
+
+class SharedCDPBrowser:
+    """Общий Chrome и одно CDP-соединение, в которых живут все асинхронные сессии."""
+
+    def __init__(self, headless=False):
+        self.headless = headless
+        self.chrome = None
+        self.connection = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def pid(self):
+        return self.chrome.pid if self.chrome else None
+
+    async def ensure_started(self):
+        async with self._lock:
+            if self.chrome and self.chrome.process.returncode is None and self.connection:
+                if not self.connection.closed:
+                    return
+                # Chrome жив, но websocket DevTools закрыт: без переподключения все новые сессии падали бы
+                logger.warning("Соединение CDP с общим браузером закрыто, переподключение")
+                await self.connection.close()
+                self.connection = None
+                try:
+                    self.connection = await CDPConnection.connect(self.chrome.websocket_url)
+                    return
+                except Exception as e:
+                    logger.warning(f"Не удалось переподключиться к Chrome, браузер перезапускается: {str(e)}")
+            await self.stop()
+            self.chrome = ChromeProcess(headless=self.headless)
+            url = await self.chrome.start()
+            self.connection = await CDPConnection.connect(url)
+
+    async def stop(self):
+        if self.connection:
+            await self.connection.close()
+            self.connection = None
+        if self.chrome:
+            await self.chrome.stop()
+            self.chrome = None
+
+
+class AsyncCDPBackend(AsyncBrowserBackend):
+    """
+    Асинхронный бэкенд поверх Chrome DevTools Protocol без WebDriver и потоков.
+
+    Каждый экземпляр - изолированный контекст браузера (свои cookies и storage)
+    с одной вкладкой. Если общий браузер не передан, бэкенд запускает свой Chrome.
+    """
+
+    name = "cdp"
+
+    def __init__(self, browser=None, headless=False):
+        self._own_browser = browser is None
+        self.browser = browser or SharedCDPBrowser(headless=headless)
+        self.context_id = None
+        self.target_id = None
+        self.session_id = None
+
+    @property
+    def connection(self):
+        return self.browser.connection
+
+    async def launch(self):
+        await self.browser.ensure_started()
+        self.context_id = (await self.connection.send("Target.createBrowserContext", {"disposeOnDetach": True}))["browserContextId"]
+        self.target_id = (await self.connection.send(
+            "Target.createTarget", {"url": "about:blank", "browserContextId": self.context_id}
+        ))["targetId"]
+        self.session_id = (await self.connection.send(
+            "Target.attachToTarget", {"targetId": self.target_id, "flatten": True}
+        ))["sessionId"]
+        await self._send("Page.enable")
+        await self._send("Page.addScriptToEvaluateOnNewDocument", {"source": WEBDRIVER_MASK_JS})
+        return True
+
+    async def _send(self, method, params=None):
+        return await self.connection.send(method, params, session_id=self.session_id)
+
+    async def _evaluate(self, expression):
+        response = await self._send("Runtime.evaluate", {
+            "expression": expression,
+            "awaitPromise": True,
+            "returnByValue": True,
+        })
+        if "exceptionDetails" in response:
+            raise CDPError(response["exceptionDetails"].get("text", "Ошибка выполнения скрипта"))
+        return response.get("result", {}).get("value")
+
+    async def _evaluate_with_retry(self, build_expression, timeout):
+        """
+        Выполняет ожидающий скрипт, повторяя его, если страница сменилась во время ожидания.
+
+        Args:
+            build_expression: Функция, строящая выражение по оставшемуся времени (мс)
+            timeout (float): Общий бюджет в секундах
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = max(0, int((deadline - time.monotonic()) * 1000))
+            try:
+                return await self._evaluate(build_expression(remaining))
+            except CDPError as e:
+                # "Execution context was destroyed" - навигация прервала ожидание
+                if time.monotonic() >= deadline:
+                    raise
+                logger.debug(f"Повтор ожидания после смены страницы: {str(e)}")
+                await asyncio.sleep(0.1)
+
+    async def navigate(self, url):
+        await self._send("Page.navigate", {"url": url})
+        await self._evaluate_with_retry(lambda remaining: READY_JS, 30)
+
+    async def wait_any(self, locators, timeout):
+        locators_json = json.dumps([list(locator) for locator in locators])
+        index = await self._evaluate_with_retry(
+            lambda remaining: page_script(WAIT_ANY_JS % (locators_json, remaining)), timeout
+        )
+        return None if index is None or index < 0 else index
+
+    async def extract(self, locator):
+        kind, expression = locator
+        texts = await self._evaluate(page_script(f"__find({json.dumps(kind)}, {json.dumps(expression)}).map(el => el.innerText.trim())"))
+        return texts or []
+
+    async def click(self, locator, timeout=5):
+        kind, expression = locator
+        point = await self._evaluate_with_retry(
+            lambda remaining: page_script(CLICK_TARGET_JS % (remaining, json.dumps(kind), json.dumps(expression))), timeout
+        )
+        if not point:
+            return False
+        for event_type in ("mouseMoved", "mousePressed", "mouseReleased"):
+            await self._send("Input.dispatchMouseEvent", {
+                "type": event_type, "x": point["x"], "y": point["y"], "button": "left", "clickCount": 1,
+            })
+        return True
+
+    async def fill(self, locator, value):
+        kind, expression = locator
+        focused = await self._evaluate(page_script(f"""
+            (() => {{
+                const el = __find({json.dumps(kind)}, {json.dumps(expression)})[0];
+                if (!el) return false;
+                el.focus();
+                if (el.select) el.select();
+                return true;
+            }})()
+        """))
+        if not focused:
+            raise CDPError(f"Поле не найдено: {expression}")
+        # insertText заменяет выделенный текст и генерирует настоящие события input
+        await self._send("Input.insertText", {"text": value})
+
+    async def snapshot(self, name):
+        screenshot_path, source_path = snapshot_paths(self.name, name)
+        html = await self._evaluate("document.documentElement.outerHTML") or ""
+        try:
+            screenshot = await self._send("Page.captureScreenshot", {"format": "png"})
+            with open(screenshot_path, "wb") as f:
+                f.write(base64.b64decode(screenshot["data"]))
+            with open(source_path, "w", encoding="utf-8") as f:
+                f.write(html)
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить снимок {name}: {str(e)}")
+        return html
+
+    async def current_url(self):
+        return await self._evaluate("location.href") or ""
+
+    async def close(self):
+        try:
+            if self.target_id and self.connection:
+                await self.connection.send("Target.closeTarget", {"targetId": self.target_id})
+            if self.context_id and self.connection:
+                await self.connection.send("Target.disposeBrowserContext", {"browserContextId": self.context_id})
+        except CDPError as e:
+            logger.warning(f"Ошибка при закрытии контекста CDP: {str(e)}")
+        finally:
+            if self.connection and self.session_id:
+                self.connection.remove_listeners(self.session_id)
+            self.target_id = self.context_id = self.session_id = None
+            if self._own_browser:
+                await self.browser.stop()
+
+
+class AsyncSessionManager:
+    """
+    Мультиплексирует проверки разных чатов на event loop бота.
+
+    Бэкенд сессии выбирается get_backend(BROWSER_BACKEND). На CDP все сессии живут
+    в одном Chrome как изолированные контексты; на selenium и playwright каждая
+    сессия запускает свой браузер. Число одновременных сессий ограничено
+    MAX_ASYNC_SESSIONS, у каждого этапа свой таймаут, а проверку чата можно
+    отменить командой.
+    """
+
+    def __init__(self, max_sessions=MAX_ASYNC_SESSIONS, stage_timeouts=None, headless=False,
+                 backend=BROWSER_BACKEND):
+        self.backend = backend
+        self.headless = headless
+        self.browser = SharedCDPBrowser(headless=headless)
+        self.stage_timeouts = stage_timeouts or ASYNC_STAGE_TIMEOUTS
+        self._semaphore = asyncio.Semaphore(max_sessions)
+        self._tasks = {}
+
+    def is_running(self, key):
+        task = self._tasks.get(key)
+        return task is not None and not task.done()
+
+    async def run_check(self, key, on_stage=None, city=None):
+        """
+        Выполняет проверку для ключа (обычно chat_id).
+
+        Args:
+            key: Ключ проверки; одновременно для ключа выполняется одна проверка
+            on_stage: Корутина on_stage(stage), вызываемая перед каждым этапом
+            city (str): Город визового центра; по умолчанию CITY
+
+        Returns:
+            dict: Результат run_check_flow; reason="busy", если проверка ключа уже идет,
+                reason="cancelled" при отмене (stage - этап, на котором остановлена)
+        """
+        if self.is_running(key):
+            return {"success": False, "stage": "launch", "reason": "busy", "dates": [],
+                    "error": "Проверка уже выполняется", "timings": {}}
+
+        current = {"stage": "launch"}
+
+        async def track(stage):
+            current["stage"] = stage
+            if on_stage:
+                await on_stage(stage)
+
+        async def job():
+            async with self._semaphore:
+                backend = get_backend(self.backend, browser=self.browser, headless=self.headless)
+                return await run_check_flow(backend, stage_timeouts=self.stage_timeouts, on_stage=track, city=city)
+
+        task = asyncio.get_running_loop().create_task(job())
+        self._tasks[key] = task
+        try:
+            return await task
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                # Отменили сам обработчик: останавливаем и проверку
+                task.cancel()
+                raise
+            logger.info(f"Проверка {key} отменена")
+            return {"success": False, "stage": current["stage"], "reason": "cancelled", "dates": [],
+                    "error": "Проверка отменена", "timings": {}}
+        finally:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+
+    def cancel(self, key):
+        """Отменяет проверку для ключа. Возвращает True, если было что отменять."""
+        task = self._tasks.get(key)
+        if task is None or task.done():
+            return False
+        task.cancel()
+        return True
+
+    async def shutdown(self):
+        for task in list(self._tasks.values()):
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        await self.browser.stop()
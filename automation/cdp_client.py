@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import shutil
+import asyncio
+import logging
+import tempfile
+import itertools
+
+from dotenv import load_dotenv
+
+# websockets нужен только асинхронному режиму автоматизации
+try:
+    import websockets
+    WEBSOCKETS_AVAILABLE = True
+except ImportError:
+    WEBSOCKETS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Загружаем переменные окружения
+load_dotenv()
+CHROME_BINARY = os.getenv("CHROME_BINARY")  # Путь к Chrome; если не задан, ищем в PATH
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+
+class CDPError(Exception):
+    """Ошибка, которую вернул Chrome DevTools Protocol."""
+
+
+def find_chrome_binary():
+    """Возвращает путь к исполняемому файлу Chrome/Chromium."""
+    if CHROME_BINARY:
+        return CHROME_BINARY
+    for name in ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser"):
+        path = shutil.which(name)
+        if path:
+            return path
+    raise FileNotFoundError("Chrome не найден: укажите CHROME_BINARY в .env")
+
+
+class CDPConnection:
+    """
+    Асинхронное соединение с браузером по Chrome DevTools Protocol.
+
+    Одно websocket-соединение обслуживает все вкладки: команды вкладок
+    адресуются через sessionId (Target.attachToTarget с flatten=True),
+    поэтому множество сессий мультиплексируется на одном event loop без потоков.
+    """
+
+    def __init__(self, websocket):
+        self._websocket = websocket
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._listeners = {}
+        self._reader = asyncio.get_running_loop().create_task(self._read_loop())
+
+    @classmethod
+    async def connect(cls, url):
+        if not WEBSOCKETS_AVAILABLE:
+            raise ImportError("websockets не установлен (pip install websockets)")
+        websocket = await websockets.connect(url, max_size=None, ping_interval=None)
+        return cls(websocket)
+
+    @property
+    def closed(self):
+        """Соединение больше не читается: браузер закрыл websocket или соединение закрыто вызовом close()."""
+        return self._reader.done()
+
+    async def send(self, method, params=None, session_id=None):
+        """
+        Отправляет команду CDP и ждет ответ.
+
+        Args:
+            method (str): Имя команды, например "Page.navigate"
+            params (dict): Параметры команды
+            session_id (str): Сессия вкладки; None - команда уровня браузера
+
+        Returns:
+            dict: Поле result ответа
+        """
+        if self.closed:
+            # Ответ на команду пришел бы только через цикл чтения, который уже завершен
+            raise CDPError("Соединение с браузером закрыто")
+        message_id = next(self._ids)
+        message = {"id": message_id, "method": method, "params": params or {}}
+        if session_id:
+            message["sessionId"] = session_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[message_id] = future
+        try:
+            await self._websocket.send(json.dumps(message))
+            return await future
+        finally:
+            self._pending.pop(message_id, None)
+
+    def add_listener(self, method, session_id, callback):
+        """Подписывает callback(params) на событие CDP конкретной сессии."""
+        self._listeners.setdefault((method, session_id), []).append(callback)
+
+    def remove_listeners(self, session_id):
+        for key in [key for key in self._listeners if key[1] == session_id]:
+            del self._listeners[key]
+
+    async def _read_loop(self):
+        try:
+            async for raw in self._websocket:
+                message = json.loads(raw)
+                if "id" in message:
+                    future = self._pending.get(message["id"])
+                    if future is None or future.done():
+                        continue
+                    if "error" in message:
+                        future.set_exception(CDPError(message["error"].get("message", str(message["error"]))))
+                    else:
+                        future.set_result(message.get("result", {}))
+                    continue
+                for callback in self._listeners.get((message.get("method"), message.get("sessionId")), []):
+                    try:
+                        callback(message.get("params", {}))
+                    except Exception as e:
+                        logger.warning(f"Ошибка в обработчике события {message.get('method')}: {str(e)}")
+        except Exception as e:
+            logger.warning(f"Соединение CDP закрыто: {str(e)}")
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(CDPError("Соединение с браузером закрыто"))
+
+    async def close(self):
+        self._reader.cancel()
+        try:
+            await self._websocket.close()
+        except Exception:
+            pass
+
+
+class ChromeProcess:
+    """Процесс Chrome с открытым портом DevTools, запущенный через asyncio."""
+
+    def __init__(self, headless=False):
+        self.headless = headless
+        self.process = None
+        self.profile_dir = None
+        self.websocket_url = None
+
+    @property
+    def pid(self):
+        return self.process.pid if self.process else None
+
+    async def start(self, startup_timeout=30):
+        """Запускает Chrome и ждет, пока он сообщит адрес DevTools."""
+        self.profile_dir = tempfile.mkdtemp(prefix=f"chrome_cdp_{int(time.time())}_")
+        args = [
+            find_chrome_binary(),
+            "--remote-debugging-port=0",
+            f"--user-data-dir={self.profile_dir}",
+            "--no-sandbox",
+            "--disable-dev-shm-usage",
+            "--disable-blink-features=AutomationControlled",
+            "--disable-extensions",
+            "--no-first-run",
+            "--no-default-browser-check",
+            "--window-size=1920,1080",
+            f"--user-agent={USER_AGENT}",
+        ]
+        if self.headless:
+            args.append("--headless=new")
+        args.append("about:blank")
+
+        self.process = await asyncio.create_subprocess_exec(
+            *args, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+        )
+
+        # Chrome записывает выбранный порт и путь websocket в DevToolsActivePort
+        port_file = os.path.join(self.profile_dir, "DevToolsActivePort")
+        deadline = time.monotonic() + startup_timeout
+        while time.monotonic() < deadline:
+            if self.process.returncode is not None:
+                raise RuntimeError(f"Chrome завершился при запуске с кодом {self.process.returncode}")
+            try:
+                with open(port_file, encoding="utf-8") as f:
+                    lines = f.read().split()
+                if len(lines) >= 2:
+                    self.websocket_url = f"ws://127.0.0.1:{lines[0]}{lines[1]}"
+                    logger.info(f"Chrome запущен (PID {self.pid}), DevTools: {self.websocket_url}")
+                    return self.websocket_url
+            except OSError:
+                pass
+            await asyncio.sleep(0.1)
+        await self.stop()
+        raise TimeoutError("Chrome не открыл порт DevTools за отведенное время")
+
+    async def stop(self):
+        """Завершает Chrome и удаляет временный профиль."""
+        if self.process and self.process.returncode is None:
+            self.process.terminate()
+            try:
+                await asyncio.wait_for(self.process.wait(), 5)
+            except asyncio.TimeoutError:
+                self.process.kill()
+                await self.process.wait()
+        if self.profile_dir:
+            shutil.rmtree(self.profile_dir, ignore_errors=True)
+            self.profile_dir = None
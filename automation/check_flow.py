@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import logging
+
+from dotenv import load_dotenv
+from selenium.common.exceptions import WebDriverException
+
+from page_parsers import snapshot, no_slots_message, CALENDAR
+from browser import login_vfs_global, start_new_appointment, check_available_dates
+from date_selector import select_available_date, select_time_slot, complete_booking
+
+logger = logging.getLogger(__name__)
+
+# Загружаем переменные окружения
+load_dotenv()
+STAGE_RETRIES = int(os.getenv("STAGE_RETRIES", "2"))  # Повторов этапа на том же драйвере
+
+# Причины, при которых повтор на том же драйвере бессмысленен
+FATAL_REASONS = ("captcha", "cloudflare", "driver")
+
+
+def session_valid(driver):
+    """Контрольная точка "сессия действительна": открыта страница личного кабинета, а не вход."""
+    url = driver.current_url
+    return "login" not in url and ("dashboard" in url or "book-an-appointment" in url)
+
+
+def form_filled(driver):
+    """Контрольная точка "форма заполнена": после формы открыт календарь или сообщение об отсутствии слотов."""
+    # Проверка по снимку страницы: отсутствие элемента не ждет неявного ожидания драйвера
+    page = snapshot(driver.page_source)
+    return bool(page.find(CALENDAR)) or no_slots_message(page) is not None
+
+
+def calendar_open(driver):
+    """Контрольная точка "календарь открыт": на странице есть календарь с датами."""
+    return bool(snapshot(driver.page_source).find(CALENDAR))
+
+
+def classify_failure(driver):
+    """
+    Определяет причину неудачи этапа по состоянию браузера.
+
+    Returns:
+        str: captcha, cloudflare, driver или error
+    """
+    try:
+        page = driver.page_source.lower()
+    except WebDriverException:
+        return "driver"
+    if "captcha" in page:
+        return "captcha"
+    if "just a moment" in page or "cf-challenge" in page:
+        return "cloudflare"
+    return "error"
+
+
+def _login(driver, flow):
+    return login_vfs_global(driver), None
+
+
+def _form(driver, flow):
+    return start_new_appointment(driver, flow.city), None
+
+
+def _calendar(driver, flow):
+    success, result = check_available_dates(driver)
+    if success and not result:
+        # Пустой календарь - не ошибка, но бронировать нечего
+        return True, []
+    return success, result
+
+
+def _date(driver, flow):
+    return select_available_date(driver, flow.selected_date)
+
+
+def _time(driver, flow):
+    success, value = select_time_slot(driver, flow.values.get("date"))
+    if not success:
+        return False, value
+    # Все свободное время даты возвращается боту вместе с результатом (jobs.book_job)
+    flow.time_slots = value["slots"]
+    flow.selected_time = value["selected"]
+    return True, value["message"]
+
+
+def _booking(driver, flow):
+    return complete_booking(driver)
+
+
+class Stage:
+    """
+    Этап сценария.
+
+    Args:
+        name (str): Имя этапа (используется в сообщениях о ходе)
+        action: Функция action(driver, flow) -> (bool, значение или текст ошибки)
+        checkpoint: Функция checkpoint(driver) -> bool: сохраняется ли результат этапа
+        error (str): Сообщение пользователю при неудаче
+        retry (bool): Можно ли повторять этап (подтверждение брони - нельзя)
+    """
+
+    def __init__(self, name, action, checkpoint, error, retry=True):
+        self.name = name
+        self.action = action
+        self.checkpoint = checkpoint
+        self.error = error
+        self.retry = retry
+
+
+STAGES = [
+    Stage("login", _login, session_valid, "Не удалось войти в аккаунт VFS Global. Попробуйте позже."),
+    Stage("form", _form, form_filled, "Не удалось заполнить форму записи. Попробуйте позже."),
+    Stage("calendar", _calendar, calendar_open, "Произошла ошибка при проверке доступных дат"),
+    Stage("date", _date, lambda driver: True, "Не удалось выбрать дату"),
+    Stage("time", _time, lambda driver: True, "Не удалось выбрать время"),
+    Stage("booking", _booking, lambda driver: True, "Не удалось завершить бронирование", retry=False),
+]
+STAGE_NAMES = [stage.name for stage in STAGES]
+
+
+class CheckFlow:
+    """
+    Сценарий проверки и бронирования с контрольными точками.
+
+    Флоу помнит последний успешно пройденный этап, поэтому его можно
+    удерживать между заданиями (jobs.HotSessions) и продолжить с календаря. При ошибке повтор
+    начинается с этапа, следующего за последней контрольной точкой, на том
+    же драйвере; к более ранним этапам флоу возвращается, только если их
+    контрольные точки больше не выполняются (например, сессия истекла).
+    """
+
+    def __init__(self, driver, selected_date=None, retries=STAGE_RETRIES, city=None):
+        self.driver = driver
+        self.selected_date = selected_date
+        self.city = city  # Город визового центра формы; None - CITY из .env
+        self.retries = retries
+        self.completed = -1  # Индекс последнего пройденного этапа
+        self.values = {}
+        self.time_slots = []  # Свободное время выбранной даты (этап time)
+        self.selected_time = None
+
+    @property
+    def last_stage(self):
+        return STAGE_NAMES[self.completed] if self.completed >= 0 else None
+
+    def switch_city(self, city):
+        """
+        Переключает флоу на другой визовый центр в той же сессии.
+
+        Вход сохраняется, а форма и календарь при следующем run() выполняются
+        заново с центром города city.
+        """
+        self.city = city
+        self.completed = min(self.completed, STAGE_NAMES.index("login"))
+        for name in STAGE_NAMES[self.completed + 1:]:
+            self.values.pop(name, None)
+
+    def _resume_index(self):
+        """Находит этап для продолжения: откатывается назад, пока контрольные точки не выполняются."""
+        while self.completed >= 0:
+            try:
+                if STAGES[self.completed].checkpoint(self.driver):
+                    break
+            except WebDriverException:
+                pass
+            logger.info(f"Контрольная точка этапа {STAGES[self.completed].name} больше не выполняется")
+            self.completed -= 1
+        return self.completed + 1
+
+    def run(self, until, progress=None):
+        """
+        Выполняет этапы до until включительно, продолжая с последней контрольной точки.
+
+        Args:
+            until (str): Последний этап ("calendar" для проверки, "booking" для бронирования)
+            progress: Функция progress(stage, detail=None)
+
+        Returns:
+            dict: success, stage, reason и error; значения этапов в self.values
+        """
+        target = STAGE_NAMES.index(until)
+        failures = 0
+        index = self._resume_index()
+        if index > 0:
+            logger.info(f"Продолжаю сценарий с этапа {STAGE_NAMES[index]} (пройдено: {self.last_stage})")
+
+        while index <= target:
+            stage = STAGES[index]
+            if progress:
+                progress(stage.name, self.values.get(STAGE_NAMES[index - 1]) if index > 0 else None)
+            try:
+                success, value = stage.action(self.driver, self)
+            except WebDriverException as e:
+                success, value = False, str(e)
+
+            if success:
+                self.values[stage.name] = value
+                self.completed = index
+                index += 1
+                continue
+
+            reason = classify_failure(self.driver)
+            failures += 1
+            error = f"{stage.error}: {value}" if value else stage.error
+            if reason in ("captcha", "cloudflare"):
+                error += f" (на странице {'капча' if reason == 'captcha' else 'проверка Cloudflare'})"
+            logger.warning(f"Этап {stage.name} не выполнен ({reason}), попытка {failures}/{self.retries + 1}")
+            if reason in FATAL_REASONS or not stage.retry or failures > self.retries:
+                return {"success": False, "stage": stage.name, "reason": reason, "error": error}
+            index = self._resume_index()
+
+        return {"success": True, "stage": until, "reason": None, "error": None}
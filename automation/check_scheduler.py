@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import random
+import logging
+import datetime
+
+from dotenv import load_dotenv
+
+from history_store import history
+
+logger = logging.getLogger(__name__)
+
+# Загружаем переменные окружения
+load_dotenv()
+DAILY_CHECK_BUDGET = int(os.getenv("DAILY_CHECK_BUDGET", "24"))  # Проверок в сутки на пару (город, тип визы)
+MIN_CHECK_INTERVAL = int(os.getenv("MIN_CHECK_INTERVAL", "15"))  # Минимальный интервал между проверками, минуты
+CHECK_JITTER = float(os.getenv("CHECK_JITTER", "0.2"))  # Случайный сдвиг как доля интервала между проверками
+HISTORY_DAYS = int(os.getenv("HISTORY_DAYS", "30"))  # За сколько дней учитывать историю появления слотов
+
+PRIOR_STRENGTH = 5  # Сколько "виртуальных" проверок в час добавляет сглаживание
+
+
+def hourly_weights(hits, checks, prior_strength=PRIOR_STRENGTH):
+    """
+    Вес каждого часа суток - сглаженная доля проверок, нашедших слоты.
+
+    Часы без истории получают среднюю долю, поэтому без данных
+    проверки распределяются равномерно.
+
+    Args:
+        hits (list): Проверок со слотами по часам
+        checks (list): Успешных проверок по часам
+
+    Returns:
+        list: 24 положительных веса
+    """
+    overall = (sum(hits) + 1) / (sum(checks) + 2)
+    return [(hits[hour] + prior_strength * overall) / (checks[hour] + prior_strength) for hour in range(24)]
+
+
+def _segments(start, end, weights):
+    """Разбивает интервал по границам часов: [(начало, конец, вес часа)]."""
+    segments = []
+    current = start
+    while current < end:
+        next_hour = current.replace(minute=0, second=0, microsecond=0) + datetime.timedelta(hours=1)
+        segment_end = min(next_hour, end)
+        segments.append((current, segment_end, weights[current.hour]))
+        current = segment_end
+    return segments
+
+
+def _mass(segments):
+    return sum((segment_end - segment_start).total_seconds() * weight for segment_start, segment_end, weight in segments)
+
+
+def plan_checks(budget, weights, start, end, min_interval, jitter=CHECK_JITTER, rng=None):
+    """
+    Распределяет budget проверок по интервалу [start, end) пропорционально весам часов.
+
+    Проверка k ставится в квантиль (k + 0.5) / budget накопленного веса, затем
+    сдвигается на случайную долю jitter соседнего интервала. Интервал между
+    проверками не бывает меньше min_interval; проверки, вышедшие за end, отбрасываются.
+
+    Args:
+        budget (int): Число проверок
+        weights (list): Веса часов суток (hourly_weights)
+        start (datetime): Начало интервала
+        end (datetime): Конец интервала
+        min_interval (timedelta): Минимальный интервал между проверками
+        jitter (float): Доля интервала для случайного сдвига
+        rng (random.Random): Генератор случайных чисел
+
+    Returns:
+        list: Время проверок (datetime) по возрастанию
+    """
+    rng = rng or random.Random()
+    segments = _segments(start, end, weights)
+    total = _mass(segments)
+    if budget <= 0 or total <= 0:
+        return []
+
+    # Обратная функция распределения по кусочно-постоянной плотности
+    planned = []
+    index = 0
+    passed = 0.0
+    for k in range(budget):
+        target = (k + 0.5) / budget * total
+        while index < len(segments) - 1:
+            segment_start, segment_end, weight = segments[index]
+            segment_mass = (segment_end - segment_start).total_seconds() * weight
+            if passed + segment_mass >= target:
+                break
+            passed += segment_mass
+            index += 1
+        segment_start, segment_end, weight = segments[index]
+        planned.append(segment_start + datetime.timedelta(seconds=(target - passed) / weight))
+
+    # Случайный сдвиг, чтобы проверки не шли по предсказуемой сетке
+    jittered = []
+    for i, moment in enumerate(planned):
+        previous = planned[i - 1] if i > 0 else start
+        following = planned[i + 1] if i + 1 < len(planned) else end
+        gap = (following - previous).total_seconds() / 2
+        jittered.append(moment + datetime.timedelta(seconds=rng.uniform(-jitter, jitter) * gap))
+    jittered.sort()
+
+    result = []
+    for moment in jittered:
+        moment = max(moment, start)
+        if result and moment - result[-1] < min_interval:
+            moment = result[-1] + min_interval
+        if moment >= end:
+            break
+        result.append(moment)
+    return result
+
+
+def plan_day(city, visa_type, now=None, budget=DAILY_CHECK_BUDGET, min_interval_minutes=MIN_CHECK_INTERVAL,
+             jitter=CHECK_JITTER, history_days=HISTORY_DAYS, store=None):
+    """
+    Планирует проверки пары (город, тип визы) до конца текущих суток.
+
+    Суточный бюджет делится по часам согласно истории появления слотов;
+    если сутки уже начались, используется доля бюджета, приходящаяся на оставшиеся часы.
+
+    Args:
+        store (HistoryStore): История, по которой строится план; по умолчанию
+            история живых проверок (history_store.history)
+
+    Returns:
+        list: Время проверок (datetime, местное время)
+    """
+    now = now or datetime.datetime.now()
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    end = midnight + datetime.timedelta(days=1)
+
+    hits, checks = (store or history).hourly_slot_counts(city, visa_type, history_days)
+    weights = hourly_weights(hits, checks)
+    remaining = _mass(_segments(now, end, weights)) / _mass(_segments(midnight, end, weights))
+    today_budget = round(budget * remaining)
+
+    times = plan_checks(today_budget, weights, now, end, datetime.timedelta(minutes=min_interval_minutes), jitter)
+    busiest = sorted(range(24), key=lambda hour: weights[hour], reverse=True)[:3]
+    logger.info(f"План проверок {city} / {visa_type}: {len(times)} из суточного бюджета {budget}, "
+                f"самые вероятные часы: {', '.join(f'{hour:02d}:00' for hour in busiest)}")
+    return times
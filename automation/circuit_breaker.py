@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import logging
+import datetime
+import threading
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+# Загружаем переменные окружения
+load_dotenv()
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3"))  # Неудач подряд до размыкания
+BREAKER_BASE_DELAY = int(os.getenv("BREAKER_BASE_DELAY", "300"))  # Первая пауза, секунды
+BREAKER_MAX_DELAY = int(os.getenv("BREAKER_MAX_DELAY", "3600"))  # Максимальная пауза, секунды
+BREAKER_PROBE_TIMEOUT = 900  # Через сколько секунд пробная проверка без результата считается потерянной
+
+STATE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs", "circuit_breaker.json")
+
+# Причины неудачи, говорящие о проблемах сайта, а не бота
+SITE_FAILURE_REASONS = ("captcha", "cloudflare", "timeout", "error")
+# Причины, при которых цепь размыкается сразу, без накопления неудач
+IMMEDIATE_REASONS = ("captcha", "cloudflare")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitBreaker:
+    """
+    Общий предохранитель для всех заданий, обращающихся к VFS Global.
+
+    closed - задания выполняются, неудачи считаются; после BREAKER_FAILURE_THRESHOLD
+    неудач подряд (или сразу при капче) цепь размыкается.
+    open - задания не запускаются до времени следующей пробы; пауза растет
+    экспоненциально от BREAKER_BASE_DELAY до BREAKER_MAX_DELAY.
+    half-open - пропускается одна пробная проверка: успех замыкает цепь,
+    неудача снова размыкает ее с удвоенной паузой. Разрешение allow() занимает
+    пробу; задание, которое так и не обратилось к сайту, освобождает ее
+    release_probe(), иначе проба считается потерянной через BREAKER_PROBE_TIMEOUT.
+    """
+
+    def __init__(self, threshold=BREAKER_FAILURE_THRESHOLD, base_delay=BREAKER_BASE_DELAY,
+                 max_delay=BREAKER_MAX_DELAY, state_file=STATE_FILE):
+        self.threshold = threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.state_file = state_file
+        self.state = CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.open_until = 0.0
+        self.last_reason = None
+        self._probe_started = None
+        self._lock = threading.Lock()
+        self._load()
+
+    def allow(self):
+        """
+        Решает, можно ли запускать задание.
+
+        Returns:
+            tuple: (bool, datetime) - (разрешено, время следующей пробы, если нет)
+        """
+        with self._lock:
+            now = time.time()
+            if self.state == OPEN:
+                if now < self.open_until:
+                    return False, self.next_probe_at
+                self.state = HALF_OPEN
+                self._probe_started = None
+                logger.info("Предохранитель: пробная проверка доступности сайта")
+            if self.state == HALF_OPEN:
+                if self._probe_started and now - self._probe_started < BREAKER_PROBE_TIMEOUT:
+                    return False, datetime.datetime.fromtimestamp(self._probe_started + BREAKER_PROBE_TIMEOUT)
+                self._probe_started = now
+            return True, None
+
+    def record(self, success, reason=None):
+        """
+        Учитывает результат задания.
+
+        Args:
+            success (bool): Задание прошло этапы обращения к сайту
+            reason (str): Код причины неудачи (captcha, timeout, ...)
+        """
+        with self._lock:
+            if success:
+                if self.state != CLOSED:
+                    logger.info("Предохранитель замкнут: сайт снова отвечает")
+                self.state = CLOSED
+                self.failures = 0
+                self.trips = 0
+            elif reason in SITE_FAILURE_REASONS:
+                self.failures += 1
+                self.last_reason = reason
+                if self.state == HALF_OPEN or self.failures >= self.threshold or reason in IMMEDIATE_REASONS:
+                    self._trip()
+            # Остальные причины (учетные данные, отмена, запуск браузера) о сайте ничего не говорят
+            self._probe_started = None
+            self._save()
+
+    def release_probe(self):
+        """
+        Освобождает пробу, занятую allow(), если задание завершилось без обращения
+        к сайту (автоматизация недоступна, ошибка до запуска задания): следующее
+        задание сразу станет пробой. Состояние и счетчик неудач не меняются.
+        """
+        with self._lock:
+            self._probe_started = None
+
+    def record_result(self, result):
+        """Учитывает словарь результата задания (success, reason)."""
+        self.record(result.get("success") or result.get("reason") == "no_slots", result.get("reason"))
+
+    def _trip(self):
+        delay = min(self.base_delay * (2 ** self.trips), self.max_delay)
+        self.trips += 1
+        self.state = OPEN
+        self.open_until = time.time() + delay
+        self._probe_started = None
+        logger.warning(f"Предохранитель разомкнут ({self.last_reason}, неудач подряд: {self.failures}), "
+                       f"следующая проба через {delay} с")
+
+    @property
+    def next_probe_at(self):
+        return datetime.datetime.fromtimestamp(self.open_until)
+
+    def format_status(self):
+        if self.state == OPEN:
+            return f"разомкнут ({self.last_reason}), следующая проба в {self.next_probe_at:%H:%M}"
+        if self.state == HALF_OPEN:
+            return "пробная проверка"
+        return f"замкнут, неудач подряд: {self.failures}"
+
+    def _load(self):
+        # Состояние переживает перезапуск бота, чтобы не нагружать сайт сразу после рестарта
+        try:
+            with open(self.state_file, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.state = data.get("state", CLOSED)
+        if self.state == HALF_OPEN:
+            self.state = OPEN
+        self.failures = data.get("failures", 0)
+        self.trips = data.get("trips", 0)
+        self.open_until = data.get("open_until", 0.0)
+        self.last_reason = data.get("last_reason")
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+            with open(self.state_file, "w", encoding="utf-8") as f:
+                json.dump({"state": self.state, "failures": self.failures, "trips": self.trips,
+                           "open_until": self.open_until, "last_reason": self.last_reason}, f)
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить состояние предохранителя: {str(e)}")
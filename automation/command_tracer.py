@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+# Загружаем переменные окружения
+load_dotenv()
+WEBDRIVER_TRACE = os.getenv("WEBDRIVER_TRACE", "0") == "1"  # Трассировка команд WebDriver (по умолчанию выключена)
+
+AUTOMATION_DIR = os.path.dirname(os.path.abspath(__file__))
+TRACE_DIR = os.path.join(os.path.dirname(AUTOMATION_DIR), "logs", "traces")
+
+# Функции сценария, по которым команды группируются в сводке по этапам
+STAGE_FUNCTIONS = (
+    "setup_driver", "reset_to_dashboard", "login_vfs_global", "start_new_appointment",
+    "check_available_dates", "fill_personal_data", "select_available_date", "select_time_slot",
+    "complete_booking",
+)
+
+# Кадры, которые не несут смысла в стеке (обертки декораторов и сам трассировщик)
+SKIPPED_FRAMES = ("wrapper", "execute")
+
+# Трасса текущего потока: задания разных потоков делят один command_executor
+_local = threading.local()
+
+
+def _size(value):
+    if value is None:
+        return 0
+    try:
+        return len(json.dumps(value, ensure_ascii=False, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _caller_stack():
+    """Функции automation/ на стеке вызова команды, от внешней к внутренней (module.function)."""
+    frames = []
+    frame = sys._getframe(2)
+    while frame is not None:
+        code = frame.f_code
+        if code.co_filename.startswith(AUTOMATION_DIR) and code.co_name not in SKIPPED_FRAMES:
+            module = os.path.splitext(os.path.basename(code.co_filename))[0]
+            frames.append((module, code.co_name))
+        frame = frame.f_back
+    frames.reverse()
+    return tuple(frames)
+
+
+class CommandTrace:
+    """Команды WebDriver одного задания: имя, длительность, размер запроса и ответа, стек вызова."""
+
+    def __init__(self, label):
+        self.label = label
+        self.started = time.time()
+        self.records = []
+
+    def add(self, stack, command, seconds, sent, received):
+        self.records.append((stack, command, seconds, sent, received))
+
+    @staticmethod
+    def stage_of(stack):
+        for _, function in stack:
+            if function in STAGE_FUNCTIONS:
+                return function
+        return stack[-1][1] if stack else "-"
+
+    def stage_summary(self):
+        """
+        Сводка по этапам.
+
+        Returns:
+            list: [(этап, команд, секунд, байт, [(команда, число), ...])] в порядке первого появления
+        """
+        stages = {}
+        for stack, command, seconds, sent, received in self.records:
+            entry = stages.setdefault(self.stage_of(stack), [0, 0.0, 0, {}])
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] += sent + received
+            entry[3][command] = entry[3].get(command, 0) + 1
+        return [(stage, calls, seconds, size, sorted(commands.items(), key=lambda item: -item[1])[:3])
+                for stage, (calls, seconds, size, commands) in stages.items()]
+
+    def flame_lines(self):
+        """Свернутые стеки в стиле flamegraph: "a;b;c команда" -> (число, секунд), по убыванию времени."""
+        folded = {}
+        for stack, command, seconds, _, _ in self.records:
+            key = ";".join(f"{module}.{function}" for module, function in stack) + f" {command}"
+            entry = folded.setdefault(key, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+        return sorted(folded.items(), key=lambda item: -item[1][1])
+
+    def format_summary(self):
+        total = sum(record[2] for record in self.records)
+        lines = [f"Команд WebDriver ({self.label}): {len(self.records)} за {total:.1f} с"]
+        for stage, calls, seconds, size, top in self.stage_summary():
+            commands = ", ".join(f"{command}×{count}" for command, count in top)
+            lines.append(f"• {stage}: {calls} команд, {seconds:.1f} с, {size / 1024:.0f} КБ ({commands})")
+        return "\n".join(lines)
+
+    def format_report(self):
+        """Полный отчет: сводка по этапам и свернутые стеки с числом команд и временем."""
+        lines = [self.format_summary(), "", "Стеки (команд, мс, стек команда):"]
+        for key, (count, seconds) in self.flame_lines():
+            lines.append(f"{count:6d} {seconds * 1000:9.0f}  {key}")
+        return "\n".join(lines)
+
+    def save(self, trace_dir=TRACE_DIR):
+        """Сохраняет отчет в logs/traces и возвращает путь к файлу."""
+        path = os.path.join(trace_dir, f"{self.label}_{int(self.started)}.txt")
+        try:
+            os.makedirs(trace_dir, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self.format_report() + "\n")
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить трассу команд: {str(e)}")
+            return None
+        return path
+
+
+def _install(executor):
+    """Оборачивает command_executor.execute один раз; команды пишутся в трассу текущего потока."""
+    if getattr(executor, "_command_tracer", False):
+        return
+    original = executor.execute
+
+    def execute(command, params):
+        trace = getattr(_local, "trace", None)
+        if trace is None:
+            return original(command, params)
+        started = time.perf_counter()
+        response = None
+        try:
+            response = original(command, params)
+            return response
+        finally:
+            trace.add(_caller_stack(), command, time.perf_counter() - started, _size(params), _size(response))
+
+    executor.execute = execute
+    executor._command_tracer = True
+
+
+@contextmanager
+def trace_commands(driver, label, enabled=None):
+    """
+    Записывает команды WebDriver, выполненные в блоке with текущим потоком.
+
+    По завершении сводка по этапам пишется в лог, а полный отчет - в logs/traces.
+    Без WEBDRIVER_TRACE=1 ничего не делает.
+
+    Args:
+        driver: Драйвер, чьи команды записываются
+        label (str): Имя задания для отчета ("check", "book")
+
+    Yields:
+        CommandTrace: Трасса или None, если трассировка выключена
+    """
+    enabled = WEBDRIVER_TRACE if enabled is None else enabled
+    executor = getattr(driver, "command_executor", None)
+    if not enabled or executor is None:
+        yield None
+        return
+
+    _install(executor)
+    trace = CommandTrace(label)
+    _local.trace = trace
+    try:
+        yield trace
+    finally:
+        _local.trace = None
+        path = trace.save()
+        logger.info(f"{trace.format_summary()}\nОтчет: {path}")
@@ -2,106 +2,169 @@
 # -*- coding: utf-8 -*-
 
 import os
+import re
 import time
 import logging
 import tempfile
+from dotenv import load_dotenv
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from pathlib import Path
 
+from wait_budget import wait_budget
+from metrics import timed_stage
+from locators import NO_SLOTS_MESSAGE, TIME_MENU, TIME_SLOTS, TIME_CONFIRM_TEXTS
+# Решения принимаются по снимку страницы (page_parsers.py), драйвер нужен для кликов
+from page_parsers import snapshot, parse_calendar, parse_booking_page, is_date_label, LOOSE_DATES
+
 # Настройка логирования
 log_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs")
 os.makedirs(log_dir, exist_ok=True)
 screenshots_dir = os.path.join(log_dir, "screenshots")
 os.makedirs(screenshots_dir, exist_ok=True)
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(os.path.join(log_dir, "date_selector.log")),
-        logging.StreamHandler()
-    ]
-)
+# Обработчики логов настраивает log_setup.setup_logging (файл date_selector.log - по имени логгера)
 logger = logging.getLogger(__name__)
 
+# Загружаем переменные окружения
+load_dotenv()
+# Какое время выбирать: earliest, latest или окно "ЧЧ:ММ-ЧЧ:ММ" (сначала слоты окна, от ранних)
+SLOT_TIME_PREFERENCE = os.getenv("SLOT_TIME_PREFERENCE", "earliest")
+
+TIME_PATTERN = re.compile(r"(\d{1,2})[:.](\d{2})")
+
+# Слоты времени после клика по дате одним вызовом: ждет меню (MutationObserver вместо
+# опроса), возвращает текст всех свободных слотов и запоминает их элементы для клика
+EXTRACT_TIME_SLOTS_JS = """
+const [menuCss, slotCss, timeout, done] = arguments;
+const started = Date.now();
+const enabled = (el) => !el.disabled && el.getAttribute('aria-disabled') !== 'true'
+    && el.getClientRects().length > 0;
+const collect = (timedOut) => {
+    const slots = Array.from(document.querySelectorAll(slotCss)).filter(enabled);
+    window.__timeSlots = slots;
+    done({waited: Date.now() - started, timeout: timedOut, menu: !!document.querySelector(menuCss),
+          slots: slots.map((el) => el.textContent.trim())});
+};
+if (document.querySelector(menuCss)) return collect(false);
+const observer = new MutationObserver(() => {
+    if (document.querySelector(menuCss)) { observer.disconnect(); clearTimeout(timer); collect(false); }
+});
+observer.observe(document, {childList: true, subtree: true});
+const timer = setTimeout(() => { observer.disconnect(); collect(true); }, timeout);
+"""
+
+# Клик по слоту и ожидание кнопки подтверждения одним вызовом: кнопка обычно
+# появляется или становится активной после выбора времени (отслеживаются и атрибуты)
+CLICK_TIME_SLOT_JS = """
+const [index, text, slotCss, confirmTexts, timeout, done] = arguments;
+const started = Date.now();
+let slot = (window.__timeSlots || [])[index];
+if (!slot || !slot.isConnected || slot.textContent.trim() !== text) {
+    slot = Array.from(document.querySelectorAll(slotCss)).find((el) => el.textContent.trim() === text);
+}
+if (!slot) return done({clicked: false, confirm: null});
+slot.scrollIntoView({block: 'center'});
+slot.click();
+const confirmButton = () => Array.from(document.querySelectorAll('button')).find((el) =>
+    confirmTexts.some((t) => el.textContent.includes(t)) && !el.disabled && el.getClientRects().length > 0);
+const press = (button) => {
+    const label = button.textContent.trim();
+    button.click();
+    done({clicked: true, confirm: label, waited: Date.now() - started});
+};
+const ready = confirmButton();
+if (ready) return press(ready);
+const observer = new MutationObserver(() => {
+    const button = confirmButton();
+    if (button) { observer.disconnect(); clearTimeout(timer); press(button); }
+});
+observer.observe(document, {childList: true, subtree: true, attributes: true});
+const timer = setTimeout(() => { observer.disconnect(); done({clicked: true, confirm: null}); }, timeout);
+"""
+
+@timed_stage("select_available_date")
 def select_available_date(driver, selected_date=None):
     """
     Выбирает доступную дату из календаря VFS Global.
+
+    Время для даты выбирает следующий этап (select_time_slot).
     
     Args:
         driver: Экземпляр Selenium WebDriver
         selected_date: Предпочтительная дата для выбора (если None, выбирается первая доступная)
         
     Returns:
-        tuple: (bool, str) - (успех, выбранная дата или сообщение об ошибке)
+        tuple: (bool, str) - (успех, текст выбранной даты или сообщение об ошибке)
     """
     try:
         logger.info("Начинаю поиск и выбор доступной даты")
         
-        # Сначала проверяем, есть ли сообщение об отсутствии слотов
+        # Проверяем, есть ли календарь с датами
         try:
-            no_slots_message = driver.find_element(By.XPATH, 
-                "//div[contains(text(), 'нет доступных слотов') or contains(text(), 'Приносим извинения') or contains(text(), 'Места для регистрации')]")
-            message_text = no_slots_message.text
-            logger.info(f"Найдено сообщение об отсутствии слотов: {message_text}")
+            # Ждем календарь (матрицу дат) или сообщение об отсутствии слотов: что появится раньше
+            wait_budget.wait(driver, "calendar", EC.any_of(
+                EC.presence_of_element_located((By.CSS_SELECTOR, ".mat-calendar-body, .calendar-container, mat-calendar, .date-selection")),
+                EC.presence_of_element_located(NO_SLOTS_MESSAGE)
+            ))
             
-            # Делаем скриншот страницы с сообщением
-            screenshot_path = os.path.join(screenshots_dir, f"no_slots_for_selection_{int(time.time())}.png")
-            driver.save_screenshot(screenshot_path)
+            # Страница снимается один раз: сообщение, ячейки и их текст берутся из снимка
+            page = snapshot(driver.page_source)
+            calendar = parse_calendar(page)
             
-            # Возвращаем сообщение об ошибке
-            return False, "Нет доступных слотов для записи"
-        except:
-            logger.info("Сообщение об отсутствии слотов не найдено, ищем доступные даты для выбора")
-        
-        # Делаем скриншот перед попыткой найти календарь
-        screenshot_path = os.path.join(screenshots_dir, f"calendar_search_{int(time.time())}.png")
-        driver.save_screenshot(screenshot_path)
-        
-        # Проверяем, есть ли календарь с датами
-        try:
-            # Ищем элементы календаря (матрицу дат)
-            calendar = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, ".mat-calendar-body, .calendar-container, mat-calendar, .date-selection"))
-            )
+            if calendar["no_slots"]:
+                logger.info(f"Найдено сообщение об отсутствии слотов: {calendar['no_slots']}")
+                
+                # Делаем скриншот страницы с сообщением
+                screenshot_path = os.path.join(screenshots_dir, f"no_slots_for_selection_{int(time.time())}.png")
+                driver.save_screenshot(screenshot_path)
+                
+                # Возвращаем сообщение об ошибке
+                return False, "Нет доступных слотов для записи"
+            
+            # Делаем скриншот найденного календаря
+            screenshot_path = os.path.join(screenshots_dir, f"calendar_search_{int(time.time())}.png")
+            driver.save_screenshot(screenshot_path)
             logger.info("Календарь найден")
             
             # Ищем все доступные (не заблокированные) ячейки в календаре
             available_cells = []
+            cell_texts = []
             
             # Проверяем доступные даты различными способами (под разные версии UI)
             
             # Способ 1: Ищем стандартные ячейки календаря
-            try:
-                cells = driver.find_elements(By.CSS_SELECTOR, 
-                    ".mat-calendar-body-cell:not(.mat-calendar-body-disabled), .date-available, td.selectable:not(.disabled)")
-                
-                if cells:
+            if calendar["cells"]:
+                try:
+                    cells = driver.find_elements(By.CSS_SELECTOR, 
+                        ".mat-calendar-body-cell:not(.mat-calendar-body-disabled), .date-available, td.selectable:not(.disabled)")
                     available_cells.extend(cells)
+                    # Текст ячеек берется из снимка, если календарь не перерисовался после него
+                    cell_texts = calendar["cells"] if len(cells) == len(calendar["cells"]) else [cell.text.strip() for cell in cells]
                     logger.info(f"Найдено {len(cells)} доступных ячеек календаря (способ 1)")
-            except Exception as e:
-                logger.warning(f"Ошибка при поиске ячеек календаря (способ 1): {str(e)}")
+                except Exception as e:
+                    logger.warning(f"Ошибка при поиске ячеек календаря (способ 1): {str(e)}")
             
             # Способ 2: Ищем любые элементы, которые могут быть кликабельными датами
-            if not available_cells:
+            if not available_cells and calendar["labels"]:
                 try:
                     date_elements = driver.find_elements(By.CSS_SELECTOR, 
                         "[class*='date']:not([class*='disabled']), [class*='calendar-cell']:not([class*='disabled'])")
+                    texts = page.texts(LOOSE_DATES)
+                    if len(texts) != len(date_elements):
+                        texts = [elem.text.strip() for elem in date_elements]
                     
-                    clickable_elements = []
-                    for elem in date_elements:
+                    for elem, text in zip(date_elements, texts):
                         try:
-                            if elem.is_displayed() and elem.is_enabled() and elem.text.strip() and any(c.isdigit() for c in elem.text):
-                                clickable_elements.append(elem)
+                            if is_date_label(text) and elem.is_displayed() and elem.is_enabled():
+                                available_cells.append(elem)
+                                cell_texts.append(text)
                         except:
                             continue
                     
-                    if clickable_elements:
-                        available_cells.extend(clickable_elements)
-                        logger.info(f"Найдено {len(clickable_elements)} кликабельных элементов с датами (способ 2)")
+                    if available_cells:
+                        logger.info(f"Найдено {len(available_cells)} кликабельных элементов с датами (способ 2)")
                 except Exception as e:
                     logger.warning(f"Ошибка при поиске элементов дат (способ 2): {str(e)}")
             
@@ -109,22 +172,22 @@ def select_available_date(driver, selected_date=None):
             if available_cells:
                 # Если есть предпочтительная дата, пытаемся найти ее
                 selected_cell = None
+                selected_date_text = None
                 
                 if selected_date:
-                    for cell in available_cells:
-                        try:
-                            cell_text = cell.text.strip()
-                            if selected_date in cell_text:
-                                selected_cell = cell
-                                logger.info(f"Найдена предпочтительная дата: {cell_text}")
-                                break
-                        except:
-                            continue
+                    for cell, cell_text in zip(available_cells, cell_texts):
+                        # Ячейка содержит только число, дата приходит как "<день> <месяц год>"
+                        if cell_text in (selected_date, selected_date.split()[0]):
+                            selected_cell = cell
+                            selected_date_text = cell_text
+                            logger.info(f"Найдена предпочтительная дата: {cell_text}")
+                            break
                 
                 # Если предпочтительная дата не найдена или не указана, берем первую доступную
-                if not selected_cell and available_cells:
+                if not selected_cell:
                     selected_cell = available_cells[0]
-                    logger.info(f"Выбрана первая доступная дата: {selected_cell.text}")
+                    selected_date_text = cell_texts[0]
+                    logger.info(f"Выбрана первая доступная дата: {selected_date_text}")
                 
                 # Прокручиваем страницу к выбранной ячейке
                 driver.execute_script("arguments[0].scrollIntoView(true);", selected_cell)
@@ -134,118 +197,26 @@ def select_available_date(driver, selected_date=None):
                 screenshot_path = os.path.join(screenshots_dir, f"before_date_click_{int(time.time())}.png")
                 driver.save_screenshot(screenshot_path)
                 
-                # Сохраняем текст выбранной даты
-                selected_date_text = "Не удалось получить текст даты"
-                try:
-                    selected_date_text = selected_cell.text.strip()
-                except:
-                    pass
+                if not selected_date_text:
+                    selected_date_text = "Не удалось получить текст даты"
                 
-                # Кликаем на выбранную дату
+                # Кликаем на выбранную дату; меню времени ждет этап select_time_slot
                 try:
-                    WebDriverWait(driver, 5).until(EC.element_to_be_clickable(selected_cell))
+                    wait_budget.wait(driver, "calendar_control", EC.element_to_be_clickable(selected_cell))
                     selected_cell.click()
                     logger.info(f"Выполнен клик по дате: {selected_date_text}")
-                    time.sleep(2)
                 except Exception as e:
                     logger.error(f"Ошибка при клике на дату: {str(e)}")
                     # Альтернативный способ клика
                     try:
                         driver.execute_script("arguments[0].click();", selected_cell)
                         logger.info(f"Выполнен JavaScript-клик по дате: {selected_date_text}")
-                        time.sleep(2)
                     except Exception as js_error:
                         logger.error(f"Ошибка при JavaScript-клике: {str(js_error)}")
                         return False, f"Не удалось выбрать дату: {selected_date_text}"
-                
-                # Делаем скриншот после клика
-                screenshot_path = os.path.join(screenshots_dir, f"after_date_click_{int(time.time())}.png")
-                driver.save_screenshot(screenshot_path)
-                
-                # Проверяем, появилось ли меню выбора времени
-                try:
-                    time_selection = WebDriverWait(driver, 5).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, ".time-slot, .time-selection, [class*='time-slot']"))
-                    )
-                    logger.info("Найдено меню выбора времени")
-                    
-                    # Выбираем первый доступный временной слот
-                    try:
-                        time_slots = driver.find_elements(By.CSS_SELECTOR, 
-                            ".time-slot:not(.disabled), [class*='time-slot']:not([class*='disabled']), button[class*='time']")
-                        
-                        if time_slots:
-                            first_slot = time_slots[0]
-                            slot_text = first_slot.text.strip()
-                            
-                            # Прокручиваем к временному слоту
-                            driver.execute_script("arguments[0].scrollIntoView(true);", first_slot)
-                            time.sleep(1)
-                            
-                            # Делаем скриншот перед выбором времени
-                            screenshot_path = os.path.join(screenshots_dir, f"before_time_click_{int(time.time())}.png")
-                            driver.save_screenshot(screenshot_path)
-                            
-                            # Кликаем на временной слот
-                            try:
-                                WebDriverWait(driver, 5).until(EC.element_to_be_clickable(first_slot))
-                                first_slot.click()
-                                logger.info(f"Выбран временной слот: {slot_text}")
-                                time.sleep(2)
-                            except:
-                                # Альтернативный клик
-                                driver.execute_script("arguments[0].click();", first_slot)
-                                logger.info(f"Выполнен JavaScript-клик по временному слоту: {slot_text}")
-                                time.sleep(2)
-                            
-                            # Делаем скриншот после выбора времени
-                            screenshot_path = os.path.join(screenshots_dir, f"after_time_click_{int(time.time())}.png")
-                            driver.save_screenshot(screenshot_path)
-                            
-                            # Проверяем наличие кнопки подтверждения
-                            try:
-                                confirm_button = WebDriverWait(driver, 5).until(
-                                    EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'Подтвердить') or contains(text(), 'Продолжить')]"))
-                                )
-                                confirm_button.click()
-                                logger.info("Нажата кнопка подтверждения времени")
-                                time.sleep(2)
-                                
-                                # Делаем финальный скриншот после подтверждения
-                                screenshot_path = os.path.join(screenshots_dir, f"after_confirmation_{int(time.time())}.png")
-                                driver.save_screenshot(screenshot_path)
-                                
-                                return True, f"Успешно выбрана дата {selected_date_text} и время {slot_text}"
-                            except:
-                                logger.warning("Кнопка подтверждения не найдена, но дата и время были выбраны")
-                                return True, f"Выбрана дата {selected_date_text} и время {slot_text}, подтверждение невозможно"
-                        else:
-                            logger.warning("Меню выбора времени найдено, но нет доступных временных слотов")
-                            return False, "Нет доступных временных слотов для выбранной даты"
-                    except Exception as e:
-                        logger.error(f"Ошибка при выборе временного слота: {str(e)}")
-                        return False, f"Ошибка при выборе времени: {str(e)}"
-                except:
-                    logger.info("Меню выбора времени не найдено, возможно, выбор времени не требуется")
-                    # В некоторых случаях выбор времени может не потребоваться
-                    # Проверяем наличие кнопки подтверждения или продолжения
-                    try:
-                        next_button = WebDriverWait(driver, 5).until(
-                            EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'Подтвердить') or contains(text(), 'Продолжить') or contains(text(), 'Далее')]"))
-                        )
-                        next_button.click()
-                        logger.info("Нажата кнопка подтверждения даты")
-                        time.sleep(2)
-                        
-                        # Делаем финальный скриншот после подтверждения
-                        screenshot_path = os.path.join(screenshots_dir, f"after_date_confirm_{int(time.time())}.png")
-                        driver.save_screenshot(screenshot_path)
-                        
-                        return True, f"Успешно выбрана дата {selected_date_text}"
-                    except:
-                        logger.warning("Кнопка подтверждения не найдена, но дата была выбрана")
-                        return True, f"Выбрана дата {selected_date_text}, подтверждение невозможно"
-                
+
+                return True, selected_date_text
+
             else:
                 logger.warning("Календарь найден, но нет доступных дат для выбора")
                 screenshot_path = os.path.join(screenshots_dir, f"no_available_dates_{int(time.time())}.png")
@@ -268,6 +239,125 @@ def select_available_date(driver, selected_date=None):
         return False, f"Критическая ошибка при выборе даты: {str(e)}"
 
 
+def _slot_minutes(slot):
+    match = TIME_PATTERN.search(slot)
+    return int(match.group(1)) * 60 + int(match.group(2)) if match else None
+
+
+def rank_time_slots(slots, preference=SLOT_TIME_PREFERENCE):
+    """
+    Упорядочивает слоты времени по предпочтению.
+
+    Args:
+        slots (list): Текст слотов ("09:30", "14:00 - 14:15")
+        preference (str): earliest, latest или окно "ЧЧ:ММ-ЧЧ:ММ": сначала слоты,
+            начинающиеся в окне, затем остальные, от ранних к поздним
+
+    Returns:
+        list: Слоты в порядке выбора; слоты без времени в тексте - в конце, в исходном порядке
+    """
+    timed, untimed = [], []
+    for slot in slots:
+        minutes = _slot_minutes(slot)
+        if minutes is None:
+            untimed.append(slot)
+        else:
+            timed.append((minutes, slot))
+    timed.sort(key=lambda item: item[0])
+
+    preference = (preference or "earliest").strip().lower()
+    if preference == "latest":
+        timed.reverse()
+    elif preference != "earliest":
+        window = TIME_PATTERN.findall(preference)
+        if len(window) != 2:
+            logger.warning(f"Непонятное предпочтение времени {preference!r}, выбираю самое раннее")
+        else:
+            low, high = (int(hours) * 60 + int(minutes) for hours, minutes in window)
+            timed.sort(key=lambda item: not low <= item[0] <= high)
+    return [slot for _, slot in timed] + untimed
+
+
+def _confirm_date(driver, date_text):
+    """Подтверждает дату, для которой выбор времени не требуется."""
+    conditions = " or ".join(f"contains(text(), '{text}')" for text in TIME_CONFIRM_TEXTS)
+    locator = (By.XPATH, f"//button[{conditions}]")
+    try:
+        wait_budget.wait(driver, "continue_button", EC.element_to_be_clickable(locator)).click()
+        logger.info("Нажата кнопка подтверждения даты")
+        return True, {"message": f"Успешно выбрана дата {date_text}", "selected": None, "slots": []}
+    except Exception:
+        logger.warning("Кнопка подтверждения не найдена, но дата была выбрана")
+        return True, {"message": f"Выбрана дата {date_text}, подтверждение невозможно", "selected": None, "slots": []}
+
+
+@timed_stage("select_time_slot")
+def select_time_slot(driver, date_text=None, preference=SLOT_TIME_PREFERENCE):
+    """
+    Выбирает время для даты, выбранной select_available_date.
+
+    Все свободные слоты извлекаются одним вызовом (EXTRACT_TIME_SLOTS_JS) и
+    упорядочиваются по предпочтению (rank_time_slots); клик по слоту и
+    подтверждение - вторым вызовом с ожиданием кнопки внутри страницы.
+
+    Args:
+        driver: Экземпляр Selenium WebDriver
+        date_text (str): Выбранная дата (для сообщений)
+        preference (str): Предпочтение времени (SLOT_TIME_PREFERENCE)
+
+    Returns:
+        tuple: (bool, dict или str) - (успех, {"message", "selected", "slots"} или сообщение об ошибке)
+    """
+    timeout = wait_budget.budget("time_slots")
+    try:
+        driver.set_script_timeout(timeout + 5)
+        found = driver.execute_async_script(EXTRACT_TIME_SLOTS_JS, TIME_MENU[1], TIME_SLOTS[1], int(timeout * 1000))
+    except Exception as e:
+        logger.error(f"Ошибка при чтении слотов времени: {str(e)}")
+        return False, f"Ошибка при выборе времени: {str(e)}"
+    if found["timeout"]:
+        wait_budget.record("time_slots", timeout, timed_out=True)
+    else:
+        wait_budget.record("time_slots", found["waited"] / 1000)
+
+    if not found["menu"]:
+        logger.info("Меню выбора времени не найдено, возможно, выбор времени не требуется")
+        return _confirm_date(driver, date_text)
+
+    slots = found["slots"]
+    if not slots:
+        logger.warning("Меню выбора времени найдено, но нет доступных временных слотов")
+        return False, "Нет доступных временных слотов для выбранной даты"
+
+    choice = rank_time_slots(slots, preference)[0]
+    logger.info(f"Свободное время ({len(slots)}): {', '.join(slots)}; выбрано {choice} ({preference})")
+
+    confirm_timeout = wait_budget.budget("continue_button")
+    try:
+        driver.set_script_timeout(confirm_timeout + 5)
+        clicked = driver.execute_async_script(CLICK_TIME_SLOT_JS, slots.index(choice), choice, TIME_SLOTS[1],
+                                              list(TIME_CONFIRM_TEXTS), int(confirm_timeout * 1000))
+    except Exception as e:
+        logger.error(f"Ошибка при выборе временного слота: {str(e)}")
+        return False, f"Ошибка при выборе времени: {str(e)}"
+    if not clicked["clicked"]:
+        return False, f"Слот {choice} исчез со страницы"
+
+    value = {"selected": choice, "slots": slots}
+    if clicked["confirm"]:
+        wait_budget.record("continue_button", clicked["waited"] / 1000)
+        logger.info(f"Выбран временной слот {choice}, нажата кнопка «{clicked['confirm']}»")
+        screenshot_path = os.path.join(screenshots_dir, f"after_confirmation_{int(time.time())}.png")
+        driver.save_screenshot(screenshot_path)
+        value["message"] = f"Успешно выбрана дата {date_text} и время {choice}"
+    else:
+        wait_budget.record("continue_button", confirm_timeout, timed_out=True)
+        logger.warning("Кнопка подтверждения не найдена, но дата и время были выбраны")
+        value["message"] = f"Выбрана дата {date_text} и время {choice}, подтверждение невозможно"
+    return True, value
+
+
+@timed_stage("complete_booking")
 def complete_booking(driver):
     """
     Завершает процесс бронирования после выбора даты и времени.
@@ -285,37 +375,25 @@ def complete_booking(driver):
         screenshot_path = os.path.join(screenshots_dir, f"booking_completion_start_{int(time.time())}.png")
         driver.save_screenshot(screenshot_path)
         
-        # Проверяем, находимся ли мы на странице завершения бронирования
-        # Ищем элементы, характерные для финальной страницы
-        confirmation_elements = [
-            "//h1[contains(text(), 'Подтверждение')]",
-            "//div[contains(text(), 'Ваше бронирование')]",
-            "//div[contains(text(), 'Записи на прием')]",
-            "//button[contains(text(), 'Завершить') or contains(text(), 'Подтвердить бронирование')]"
-        ]
-        
-        found_confirmation_page = False
-        for selector in confirmation_elements:
-            try:
-                element = driver.find_element(By.XPATH, selector)
-                found_confirmation_page = True
-                logger.info(f"Найден элемент подтверждения бронирования: {selector}")
-                break
-            except:
-                continue
+        # Проверяем, находимся ли мы на странице завершения бронирования: признаки финальной
+        # страницы, кнопки и сообщение об успехе берутся из одного снимка, без ожиданий
+        # поиска по каждому варианту
+        page = parse_booking_page(driver.page_source)
         
-        if not found_confirmation_page:
+        if page["confirmation"]:
+            logger.info(f"Найден элемент подтверждения бронирования: {page['confirmation']}")
+        else:
             logger.warning("Не найдены элементы страницы подтверждения бронирования")
             
             # Пробуем нажать любую кнопку продолжения, которая может быть на странице
             try:
                 continue_buttons = driver.find_elements(By.XPATH, 
-                    "//button[contains(text(), 'Продолжить') or contains(text(), 'Далее') or contains(text(), 'Подтвердить')]")
+                    "//button[contains(text(), 'Продолжить') or contains(text(), 'Далее') or contains(text(), 'Подтвердить')]") if page["continue_buttons"] else []
                 
                 if continue_buttons:
                     # Берем первую найденную кнопку
                     button = continue_buttons[0]
-                    button_text = button.text.strip()
+                    button_text = page["continue_buttons"][0]
                     
                     # Скролл к кнопке
                     driver.execute_script("arguments[0].scrollIntoView(true);", button)
@@ -333,6 +411,7 @@ def complete_booking(driver):
                     # Делаем скриншот после нажатия
                     screenshot_path = os.path.join(screenshots_dir, f"after_continue_click_{int(time.time())}.png")
                     driver.save_screenshot(screenshot_path)
+                    page = parse_booking_page(driver.page_source)
                 else:
                     logger.warning("Не найдено кнопок для продолжения")
             except Exception as e:
@@ -342,11 +421,11 @@ def complete_booking(driver):
         final_button_found = False
         try:
             final_buttons = driver.find_elements(By.XPATH, 
-                "//button[contains(text(), 'Завершить') or contains(text(), 'Подтвердить бронирование') or contains(text(), 'Финализировать')]")
+                "//button[contains(text(), 'Завершить') or contains(text(), 'Подтвердить бронирование') or contains(text(), 'Финализировать')]") if page["final_buttons"] else []
             
             if final_buttons:
                 final_button = final_buttons[0]
-                final_button_text = final_button.text.strip()
+                final_button_text = page["final_buttons"][0]
                 
                 # Скролл к кнопке
                 driver.execute_script("arguments[0].scrollIntoView(true);", final_button)
@@ -364,6 +443,7 @@ def complete_booking(driver):
                 # Делаем скриншот после финального нажатия
                 screenshot_path = os.path.join(screenshots_dir, f"after_final_button_{int(time.time())}.png")
                 driver.save_screenshot(screenshot_path)
+                page = parse_booking_page(driver.page_source)
                 
                 final_button_found = True
             else:
@@ -371,24 +451,11 @@ def complete_booking(driver):
         except Exception as e:
             logger.error(f"Ошибка при поиске и нажатии финальной кнопки: {str(e)}")
         
-        # Проверяем наличие подтверждения успешного бронирования
-        success_elements = [
-            "//div[contains(text(), 'успешно забронирован') or contains(text(), 'Ваша запись подтверждена')]",
-            "//div[contains(text(), 'Спасибо') and contains(text(), 'бронирование')]",
-            "//h1[contains(text(), 'Подтверждение')]"
-        ]
-        
-        success_found = False
-        success_message = ""
-        for selector in success_elements:
-            try:
-                element = driver.find_element(By.XPATH, selector)
-                success_message = element.text.strip()
-                success_found = True
-                logger.info(f"Найдено подтверждение успешного бронирования: {success_message}")
-                break
-            except:
-                continue
+        # Проверяем наличие подтверждения успешного бронирования (снимок после последнего нажатия)
+        success_message = page["success"]
+        success_found = success_message is not None
+        if success_found:
+            logger.info(f"Найдено подтверждение успешного бронирования: {success_message}")
         
         # Делаем финальный скриншот результата
         screenshot_path = os.path.join(screenshots_dir, f"booking_completion_final_{int(time.time())}.png")
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import asyncio
+import logging
+import datetime
+
+from dotenv import load_dotenv
+
+import locators as L
+from metrics import record_stage
+
+logger = logging.getLogger(__name__)
+
+# Загружаем переменные окружения
+load_dotenv()
+VFS_EMAIL = os.getenv("VFS_EMAIL")
+VFS_PASSWORD = os.getenv("VFS_PASSWORD")
+USER_BIRTH_DATE = os.getenv("USER_BIRTH_DATE", "06/09/1957")
+CITY = os.getenv("CITY", "Минск")
+
+# Асинхронный сценарий проверки поверх интерфейса backends.AsyncBrowserBackend: его
+# выполняет режим AUTOMATION_MODE=async на CDP (cdp_backend.py), а benchmarks/bench_backends.py
+# сравнивает на нем CDP и Playwright. Задания Selenium идут через check_flow.py и browser.py.
+
+
+class FlowError(Exception):
+    """Ошибка этапа сценария. Атрибут reason - короткий код причины (captcha, timeout, ...)."""
+
+    def __init__(self, stage, reason, message):
+        super().__init__(message)
+        self.stage = stage
+        self.reason = reason
+
+
+async def wait_for_url(backend, fragment, timeout, poll=0.5):
+    """Ждет, пока адрес страницы не будет содержать fragment."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if fragment in await backend.current_url():
+            return True
+        await asyncio.sleep(poll)
+    return False
+
+
+async def login(backend, email=None, password=None):
+    """Выполняет вход в VFS Global через бэкенд."""
+    email = email or VFS_EMAIL
+    password = password or VFS_PASSWORD
+    if not email or not password:
+        raise FlowError("login", "credentials", "Не найдены учетные данные VFS Global")
+
+    if "dashboard" in await backend.current_url():
+        return
+
+    await backend.navigate(L.LOGIN_URL)
+    if await backend.wait_any([L.LOGIN_EMAIL_INPUT], 15) is None:
+        raise FlowError("login", "timeout", "Форма авторизации не загрузилась")
+
+    html = await backend.snapshot("login_page")
+    if "captcha" in html.lower():
+        raise FlowError("login", "captcha", "Обнаружена капча на странице входа")
+
+    await backend.fill(L.LOGIN_EMAIL_INPUT, email)
+    await backend.fill(L.LOGIN_PASSWORD_INPUT, password)
+    if not await backend.click(L.LOGIN_BUTTON, timeout=10):
+        raise FlowError("login", "timeout", "Кнопка входа не найдена")
+
+    if not await wait_for_url(backend, "dashboard", 20):
+        await backend.snapshot("login_error")
+        raise FlowError("login", "timeout", "Не удалось перейти на dashboard после входа")
+
+
+async def _select_option(backend, dropdown, option_text, fallback_first=False):
+    """Открывает выпадающий список Material и выбирает пункт по тексту."""
+    if not await backend.click(dropdown):
+        logger.warning(f"Выпадающий список не найден: {dropdown[1]}")
+        return False
+    if await backend.click(L.mat_option(option_text)):
+        return True
+    if fallback_first:
+        return await backend.click(L.FIRST_MAT_OPTION)
+    return False
+
+
+async def open_booking_form(backend, center=L.DEFAULT_CENTER, category=L.DEFAULT_CATEGORY,
+                            subcategory=L.DEFAULT_SUBCATEGORY, birth_date=None):
+    """Открывает форму записи и заполняет центр, категорию, подкатегорию и дату рождения."""
+    if "dashboard" not in await backend.current_url():
+        await backend.navigate(L.DASHBOARD_URL)
+
+    if not await backend.click(L.BOOK_APPOINTMENT_BUTTON, timeout=10):
+        await backend.navigate(L.NEW_BOOKING_URL)
+
+    if await backend.wait_any([L.BOOKING_FORM_MARKER], 15) is None:
+        raise FlowError("form", "timeout", "Форма записи не загрузилась")
+
+    if not await _select_option(backend, L.CENTER_DROPDOWN, center):
+        # Без выбранного центра календарь был бы не того города
+        raise FlowError("form", "error", f"Не удалось выбрать центр {center}")
+    await _select_option(backend, L.CATEGORY_DROPDOWN, category)
+    await _select_option(backend, L.SUBCATEGORY_DROPDOWN, subcategory, fallback_first=True)
+
+    if await backend.wait_any([L.BIRTH_DATE_INPUT], 5) is not None:
+        await backend.fill(L.BIRTH_DATE_INPUT, birth_date or USER_BIRTH_DATE)
+
+    await backend.click(L.CONTINUE_BUTTON)
+
+
+async def extract_calendar(backend):
+    """
+    Возвращает доступные даты календаря.
+
+    Returns:
+        list: Даты в формате "<день> <месяц год>" или пустой список
+    """
+    found = await backend.wait_any([L.NO_SLOTS_MESSAGE, L.CALENDAR], 5)
+    if found is None or found == 0:
+        return []
+
+    month_names = await backend.extract(L.CALENDAR_PERIOD)
+    month_name = month_names[0] if month_names else datetime.datetime.now().strftime("%B %Y")
+    days = [text for text in await backend.extract(L.CALENDAR_AVAILABLE_CELLS) if text]
+    return [f"{day} {month_name}" for day in days]
+
+
+async def run_stage(step, timeout):
+    """Выполняет этап с ограничением по времени (asyncio.timeout или wait_for до Python 3.11)."""
+    if not timeout:
+        return await step()
+    if hasattr(asyncio, "timeout"):
+        async with asyncio.timeout(timeout):
+            return await step()
+    return await asyncio.wait_for(step(), timeout)
+
+
+async def run_check_flow(backend, close=True, stage_timeouts=None, on_stage=None, city=None):
+    """
+    Полный сценарий проверки: запуск браузера, вход, форма, календарь.
+
+    Args:
+        backend (AsyncBrowserBackend): Бэкенд браузера
+        close (bool): Закрыть браузер после проверки
+        stage_timeouts (dict): Таймауты этапов в секундах (launch, login, form, calendar)
+        on_stage: Корутина on_stage(stage), вызываемая перед каждым этапом
+        city (str): Город визового центра (ключ locators.CITY_CENTERS); по умолчанию CITY
+
+    Returns:
+        dict: success, stage, reason, dates, error (как у jobs.check_job),
+            timings (секунды по этапам) и backend
+    """
+    timings = {}
+    result = {"success": False, "stage": "launch", "reason": None, "dates": [], "error": None,
+              "timings": timings, "backend": backend.name}
+    city = city or CITY
+    if city not in L.CITY_CENTERS:
+        result.update(stage="form", reason="error", error=f"Нет визового центра для города {city}")
+        return result
+    stages = (
+        ("launch", backend.launch),
+        ("login", lambda: login(backend)),
+        ("form", lambda: open_booking_form(backend, center=L.CITY_CENTERS[city])),
+        ("calendar", lambda: extract_calendar(backend)),
+    )
+    try:
+        for stage, step in stages:
+            result["stage"] = stage
+            if on_stage:
+                await on_stage(stage)
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                value = await run_stage(step, (stage_timeouts or {}).get(stage))
+                outcome = "fail" if value is False else "ok"
+            except (asyncio.TimeoutError, TimeoutError):
+                outcome = "timeout"
+                limit = (stage_timeouts or {}).get(stage)
+                message = f"Этап {stage} не уложился в {limit:.0f} с" if limit else f"Этап {stage} превысил время ожидания"
+                raise FlowError(stage, "timeout", message)
+            finally:
+                timings[stage] = time.perf_counter() - started
+                record_stage(f"{backend.name}_{stage}", timings[stage], outcome)
+            if stage == "launch" and value is False:
+                raise FlowError("launch", "launch", "Не удалось запустить браузер")
+            if stage == "calendar":
+                result["dates"] = value
+        result["success"] = True
+    except FlowError as e:
+        logger.error(f"Ошибка на этапе {e.stage} ({backend.name}): {str(e)}")
+        result.update(stage=e.stage, error=str(e), reason=e.reason)
+    except Exception as e:
+        logger.error(f"Ошибка сценария проверки ({backend.name}): {str(e)}")
+        result.update(error=str(e), reason="error")
+    finally:
+        if close:
+            started = time.perf_counter()
+            try:
+                await backend.close()
+            except Exception as e:
+                logger.warning(f"Ошибка при закрытии браузера: {str(e)}")
+            timings["close"] = time.perf_counter() - started
+    return result
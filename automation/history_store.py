@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import queue
+import sqlite3
+import logging
+import datetime
+import threading
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+# Загружаем переменные окружения
+load_dotenv()
+HISTORY_RETENTION_DAYS = int(os.getenv("HISTORY_RETENTION_DAYS", "30"))  # Сколько дней хранить отдельные проверки
+HISTORY_BATCH_SIZE = 100  # Сколько записей вставляется одной транзакцией
+HISTORY_FLUSH_INTERVAL = 1.0  # Как долго запись ждет в очереди, секунды
+HISTORY_ROLLUP_INTERVAL = 3600  # Как часто старые проверки сворачиваются в почасовые итоги, секунды
+
+LOGS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs")
+HISTORY_DB = os.path.join(LOGS_DIR, "history.sqlite3")
+LEGACY_JSONL = os.path.join(LOGS_DIR, "slot_history.jsonl")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checks (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    city TEXT NOT NULL,
+    visa_type TEXT NOT NULL,
+    success INTEGER NOT NULL,
+    slots INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    reason TEXT,
+    dates TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_checks_target_ts ON checks (city, visa_type, ts);
+CREATE TABLE IF NOT EXISTS hourly (
+    city TEXT NOT NULL,
+    visa_type TEXT NOT NULL,
+    hour_ts INTEGER NOT NULL,
+    checks INTEGER NOT NULL,
+    successes INTEGER NOT NULL,
+    hits INTEGER NOT NULL,
+    max_slots INTEGER NOT NULL,
+    PRIMARY KEY (city, visa_type, hour_ts)
+) WITHOUT ROWID;
+"""
+
+# Свертка: проверки старше срока хранения превращаются в почасовые итоги и удаляются
+ROLLUP_SQL = """
+INSERT INTO hourly (city, visa_type, hour_ts, checks, successes, hits, max_slots)
+SELECT city, visa_type, CAST(ts / 3600 AS INTEGER) * 3600, COUNT(*), SUM(success), SUM(slots > 0), MAX(slots)
+FROM checks WHERE ts < ? GROUP BY 1, 2, 3
+ON CONFLICT (city, visa_type, hour_ts) DO UPDATE SET
+    checks = checks + excluded.checks,
+    successes = successes + excluded.successes,
+    hits = hits + excluded.hits,
+    max_slots = MAX(max_slots, excluded.max_slots)
+"""
+
+
+def _connect(path):
+    connection = sqlite3.connect(path, timeout=10, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+class HistoryStore:
+    """
+    История проверок в SQLite (WAL).
+
+    Запись не блокирует обработчики: record() кладет строку в очередь, а фоновый
+    поток вставляет накопленное одной транзакцией (до HISTORY_BATCH_SIZE строк
+    или раз в HISTORY_FLUSH_INTERVAL). Проверки старше HISTORY_RETENTION_DAYS
+    раз в час сворачиваются в почасовые итоги (таблица hourly). Чтение идет
+    через отдельные соединения и не ждет писателя.
+    """
+
+    def __init__(self, path=HISTORY_DB, retention_days=HISTORY_RETENTION_DAYS):
+        self.path = path
+        self.retention_days = retention_days
+        self._queue = queue.Queue()
+        self._thread = None
+        self._started = threading.Lock()
+        self._ready = False
+
+    def _ensure_schema(self):
+        if self._ready:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with _connect(self.path) as connection:
+            connection.executescript(SCHEMA)
+        self._ready = True
+        self._import_legacy()
+
+    def _import_legacy(self):
+        # История из logs/slot_history.jsonl (до перехода на SQLite) переносится один раз
+        if self.path != HISTORY_DB or not os.path.exists(LEGACY_JSONL):
+            return
+        rows = []
+        with open(LEGACY_JSONL, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    rows.append((entry["ts"], entry["city"], entry["visa_type"], int(entry["success"]),
+                                 int(entry["slots"]), entry.get("source", "manual"), None, None))
+                except (ValueError, KeyError):
+                    continue
+        with _connect(self.path) as connection:
+            connection.executemany("INSERT INTO checks (ts, city, visa_type, success, slots, source, reason, dates) "
+                                   "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        os.replace(LEGACY_JSONL, LEGACY_JSONL + ".imported")
+        logger.info(f"История проверок перенесена в SQLite: {len(rows)} записей")
+
+    def _start(self):
+        with self._started:
+            if self._thread and self._thread.is_alive():
+                return
+            self._ensure_schema()
+            self._thread = threading.Thread(target=self._writer, name="history-writer", daemon=True)
+            self._thread.start()
+
+    def record(self, city, visa_type, success, slots, source="manual", reason=None, dates=None):
+        """
+        Добавляет результат проверки в очередь записи.
+
+        Args:
+            city (str): Город визового центра
+            visa_type (str): Тип визы
+            success (bool): Проверка дошла до календаря
+            slots (int): Сколько доступных дат найдено
+            source (str): Кто запустил проверку (manual, scheduler)
+            reason (str): Код причины неудачи
+            dates (list): Найденные даты
+        """
+        self._start()
+        self._queue.put((time.time(), city, visa_type, int(bool(success)), int(slots), source, reason,
+                         json.dumps(dates, ensure_ascii=False) if dates else None))
+
+    def flush(self, timeout=5):
+        """Ждет, пока все записи из очереди попадут в базу."""
+        if self._thread and self._thread.is_alive():
+            done = threading.Event()
+            self._queue.put(done)
+            done.wait(timeout)
+
+    def close(self):
+        """Дописывает очередь и останавливает поток записи."""
+        if self._thread and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(10)
+
+    def _writer(self):
+        connection = _connect(self.path)
+        last_rollup = 0.0
+        try:
+            while True:
+                item = self._queue.get()
+                batch = []
+                waiters = []
+                stop = False
+                deadline = time.monotonic() + HISTORY_FLUSH_INTERVAL
+                while True:
+                    if item is None:
+                        stop = True
+                    elif isinstance(item, threading.Event):
+                        waiters.append(item)
+                    else:
+                        batch.append(item)
+                    if stop or waiters or len(batch) >= HISTORY_BATCH_SIZE:
+                        break
+                    try:
+                        item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                if batch:
+                    try:
+                        with connection:
+                            connection.executemany(
+                                "INSERT INTO checks (ts, city, visa_type, success, slots, source, reason, dates) "
+                                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+                    except sqlite3.Error as e:
+                        logger.warning(f"Не удалось записать историю проверок ({len(batch)} записей): {str(e)}")
+                for waiter in waiters:
+                    waiter.set()
+                if time.time() - last_rollup >= HISTORY_ROLLUP_INTERVAL:
+                    last_rollup = time.time()
+                    self._rollup(connection)
+                if stop:
+                    return
+        finally:
+            connection.close()
+
+    def _rollup(self, connection):
+        cutoff = time.time() - self.retention_days * 86400
+        # Граница по началу часа, чтобы час не делился между checks и hourly
+        cutoff = int(cutoff // 3600) * 3600
+        try:
+            with connection:
+                connection.execute(ROLLUP_SQL, (cutoff,))
+                removed = connection.execute("DELETE FROM checks WHERE ts < ?", (cutoff,)).rowcount
+            if removed:
+                logger.info(f"История проверок: {removed} записей старше {self.retention_days} дн. свернуты по часам")
+        except sqlite3.Error as e:
+            logger.warning(f"Не удалось свернуть историю проверок: {str(e)}")
+
+    def _read(self, sql, params):
+        self._ensure_schema()
+        connection = _connect(self.path)
+        try:
+            return connection.execute(sql, params).fetchall()
+        finally:
+            connection.close()
+
+    def recent(self, city, visa_type, limit=10):
+        """
+        Последние проверки пары (город, тип визы).
+
+        Returns:
+            list: [(datetime, success, slots, source, reason, dates)] от новых к старым
+        """
+        rows = self._read("SELECT ts, success, slots, source, reason, dates FROM checks "
+                          "WHERE city = ? AND visa_type = ? ORDER BY ts DESC LIMIT ?", (city, visa_type, limit))
+        return [(datetime.datetime.fromtimestamp(ts), bool(success), slots, source, reason,
+                 json.loads(dates) if dates else []) for ts, success, slots, source, reason, dates in rows]
+
+    def summary(self, city, visa_type, days=7):
+        """
+        Итоги за days дней: проверок, дошедших до календаря, со слотами и время последних слотов.
+
+        Returns:
+            dict: checks, successes, hits, last_hit (datetime или None)
+        """
+        since = time.time() - days * 86400
+        checks, successes, hits, last_hit = self._read(
+            "SELECT COUNT(*), COALESCE(SUM(success), 0), COALESCE(SUM(slots > 0), 0), MAX(CASE WHEN slots > 0 THEN ts END) "
+            "FROM checks WHERE city = ? AND visa_type = ? AND ts >= ?", (city, visa_type, since))[0]
+        rolled = self._read(
+            "SELECT COALESCE(SUM(checks), 0), COALESCE(SUM(successes), 0), COALESCE(SUM(hits), 0), "
+            "MAX(CASE WHEN hits > 0 THEN hour_ts END) FROM hourly WHERE city = ? AND visa_type = ? AND hour_ts >= ?",
+            (city, visa_type, since))[0]
+        last_hit = last_hit or rolled[3]
+        return {
+            "checks": checks + rolled[0],
+            "successes": successes + rolled[1],
+            "hits": hits + rolled[2],
+            "last_hit": datetime.datetime.fromtimestamp(last_hit) if last_hit else None,
+        }
+
+    def hourly_slot_counts(self, city, visa_type, days=30):
+        """
+        Считает по часам суток (местное время), сколько раз проверка находила слоты.
+
+        Returns:
+            tuple: (list, list) - (проверок со слотами по часам, всего успешных проверок по часам)
+        """
+        since = time.time() - days * 86400
+        hits = [0] * 24
+        checks = [0] * 24
+        rows = self._read(
+            "SELECT CAST(strftime('%H', ts, 'unixepoch', 'localtime') AS INTEGER), COUNT(*), SUM(slots > 0) "
+            "FROM checks WHERE city = ? AND visa_type = ? AND ts >= ? AND success = 1 GROUP BY 1",
+            (city, visa_type, since))
+        rows += self._read(
+            "SELECT CAST(strftime('%H', hour_ts, 'unixepoch', 'localtime') AS INTEGER), SUM(successes), SUM(hits) "
+            "FROM hourly WHERE city = ? AND visa_type = ? AND hour_ts >= ? GROUP BY 1",
+            (city, visa_type, since))
+        for hour, total, hit in rows:
+            checks[hour] += total
+            hits[hour] += hit
+        return hits, checks
+
+
+# Общее хранилище процесса бота
+history = HistoryStore()
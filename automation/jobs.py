@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import logging
+import threading
+from functools import partial
+
+from dotenv import load_dotenv
+
+from browser import setup_driver, reset_to_dashboard, cleanup_chrome, login_vfs_global, CITY
+from check_flow import CheckFlow, FATAL_REASONS
+from memory_watchdog import DriverRecycler
+from browser_contexts import SharedBrowser
+from spare_browsers import SpareBrowsers, SPARE_BROWSERS, SPARE_BROWSER_LOGIN
+from command_tracer import trace_commands
+
+logger = logging.getLogger(__name__)
+
+# Загружаем переменные окружения
+load_dotenv()
+HOT_SESSION_HOLD = int(os.getenv("HOT_SESSION_HOLD", "120"))  # Сколько секунд держать сессию с найденными слотами
+
+# Задания браузера, которые выполняются целиком в одном месте: в процессе-исполнителе
+# (supervisor.py) или в потоке бота. Результат - словарь из простых типов, чтобы его
+# можно было передать через pipe в JSON.
+
+
+def create_driver_pool(browser_mode="process", cleanup=True):
+    """
+    Создает источник драйверов для заданий.
+
+    В режиме "process" при SPARE_BROWSERS > 0 сразу начинает запускать запасные
+    браузеры (spare_browsers.py), с входом в аккаунт при SPARE_BROWSER_LOGIN=1.
+
+    Args:
+        browser_mode (str): "process" - свой Chrome на драйвер, "contexts" - контексты в общем Chrome
+        cleanup (bool): Завершать все процессы Chrome перед запуском браузеров; False -
+            в процессах-исполнителях, где рядом работают браузеры других исполнителей
+
+    Returns:
+        DriverRecycler или SharedBrowser
+    """
+    factory = setup_driver if cleanup else partial(setup_driver, cleanup=False)
+    if browser_mode == "contexts":
+        return SharedBrowser(factory)
+    if SPARE_BROWSERS <= 0:
+        return DriverRecycler(factory, reset_page=reset_to_dashboard)
+
+    # Запасные браузеры работают рядом с текущим, поэтому процессы Chrome
+    # очищаются один раз здесь, а не перед каждым запуском
+    if cleanup:
+        cleanup_chrome()
+    factory = partial(setup_driver, cleanup=False)
+    spares = SpareBrowsers(factory, prepare=login_vfs_global if SPARE_BROWSER_LOGIN else None)
+    spares.start()
+    return DriverRecycler(factory, reset_page=reset_to_dashboard, spares=spares)
+
+
+class HotSessions:
+    """
+    Сессии, в которых проверка нашла слоты, удерживаемые для быстрого бронирования.
+
+    Пока окно удержания не истекло, драйвер с открытым календарем не
+    возвращается в пул, и /book того же чата сразу переходит к выбору даты.
+    """
+
+    def __init__(self, hold=HOT_SESSION_HOLD):
+        self.hold = hold
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def put(self, chat_id, pool, flow):
+        """Удерживает сессию чата на hold секунд."""
+        timer = threading.Timer(self.hold, self._expire, args=(chat_id, flow))
+        timer.daemon = True
+        with self._lock:
+            previous = self._sessions.pop(chat_id, None)
+            self._sessions[chat_id] = (pool, flow, timer)
+        if previous:
+            self._release(previous)
+        timer.start()
+        logger.info(f"Сессия чата {chat_id} удерживается {self.hold} с")
+
+    def take(self, chat_id):
+        """
+        Забирает удерживаемую сессию чата.
+
+        Returns:
+            tuple: (pool, flow) или None, если сессии нет
+        """
+        with self._lock:
+            entry = self._sessions.pop(chat_id, None)
+        if entry is None:
+            return None
+        entry[2].cancel()
+        return entry[0], entry[1]
+
+    def drop(self, chat_id):
+        """Возвращает удерживаемый драйвер чата в пул."""
+        with self._lock:
+            entry = self._sessions.pop(chat_id, None)
+        if entry:
+            self._release(entry)
+
+    def release_all(self):
+        """Возвращает все удерживаемые драйверы в пул."""
+        with self._lock:
+            entries = list(self._sessions.values())
+            self._sessions.clear()
+        for entry in entries:
+            self._release(entry)
+
+    def _expire(self, chat_id, flow):
+        with self._lock:
+            entry = self._sessions.get(chat_id)
+            if entry is None or entry[1] is not flow:
+                return
+            del self._sessions[chat_id]
+        logger.info(f"Окно удержания сессии чата {chat_id} истекло")
+        self._release(entry)
+
+    @staticmethod
+    def _release(entry):
+        pool, flow, timer = entry
+        timer.cancel()
+        try:
+            pool.release(flow.driver)
+        except Exception as e:
+            logger.warning(f"Ошибка при освобождении удерживаемой сессии: {str(e)}")
+
+
+hot_sessions = HotSessions()
+
+
+def _make_room(pool):
+    """Освобождает удерживаемые сессии, если пул выдает один драйвер на всех."""
+    if getattr(pool, "exclusive", False):
+        hot_sessions.release_all()
+
+
+def _failure(stage, error, reason="error"):
+    return {"success": False, "stage": stage, "reason": reason, "error": error}
+
+
+def check_job(pool, progress, chat_id=None, city=None):
+    """
+    Проверка доступных дат: вход, форма записи, календарь.
+
+    Неудачный этап повторяется на том же драйвере с последней контрольной
+    точки (check_flow.CheckFlow), без нового браузера и повторного входа.
+    Если слоты найдены, сессия удерживается для чата на HOT_SESSION_HOLD секунд.
+
+    Args:
+        pool: Источник драйверов (create_driver_pool)
+        progress: Функция progress(stage, detail=None) для сообщений о ходе задания
+        chat_id (int): Чат, для которого удерживается сессия
+        city (str): Город визового центра (ключ locators.CITY_CENTERS); по умолчанию CITY
+
+    Returns:
+        dict: success, stage, reason, dates или error; hold - секунды удержания сессии
+    """
+    _make_room(pool)
+    if chat_id is not None:
+        hot_sessions.drop(chat_id)
+
+    driver = pool.acquire()
+    if not driver:
+        return _failure("launch", "Не удалось инициализировать браузер. Пожалуйста, попробуйте позже.", "launch")
+
+    session_failed = True
+    held = False
+    try:
+        flow = CheckFlow(driver, city=city)
+        with trace_commands(driver, "check"):
+            result = flow.run("calendar", progress)
+        session_failed = not result["success"]
+        result["dates"] = flow.values.get("calendar", [])
+        if result["dates"] and chat_id is not None and hot_sessions.hold > 0:
+            hot_sessions.put(chat_id, pool, flow)
+            result["hold"] = hot_sessions.hold
+            held = True
+        return result
+    finally:
+        if not held:
+            pool.release(driver, session_failed)
+
+
+def check_cities_job(pool, progress, cities, chat_id=None):
+    """
+    Проверка нескольких визовых центров в одной сессии: вход выполняется один
+    раз, затем для каждого города форма записи с его центром и календарь.
+
+    Если город не удалось проверить по причине, при которой не проверить и
+    остальные (капча, Cloudflare, драйвер, потерянный вход), проверка
+    прекращается; непроверенных городов нет в результате.
+
+    Args:
+        cities (list): Города в порядке проверки (ключи locators.CITY_CENTERS)
+        chat_id (int): Чат, чья удерживаемая сессия освобождается перед проверкой
+
+    Returns:
+        dict: success, stage, reason, error - первой неудачной проверки, если проверка
+            прервана или не удалась ни для одного города; неудача отдельного города при
+            успешных остальных - проблема его формы, а не сайта (для предохранителя
+            задание успешно); cities - город -> success, reason, error, dates
+    """
+    _make_room(pool)
+    if chat_id is not None:
+        hot_sessions.drop(chat_id)
+
+    driver = pool.acquire()
+    if not driver:
+        return _failure("launch", "Не удалось инициализировать браузер. Пожалуйста, попробуйте позже.",
+                        "launch") | {"cities": {}}
+
+    checked = {}
+    failed = None
+    aborted = False
+    try:
+        flow = CheckFlow(driver)
+        with trace_commands(driver, "check_cities"):
+            for city in cities:
+                progress("city", city)
+                flow.switch_city(city)
+                result = flow.run("calendar", progress)
+                result["dates"] = flow.values.get("calendar", [])
+                checked[city] = {name: result[name] for name in ("success", "reason", "error", "dates")}
+                if result["success"]:
+                    continue
+                failed = failed or result
+                if result["reason"] in FATAL_REASONS or result["stage"] == "login":
+                    logger.warning(f"Проверка городов прервана на городе {city}: {result['error']}")
+                    aborted = True
+                    break
+        if failed and (aborted or not any(entry["success"] for entry in checked.values())):
+            return {name: failed[name] for name in ("success", "stage", "reason", "error")} | {"cities": checked}
+        return {"success": True, "stage": "calendar", "reason": None, "error": None, "cities": checked}
+    finally:
+        pool.release(driver, failed is not None)
+
+
+def book_job(pool, progress, selected_date=None, chat_id=None, city=None):
+    """
+    Бронирование слота: проверка дат, выбор даты и подтверждение.
+
+    Если для чата удерживается сессия после /check того же города, задание
+    продолжает ее с открытого календаря, без входа и заполнения формы.
+
+    Args:
+        selected_date (str): Дата для выбора; по умолчанию первая доступная
+        chat_id (int): Чат, чья удерживаемая сессия используется
+        city (str): Город визового центра; по умолчанию CITY
+
+    Returns:
+        dict: success, stage, reason, dates, selected, message или error;
+            time_slots - все свободное время выбранной даты, selected_time - выбранное
+    """
+    hot = hot_sessions.take(chat_id) if chat_id is not None else None
+    if hot and (hot[1].city or CITY) != (city or CITY):
+        # Открыт календарь другого центра: сессия возвращается в пул
+        hot[0].release(hot[1].driver)
+        hot = None
+    _make_room(pool)
+    if hot:
+        pool, flow = hot
+        driver = flow.driver
+        flow.selected_date = selected_date
+        progress("hot")
+    else:
+        driver = pool.acquire()
+        if not driver:
+            return _failure("launch", "Не удалось инициализировать браузер. Пожалуйста, попробуйте позже.", "launch")
+        flow = CheckFlow(driver, selected_date=selected_date, city=city)
+
+    session_failed = True
+    try:
+        with trace_commands(driver, "book"):
+            result = flow.run("calendar", progress)
+            result["dates"] = flow.values.get("calendar", [])
+            if not result["success"]:
+                return result
+            if not result["dates"]:
+                session_failed = False
+                return _failure("calendar", "Нет доступных слотов", "no_slots") | {"dates": []}
+
+            result = flow.run("booking", progress)
+        result["dates"] = flow.values["calendar"]
+        result["selected"] = flow.values.get("date")
+        result["time_slots"] = flow.time_slots
+        result["selected_time"] = flow.selected_time
+        result["message"] = flow.values.get("booking")
+        if result["stage"] == "booking" and not result["success"]:
+            result["reason"] = "unconfirmed"
+        session_failed = not result["success"]
+        return result
+    finally:
+        pool.release(driver, session_failed)
+
+
+# Реестр заданий, доступных исполнителю
+JOBS = {
+    "check": check_job,
+    "check_cities": check_cities_job,
+    "book": book_job,
+}
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Локаторы элементов страниц VFS Global.
+# Локатор - кортеж (тип, выражение), где тип "css" или "xpath". Формат не зависит
+# от бэкенда браузера: Selenium и Playwright переводят его в свои селекторы (см. backends.py).
+
+import os
+
+from dotenv import load_dotenv
+
+# Загружаем переменные окружения
+load_dotenv()
+# Корень сайта VFS Global; для локальных прогонов - адрес mocks/vfs_site.py
+VFS_BASE_URL = os.getenv("VFS_BASE_URL", "https://visa.vfsglobal.com/blr/ru/pol").rstrip("/")
+
+# Адреса страниц
+LOGIN_URL = f"{VFS_BASE_URL}/login"
+DASHBOARD_URL = f"{VFS_BASE_URL}/dashboard"
+NEW_BOOKING_URL = f"{VFS_BASE_URL}/book-an-appointment"
+REGISTER_URL = f"{VFS_BASE_URL}/register"
+
+# Страница авторизации
+LOGIN_EMAIL_INPUT = ("css", "#mat-input-0")
+LOGIN_PASSWORD_INPUT = ("css", "#mat-input-1")
+LOGIN_BUTTON = ("xpath", "//button[contains(text(), 'Войти') or contains(text(), 'Login')]")
+
+# Dashboard и форма записи
+BOOK_APPOINTMENT_BUTTON = ("xpath", "//button[contains(text(), 'Записаться на прием')]")
+BOOKING_FORM_MARKER = ("xpath", "//*[contains(text(), 'Выберите свой Центр приложений')]")
+CENTER_DROPDOWN = ("xpath", "//mat-select[contains(@aria-labelledby, 'mat-form-field') and contains(@formcontrolname, 'center')]")
+CATEGORY_DROPDOWN = ("xpath", "//mat-select[contains(@aria-labelledby, 'mat-form-field') and contains(@formcontrolname, 'category')]")
+SUBCATEGORY_DROPDOWN = ("xpath", "//mat-select[contains(@aria-labelledby, 'mat-form-field') and contains(@formcontrolname, 'subCategory')]")
+BIRTH_DATE_INPUT = ("xpath", "//input[@formcontrolname='dateOfBirth']")
+CONTINUE_BUTTON = ("xpath", "//button[contains(text(), 'Продолжить')]")
+FIRST_MAT_OPTION = ("xpath", "//mat-option[1]")
+
+
+def mat_option(text):
+    """Локатор пункта выпадающего списка Angular Material с заданным текстом."""
+    return ("xpath", f"//mat-option//span[contains(text(), '{text}')]")
+
+
+# Форма личных данных заявителя
+FIRST_NAME_INPUT = ("css", "input[formcontrolname='firstName']")
+LAST_NAME_INPUT = ("css", "input[formcontrolname='lastName']")
+# Дата рождения - текстовое поле или поле с датапикером Angular Material
+PERSONAL_BIRTH_DATE_INPUT = ("css", "input[formcontrolname='dateOfBirth'], input.mat-datepicker-input")
+SUBMIT_BUTTON_TEXTS = ("Продолжить", "Continue")
+
+# Календарь и сообщение об отсутствии слотов
+NO_SLOTS_MESSAGE = ("xpath", "//div[contains(text(), 'нет доступных слотов') or contains(text(), 'Приносим извинения') or contains(text(), 'Места для регистрации')]")
+CALENDAR = ("css", ".mat-calendar-body, .calendar-container, mat-calendar, .date-selection")
+CALENDAR_AVAILABLE_CELLS = ("css", ".mat-calendar-body-cell:not(.mat-calendar-body-disabled), .date-available, td.selectable:not(.disabled)")
+CALENDAR_CELL_TEXT = ("css", ".mat-calendar-body-cell-content, .date-text")
+CALENDAR_PERIOD = ("css", ".mat-calendar-period-button, .current-month")
+
+# Меню выбора времени после клика по дате и свободные слоты (как page_parsers.TIME_MENU, TIME_SLOTS)
+TIME_MENU = ("css", ".time-slot, .time-selection, [class*='time-slot']")
+TIME_SLOTS = ("css", ".time-slot:not(.disabled), [class*='time-slot']:not([class*='disabled']), button[class*='time']")
+# Кнопки подтверждения выбранного времени или даты
+TIME_CONFIRM_TEXTS = ("Подтвердить", "Продолжить", "Далее")
+
+# Названия центра и категории, которые выбирает форма записи
+DEFAULT_CENTER = "Poland Visa Application Center-Minsk"
+DEFAULT_CATEGORY = "National Visa D"
+DEFAULT_SUBCATEGORY = "Praca - Oswiadczenie"
+
+# Визовый центр по городу (CITIES в main.py)
+CITY_CENTERS = {
+    "Минск": "Poland Visa Application Center-Minsk",
+    "Брест": "Poland Visa Application Center-Brest",
+    "Гродно": "Poland Visa Application Center-Grodno",
+    "Могилев": "Poland Visa Application Center-Mogilev",
+    "Витебск": "Poland Visa Application Center-Vitebsk",
+    "Гомель": "Poland Visa Application Center-Gomel",
+}
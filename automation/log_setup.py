@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import datetime
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+
+from dotenv import load_dotenv
+
+# Загружаем переменные окружения
+load_dotenv()
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()  # Уровень логирования
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # "text" или "json" (по строке JSON на запись)
+LOG_ROTATION = os.getenv("LOG_ROTATION", "size")  # "size" - по размеру, "time" - каждую полночь
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(5 * 1024 * 1024)))  # Размер файла до ротации
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))  # Сколько старых файлов хранить
+HTTPX_LOG_RATE = int(os.getenv("HTTPX_LOG_RATE", "2"))  # Строк httpx в минуту на метод Bot API (getUpdates, ...)
+
+LOGS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs")
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Отдельные файлы компонентов: файл -> имена логгеров (модули automation/ импортируются без пакета)
+COMPONENT_LOGS = {
+    "browser.log": ("browser", "backends", "browser_contexts", "memory_watchdog", "jobs", "check_flow",
+                    "wait_budget", "command_tracer", "supervisor"),
+    "date_selector.log": ("date_selector",),
+    "registration.log": ("register_account",),
+}
+
+# Шумные логгеры, строки INFO которых прореживаются
+SAMPLED_LOGGERS = ("httpx", "httpcore")
+
+_listener = None
+_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """Запись лога одной строкой JSON."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "process": record.process,
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class ComponentFilter(logging.Filter):
+    """Пропускает записи указанных логгеров и их потомков."""
+
+    def __init__(self, names):
+        super().__init__()
+        self.names = tuple(names)
+
+    def filter(self, record):
+        return record.name in self.names or record.name.startswith(tuple(f"{name}." for name in self.names))
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Прореживает строки INFO/DEBUG шумных логгеров: не больше per_minute строк
+    в минуту на ключ (для httpx - метод Bot API). Предупреждения и ошибки проходят всегда.
+    Число отброшенных строк дописывается к первой строке следующей минуты.
+    """
+
+    def __init__(self, names=SAMPLED_LOGGERS, per_minute=HTTPX_LOG_RATE):
+        super().__init__()
+        self.names = tuple(names)
+        self.per_minute = per_minute
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(record):
+        # httpx: 'HTTP Request: %s %s "%s %d %s"' - ключом служит последний сегмент URL (getUpdates, sendMessage)
+        if isinstance(record.args, tuple) and len(record.args) >= 2:
+            return record.name, str(record.args[1]).split("?")[0].rstrip("/").rsplit("/", 1)[-1]
+        return record.name, str(record.msg)
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not record.name.startswith(self.names):
+            return True
+        key = self._key(record)
+        now = time.monotonic()
+        with self._lock:
+            started, passed, dropped = self._windows.get(key, (now, 0, 0))
+            if now - started >= 60:
+                started, passed = now, 0
+            if passed >= self.per_minute:
+                self._windows[key] = (started, passed, dropped + 1)
+                return False
+            self._windows[key] = (started, passed + 1, 0)
+        if dropped:
+            record.msg = f"{record.msg} (пропущено похожих строк: {dropped})"
+        return True
+
+
+class ForwardHandler(logging.Handler):
+    """
+    Передает записи процесса-исполнителя боту (supervisor.py) словарями: файлы логов
+    пишет только бот, и ротация не идет из нескольких процессов над одним файлом.
+    """
+
+    def __init__(self, forward):
+        super().__init__()
+        self.forward = forward
+
+    def emit(self, record):
+        try:
+            exc_text = None
+            if record.exc_info:
+                exc_text = logging.Formatter().formatException(record.exc_info)
+            self.forward({
+                "name": record.name,
+                "levelno": record.levelno,
+                "levelname": record.levelname,
+                "msg": record.getMessage(),
+                "created": record.created,
+                "msecs": record.msecs,
+                "process": record.process,
+                "processName": record.processName,
+                "thread": record.thread,
+                "threadName": record.threadName,
+                "exc_text": exc_text or record.exc_text,
+            })
+        except Exception:
+            self.handleError(record)
+
+
+def handle_forwarded(data):
+    """Выводит запись, полученную от процесса-исполнителя, обработчиками этого процесса."""
+    record = logging.makeLogRecord(data)
+    logging.getLogger(record.name).handle(record)
+
+
+def _file_handler(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if LOG_ROTATION == "time":
+        return TimedRotatingFileHandler(path, when="midnight", backupCount=LOG_BACKUP_COUNT, encoding="utf-8")
+    return RotatingFileHandler(path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8")
+
+
+def setup_logging(main_file=None, components_dir=LOGS_DIR, level=LOG_LEVEL, json_format=None, forward=None):
+    """
+    Настраивает логирование процесса один раз.
+
+    Записи кладутся в очередь (QueueHandler) и пишутся в консоль и файлы отдельным
+    потоком (QueueListener), поэтому event loop бота не ждет диска. Файлы ротируются
+    по размеру или по времени; строки httpx прореживаются.
+
+    Args:
+        main_file (str): Общий файл лога всех компонентов; None - только консоль и файлы компонентов
+        components_dir (str): Папка для файлов компонентов (COMPONENT_LOGS)
+        level (str): Уровень логирования
+        json_format (bool): Писать JSON; по умолчанию из LOG_FORMAT
+        forward: Функция forward(dict), которой передаются записи вместо консоли и
+            файлов (процесс-исполнитель отправляет их боту, см. handle_forwarded)
+    """
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+        json_format = LOG_FORMAT == "json" if json_format is None else json_format
+        formatter = JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+
+        if forward is not None:
+            # Консоль и файлы ведет процесс, получающий записи
+            handlers = [ForwardHandler(forward)]
+        else:
+            handlers = [logging.StreamHandler(sys.stderr)]
+            try:
+                if main_file:
+                    handlers.append(_file_handler(main_file))
+                for file_name, names in COMPONENT_LOGS.items():
+                    handler = _file_handler(os.path.join(components_dir, file_name))
+                    handler.addFilter(ComponentFilter(names))
+                    handlers.append(handler)
+            except OSError as e:
+                sys.stderr.write(f"Не удалось открыть файл лога: {str(e)}\n")
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        records = queue.SimpleQueue()
+        queue_handler = QueueHandler(records)
+        queue_handler.addFilter(RateLimitFilter())
+
+        root = logging.getLogger()
+        # Обработчики, добавленные неявно (logging.warning до настройки), заменяются очередью
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        root.setLevel(level)
+
+        _listener = QueueListener(records, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Дописывает оставшиеся записи и останавливает поток логирования."""
+    global _listener
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
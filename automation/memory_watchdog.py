@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+# Загружаем переменные окружения
+load_dotenv()
+MAX_DRIVER_MEMORY_MB = int(os.getenv("MAX_DRIVER_MEMORY_MB", "1500"))  # Лимит памяти дерева процессов Chrome
+MAX_DRIVER_SESSIONS = int(os.getenv("MAX_DRIVER_SESSIONS", "1"))  # Сколько сессий (проверок) обслуживает один драйвер
+MEMORY_SAMPLE_INTERVAL = int(os.getenv("MEMORY_SAMPLE_INTERVAL", "15"))  # Интервал фонового замера в секундах
+MEMORY_CURVE_LENGTH = 240  # Сколько последних замеров хранится для каждой сессии
+
+# psutil необязателен: без него читаем /proc напрямую (только Linux)
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def get_driver_pid(driver):
+    """
+    Возвращает PID процесса chromedriver, от которого растет дерево процессов Chrome.
+
+    Args:
+        driver: Экземпляр Selenium WebDriver (в том числе undetected_chromedriver)
+
+    Returns:
+        int: PID или None, если его не удалось определить
+    """
+    try:
+        return driver.service.process.pid
+    except Exception:
+        pass
+    # undetected_chromedriver хранит PID браузера отдельно
+    return getattr(driver, "browser_pid", None)
+
+
+def _proc_children_map():
+    """Строит словарь ppid -> [pid] по содержимому /proc."""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "rb") as f:
+                stat = f.read()
+            # Имя процесса может содержать пробелы, поэтому разбираем после ')'
+            ppid = int(stat[stat.rfind(b")") + 2:].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    return children
+
+
+def _proc_rss(pid):
+    """Возвращает RSS процесса в байтах по /proc/<pid>/statm."""
+    try:
+        with open(f"/proc/{pid}/statm", "rb") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def get_process_tree_pids(pid):
+    """
+    Возвращает PID процесса и всех его потомков.
+
+    Args:
+        pid (int): Корневой PID
+
+    Returns:
+        list: PID дерева процессов, корень первым
+    """
+    if PSUTIL_AVAILABLE:
+        try:
+            root = psutil.Process(pid)
+            return [pid] + [child.pid for child in root.children(recursive=True)]
+        except psutil.Error:
+            return [pid]
+
+    if not os.path.isdir("/proc"):
+        return [pid]
+
+    children = _proc_children_map()
+    pids = []
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        pids.append(current)
+        stack.extend(children.get(current, []))
+    return pids
+
+
+def get_process_tree_rss(pid):
+    """
+    Считает суммарный RSS процесса и всех его потомков.
+
+    Args:
+        pid (int): Корневой PID (обычно chromedriver)
+
+    Returns:
+        tuple: (int, int) - (RSS в байтах, количество процессов в дереве)
+    """
+    if PSUTIL_AVAILABLE:
+        try:
+            root = psutil.Process(pid)
+            processes = [root] + root.children(recursive=True)
+        except psutil.Error:
+            return 0, 0
+        total = 0
+        for process in processes:
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                continue
+        return total, len(processes)
+
+    if not os.path.isdir("/proc"):
+        return 0, 0
+
+    children = _proc_children_map()
+    total = 0
+    count = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        rss = _proc_rss(current)
+        if rss or current == pid:
+            total += rss
+            count += 1
+        stack.extend(children.get(current, []))
+    return total, count
+
+
+class DriverSession:
+    """Учет одного драйвера: количество сессий и кривая потребления памяти."""
+
+    def __init__(self, session_id, driver):
+        self.session_id = session_id
+        self.driver = driver
+        self.pid = get_driver_pid(driver)
+        self.created_at = time.time()
+        self.sessions_served = 0
+        self.peak_rss = 0
+        self.curve = deque(maxlen=MEMORY_CURVE_LENGTH)
+        self.recycle_reason = None
+
+    @property
+    def last_rss(self):
+        return self.curve[-1][1] if self.curve else 0
+
+    def sample(self):
+        """Выполняет замер RSS дерева процессов и добавляет точку в кривую."""
+        if not self.pid:
+            return 0
+        rss, _ = get_process_tree_rss(self.pid)
+        self.curve.append((time.time(), rss))
+        self.peak_rss = max(self.peak_rss, rss)
+        return rss
+
+
+class MemoryWatchdog:
+    """
+    Следит за памятью драйверов Chrome и решает, когда драйвер пора пересоздать.
+
+    Драйвер помечается на пересоздание, если RSS его дерева процессов превысил
+    MAX_DRIVER_MEMORY_MB или он обслужил MAX_DRIVER_SESSIONS сессий.
+    """
+
+    def __init__(self, max_memory_mb=MAX_DRIVER_MEMORY_MB, max_sessions=MAX_DRIVER_SESSIONS,
+                 sample_interval=MEMORY_SAMPLE_INTERVAL):
+        self.max_memory_bytes = max_memory_mb * 1024 * 1024
+        self.max_sessions = max_sessions
+        self.sample_interval = sample_interval
+        self._sessions = {}
+        self._finished = deque(maxlen=20)
+        self._lock = threading.Lock()
+        self._counter = 0
+        self._thread = None
+        self._stop = threading.Event()
+
+    def register(self, driver):
+        """Берет драйвер под наблюдение и возвращает его DriverSession."""
+        with self._lock:
+            self._counter += 1
+            session = DriverSession(f"driver-{self._counter}", driver)
+            self._sessions[id(driver)] = session
+        session.sample()
+        logger.info(f"Драйвер {session.session_id} (PID {session.pid}) взят под наблюдение")
+        return session
+
+    def unregister(self, driver):
+        """Снимает драйвер с наблюдения, сохраняя его кривую в истории."""
+        with self._lock:
+            session = self._sessions.pop(id(driver), None)
+            if session:
+                session.driver = None
+                self._finished.append(session)
+        return session
+
+    def get_session(self, driver):
+        with self._lock:
+            return self._sessions.get(id(driver))
+
+    def check(self, driver):
+        """
+        Делает замер и проверяет лимиты для драйвера.
+
+        Returns:
+            str: Причина пересоздания или None, если драйвер в пределах лимитов
+        """
+        session = self.get_session(driver)
+        if session is None:
+            return None
+        rss = session.sample()
+        if session.recycle_reason:
+            return session.recycle_reason
+        if self.max_memory_bytes and rss > self.max_memory_bytes:
+            session.recycle_reason = f"память {rss // (1024 * 1024)} МБ превышает лимит {self.max_memory_bytes // (1024 * 1024)} МБ"
+        elif self.max_sessions and session.sessions_served >= self.max_sessions:
+            session.recycle_reason = f"обслужено сессий: {session.sessions_served} из {self.max_sessions}"
+        return session.recycle_reason
+
+    def sample_all(self):
+        """Делает замер для всех драйверов под наблюдением."""
+        with self._lock:
+            sessions = list(self._sessions.values())
+        for session in sessions:
+            try:
+                rss = session.sample()
+                if self.max_memory_bytes and rss > self.max_memory_bytes and not session.recycle_reason:
+                    session.recycle_reason = f"память {rss // (1024 * 1024)} МБ превышает лимит"
+                    logger.warning(f"Драйвер {session.session_id} превысил лимит памяти: {rss // (1024 * 1024)} МБ")
+            except Exception as e:
+                logger.warning(f"Ошибка при замере памяти драйвера {session.session_id}: {str(e)}")
+
+    def start(self):
+        """Запускает фоновый поток периодических замеров."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="memory-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.sample_interval):
+            self.sample_all()
+
+    def get_memory_curves(self):
+        """
+        Возвращает кривые памяти по сессиям.
+
+        Returns:
+            dict: session_id -> список (timestamp, rss_bytes)
+        """
+        with self._lock:
+            sessions = list(self._finished) + list(self._sessions.values())
+        return {session.session_id: list(session.curve) for session in sessions}
+
+    def format_report(self):
+        """Формирует текстовый отчет о памяти драйверов для логов и Telegram."""
+        with self._lock:
+            active = list(self._sessions.values())
+            finished = list(self._finished)
+        if not active and not finished:
+            return "Нет данных о памяти браузеров"
+
+        lines = [f"Лимит: {self.max_memory_bytes // (1024 * 1024)} МБ, сессий на драйвер: {self.max_sessions}"]
+        for title, sessions in (("Активные", active), ("Завершенные", finished[-5:])):
+            if not sessions:
+                continue
+            lines.append(f"{title}:")
+            for session in sessions:
+                points = [rss // (1024 * 1024) for _, rss in list(session.curve)[-8:]]
+                curve = " → ".join(str(p) for p in points) or "-"
+                lines.append(
+                    f"• {session.session_id}: сейчас {session.last_rss // (1024 * 1024)} МБ, "
+                    f"пик {session.peak_rss // (1024 * 1024)} МБ, сессий {session.sessions_served}, "
+                    f"кривая (МБ): {curve}"
+                )
+        return "\n".join(lines)
+
+
+class DriverRecycler:
+    """
+    Выдает драйвер для очередной проверки и пересоздает его по решению MemoryWatchdog.
+
+    При MAX_DRIVER_SESSIONS=1 каждая проверка получает новый драйвер, как и раньше.
+    Новый драйвер берется из запаса заранее запущенных (spares), если он есть.
+    """
+
+    # Драйвер один на все задания: пока его держит одно задание, остальные ждут
+    exclusive = True
+
+    def __init__(self, driver_factory, watchdog=None, reset_page=None, spares=None):
+        self.driver_factory = driver_factory
+        self.reset_page = reset_page
+        self.spares = spares
+        self.watchdog = watchdog or MemoryWatchdog()
+        self._driver = None
+        self._lock = threading.Lock()
+        # Драйвер выдается одному заданию за раз, остальные ждут его освобождения
+        self._in_use = threading.Lock()
+
+    def acquire(self):
+        """
+        Возвращает готовый драйвер: переиспользует текущий или создает новый.
+
+        Returns:
+            webdriver.Chrome: Драйвер или None, если создать его не удалось
+        """
+        self._in_use.acquire()
+        try:
+            with self._lock:
+                if self._driver is not None:
+                    reason = self.watchdog.check(self._driver)
+                    if reason:
+                        self._recycle(reason)
+                if self._driver is None:
+                    driver = self.spares.take() if self.spares else None
+                    if driver is None:
+                        driver = self.driver_factory()
+                    if driver is None:
+                        self._in_use.release()
+                        return None
+                    self._driver = driver
+                    self.watchdog.register(driver)
+                session = self.watchdog.get_session(self._driver)
+                if session:
+                    session.sessions_served += 1
+                return self._driver
+        except BaseException:
+            # Без освобождения следующий acquire() ждал бы вечно: release() для этого вызова не будет
+            self._in_use.release()
+            raise
+
+    def release(self, driver, broken=False):
+        """
+        Возвращает драйвер после проверки.
+
+        Args:
+            driver: Драйвер, полученный через acquire()
+            broken (bool): True, если сессия завершилась ошибкой и драйвер нельзя переиспользовать
+        """
+        try:
+            with self._lock:
+                if driver is not self._driver:
+                    self._quit(driver)
+                    return
+                reason = "ошибка в сессии" if broken else self.watchdog.check(driver)
+                if not reason and self.reset_page:
+                    try:
+                        # Возвращаем браузер на нейтральную страницу перед следующей сессией
+                        self.reset_page(driver)
+                    except Exception as e:
+                        reason = f"не удалось сбросить страницу: {str(e)}"
+                if reason:
+                    self._recycle(reason)
+        finally:
+            if self._in_use.locked():
+                self._in_use.release()
+
+    def shutdown(self):
+        """Закрывает текущий и запасные драйверы и останавливает наблюдение."""
+        with self._lock:
+            if self._driver is not None:
+                self._recycle("остановка")
+        if self.spares:
+            self.spares.shutdown()
+        self.watchdog.stop()
+
+    def _recycle(self, reason):
+        session = self.watchdog.unregister(self._driver)
+        session_id = session.session_id if session else "?"
+        logger.info(f"Пересоздаю драйвер {session_id}: {reason}")
+        self._quit(self._driver)
+        self._driver = None
+
+    @staticmethod
+    def _quit(driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import bisect
+import logging
+import asyncio
+import functools
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+# Загружаем переменные окружения
+load_dotenv()
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))  # Порт HTTP с метриками Prometheus (0 - отключено)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")  # Адрес HTTP с метриками: по умолчанию только локально
+
+# Границы корзин гистограмм длительностей, секунды
+BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+METRIC_HELP = {
+    "visa_stage_duration_seconds": ("histogram", "Длительность этапов сценария браузера"),
+    "visa_stage_total": ("counter", "Завершенные этапы сценария браузера по исходу"),
+    "visa_stage_in_flight": ("gauge", "Выполняющиеся этапы сценария браузера"),
+    "visa_handler_duration_seconds": ("histogram", "Длительность обработчиков Telegram"),
+    "visa_handler_total": ("counter", "Вызовы обработчиков Telegram по исходу"),
+    "visa_handler_in_flight": ("gauge", "Выполняющиеся обработчики Telegram"),
+}
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Registry:
+    """
+    Хранилище метрик процесса: счетчики, датчики и гистограммы с метками.
+
+    Процессы-исполнители (supervisor.py) после каждого задания отдают боту
+    накопленные счетчики и гистограммы (drain), бот добавляет их к своим (merge),
+    поэтому HTTP и /stats показывают сумму по всем процессам.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, labels, value=1):
+        with self._lock:
+            key = _key(name, labels)
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def gauge_add(self, name, labels, delta):
+        with self._lock:
+            key = _key(name, labels)
+            self._gauges[key] = self._gauges.get(key, 0) + delta
+
+    def observe(self, name, labels, value):
+        with self._lock:
+            key = _key(name, labels)
+            histogram = self._histograms.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0, 0])
+            histogram[0][bisect.bisect_left(self.buckets, value)] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def drain(self):
+        """
+        Забирает накопленные счетчики и гистограммы (без датчиков) и обнуляет их.
+
+        Returns:
+            dict: JSON-совместимый снимок для merge()
+        """
+        with self._lock:
+            data = {
+                "counters": [[name, dict(labels), value] for (name, labels), value in self._counters.items()],
+                "histograms": [[name, dict(labels), counts, total, count]
+                               for (name, labels), (counts, total, count) in self._histograms.items()],
+            }
+            self._counters = {}
+            self._histograms = {}
+        return data
+
+    def merge(self, data):
+        """Добавляет снимок drain() другого процесса."""
+        if not data:
+            return
+        with self._lock:
+            for name, labels, value in data.get("counters", []):
+                key = _key(name, labels)
+                self._counters[key] = self._counters.get(key, 0) + value
+            for name, labels, counts, total, count in data.get("histograms", []):
+                key = _key(name, labels)
+                histogram = self._histograms.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0, 0])
+                histogram[0] = [a + b for a, b in zip(histogram[0], counts)]
+                histogram[1] += total
+                histogram[2] += count
+
+    def quantile(self, name, labels, q):
+        """Оценка квантиля гистограммы по верхним границам корзин (как histogram_quantile)."""
+        with self._lock:
+            histogram = self._histograms.get(_key(name, labels))
+        if not histogram or not histogram[2]:
+            return None
+        counts, _, count = histogram
+        rank = q * count
+        passed = 0
+        for index, bucket_count in enumerate(counts):
+            passed += bucket_count
+            if passed >= rank:
+                return self.buckets[index] if index < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def render(self):
+        """Метрики в текстовом формате Prometheus."""
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = {key: (list(counts), total, count) for key, (counts, total, count) in self._histograms.items()}
+
+        lines = []
+        for metric, (kind, help_text) in METRIC_HELP.items():
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            if kind == "histogram":
+                for (name, labels), (counts, total, count) in sorted(histograms.items()):
+                    if name != metric:
+                        continue
+                    cumulative = 0
+                    for bound, bucket_count in zip(list(self.buckets) + ["+Inf"], counts):
+                        cumulative += bucket_count
+                        lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {total:.6f}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {count}")
+            else:
+                values = counters if kind == "counter" else gauges
+                for (name, labels), value in sorted(values.items()):
+                    if name == metric:
+                        lines.append(f"{name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def stage_summary(self, prefix="visa_stage"):
+        """
+        Сводка по этапам или обработчикам для /stats.
+
+        Returns:
+            list: [(имя, {исход: число}, p50, p95, среднее, выполняется)] по убыванию суммарного времени
+        """
+        label = "stage" if prefix == "visa_stage" else "handler"
+        with self._lock:
+            durations = {dict(labels)[label]: (total, count) for (name, labels), (_, total, count)
+                         in self._histograms.items() if name == f"{prefix}_duration_seconds"}
+            outcomes = {}
+            for (name, labels), value in self._counters.items():
+                if name == f"{prefix}_total":
+                    labels = dict(labels)
+                    outcomes.setdefault(labels[label], {})[labels["outcome"]] = value
+            in_flight = {dict(labels)[label]: value for (name, labels), value in self._gauges.items()
+                         if name == f"{prefix}_in_flight"}
+
+        rows = []
+        for item, (total, count) in sorted(durations.items(), key=lambda entry: -entry[1][0]):
+            labels = {label: item}
+            rows.append((item, outcomes.get(item, {}),
+                         self.quantile(f"{prefix}_duration_seconds", labels, 0.5),
+                         self.quantile(f"{prefix}_duration_seconds", labels, 0.95),
+                         total / count if count else 0.0, in_flight.get(item, 0)))
+        return rows
+
+
+registry = Registry()
+
+
+def outcome_of(result):
+    """Исход этапа по возвращаемому значению: False, None или (False, ...) - неудача."""
+    if isinstance(result, tuple) and result:
+        result = result[0]
+    return "ok" if result is not None and result is not False else "fail"
+
+
+def record_stage(stage, seconds, outcome):
+    """Учитывает этап, замеренный снаружи (например, тайминги асинхронной проверки)."""
+    registry.observe("visa_stage_duration_seconds", {"stage": stage}, seconds)
+    registry.inc("visa_stage_total", {"stage": stage, "outcome": outcome})
+
+
+def timed_stage(stage):
+    """
+    Декоратор этапа сценария браузера: гистограмма длительности, счетчик исходов,
+    датчик выполняющихся этапов и строка в логе.
+
+    Args:
+        stage (str): Имя этапа (метка stage)
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            labels = {"stage": stage}
+            registry.gauge_add("visa_stage_in_flight", labels, 1)
+            started = time.monotonic()
+            outcome = "error"
+            try:
+                result = func(*args, **kwargs)
+                outcome = outcome_of(result)
+                return result
+            finally:
+                seconds = time.monotonic() - started
+                registry.gauge_add("visa_stage_in_flight", labels, -1)
+                record_stage(stage, seconds, outcome)
+                logger.info(f"Этап {stage}: {seconds:.2f} с ({outcome})")
+        return wrapper
+    return decorator
+
+
+def timed_handler(func):
+    """Декоратор асинхронного обработчика Telegram: длительность, исходы и выполняющиеся вызовы."""
+    labels = {"handler": func.__name__}
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        registry.gauge_add("visa_handler_in_flight", labels, 1)
+        started = time.monotonic()
+        outcome = "error"
+        try:
+            result = await func(*args, **kwargs)
+            outcome = "ok"
+            return result
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            registry.gauge_add("visa_handler_in_flight", labels, -1)
+            registry.observe("visa_handler_duration_seconds", labels, time.monotonic() - started)
+            registry.inc("visa_handler_total", {"handler": func.__name__, "outcome": outcome})
+    return wrapper
+
+
+def format_stats():
+    """Текстовая сводка метрик для команды /stats."""
+    sections = []
+    for title, prefix in (("Этапы браузера", "visa_stage"), ("Обработчики Telegram", "visa_handler")):
+        rows = registry.stage_summary(prefix)
+        if not rows:
+            continue
+        lines = [f"{title}:"]
+        for name, outcomes, p50, p95, mean, in_flight in rows:
+            counts = ", ".join(f"{outcome} {value:g}" for outcome, value in sorted(outcomes.items()))
+            running = f", выполняется {in_flight:g}" if in_flight else ""
+            lines.append(f"• {name}: {counts}; среднее {mean:.1f} с, p50 ≤{p50:g} с, p95 ≤{p95:g} с{running}")
+        sections.append("\n".join(lines))
+    return "\n\n".join(sections) or "Метрик пока нет"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Запросы скрейпера не засоряют лог бота
+        pass
+
+
+def start_http_server(port=METRICS_PORT, host=METRICS_HOST):
+    """
+    Запускает HTTP с метриками в фоновом потоке.
+
+    Returns:
+        ThreadingHTTPServer: Сервер или None, если порт 0 или занят
+    """
+    if not port:
+        return None
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logger.warning(f"Не удалось запустить HTTP с метриками на {host}:{port}: {str(e)}")
+        return None
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info(f"Метрики Prometheus: http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import re
+import datetime
+from html.parser import HTMLParser
+
+# lxml необязателен: без него страница разбирается html.parser из стандартной библиотеки
+try:
+    import lxml.etree
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+# Разбор сохраненного HTML страницы (driver.page_source или файл) без драйвера.
+# Условия повторяют локаторы сценариев (locators.py, browser.py, date_selector.py):
+# сценарий снимает страницу один раз и решает по результату разбора, а драйвер
+# нужен только для кликов. Содержимое <script> и <style> вырезается до разбора, а каждое
+# условие сначала ищется в тексте страницы подстрокой (класс, фраза): дерево строится,
+# только если хотя бы одно условие может совпасть.
+
+PARSER_BACKEND = "lxml" if LXML_AVAILABLE else "html.parser"
+
+VOID_TAGS = frozenset(("area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta",
+                       "param", "source", "track", "wbr"))
+SKIPPED_TAGS = ("script", "style")
+
+DIGIT = re.compile(r"\d")
+XML_DECLARATION = re.compile(r"^\s*<\?xml[^>]*\?>")
+
+
+class Selector:
+    """
+    Условие на элемент страницы.
+
+    Args:
+        tags (tuple): Имя тега - одно из (пусто - любой)
+        classes (tuple): Есть хотя бы один из классов
+        not_classes (tuple): Нет ни одного из классов
+        class_parts (tuple): Атрибут class содержит одну из подстрок ([class*=...])
+        not_class_parts (tuple): Атрибут class не содержит ни одной из подстрок
+        text (tuple): Собственный текстовый узел содержит одну из фраз (contains(text(), ...))
+        text_all (tuple): Собственный текстовый узел содержит все фразы
+    """
+
+    def __init__(self, tags=(), classes=(), not_classes=(), class_parts=(), not_class_parts=(), text=(), text_all=()):
+        self.tags = tags
+        self.classes = classes
+        self.not_classes = not_classes
+        self.class_parts = class_parts
+        self.not_class_parts = not_class_parts
+        self.text = text
+        self.text_all = text_all
+
+    def possible(self, html):
+        """Может ли условие совпасть на странице: нужные тег, классы и фразы встречаются в тексте."""
+        if self.tags and not any(f"<{tag}" in html for tag in self.tags):
+            return False
+        for needles in (self.classes, self.class_parts, self.text):
+            if needles and not any(needle in html for needle in needles):
+                return False
+        return all(phrase in html for phrase in self.text_all)
+
+    def matches(self, tag, class_attr, own_text):
+        if self.tags and tag not in self.tags:
+            return False
+        if self.classes or self.not_classes:
+            tokens = class_attr.split()
+            if self.classes and not any(name in tokens for name in self.classes):
+                return False
+            if any(name in tokens for name in self.not_classes):
+                return False
+        if self.class_parts and not any(part in class_attr for part in self.class_parts):
+            return False
+        if any(part in class_attr for part in self.not_class_parts):
+            return False
+        if self.text and not any(phrase in chunk for chunk in own_text for phrase in self.text):
+            return False
+        if self.text_all and not any(all(phrase in chunk for phrase in self.text_all) for chunk in own_text):
+            return False
+        return True
+
+    @property
+    def by_class(self):
+        return bool(self.classes or self.not_classes or self.class_parts or self.not_class_parts)
+
+    def xpath(self):
+        """То же условие в XPath 1.0 (для lxml) для условий без классов: тег и текст."""
+        conditions = []
+        if len(self.tags) > 1:
+            conditions.append(" or ".join(f"self::{tag}" for tag in self.tags))
+        if self.text:
+            conditions.append("text()[" + " or ".join(f"contains(., '{phrase}')" for phrase in self.text) + "]")
+        if self.text_all:
+            conditions.append("text()[" + " and ".join(f"contains(., '{phrase}')" for phrase in self.text_all) + "]")
+        node = self.tags[0] if len(self.tags) == 1 else "*"
+        return f"descendant::{node}" + "".join(f"[{condition}]" for condition in conditions)
+
+
+# Сообщение об отсутствии слотов (locators.NO_SLOTS_MESSAGE)
+NO_SLOTS_PHRASES = ("нет доступных слотов", "Приносим извинения", "Места для регистрации")
+NO_SLOTS = (Selector(tags=("div",), text=NO_SLOTS_PHRASES),)
+
+# Календарь, доступные ячейки, число в ячейке и подпись месяца (locators.CALENDAR*)
+CALENDAR = (Selector(classes=("mat-calendar-body", "calendar-container", "date-selection")),
+            Selector(tags=("mat-calendar",)))
+AVAILABLE_CELLS = (Selector(classes=("mat-calendar-body-cell",), not_classes=("mat-calendar-body-disabled",)),
+                   Selector(classes=("date-available",)),
+                   Selector(tags=("td",), classes=("selectable",), not_classes=("disabled",)))
+CELL_CONTENT = (Selector(classes=("mat-calendar-body-cell-content", "date-text")),)
+CALENDAR_PERIOD = (Selector(classes=("mat-calendar-period-button", "current-month")),)
+# Запасной вариант для других версий интерфейса: любые элементы с "date" в классе и числом в тексте
+LOOSE_DATES = (Selector(class_parts=("date", "calendar-cell"), not_class_parts=("disabled",)),)
+MAX_DATE_LABEL = 30  # Длиннее - это контейнер с несколькими датами, а не подпись даты
+
+# Меню выбора времени и свободные слоты (date_selector.select_available_date)
+TIME_MENU = (Selector(classes=("time-slot", "time-selection")), Selector(class_parts=("time-slot",)))
+TIME_SLOTS = (Selector(classes=("time-slot",), not_classes=("disabled",)),
+              Selector(class_parts=("time-slot",), not_class_parts=("disabled",)),
+              Selector(tags=("button",), class_parts=("time",)))
+
+# Страница подтверждения брони (date_selector.complete_booking): группы проверяются по порядку
+CONFIRMATION_MARKERS = (
+    (Selector(tags=("h1",), text=("Подтверждение",)),),
+    (Selector(tags=("div",), text=("Ваше бронирование",)),),
+    (Selector(tags=("div",), text=("Записи на прием",)),),
+    (Selector(tags=("button",), text=("Завершить", "Подтвердить бронирование")),),
+)
+CONTINUE_BUTTONS = (Selector(tags=("button",), text=("Продолжить", "Далее", "Подтвердить")),)
+FINAL_BUTTONS = (Selector(tags=("button",), text=("Завершить", "Подтвердить бронирование", "Финализировать")),)
+SUCCESS_MARKERS = (
+    (Selector(tags=("div",), text=("успешно забронирован", "Ваша запись подтверждена")),),
+    (Selector(tags=("div",), text_all=("Спасибо", "бронирование")),),
+    (Selector(tags=("h1",), text=("Подтверждение",)),),
+)
+# Подстроки class и теги условий календаря и времени: lxml выбирает такие элементы одним проходом по дереву
+CANDIDATE_SELECTORS = [selector
+                       for selectors in (CALENDAR, AVAILABLE_CELLS, CELL_CONTENT, CALENDAR_PERIOD, LOOSE_DATES,
+                                         TIME_MENU, TIME_SLOTS)
+                       for selector in selectors]
+CLASS_NEEDLES = tuple(sorted({needle for selector in CANDIDATE_SELECTORS
+                              for needle in selector.classes + selector.class_parts}))
+CANDIDATE_TAGS = frozenset(tag for selector in CANDIDATE_SELECTORS
+                           if not (selector.classes or selector.class_parts) for tag in selector.tags)
+
+
+def _normalize(text):
+    return " ".join(text.split())
+
+
+def _is_candidate(tag, class_attr):
+    return tag in CANDIDATE_TAGS or (bool(class_attr) and any(needle in class_attr for needle in CLASS_NEEDLES))
+
+
+def _candidates_only(selectors):
+    """Все ли условия совпадают только с элементами из прохода CLASS_NEEDLES/CANDIDATE_TAGS."""
+    return all(selector.classes or selector.class_parts or (selector.tags and CANDIDATE_TAGS.issuperset(selector.tags))
+               for selector in selectors)
+
+
+def _strip_skipped(html):
+    """Вырезает содержимое <script> и <style>: в нем встречаются имена классов и фразы, но не элементы."""
+    parts = []
+    position = 0
+    # Теги в page_source браузера строчные, поэтому достаточно поиска подстроки
+    while True:
+        starts = [index for index in (html.find(f"<{tag}", position) for tag in SKIPPED_TAGS) if index >= 0]
+        if not starts:
+            break
+        start = min(starts)
+        tag = "script" if html.startswith("<script", start) else "style"
+        end = html.find(f"</{tag}", start)
+        if end < 0:
+            break
+        opened = html.find(">", start)
+        parts.append(html[position:opened + 1])
+        position = end
+    if not parts:
+        return html
+    parts.append(html[position:])
+    return "".join(parts)
+
+
+class _Collector(HTMLParser):
+    """
+    Плоский список элементов для разбора без lxml.
+
+    Элемент - список [тег, class, собственные текстовые узлы, первый текстовый
+    фрагмент, конец текста, индекс последнего потомка]; потомки элемента идут
+    в списке сразу за ним.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.elements = []
+        self.chunks = []
+        self._stack = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        class_attr = ""
+        for name, value in attrs:
+            if name == "class":
+                class_attr = value or ""
+                break
+        element = [tag, class_attr, [], len(self.chunks), None, len(self.elements)]
+        self.elements.append(element)
+        if tag in VOID_TAGS:
+            element[4] = element[3]
+            return
+        self._stack.append(element)
+        if tag in SKIPPED_TAGS:
+            self._skip += 1
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        # Незакрытые элементы внутри закрываются вместе с ним
+        for index in range(len(self._stack) - 1, -1, -1):
+            if self._stack[index][0] == tag:
+                for element in self._stack[index:]:
+                    self._close(element)
+                del self._stack[index:]
+                return
+
+    def handle_data(self, data):
+        if self._skip:
+            return
+        self.chunks.append(data)
+        if self._stack:
+            self._stack[-1][2].append(data)
+
+    def _close(self, element):
+        element[4] = len(self.chunks)
+        element[5] = len(self.elements) - 1
+        if element[0] in SKIPPED_TAGS:
+            self._skip -= 1
+
+    def finish(self):
+        self.close()
+        for element in self._stack:
+            self._close(element)
+        self._stack = []
+
+
+class _StdlibTree:
+    def __init__(self, html):
+        collector = _Collector()
+        collector.feed(html)
+        collector.finish()
+        self.elements = collector.elements
+        self.chunks = collector.chunks
+        self.candidates = [index for index, element in enumerate(self.elements) if _is_candidate(element[0], element[1])]
+        self.by_tag = {}
+        for index, element in enumerate(self.elements):
+            self.by_tag.setdefault(element[0], []).append(index)
+
+    def find(self, selectors, within=None):
+        if within is not None:
+            indices = range(within + 1, self.elements[within][5] + 1)
+        elif _candidates_only(selectors):
+            indices = self.candidates
+        elif all(selector.tags for selector in selectors):
+            indices = sorted(index for tag in {tag for selector in selectors for tag in selector.tags}
+                             for index in self.by_tag.get(tag, ()))
+        else:
+            indices = range(len(self.elements))
+        return [index for index in indices
+                if any(selector.matches(self.elements[index][0], self.elements[index][1], self.elements[index][2])
+                       for selector in selectors)]
+
+    def text(self, index):
+        element = self.elements[index]
+        return _normalize("".join(self.chunks[element[3]:element[4]]))
+
+
+class _LxmlTree:
+    # Условия на тег и текст проверяет XPath. Условия на class в XPath (contains(@class, ...))
+    # стоят миллисекунды на каждый проход большого дерева, поэтому элементы с нужными
+    # классами выбираются одним проходом, а условия проверяются на них в Python
+    _parser = None
+    _compiled = {}
+
+    def __init__(self, html):
+        if _LxmlTree._parser is None:
+            _LxmlTree._parser = lxml.etree.HTMLParser()
+        try:
+            self.root = lxml.etree.fromstring(XML_DECLARATION.sub("", html), _LxmlTree._parser) if html.strip() else None
+        except (lxml.etree.ParserError, lxml.etree.XMLSyntaxError, ValueError):
+            self.root = None
+        self._candidates = None
+
+    @property
+    def candidates(self):
+        if self._candidates is None:
+            self._candidates = []
+            for element in self.root.iterdescendants(lxml.etree.Element):
+                if _is_candidate(element.tag, element.get("class")):
+                    self._candidates.append(element)
+        return self._candidates
+
+    def find(self, selectors, within=None):
+        if self.root is None:
+            return []
+        if not any(selector.by_class for selector in selectors):
+            xpath = self._compiled.get(selectors)
+            if xpath is None:
+                xpath = self._compiled[selectors] = lxml.etree.XPath(" | ".join(selector.xpath() for selector in selectors))
+            return xpath(self.root if within is None else within)
+        if within is not None:
+            elements = within.iterdescendants(lxml.etree.Element)
+        elif _candidates_only(selectors):
+            elements = self.candidates
+        else:
+            elements = self.root.iterdescendants(lxml.etree.Element)
+        needs_text = any(selector.text or selector.text_all for selector in selectors)
+        found = []
+        for element in elements:
+            own_text = self.own_text(element) if needs_text else ()
+            class_attr = element.get("class") or ""
+            if any(selector.matches(element.tag, class_attr, own_text) for selector in selectors):
+                found.append(element)
+        return found
+
+    @staticmethod
+    def own_text(element):
+        # Собственные текстовые узлы: текст до первого потомка и после каждого потомка
+        chunks = [element.text] if element.text else []
+        chunks.extend(child.tail for child in element if child.tail)
+        return chunks
+
+    @staticmethod
+    def text(element):
+        return _normalize(lxml.etree.tostring(element, method="text", encoding=str, with_tail=False))
+
+
+class PageSnapshot:
+    """
+    Снимок страницы для разбора: HTML строкой или байтами, дерево строится один раз и по требованию.
+
+    Args:
+        html (str|bytes): HTML страницы
+        backend (str): "lxml" или "html.parser"; по умолчанию lxml, если установлен
+    """
+
+    def __init__(self, html, backend=None):
+        html = html.decode("utf-8", errors="replace") if isinstance(html, (bytes, bytearray)) else html or ""
+        self.html = _strip_skipped(html)
+        self.backend = backend or PARSER_BACKEND
+        self._tree = None
+        self._possible = {}
+
+    @property
+    def tree(self):
+        if self._tree is None:
+            self._tree = _LxmlTree(self.html) if self.backend == "lxml" else _StdlibTree(self.html)
+        return self._tree
+
+    def find(self, selectors, within=None):
+        # Условия, чьих классов и фраз нет в тексте, не проверяются; если не осталось ни одного - дерево не нужно
+        possible = self._possible.get(selectors)
+        if possible is None:
+            possible = self._possible[selectors] = tuple(selector for selector in selectors
+                                                         if selector.possible(self.html))
+        if not possible:
+            return []
+        return self.tree.find(possible, within)
+
+    def texts(self, selectors):
+        return [self.tree.text(element) for element in self.find(selectors)]
+
+    def first_text(self, groups):
+        """Текст первого найденного элемента, группы условий проверяются по порядку."""
+        for selectors in groups:
+            found = self.find(selectors)
+            if found:
+                return self.tree.text(found[0])
+        return None
+
+
+def snapshot(html, backend=None):
+    """Снимок страницы; готовый PageSnapshot возвращается как есть."""
+    return html if isinstance(html, PageSnapshot) else PageSnapshot(html, backend)
+
+
+def is_date_label(text):
+    """Похож ли текст элемента на подпись даты (запасной способ поиска дат)."""
+    return bool(text) and len(text) <= MAX_DATE_LABEL and DIGIT.search(text) is not None
+
+
+def no_slots_message(html):
+    """
+    Сообщение об отсутствии слотов.
+
+    Returns:
+        str: Текст сообщения или None
+    """
+    return snapshot(html).first_text((NO_SLOTS,))
+
+
+def parse_calendar(html):
+    """
+    Разбирает страницу с календарем записи.
+
+    Args:
+        html (str|bytes|PageSnapshot): HTML страницы
+
+    Returns:
+        dict: no_slots (текст сообщения или None), calendar (есть ли календарь),
+              month (подпись месяца), cells (текст доступных ячеек по порядку),
+              days (число в каждой ячейке), dates ("<день> <месяц год>"),
+              labels (подписи дат запасным способом, если ячеек нет)
+    """
+    page = snapshot(html)
+    result = {"no_slots": no_slots_message(page), "calendar": False, "month": None,
+              "cells": [], "days": [], "dates": [], "labels": []}
+    if not page.find(CALENDAR):
+        return result
+    result["calendar"] = True
+
+    tree = page.tree
+    for cell in page.find(AVAILABLE_CELLS):
+        content = tree.find(CELL_CONTENT, cell)
+        result["cells"].append(tree.text(cell))
+        result["days"].append(tree.text(content[0]) if content else "")
+    result["month"] = page.first_text((CALENDAR_PERIOD,))
+    month = result["month"] or datetime.datetime.now().strftime("%B %Y")
+    result["dates"] = [f"{day} {month}" for day in result["days"] if day]
+    if not result["dates"]:
+        result["labels"] = [text for text in page.texts(LOOSE_DATES) if is_date_label(text)]
+    return result
+
+
+def parse_time_slots(html):
+    """
+    Разбирает меню выбора времени после клика по дате.
+
+    Returns:
+        dict: menu (открыто ли меню), slots (текст свободных слотов по порядку)
+    """
+    page = snapshot(html)
+    return {"menu": bool(page.find(TIME_MENU)), "slots": page.texts(TIME_SLOTS)}
+
+
+def parse_booking_page(html):
+    """
+    Разбирает страницу завершения брони.
+
+    Returns:
+        dict: confirmation (текст первого признака страницы подтверждения или None),
+              continue_buttons и final_buttons (текст кнопок по порядку),
+              success (текст сообщения об успешной брони или None)
+    """
+    page = snapshot(html)
+    return {
+        "confirmation": page.first_text(CONFIRMATION_MARKERS),
+        "continue_buttons": page.texts(CONTINUE_BUTTONS),
+        "final_buttons": page.texts(FINAL_BUTTONS),
+        "success": page.first_text(SUCCESS_MARKERS),
+    }
+
+
+def parse_page(html, backend=None):
+    """Все разборы одного снимка: календарь, время и подтверждение (ключи parse_* в одном словаре)."""
+    page = snapshot(html, backend)
+    result = parse_calendar(page)
+    slots = parse_time_slots(page)
+    result.update(time_menu=slots["menu"], time_slots=slots["slots"])
+    result.update(parse_booking_page(page))
+    return result
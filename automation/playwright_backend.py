@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+
+from backends import AsyncBrowserBackend, snapshot_paths
+
+try:
+    from playwright.async_api import async_playwright
+    from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+    PLAYWRIGHT_AVAILABLE = True
+except ImportError:
+    PLAYWRIGHT_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+
+class PlaywrightBackend(AsyncBrowserBackend):
+    """
+    Асинхронный бэкенд на Playwright (Chromium).
+
+    Реализует тот же интерфейс, что и AsyncCDPBackend, поэтому сценарий из
+    flows.py выполняется на нем без изменений.
+    """
+
+    name = "playwright"
+
+    def __init__(self, headless=False):
+        self.headless = headless
+        self._playwright = None
+        self.browser = None
+        self.context = None
+        self.page = None
+
+    async def launch(self):
+        if not PLAYWRIGHT_AVAILABLE:
+            raise ImportError("Playwright не установлен (pip install playwright && playwright install chromium)")
+
+        self._playwright = await async_playwright().start()
+        self.browser = await self._playwright.chromium.launch(
+            headless=self.headless,
+            args=[
+                "--no-sandbox",
+                "--disable-dev-shm-usage",
+                "--disable-blink-features=AutomationControlled",
+            ],
+        )
+        self.context = await self.browser.new_context(
+            viewport={"width": 1920, "height": 1080},
+            user_agent=USER_AGENT,
+        )
+        await self.context.add_init_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        self.page = await self.context.new_page()
+        return True
+
+    @staticmethod
+    def _selector(locator):
+        kind, expression = locator
+        return f"{kind}={expression}"
+
+    async def navigate(self, url):
+        await self.page.goto(url, wait_until="domcontentloaded")
+
+    async def wait_any(self, locators, timeout):
+        # Один селектор-объединение ждет любой из вариантов за одно ожидание
+        combined = self.page.locator(self._selector(locators[0]))
+        for locator in locators[1:]:
+            combined = combined.or_(self.page.locator(self._selector(locator)))
+        try:
+            await combined.first.wait_for(state="attached", timeout=timeout * 1000)
+        except PlaywrightTimeoutError:
+            return None
+        for index, locator in enumerate(locators):
+            if await self.page.locator(self._selector(locator)).count():
+                return index
+        return None
+
+    async def extract(self, locator):
+        texts = await self.page.locator(self._selector(locator)).all_inner_texts()
+        return [text.strip() for text in texts]
+
+    async def click(self, locator, timeout=5):
+        try:
+            await self.page.locator(self._selector(locator)).first.click(timeout=timeout * 1000)
+            return True
+        except PlaywrightTimeoutError:
+            return False
+
+    async def fill(self, locator, value):
+        await self.page.locator(self._selector(locator)).first.fill(value)
+
+    async def snapshot(self, name):
+        screenshot_path, source_path = snapshot_paths(self.name, name)
+        html = await self.page.content()
+        try:
+            await self.page.screenshot(path=screenshot_path)
+            with open(source_path, "w", encoding="utf-8") as f:
+                f.write(html)
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить снимок {name}: {str(e)}")
+        return html
+
+    async def current_url(self):
+        return self.page.url
+
+    async def close(self):
+        try:
+            if self.browser is not None:
+                await self.browser.close()
+        finally:
+            self.browser = None
+            if self._playwright is not None:
+                await self._playwright.stop()
+                self._playwright = None
@@ -5,9 +5,9 @@ import os
 import time
 import random
 import string
+import shutil
 import logging
 import tempfile
-import subprocess
 from pathlib import Path
 
 # Настройка логирования
@@ -16,19 +16,11 @@ os.makedirs(log_dir, exist_ok=True)
 screenshots_dir = os.path.join(log_dir, "screenshots")
 os.makedirs(screenshots_dir, exist_ok=True)
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(os.path.join(log_dir, "registration.log")),
-        logging.StreamHandler()
-    ]
-)
+# Обработчики логов настраивает log_setup.setup_logging (файл registration.log - по имени логгера)
 logger = logging.getLogger(__name__)
 
 # URL для регистрации и логина
-REGISTER_URL = "https://visa.vfsglobal.com/blr/ru/pol/register"
-LOGIN_URL = "https://visa.vfsglobal.com/blr/ru/pol/login"
+from locators import REGISTER_URL, LOGIN_URL
 
 # Загрузка учетных данных из .env
 import os
@@ -40,40 +32,60 @@ VFS_EMAIL = os.getenv("VFS_EMAIL")
 VFS_PASSWORD = os.getenv("VFS_PASSWORD")
 
 
-def cleanup_chrome():
-    """Очистка процессов Chrome и временных файлов."""
+def launch_chrome(undetected=False, profile_prefix="chrome_profile"):
+    """
+    Запускает Chrome (Selenium или undetected-chromedriver) с временным профилем.
+
+    Другие процессы Chrome не завершаются: рядом работают браузеры заданий,
+    запасные и общий Chrome, а свой браузер и профиль закрывает close_chrome.
+
+    Args:
+        undetected (bool): Использовать undetected-chromedriver
+        profile_prefix (str): Префикс временной директории профиля
+
+    Returns:
+        tuple: (драйвер, директория профиля) - закрывать через close_chrome
+    """
+    profile_dir = tempfile.mkdtemp(prefix=f"{profile_prefix}_{int(time.time())}_")
+    logger.info(f"Создана временная директория: {profile_dir}")
     try:
-        # Завершаем все процессы Chrome и chromedriver
-        logger.info("Завершаю все процессы Chrome и chromedriver...")
-        try:
-            subprocess.run(['killall', '-9', 'chrome'], stderr=subprocess.DEVNULL)
-            subprocess.run(['killall', '-9', 'chromedriver'], stderr=subprocess.DEVNULL)
-            subprocess.run(['pkill', '-9', '-f', 'chrome'], stderr=subprocess.DEVNULL)
-            subprocess.run(['pkill', '-9', '-f', 'chromedriver'], stderr=subprocess.DEVNULL)
-        except Exception as e:
-            logger.warning(f"Ошибка при завершении процессов: {str(e)}")
+        if undetected:
+            import undetected_chromedriver as uc
 
-        # Очищаем временные файлы
-        logger.info("Очищаю временные файлы Chrome...")
-        try:
-            subprocess.run(['rm', '-rf', '/tmp/chrome_*'], stderr=subprocess.DEVNULL)
-            subprocess.run(['rm', '-rf', '/tmp/.com.google.Chrome.*'], stderr=subprocess.DEVNULL)
-        except Exception as e:
-            logger.warning(f"Ошибка при очистке временных файлов: {str(e)}")
+            options = uc.ChromeOptions()
+            options.add_argument("--no-sandbox")
+            options.add_argument("--disable-dev-shm-usage")
+            driver = uc.Chrome(options=options, user_data_dir=profile_dir)
+        else:
+            from selenium import webdriver
+            from selenium.webdriver.chrome.options import Options
 
-        return True
-    except Exception as e:
-        logger.error(f"Ошибка при очистке Chrome: {str(e)}")
-        return False
+            options = Options()
+            options.add_argument("--no-sandbox")
+            options.add_argument("--disable-dev-shm-usage")
+            options.add_argument(f"--user-data-dir={profile_dir}")
+            driver = webdriver.Chrome(options=options)
+        driver.set_window_size(1920, 1080)
+        return driver, profile_dir
+    except Exception:
+        shutil.rmtree(profile_dir, ignore_errors=True)
+        raise
+
+
+def close_chrome(driver, profile_dir):
+    """Закрывает драйвер и удаляет временный профиль."""
+    try:
+        driver.quit()
+    except Exception:
+        pass
+    shutil.rmtree(profile_dir, ignore_errors=True)
+    logger.info(f"Временная директория удалена: {profile_dir}")
 
 
 def register_with_selenium(max_retries=2):
     """Регистрация аккаунта на VFS Global с использованием Selenium."""
     logger.info("Начинаю процесс регистрации с Selenium...")
     
-    # Очистка перед запуском
-    cleanup_chrome()
-    
     # Генерация случайного email и пароля
     email = f"vfsuser_{random.randint(100000, 999999)}@example.com"
     password = ''.join(random.choices(string.ascii_letters + string.digits, k=12))
@@ -84,28 +96,13 @@ def register_with_selenium(max_retries=2):
         logger.info(f"Попытка регистрации {attempt}/{max_retries}")
         
         try:
-            # Импортируем selenium здесь для обработки возможных ошибок импорта
-            from selenium import webdriver
-            from selenium.webdriver.chrome.options import Options
+            # Браузер с временным профилем, который удаляется при закрытии
             from selenium.webdriver.common.by import By
             from selenium.webdriver.support.ui import WebDriverWait
             from selenium.webdriver.support import expected_conditions as EC
-            
-            # Создаем временную директорию для пользовательских данных
-            temp_dir = tempfile.mkdtemp(prefix=f"chrome_selenium_{int(time.time())}_")
-            logger.info(f"Создана временная директория: {temp_dir}")
-            
-            # Настройка опций Chrome для этой попытки
-            options = Options()
-            options.add_argument("--no-sandbox")
-            options.add_argument("--disable-dev-shm-usage")
-            options.add_argument(f"--user-data-dir={temp_dir}")
-            # Откомментируйте для запуска в фоновом режиме
-            # options.add_argument("--headless")
-            
-            # Инициализация драйвера
-            driver = webdriver.Chrome(options=options)
-            driver.set_window_size(1920, 1080)
+            from selenium.common.exceptions import TimeoutException
+
+            driver, profile_dir = launch_chrome(undetected=False, profile_prefix="chrome_selenium")
             
             try:
                 # Открытие страницы регистрации
@@ -144,18 +141,8 @@ def register_with_selenium(max_retries=2):
                     pass
             
             finally:
-                # Закрываем драйвер и удаляем временную директорию
-                try:
-                    driver.quit()
-                except:
-                    pass
-                
-                try:
-                    import shutil
-                    shutil.rmtree(temp_dir, ignore_errors=True)
-                    logger.info(f"Временная директория удалена: {temp_dir}")
-                except:
-                    pass
+                # Закрываем драйвер и удаляем временный профиль
+                close_chrome(driver, profile_dir)
         
         except Exception as e:
             logger.error(f"Критическая ошибка при инициализации Selenium: {str(e)}")
@@ -178,9 +165,6 @@ def register_with_undetected(max_retries=2):
     """Регистрация аккаунта на VFS Global с использованием undetected-chromedriver."""
     logger.info("Начинаю процесс регистрации с undetected-chromedriver...")
     
-    # Очистка перед запуском
-    cleanup_chrome()
-    
     # Генерация случайного email и пароля
     email = f"vfsuser_{random.randint(100000, 999999)}@example.com"
     password = ''.join(random.choices(string.ascii_letters + string.digits, k=12))
@@ -191,26 +175,13 @@ def register_with_undetected(max_retries=2):
         logger.info(f"Попытка регистрации с undetected-chromedriver {attempt}/{max_retries}")
         
         try:
-            # Импортируем undetected_chromedriver здесь
-            import undetected_chromedriver as uc
-            
-            # Создаем временную директорию для этой попытки
-            temp_dir = tempfile.mkdtemp(prefix=f"chrome_undetected_{int(time.time())}_")
-            logger.info(f"Создана временная директория: {temp_dir}")
-            
-            # Важно! Создаем новый объект опций для каждой попытки
-            options = uc.ChromeOptions()
-            options.add_argument("--no-sandbox")
-            options.add_argument("--disable-dev-shm-usage")
-            # Откомментируйте для запуска в фоновом режиме
-            # options.add_argument("--headless")
-            
-            # Инициализация драйвера
-            driver = uc.Chrome(
-                options=options,
-                user_data_dir=temp_dir
-            )
-            driver.set_window_size(1920, 1080)
+            # Браузер с временным профилем, который удаляется при закрытии
+            from selenium.webdriver.common.by import By
+            from selenium.webdriver.support.ui import WebDriverWait
+            from selenium.webdriver.support import expected_conditions as EC
+            from selenium.common.exceptions import TimeoutException
+
+            driver, profile_dir = launch_chrome(undetected=True, profile_prefix="chrome_undetected")
             
             try:
                 # Открытие страницы регистрации
@@ -249,18 +220,8 @@ def register_with_undetected(max_retries=2):
                     pass
             
             finally:
-                # Закрываем драйвер и удаляем временную директорию
-                try:
-                    driver.quit()
-                except:
-                    pass
-                
-                try:
-                    import shutil
-                    shutil.rmtree(temp_dir, ignore_errors=True)
-                    logger.info(f"Временная директория удалена: {temp_dir}")
-                except:
-                    pass
+                # Закрываем драйвер и удаляем временный профиль
+                close_chrome(driver, profile_dir)
         
         except Exception as e:
             logger.error(f"Критическая ошибка при инициализации undetected-chromedriver: {str(e)}")
@@ -283,36 +244,17 @@ def login_with_selenium(max_retries=2):
     """Авторизация с существующими учетными данными через Selenium."""
     logger.info(f"Начинаю процесс авторизации на VFS Global с учетными данными: {VFS_EMAIL}")
 
-    # Очистка перед запуском
-    cleanup_chrome()
-
     for attempt in range(1, max_retries + 1):
         logger.info(f"Попытка авторизации {attempt}/{max_retries}")
 
         try:
-            # Импортируем selenium здесь для обработки возможных ошибок импорта
-            from selenium import webdriver
-            from selenium.webdriver.chrome.options import Options
+            # Браузер с временным профилем, который удаляется при закрытии
             from selenium.webdriver.common.by import By
             from selenium.webdriver.support.ui import WebDriverWait
             from selenium.webdriver.support import expected_conditions as EC
             from selenium.common.exceptions import TimeoutException
 
-            # Создаем временную директорию для пользовательских данных
-            temp_dir = tempfile.mkdtemp(prefix=f"chrome_selenium_login_{int(time.time())}_")
-            logger.info(f"Создана временная директория: {temp_dir}")
-
-            # Настройка опций Chrome для этой попытки
-            options = Options()
-            options.add_argument("--no-sandbox")
-            options.add_argument("--disable-dev-shm-usage")
-            options.add_argument(f"--user-data-dir={temp_dir}")
-            # Откомментируйте для запуска в фоновом режиме
-            # options.add_argument("--headless")
-
-            # Инициализация драйвера
-            driver = webdriver.Chrome(options=options)
-            driver.set_window_size(1920, 1080)
+            driver, profile_dir = launch_chrome(undetected=False, profile_prefix="chrome_selenium_login")
 
             try:
                 # Открытие страницы логина
@@ -381,19 +323,8 @@ def login_with_selenium(max_retries=2):
                     pass
 
             finally:
-                # Закрываем драйвер
-                try:
-                    driver.quit()
-                except:
-                    pass
-
-                # Удаляем временную директорию
-                try:
-                    import shutil
-                    shutil.rmtree(temp_dir, ignore_errors=True)
-                    logger.info(f"Временная директория удалена: {temp_dir}")
-                except:
-                    pass
+                # Закрываем драйвер и удаляем временный профиль
+                close_chrome(driver, profile_dir)
 
         except Exception as e:
             logger.error(f"Критическая ошибка при инициализации Selenium: {str(e)}")
@@ -415,37 +346,17 @@ def login_with_undetected(max_retries=2):
     """Авторизация с существующими учетными данными через undetected-chromedriver."""
     logger.info(f"Начинаю процесс авторизации на VFS Global через undetected-chromedriver с учетными данными: {VFS_EMAIL}")
 
-    # Очистка перед запуском
-    cleanup_chrome()
-
     for attempt in range(1, max_retries + 1):
         logger.info(f"Попытка авторизации с undetected-chromedriver {attempt}/{max_retries}")
 
         try:
-            # Импортируем undetected_chromedriver здесь
-            import undetected_chromedriver as uc
+            # Браузер с временным профилем, который удаляется при закрытии
             from selenium.webdriver.common.by import By
-            from selenium.webdriver.support.ui import WebDriverWait
+            from wait_budget import wait_budget
             from selenium.webdriver.support import expected_conditions as EC
             from selenium.common.exceptions import TimeoutException
 
-            # Создаем временную директорию для этой попытки
-            temp_dir = tempfile.mkdtemp(prefix=f"chrome_undetected_login_{int(time.time())}_")
-            logger.info(f"Создана временная директория: {temp_dir}")
-
-            # Важно! Создаем новый объект опций для каждой попытки
-            options = uc.ChromeOptions()
-            options.add_argument("--no-sandbox")
-            options.add_argument("--disable-dev-shm-usage")
-            # Откомментируйте для запуска в фоновом режиме
-            # options.add_argument("--headless")
-
-            # Инициализация драйвера
-            driver = uc.Chrome(
-                options=options,
-                user_data_dir=temp_dir
-            )
-            driver.set_window_size(1920, 1080)
+            driver, profile_dir = launch_chrome(undetected=True, profile_prefix="chrome_undetected_login")
 
             try:
                 # Открытие страницы авторизации
@@ -453,7 +364,7 @@ def login_with_undetected(max_retries=2):
                 driver.get(LOGIN_URL)
 
                 # Ждем загрузки формы авторизации
-                WebDriverWait(driver, 20).until(
+                wait_budget.wait(driver, "login_form",
                     EC.presence_of_element_located((By.ID, "mat-input-0"))
                 )
 
@@ -473,14 +384,14 @@ def login_with_undetected(max_retries=2):
                 password_input.send_keys(VFS_PASSWORD)
 
                 # Нажатие на кнопку входа
-                login_button = WebDriverWait(driver, 10).until(
+                login_button = wait_budget.wait(driver, "login_button",
                     EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'Войти') or contains(text(), 'Login')]"))
                 )
                 login_button.click()
 
                 # Ждем перехода на страницу после авторизации
                 try:
-                    WebDriverWait(driver, 15).until(
+                    wait_budget.wait(driver, "login_redirect",
                         EC.url_contains("dashboard")
                     )
                     logger.info("Успешная авторизация через undetected-chromedriver! Перешли на dashboard")
@@ -514,19 +425,8 @@ def login_with_undetected(max_retries=2):
                     pass
 
             finally:
-                # Закрываем драйвер
-                try:
-                    driver.quit()
-                except:
-                    pass
-
-                # Удаляем временную директорию
-                try:
-                    import shutil
-                    shutil.rmtree(temp_dir, ignore_errors=True)
-                    logger.info(f"Временная директория удалена: {temp_dir}")
-                except:
-                    pass
+                # Закрываем драйвер и удаляем временный профиль
+                close_chrome(driver, profile_dir)
 
         except Exception as e:
             logger.error(f"Критическая ошибка при инициализации undetected-chromedriver: {str(e)}")
@@ -620,6 +520,9 @@ def register_account(max_selenium_retries=2, max_undetected_retries=2):
 
 
 if __name__ == "__main__":
+    from log_setup import setup_logging
+    setup_logging()
+
     # Если скрипт запущен напрямую, регистрируем аккаунт
     result = register_account()
     if result["success"]:
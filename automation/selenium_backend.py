@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import logging
+from functools import partial
+
+from backends import AsyncBrowserBackend, snapshot_paths
+
+# Selenium нужен только этому бэкенду; CDP- и Playwright-развертывания обходятся без него
+try:
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.common.exceptions import TimeoutException
+    SELENIUM_AVAILABLE = True
+except ImportError:
+    SELENIUM_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class SeleniumBackend(AsyncBrowserBackend):
+    """
+    Бэкенд на Selenium WebDriver - текущий стек заданий (browser.py, check_flow.py).
+
+    Драйвер создается тем же setup_driver, что и у заданий (профиль, user-agent,
+    маскировка webdriver). Вызовы WebDriver блокирующие, поэтому выполняются в
+    потоке (asyncio.to_thread) по одному: сценарий flows.py не останавливает event loop.
+    """
+
+    name = "selenium"
+
+    def __init__(self, headless=False, driver_factory=None):
+        self.headless = headless
+        self.driver_factory = driver_factory
+        self.driver = None
+
+    async def _call(self, func, *args):
+        return await asyncio.to_thread(func, *args)
+
+    async def launch(self):
+        if not SELENIUM_AVAILABLE:
+            raise ImportError("Selenium не установлен (pip install selenium)")
+        factory = self.driver_factory
+        if factory is None:
+            from browser import setup_driver
+            # Рядом могут работать другие браузеры бота: чужие процессы Chrome не завершаются
+            factory = partial(setup_driver, headless=self.headless, cleanup=False)
+        self.driver = await self._call(factory)
+        return self.driver is not None
+
+    @staticmethod
+    def _by(locator):
+        kind, expression = locator
+        return (By.XPATH if kind == "xpath" else By.CSS_SELECTOR), expression
+
+    async def navigate(self, url):
+        await self._call(self.driver.get, url)
+
+    async def wait_any(self, locators, timeout):
+        by_locators = [self._by(locator) for locator in locators]
+
+        def first_present(driver):
+            for index, (by, expression) in enumerate(by_locators):
+                if driver.find_elements(by, expression):
+                    # WebDriverWait считает результат 0 неуспехом, поэтому индекс сдвигается на единицу
+                    return index + 1
+            return False
+
+        def wait():
+            try:
+                return WebDriverWait(self.driver, timeout).until(first_present) - 1
+            except TimeoutException:
+                return None
+
+        return await self._call(wait)
+
+    async def extract(self, locator):
+        def texts():
+            found = []
+            for element in self.driver.find_elements(*self._by(locator)):
+                try:
+                    found.append(element.text.strip())
+                except Exception:
+                    continue
+            return found
+
+        return await self._call(texts)
+
+    async def click(self, locator, timeout=5):
+        by, expression = self._by(locator)
+
+        def clickable(driver):
+            for element in driver.find_elements(by, expression):
+                if element.is_displayed() and element.is_enabled():
+                    return element
+            return False
+
+        def click():
+            try:
+                WebDriverWait(self.driver, timeout).until(clickable).click()
+                return True
+            except TimeoutException:
+                return False
+
+        return await self._call(click)
+
+    async def fill(self, locator, value):
+        def fill():
+            element = self.driver.find_element(*self._by(locator))
+            element.clear()
+            element.send_keys(value)
+
+        await self._call(fill)
+
+    async def snapshot(self, name):
+        screenshot_path, source_path = snapshot_paths(self.name, name)
+
+        def snapshot():
+            html = self.driver.page_source
+            try:
+                self.driver.save_screenshot(screenshot_path)
+                with open(source_path, "w", encoding="utf-8") as f:
+                    f.write(html)
+            except Exception as e:
+                logger.warning(f"Не удалось сохранить снимок {name}: {str(e)}")
+            return html
+
+        return await self._call(snapshot)
+
+    async def current_url(self):
+        return await self._call(lambda: self.driver.current_url)
+
+    async def close(self):
+        if self.driver is None:
+            return
+        driver, self.driver = self.driver, None
+        try:
+            await self._call(driver.quit)
+        except Exception as e:
+            logger.warning(f"Ошибка при закрытии драйвера: {str(e)}")
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import random
+import asyncio
+import logging
+import datetime
+import urllib.error
+import urllib.request
+from http.cookiejar import CookieJar
+from urllib.parse import urlencode
+
+from dotenv import load_dotenv
+
+import locators as L
+from history_store import HistoryStore
+
+logger = logging.getLogger(__name__)
+
+# Загружаем переменные окружения
+load_dotenv()
+SLOT_SOURCE_LATENCY = float(os.getenv("SLOT_SOURCE_LATENCY", "0"))  # Время ответа replay и synthetic, секунды
+SLOT_SYNTHETIC_HIT_RATE = float(os.getenv("SLOT_SYNTHETIC_HIT_RATE", "0.3"))  # Доля проверок с датами
+SLOT_SYNTHETIC_ERROR_RATE = float(os.getenv("SLOT_SYNTHETIC_ERROR_RATE", "0"))  # Доля неудачных проверок
+SLOT_SYNTHETIC_SEED = os.getenv("SLOT_SYNTHETIC_SEED")  # Зерно генератора (повторяемые прогоны)
+SLOT_REPLAY_LIMIT = int(os.getenv("SLOT_REPLAY_LIMIT", "1000"))  # Сколько последних проверок воспроизводить
+MOCK_SITE_TIMEOUT = 30  # Таймаут запроса к стенду, секунды
+
+SLOT_SOURCES = ("live", "mock", "replay", "synthetic")
+
+# Учетные данные для стенда: настоящие из .env на стенд не отправляются
+MOCK_EMAIL = "slot-source@example.com"
+MOCK_PASSWORD = "slot-source"
+
+# Источники результатов проверки для слоя бота. Обработчики, планировщик, история и
+# рассылка уведомлений получают одинаковый словарь результата (как jobs.check_job),
+# поэтому их можно нагружать тысячами проверок в минуту без живого сайта:
+#   live      - настоящая проверка (задание браузера или асинхронный режим)
+#   mock      - календарь локального стенда (mocks/vfs_site.py) по HTTP, без браузера
+#   replay    - записанные проверки из истории (logs/history.sqlite3) по кругу
+#   synthetic - случайные даты и ошибки с заданными долями
+
+
+def _found(dates):
+    return {"success": True, "stage": "calendar", "reason": None, "error": None, "dates": dates}
+
+
+def _failure(error, reason="error"):
+    return {"success": False, "stage": "calendar", "reason": reason, "error": error, "dates": []}
+
+
+def _format_date(date):
+    # Тот же вид, что у дат из календаря сайта: "<день> <месяц год>"
+    return f"{date.day} {date:%B %Y}"
+
+
+class SlotSource:
+    """
+    Источник результатов проверки слотов.
+
+    Результат check() - словарь как у jobs.check_job: success, stage, reason,
+    error и dates (список дат; пустой, если слотов нет).
+    """
+
+    name = None
+    live = False  # Проверяет ли источник настоящий сайт
+
+    async def check(self, city, visa_type, chat_id=None, on_progress=None):
+        """
+        Проверяет слоты пары (город, тип визы).
+
+        Args:
+            city (str): Город визового центра
+            visa_type (str): Тип визы
+            chat_id (int): Чат, для которого выполняется проверка; None - плановая проверка
+            on_progress: Корутина on_progress(stage, detail) для сообщений о ходе
+
+        Returns:
+            dict: success, stage, reason, error, dates
+        """
+        raise NotImplementedError
+
+    async def close(self):
+        """Освобождает ресурсы источника при остановке бота."""
+
+
+class LiveSlotSource(SlotSource):
+    """
+    Проверка на сайте VFS Global.
+
+    Тип визы задается формой сценария (категория VISA_TYPE), поэтому
+    результат относится к паре (city, VISA_TYPE) при любом visa_type.
+
+    Args:
+        runner: Корутина runner(chat_id, on_progress, city) -> результат; выбирает
+            режим автоматизации (задание браузера или CDP) на стороне бота
+    """
+
+    name = "live"
+    live = True
+
+    def __init__(self, runner):
+        self.runner = runner
+
+    async def check(self, city, visa_type, chat_id=None, on_progress=None):
+        return await self.runner(chat_id, on_progress, city)
+
+
+class MockSiteSlotSource(SlotSource):
+    """
+    Календарь локального стенда (mocks/vfs_site.py) по HTTP, без браузера.
+
+    Сценарии, задержки и счетчики стенда работают как при прогоне браузером,
+    а страница календаря разбирается теми же разборщиками (page_parsers.py).
+
+    Args:
+        base_url (str): Корень сайта на стенде (по умолчанию VFS_BASE_URL)
+    """
+
+    name = "mock"
+
+    def __init__(self, base_url=L.VFS_BASE_URL):
+        self.base_url = base_url.rstrip("/")
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+
+    def _get(self, path, data=None):
+        body = urlencode(data).encode("utf-8") if data is not None else None
+        with self.opener.open(f"{self.base_url}/{path}", data=body, timeout=MOCK_SITE_TIMEOUT) as response:
+            return response.geturl(), response.read().decode("utf-8", errors="replace")
+
+    def _login(self):
+        url, page = self._get("login", {"email": MOCK_EMAIL, "password": MOCK_PASSWORD})
+        if url.rstrip("/").endswith("/login"):
+            return "captcha" if "captcha" in page.lower() else "error"
+        return None
+
+    def _fetch(self, city):
+        # Разборщики (и lxml) нужны только этому источнику: не замедляют запуск бота
+        from page_parsers import parse_calendar
+
+        center = L.CITY_CENTERS.get(city, L.DEFAULT_CENTER)
+        # render=static: стенд отдает готовую разметку, как driver.page_source после отрисовки
+        path = f"book-an-appointment/calendar?{urlencode({'center': center, 'render': 'static'})}"
+        url, page = self._get(path)
+        if url.rstrip("/").endswith("/login"):
+            reason = self._login()
+            if reason:
+                return _failure(f"Не удалось войти на стенд ({reason})", reason)
+            url, page = self._get(path)
+
+        calendar = parse_calendar(page)
+        if calendar["no_slots"]:
+            return _found([])
+        if not calendar["calendar"]:
+            return _failure("Календарь стенда не найден")
+        return _found(calendar["dates"] or calendar["labels"])
+
+    async def check(self, city, visa_type, chat_id=None, on_progress=None):
+        if on_progress:
+            await on_progress("calendar")
+        try:
+            return await asyncio.to_thread(self._fetch, city)
+        except (urllib.error.URLError, OSError) as e:
+            logger.warning(f"Стенд {self.base_url} недоступен: {str(e)}")
+            return _failure(f"Стенд недоступен: {str(e)}")
+
+
+class ReplaySlotSource(SlotSource):
+    """
+    Воспроизводит записанные проверки пары (город, тип визы) по кругу, от старых к новым.
+
+    Args:
+        store (HistoryStore): История, из которой берутся проверки
+        latency (float): Время ответа, секунды
+        limit (int): Сколько последних проверок пары воспроизводить
+    """
+
+    name = "replay"
+
+    def __init__(self, store, latency=SLOT_SOURCE_LATENCY, limit=SLOT_REPLAY_LIMIT):
+        self.store = store
+        self.latency = latency
+        self.limit = limit
+        self._records = {}
+        self._positions = {}
+
+    async def check(self, city, visa_type, chat_id=None, on_progress=None):
+        key = (city, visa_type)
+        if key not in self._records:
+            recent = await asyncio.to_thread(self.store.recent, city, visa_type, self.limit)
+            self._records[key] = list(reversed(recent))
+            self._positions[key] = 0
+            logger.info(f"Воспроизведение {city} / {visa_type}: {len(recent)} записанных проверок")
+
+        if on_progress:
+            await on_progress("calendar")
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        records = self._records[key]
+        if not records:
+            return _failure(f"Нет записанных проверок для {city} / {visa_type}")
+        position = self._positions[key]
+        self._positions[key] = (position + 1) % len(records)
+        _, success, _, _, reason, dates = records[position]
+        return _found(dates) if success else _failure(f"Записанная ошибка проверки ({reason})", reason or "error")
+
+
+class SyntheticSlotSource(SlotSource):
+    """
+    Случайные результаты: даты с долей hit_rate, ошибки с долей error_rate.
+
+    Args:
+        hit_rate (float): Доля проверок, нашедших даты
+        error_rate (float): Доля неудачных проверок
+        latency (float): Время ответа, секунды
+        seed: Зерно генератора; None - случайное
+        max_dates (int): Наибольшее число дат в одной проверке
+        horizon_days (int): На сколько дней вперед генерируются даты
+    """
+
+    name = "synthetic"
+
+    def __init__(self, hit_rate=SLOT_SYNTHETIC_HIT_RATE, error_rate=SLOT_SYNTHETIC_ERROR_RATE,
+                 latency=SLOT_SOURCE_LATENCY, seed=SLOT_SYNTHETIC_SEED, max_dates=5, horizon_days=60):
+        self.hit_rate = hit_rate
+        self.error_rate = error_rate
+        self.latency = latency
+        self.random = random.Random(seed)
+        self.max_dates = max_dates
+        self.horizon_days = horizon_days
+
+    async def check(self, city, visa_type, chat_id=None, on_progress=None):
+        if on_progress:
+            await on_progress("calendar")
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        roll = self.random.random()
+        if roll < self.error_rate:
+            return _failure("Синтетическая ошибка проверки")
+        if roll >= self.error_rate + self.hit_rate:
+            return _found([])
+        today = datetime.date.today()
+        offsets = sorted(self.random.sample(range(1, self.horizon_days + 1),
+                                            self.random.randint(1, self.max_dates)))
+        return _found([_format_date(today + datetime.timedelta(days=offset)) for offset in offsets])
+
+
+def create_slot_source(name, live_runner=None):
+    """
+    Создает источник результатов проверки по имени (SLOT_SOURCE).
+
+    Args:
+        name (str): live, mock, replay или synthetic
+        live_runner: Корутина runner(chat_id, on_progress) для источника live
+
+    Returns:
+        SlotSource
+    """
+    if name == "mock":
+        return MockSiteSlotSource()
+    if name == "replay":
+        # Воспроизводится история живых проверок
+        return ReplaySlotSource(HistoryStore())
+    if name == "synthetic":
+        return SyntheticSlotSource()
+    if name != "live":
+        logger.warning(f"Неизвестный источник слотов SLOT_SOURCE={name}, используется live")
+    return LiveSlotSource(live_runner)
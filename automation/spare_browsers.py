@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import logging
+import threading
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+# Загружаем переменные окружения
+load_dotenv()
+SPARE_BROWSERS = int(os.getenv("SPARE_BROWSERS", "0"))  # Сколько браузеров держать запущенными заранее
+SPARE_BROWSER_TTL = int(os.getenv("SPARE_BROWSER_TTL", "600"))  # Через сколько секунд простоя запасной браузер закрывается
+SPARE_BROWSER_LOGIN = os.getenv("SPARE_BROWSER_LOGIN", "0") == "1"  # Входить ли в аккаунт в запасном браузере
+SPARE_SHUTDOWN_TIMEOUT = 30  # Сколько ждать запускаемый браузер при остановке, секунды
+
+
+class SpareBrowsers:
+    """
+    Запас заранее запущенных драйверов для первого задания.
+
+    Драйверы запускаются в фоновом потоке после start() и после каждого
+    take(), пока их не станет count. Драйвер, простоявший idle_ttl секунд,
+    закрывается и заново не запускается до следующего take(): в простое
+    память браузеров не занята. Если запуск или подготовка не удались,
+    запас не пополняется до следующего take(), чтобы не запускать браузеры подряд.
+
+    Args:
+        driver_factory: Функция без аргументов, возвращающая драйвер или None
+        count (int): Сколько драйверов держать в запасе (0 - запас отключен)
+        idle_ttl (float): Время простоя до закрытия драйвера, секунды (0 - не закрывать)
+        prepare: Функция prepare(driver) -> bool, доводящая драйвер до готовности (например, вход)
+    """
+
+    def __init__(self, driver_factory, count=SPARE_BROWSERS, idle_ttl=SPARE_BROWSER_TTL, prepare=None):
+        self.driver_factory = driver_factory
+        self.count = count
+        self.idle_ttl = idle_ttl
+        self.prepare = prepare
+        self._spares = []  # (драйвер, время готовности)
+        self._refill = False
+        self._launching = False
+        self._stopped = False
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def start(self):
+        """Запускает фоновое пополнение запаса."""
+        if self.count <= 0 or self._thread is not None:
+            return
+        with self._cond:
+            self._refill = True
+        self._thread = threading.Thread(target=self._run, name="spare-browsers", daemon=True)
+        self._thread.start()
+
+    def take(self):
+        """
+        Забирает готовый драйвер из запаса и запускает пополнение.
+
+        Если готового нет, но драйвер уже запускается, ждет его: второй браузер,
+        запущенный параллельно, был бы готов не раньше.
+
+        Returns:
+            webdriver.Chrome: Драйвер или None, если готового нет
+        """
+        with self._cond:
+            while not self._spares and self._launching and not self._stopped:
+                self._cond.wait()
+            driver, ready_at = self._spares.pop(0) if self._spares else (None, None)
+            self._refill = self.count > 0
+            self._cond.notify_all()
+        if driver is not None:
+            logger.info(f"Взят запасной браузер (готов {time.monotonic() - ready_at:.0f} с назад)")
+        return driver
+
+    def shutdown(self):
+        """Закрывает запасные драйверы и останавливает пополнение."""
+        with self._cond:
+            self._stopped = True
+            spares, self._spares = self._spares, []
+            self._cond.notify_all()
+        for driver, _ in spares:
+            self._quit(driver)
+        if self._thread is not None:
+            # Запускаемый в этот момент драйвер закрывается потоком пополнения
+            self._thread.join(SPARE_SHUTDOWN_TIMEOUT)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._stopped:
+                    return
+                now = time.monotonic()
+                expired = [driver for driver, ready_at in self._spares if self._expired(ready_at, now)]
+                self._spares = [(driver, ready_at) for driver, ready_at in self._spares
+                                if not self._expired(ready_at, now)]
+                launch = self._refill and len(self._spares) < self.count
+                self._launching = launch
+                if not launch and not expired:
+                    deadlines = [ready_at + self.idle_ttl - now for _, ready_at in self._spares]
+                    self._cond.wait(min(deadlines) if deadlines and self.idle_ttl > 0 else None)
+                    continue
+
+            for driver in expired:
+                logger.info(f"Запасной браузер простоял {self.idle_ttl} с, закрываю")
+                self._quit(driver)
+            if launch:
+                self._launch()
+
+    def _expired(self, ready_at, now):
+        return self.idle_ttl > 0 and now - ready_at >= self.idle_ttl
+
+    def _launch(self):
+        started = time.monotonic()
+        driver = None
+        try:
+            driver = self.driver_factory()
+            if driver is not None and self.prepare is not None and not self.prepare(driver):
+                logger.warning("Не удалось подготовить запасной браузер")
+                self._quit(driver)
+                driver = None
+        except Exception as e:
+            logger.warning(f"Ошибка при запуске запасного браузера: {str(e)}")
+            if driver is not None:
+                self._quit(driver)
+            driver = None
+
+        with self._cond:
+            self._launching = False
+            self._cond.notify_all()
+            stopped = self._stopped
+            if driver is None:
+                # До следующего take(): сайт или Chrome могут быть недоступны
+                self._refill = False
+            elif not stopped:
+                self._spares.append((driver, time.monotonic()))
+                self._refill = len(self._spares) < self.count
+                ready = len(self._spares)
+        if driver is not None and stopped:
+            self._quit(driver)
+        elif driver is not None:
+            logger.info(f"Запасной браузер готов за {time.monotonic() - started:.1f} с "
+                        f"(в запасе {ready}/{self.count})")
+
+    @staticmethod
+    def _quit(driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass
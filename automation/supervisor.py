@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import json
+import shutil
+import signal
+import tempfile
+import asyncio
+import logging
+import argparse
+import itertools
+import threading
+
+from dotenv import load_dotenv
+
+from memory_watchdog import get_process_tree_pids, get_process_tree_rss
+from metrics import registry
+from log_setup import handle_forwarded
+from spare_browsers import SPARE_BROWSERS
+
+logger = logging.getLogger(__name__)
+
+# Загружаем переменные окружения
+load_dotenv()
+JOB_TIMEOUT_CHECK = int(os.getenv("JOB_TIMEOUT_CHECK", "300"))  # Жесткий лимит проверки, секунды
+JOB_TIMEOUT_BOOK = int(os.getenv("JOB_TIMEOUT_BOOK", "600"))  # Жесткий лимит бронирования, секунды
+JOB_TIMEOUT_CHECK_CITIES = int(os.getenv("JOB_TIMEOUT_CHECK_CITIES", "900"))  # Жесткий лимит проверки городов, секунды
+MAX_WORKERS = int(os.getenv("MAX_WORKERS", "1"))  # Число процессов-исполнителей
+
+JOB_TIMEOUTS = {
+    "check": JOB_TIMEOUT_CHECK,
+    "book": JOB_TIMEOUT_BOOK,
+    "check_cities": JOB_TIMEOUT_CHECK_CITIES,
+}
+
+WORKER_SCRIPT = os.path.abspath(__file__)
+# Предел строки протокола: по умолчанию asyncio читает строки до 64 КиБ, а результат задания
+# (даты, сообщения, метрики) или запись лога с трассировкой бывают длиннее
+MESSAGE_LIMIT = 32 * 1024 * 1024
+
+# Протокол исполнителя - JSON по строке в stdin/stdout:
+#   бот -> исполнитель: {"cmd": "run", "id": 1, "job": "check", "kwargs": {}} | {"cmd": "stop"}
+#   исполнитель -> бот: {"event": "progress", "id": 1, "stage": "login", "detail": null}
+#                       {"event": "result", "id": 1, "result": {...}, "metrics": {...}}
+#                       {"event": "log", "record": {...}} - запись лога (log_setup.ForwardHandler)
+
+
+def kill_process_tree(pid):
+    """
+    Жестко завершает процесс, его группу и всех потомков (SIGKILL).
+
+    Дерево собирается до сигнала: после гибели родителя потомки переходят к init.
+    """
+    pids = get_process_tree_pids(pid)
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except OSError:
+        pass
+    for child in pids:
+        try:
+            os.kill(child, signal.SIGKILL)
+        except OSError:
+            pass
+
+
+class SupervisedWorker:
+    """
+    Процесс-исполнитель заданий браузера.
+
+    Исполнитель живет между заданиями (драйвер переиспользуется как раньше),
+    запускается в своей сессии (setsid), поэтому chromedriver и Chrome попадают
+    в его группу процессов и убиваются вместе с ним по истечении срока.
+    Процессы Chrome других исполнителей он не трогает (cleanup_chrome не вызывается),
+    а профили Chrome создает в своем каталоге, который удаляется при остановке.
+    """
+
+    def __init__(self, number, browser_mode="process"):
+        self.number = number
+        self.browser_mode = browser_mode
+        self.process = None
+        self.profile_root = None
+        self._messages = None
+        self._reader = None
+        self.jobs_done = 0
+        self._ids = itertools.count(1)
+
+    @property
+    def pid(self):
+        return self.process.pid if self.process else None
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self):
+        # Каталог прошлого запуска, если исполнитель завершился сам
+        self._remove_profiles()
+        self.profile_root = tempfile.mkdtemp(prefix=f"chrome_profile_worker{self.number}_")
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable, WORKER_SCRIPT, "--browser-mode", self.browser_mode,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            start_new_session=True,
+            limit=MESSAGE_LIMIT,
+            env=dict(os.environ, CHROME_PROFILE_ROOT=self.profile_root),
+        )
+        # Вывод исполнителя читается постоянно, и между заданиями тоже: записи лога
+        # сразу выводятся ботом, остальные сообщения ждут run() в очереди
+        self._messages = asyncio.Queue()
+        self._reader = asyncio.get_running_loop().create_task(self._read_loop(self.process, self._messages))
+        logger.info(f"Исполнитель {self.number} запущен (PID {self.pid})")
+
+    async def _send(self, message):
+        self.process.stdin.write((json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8"))
+        await self.process.stdin.drain()
+
+    @staticmethod
+    async def _read_loop(process, messages):
+        """Разбирает строки исполнителя до конца вывода; конец или ошибка чтения кладутся в очередь."""
+        try:
+            while True:
+                line = await process.stdout.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                if message.get("event") == "log":
+                    handle_forwarded(message["record"])
+                    continue
+                messages.put_nowait(message)
+        except (ConnectionError, ValueError) as e:
+            messages.put_nowait(e)
+        finally:
+            messages.put_nowait(None)
+
+    async def _read(self):
+        message = await self._messages.get()
+        if message is None:
+            raise EOFError(f"Исполнитель завершился с кодом {self.process.returncode}")
+        if isinstance(message, Exception):
+            raise message
+        return message
+
+    async def run(self, job, kwargs, timeout, on_progress=None):
+        """
+        Выполняет задание с ограничением по времени.
+
+        Args:
+            job (str): Имя задания из jobs.JOBS
+            kwargs (dict): Аргументы задания (JSON-совместимые)
+            timeout (float): Лимит времени в секундах
+            on_progress: Корутина on_progress(stage, detail) для сообщений о ходе задания
+
+        Returns:
+            dict: Результат задания; reason="timeout" или "crashed", если исполнитель пришлось убить
+        """
+        if not self.alive:
+            await self.start()
+
+        job_id = next(self._ids)
+        stage = None
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        try:
+            await self._send({"cmd": "run", "id": job_id, "job": job, "kwargs": kwargs})
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                message = await asyncio.wait_for(self._read(), remaining)
+                if message.get("id") != job_id:
+                    continue
+                if message["event"] == "result":
+                    self.jobs_done += 1
+                    # Метрики этапов, накопленные исполнителем за задание, добавляются к метрикам бота
+                    registry.merge(message.get("metrics"))
+                    return message["result"]
+                if message["event"] == "progress":
+                    stage = message["stage"]
+                    if on_progress:
+                        try:
+                            await on_progress(stage, message.get("detail"))
+                        except Exception as e:
+                            logger.warning(f"Ошибка при отправке хода задания {job}: {str(e)}")
+        except asyncio.TimeoutError:
+            logger.error(f"Задание {job} превысило {timeout} с на этапе {stage}, "
+                         f"принудительно завершаю исполнитель {self.number} (PID {self.pid})")
+            await self.kill()
+            return {"success": False, "stage": stage, "reason": "timeout",
+                    "error": f"Задание не уложилось в {timeout:.0f} с и было остановлено."}
+        except (EOFError, ConnectionError, ValueError) as e:
+            logger.error(f"Исполнитель {self.number} аварийно завершился на этапе {stage}: {str(e)}")
+            await self.kill()
+            return {"success": False, "stage": stage, "reason": "crashed",
+                    "error": "Процесс браузера аварийно завершился. Попробуйте позже."}
+        except asyncio.CancelledError:
+            await self.kill()
+            raise
+
+    async def kill(self):
+        """Убивает исполнитель вместе с chromedriver и Chrome и удаляет его профили Chrome."""
+        if self.process is None:
+            self._remove_profiles()
+            return
+        if self.process.returncode is None:
+            kill_process_tree(self.process.pid)
+            await self.process.wait()
+        self.process = None
+        self._stop_reader()
+        self._remove_profiles()
+
+    async def stop(self, timeout=15):
+        """Корректно останавливает исполнитель (закрывает драйвер), при зависании - убивает."""
+        if not self.alive:
+            self.process = None
+            self._remove_profiles()
+            return
+        try:
+            await self._send({"cmd": "stop"})
+            await asyncio.wait_for(self.process.wait(), timeout)
+            self.process = None
+            self._stop_reader()
+            self._remove_profiles()
+        except (asyncio.TimeoutError, ConnectionError):
+            await self.kill()
+
+    def _stop_reader(self):
+        if self._reader is not None:
+            self._reader.cancel()
+            self._reader = None
+
+    def _remove_profiles(self):
+        # Убитый Chrome не удаляет свой профиль: каталог исполнителя удаляется целиком
+        if self.profile_root:
+            shutil.rmtree(self.profile_root, ignore_errors=True)
+            self.profile_root = None
+
+    def format_status(self):
+        if not self.alive:
+            return f"Исполнитель {self.number}: не запущен"
+        rss, count = get_process_tree_rss(self.pid)
+        return (f"Исполнитель {self.number} (PID {self.pid}): {rss / (1024 * 1024):.0f} МБ, "
+                f"процессов {count}, заданий {self.jobs_done}")
+
+
+class JobSupervisor:
+    """
+    Раздает задания процессам-исполнителям и следит за их сроками.
+
+    Каждый исполнитель выполняет одно задание за раз; если все заняты,
+    задание ждет освобождения. Зависший браузер не блокирует бота: по
+    истечении срока дерево процессов исполнителя убивается и при следующем
+    задании запускается заново. Задания чата, чья сессия удерживается после
+    проверки (jobs.HotSessions), направляются в тот же исполнитель.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, browser_mode="process", timeouts=None):
+        if browser_mode == "contexts":
+            # Исполнитель выполняет одно задание за раз, и общий Chrome с контекстами в нем
+            # только добавил бы сериализацию команд без параллельности
+            logger.warning("BROWSER_MODE=contexts работает только с JOB_ISOLATION=thread, "
+                           "исполнители запускают отдельный Chrome (BROWSER_MODE=process)")
+            browser_mode = "process"
+        self.workers = [SupervisedWorker(number, browser_mode) for number in range(1, max_workers + 1)]
+        self.timeouts = timeouts or JOB_TIMEOUTS
+        self._idle = list(self.workers)
+        self._affinity = {}
+        self._available = None
+
+    def _condition(self):
+        # Условие создается лениво: на event loop бота, а не при импорте
+        if self._available is None:
+            self._available = asyncio.Condition()
+        return self._available
+
+    def _preferred(self, chat_id):
+        entry = self._affinity.get(chat_id)
+        if entry is None:
+            return None
+        worker, expires = entry
+        if asyncio.get_running_loop().time() > expires:
+            del self._affinity[chat_id]
+            return None
+        return worker
+
+    async def _acquire(self, chat_id):
+        preferred = self._preferred(chat_id)
+        available = self._condition()
+        async with available:
+            if preferred is not None:
+                await available.wait_for(lambda: preferred in self._idle)
+                worker = preferred
+            else:
+                await available.wait_for(lambda: bool(self._idle))
+                worker = self._idle[0]
+            self._idle.remove(worker)
+            return worker
+
+    async def _release(self, worker):
+        available = self._condition()
+        async with available:
+            self._idle.append(worker)
+            available.notify_all()
+
+    async def warm_up(self):
+        """
+        Запускает свободные исполнители заранее, чтобы они подготовили запасные
+        браузеры (SPARE_BROWSERS); без запаса исполнители запускаются первым заданием.
+        """
+        if SPARE_BROWSERS <= 0:
+            return
+        available = self._condition()
+        for worker in self.workers:
+            async with available:
+                if worker.alive or worker not in self._idle:
+                    continue
+                self._idle.remove(worker)
+            try:
+                await worker.start()
+            finally:
+                await self._release(worker)
+
+    async def run(self, job, on_progress=None, timeout=None, **kwargs):
+        """
+        Выполняет задание на свободном исполнителе.
+
+        Args:
+            job (str): Имя задания ("check", "check_cities", "book")
+            on_progress: Корутина on_progress(stage, detail)
+            timeout (float): Лимит времени; по умолчанию JOB_TIMEOUT_<JOB>
+            **kwargs: Аргументы задания (chat_id, selected_date, cities)
+
+        Returns:
+            dict: Результат задания
+        """
+        chat_id = kwargs.get("chat_id")
+        worker = await self._acquire(chat_id)
+        try:
+            result = await worker.run(job, kwargs, timeout or self.timeouts.get(job, JOB_TIMEOUT_CHECK), on_progress)
+            if result.get("hold") and chat_id is not None:
+                self._affinity[chat_id] = (worker, asyncio.get_running_loop().time() + result["hold"])
+            elif chat_id is not None:
+                self._affinity.pop(chat_id, None)
+            return result
+        finally:
+            await self._release(worker)
+
+    def format_report(self):
+        """Текстовый отчет о памяти исполнителей для /memory."""
+        return "\n".join(worker.format_status() for worker in self.workers)
+
+    async def shutdown(self):
+        await asyncio.gather(*(worker.stop() for worker in self.workers), return_exceptions=True)
+
+
+def worker_main(browser_mode):
+    """Цикл процесса-исполнителя: читает команды из stdin, пишет события в stdout."""
+    # stdout занят протоколом: все остальные выводы (print, драйверы) уходят в stderr
+    channel = os.fdopen(os.dup(sys.stdout.fileno()), "w", encoding="utf-8", buffering=1)
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    channel_lock = threading.Lock()
+
+    def send(message):
+        # События задания и записи лога (поток логирования) пишутся в один канал
+        line = json.dumps(message, ensure_ascii=False) + "\n"
+        with channel_lock:
+            channel.write(line)
+            channel.flush()
+
+    # Записи лога уходят боту: файлы логов пишет только он, без ротации из нескольких процессов
+    from log_setup import setup_logging
+    setup_logging(forward=lambda record: send({"event": "log", "record": record}))
+
+    from jobs import JOBS, create_driver_pool, hot_sessions
+    from wait_budget import wait_budget
+
+    # Рядом могут работать другие исполнители (MAX_WORKERS > 1): чужие Chrome не завершаются
+    pool = create_driver_pool(browser_mode, cleanup=False)
+    pool.watchdog.start()
+    try:
+        for line in sys.stdin:
+            message = json.loads(line)
+            if message["cmd"] == "stop":
+                break
+            if message["cmd"] != "run":
+                continue
+
+            job_id = message["id"]
+
+            def progress(stage, detail=None):
+                send({"event": "progress", "id": job_id, "stage": stage, "detail": detail})
+
+            try:
+                result = JOBS[message["job"]](pool, progress, **message.get("kwargs", {}))
+            except Exception as e:
+                logger.error(f"Ошибка задания {message['job']}: {str(e)}")
+                result = {"success": False, "stage": None, "reason": "error", "error": str(e)}
+            # Замеры ожиданий - до ответа: исполнитель могут остановить сразу после результата
+            wait_budget.flush()
+            send({"event": "result", "id": job_id, "result": result, "metrics": registry.drain()})
+            logger.info(f"Память браузеров:\n{pool.watchdog.format_report()}")
+    finally:
+        hot_sessions.release_all()
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Процесс-исполнитель заданий браузера")
+    parser.add_argument("--browser-mode", default="process", choices=["process", "contexts"])
+    args = parser.parse_args()
+    worker_main(args.browser_mode)
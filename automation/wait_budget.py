@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import atexit
+import logging
+import tempfile
+import threading
+from collections import deque
+
+from dotenv import load_dotenv
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+
+logger = logging.getLogger(__name__)
+
+# Загружаем переменные окружения
+load_dotenv()
+WAIT_TIMEOUT_MIN = float(os.getenv("WAIT_TIMEOUT_MIN", "2"))  # Нижняя граница ожидания, секунды
+WAIT_TIMEOUT_MAX = float(os.getenv("WAIT_TIMEOUT_MAX", "60"))  # Верхняя граница ожидания, секунды
+WAIT_TIMEOUT_MARGIN = float(os.getenv("WAIT_TIMEOUT_MARGIN", "1.5"))  # Запас поверх перцентиля
+WAIT_HISTORY_SIZE = int(os.getenv("WAIT_HISTORY_SIZE", "200"))  # Сколько последних замеров хранится на ожидание
+WAIT_SAVE_INTERVAL = float(os.getenv("WAIT_SAVE_INTERVAL", "30"))  # Не чаще раза в столько секунд замеры пишутся в файл
+WAIT_MIN_SAMPLES = 10  # До этого числа замеров используется время по умолчанию
+
+STATE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs", "wait_budget.json")
+
+# Ожидания сценария: имя -> (время по умолчанию в секундах, перцентиль, необязательное).
+# p99 - для элементов, которые должны появиться (загрузка страниц и форм);
+# p95 - для элементов, которых может не быть (запасные варианты кнопок):
+# их отсутствие выясняется быстрее. Таймаут необязательного ожидания - обычный
+# ответ ("кнопки нет", "слотов нет"), а не медленная страница, поэтому он только
+# считается и бюджет не увеличивает.
+WAITS = {
+    "login_form": (15, 0.99, False),
+    "login_button": (5, 0.99, False),
+    "login_button_ru": (5, 0.95, True),
+    "login_button_en": (5, 0.95, True),
+    "login_redirect": (20, 0.99, False),
+    "appointment_button": (10, 0.95, True),
+    "appointment_form": (15, 0.99, False),
+    "form_control": (5, 0.99, False),
+    "continue_button": (5, 0.95, True),
+    "calendar": (10, 0.99, True),
+    "calendar_control": (5, 0.99, False),
+    "time_slots": (5, 0.95, True),
+    "personal_form": (15, 0.99, False),
+    "submit_button": (10, 0.99, False),
+}
+
+
+def percentile(values, q):
+    """Перцентиль q (0..1) по ближайшему рангу."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+
+class WaitBudget:
+    """
+    Бюджеты времени для ожиданий WebDriverWait, обучаемые по замерам.
+
+    Бюджет ожидания - перцентиль длительностей последних ожиданий с запасом
+    WAIT_TIMEOUT_MARGIN, ограниченный WAIT_TIMEOUT_MIN..WAIT_TIMEOUT_MAX.
+    Пока замеров меньше WAIT_MIN_SAMPLES, используется время по умолчанию из WAITS.
+    Таймаут обязательного ожидания попадает в выборку цензурированным замером, равным
+    бюджету, при котором он случился (настоящая длительность не меньше): когда доля
+    таймаутов превышает 1 - перцентиль, бюджет растет на запас. Таймауты необязательных
+    ожиданий в выборку не попадают, а считаются отдельно (не больше WAIT_HISTORY_SIZE).
+
+    Файл замеров общий для бота и процессов-исполнителей: новые замеры копятся в памяти
+    и не чаще раза в WAIT_SAVE_INTERVAL секунд (и по flush() в конце задания)
+    дописываются к содержимому файла, который заменяется атомарно. С state_file=None
+    замеры не читаются и не сохраняются (бенчмарки).
+    """
+
+    def __init__(self, waits=WAITS, state_file=STATE_FILE, low=WAIT_TIMEOUT_MIN, high=WAIT_TIMEOUT_MAX,
+                 margin=WAIT_TIMEOUT_MARGIN, history_size=WAIT_HISTORY_SIZE, save_interval=WAIT_SAVE_INTERVAL):
+        self.waits = waits
+        self.state_file = state_file
+        self.low = low
+        self.high = high
+        self.margin = margin
+        self.history_size = history_size
+        self.save_interval = save_interval
+        self.samples = {name: deque(maxlen=history_size) for name in waits}
+        self.timeouts = {name: 0 for name in waits}
+        # Замеры и таймауты, еще не записанные в файл
+        self._pending = {name: [] for name in waits}
+        self._pending_timeouts = {name: 0 for name in waits}
+        self._saved_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._load()
+
+    def budget(self, name):
+        """
+        Возвращает бюджет ожидания в секундах.
+
+        Args:
+            name (str): Имя ожидания из WAITS
+        """
+        default, q, _ = self.waits[name]
+        with self._lock:
+            samples = list(self.samples[name])
+        if len(samples) < WAIT_MIN_SAMPLES:
+            return default
+        return min(self.high, max(self.low, percentile(samples, q) * self.margin))
+
+    def record(self, name, seconds=None, timed_out=False):
+        """
+        Учитывает длительность успешного ожидания или таймаут.
+
+        Args:
+            name (str): Имя ожидания из WAITS
+            seconds (float): Длительность ожидания; для таймаута - бюджет, при котором
+                он случился (по умолчанию текущий бюджет)
+            timed_out (bool): Условие не выполнилось за бюджет
+        """
+        optional = self.waits[name][2]
+        if timed_out and seconds is None and not optional:
+            seconds = self.budget(name)
+        with self._lock:
+            if timed_out:
+                self.timeouts[name] = min(self.history_size, self.timeouts[name] + 1)
+                self._pending_timeouts[name] += 1
+            if not (timed_out and optional):
+                self.samples[name].append(round(seconds, 3))
+                self._pending[name].append(round(seconds, 3))
+            due = time.monotonic() - self._saved_at >= self.save_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        """
+        Дописывает накопленные замеры к файлу состояния.
+
+        Замеры других процессов, сохраненные в файл с прошлого чтения, не теряются:
+        файл перечитывается, к нему добавляются свои новые замеры, и результат
+        заменяет файл через os.replace, так что прерванная запись не портит его.
+        """
+        with self._lock:
+            self._saved_at = time.monotonic()
+            if not any(self._pending.values()) and not any(self._pending_timeouts.values()):
+                return
+            data = self._read()
+            if data is not None:
+                for name in self.waits:
+                    merged = deque(data.get("samples", {}).get(name, []), maxlen=self.history_size)
+                    merged.extend(self._pending[name])
+                    self.samples[name] = merged
+                    self.timeouts[name] = min(self.history_size,
+                                              data.get("timeouts", {}).get(name, 0) + self._pending_timeouts[name])
+            if self._save():
+                self._pending = {name: [] for name in self.waits}
+                self._pending_timeouts = {name: 0 for name in self.waits}
+
+    def wait(self, driver, name, condition):
+        """
+        WebDriverWait(driver, бюджет).until(condition) с замером длительности.
+
+        Returns:
+            Результат condition, как у WebDriverWait.until
+
+        Raises:
+            TimeoutException: Если условие не выполнилось за бюджет
+        """
+        timeout = self.budget(name)
+        started = time.monotonic()
+        try:
+            result = WebDriverWait(driver, timeout).until(condition)
+        except TimeoutException:
+            self.record(name, timeout, timed_out=True)
+            logger.debug(f"Ожидание {name} не уложилось в {timeout:.1f} с")
+            raise
+        self.record(name, time.monotonic() - started)
+        return result
+
+    def format_report(self):
+        """Текстовый отчет о бюджетах ожиданий для логов и Telegram."""
+        lines = [f"Границы: {self.low:g}–{self.high:g} с, запас ×{self.margin:g}"]
+        for name, (default, q, _) in self.waits.items():
+            with self._lock:
+                samples = list(self.samples[name])
+                timeouts = self.timeouts[name]
+            if len(samples) < WAIT_MIN_SAMPLES:
+                lines.append(f"• {name}: {default} с по умолчанию (замеров {len(samples)}, таймаутов {timeouts})")
+                continue
+            lines.append(
+                f"• {name}: {self.budget(name):.1f} с (было {default} с), p{round(q * 100)} "
+                f"{percentile(samples, q):.2f} с, медиана {percentile(samples, 0.5):.2f} с, "
+                f"замеров {len(samples)}, таймаутов {timeouts}"
+            )
+        return "\n".join(lines)
+
+    def _read(self):
+        """Содержимое файла состояния или None, если файла нет или он поврежден."""
+        if self.state_file is None:
+            return None
+        try:
+            with open(self.state_file, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Не удалось прочитать замеры ожиданий {self.state_file}: {str(e)}")
+            return None
+
+    def _load(self):
+        data = self._read()
+        if data is None:
+            return
+        for name in self.waits:
+            self.samples[name].extend(data.get("samples", {}).get(name, []))
+            self.timeouts[name] = min(self.history_size, data.get("timeouts", {}).get(name, 0))
+
+    def _save(self):
+        """Атомарно записывает замеры: временный файл рядом и os.replace."""
+        if self.state_file is None:
+            return True
+        tmp_path = None
+        try:
+            directory = os.path.dirname(self.state_file)
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix=".wait_budget_", suffix=".tmp", dir=directory)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"samples": {name: list(values) for name, values in self.samples.items()},
+                           "timeouts": self.timeouts}, f)
+            os.replace(tmp_path, self.state_file)
+            return True
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить замеры ожиданий: {str(e)}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+
+# Общие бюджеты процесса: сценарии браузера вызывают wait_budget.wait(driver, "имя", условие)
+wait_budget = WaitBudget()
+atexit.register(wait_budget.flush)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Сравнение бэкендов браузера на одном и том же асинхронном сценарии проверки (automation/flows.py):
+# CDP, Selenium (текущий стек заданий) и Playwright.
+# Задания check_job и book_job целиком замеряет benchmarks/bench_flows.py.
+#
+# Запуск:
+#   python benchmarks/bench_backends.py --backends cdp selenium playwright --runs 3
+#
+# Для каждого бэкенда выводится время этапов (медиана и максимум) и пиковая
+# память дерева процессов (Python + драйвер + браузер).
+
+import os
+import sys
+import json
+import asyncio
+import argparse
+import statistics
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BOT_DIR, "automation"))
+
+from backends import get_backend
+from flows import run_check_flow
+from memory_watchdog import get_process_tree_rss
+
+
+async def sample_memory(peak, interval=0.5):
+    """Фоново замеряет RSS текущего процесса и его потомков, сохраняя максимум."""
+    while True:
+        rss, _ = get_process_tree_rss(os.getpid())
+        peak[0] = max(peak[0], rss)
+        await asyncio.sleep(interval)
+
+
+async def bench_backend(name, runs, headless):
+    """Прогоняет сценарий проверки runs раз на бэкенде name."""
+    results = []
+    for run in range(1, runs + 1):
+        peak = [0]
+        sampler = asyncio.create_task(sample_memory(peak))
+        try:
+            result = await run_check_flow(get_backend(name, headless=headless))
+        finally:
+            sampler.cancel()
+        result["peak_rss_mb"] = peak[0] / (1024 * 1024)
+        results.append(result)
+        status = "ok" if result["success"] else f"ошибка: {result['error']}"
+        print(f"[{name}] прогон {run}/{runs}: {status}, пик памяти {result['peak_rss_mb']:.0f} МБ")
+    return results
+
+
+def summarize(name, results):
+    """Печатает сводку по этапам для одного бэкенда."""
+    stages = []
+    for result in results:
+        for stage in result["timings"]:
+            if stage not in stages:
+                stages.append(stage)
+
+    print(f"\n=== {name} ===")
+    print(f"{'этап':<10} {'медиана, с':>11} {'максимум, с':>12}")
+    for stage in stages:
+        values = [result["timings"][stage] for result in results if stage in result["timings"]]
+        print(f"{stage:<10} {statistics.median(values):>11.2f} {max(values):>12.2f}")
+    totals = [sum(result["timings"].values()) for result in results]
+    print(f"{'всего':<10} {statistics.median(totals):>11.2f} {max(totals):>12.2f}")
+    print(f"успешных прогонов: {sum(1 for r in results if r['success'])}/{len(results)}, "
+          f"пик памяти: {max(r['peak_rss_mb'] for r in results):.0f} МБ")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Сравнение бэкендов браузера на сценарии проверки")
+    parser.add_argument("--backends", nargs="+", default=["cdp", "selenium", "playwright"])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--headless", action="store_true", help="Только для локальных стендов: VFS блокирует headless")
+    parser.add_argument("--json", help="Сохранить сырые результаты в файл")
+    args = parser.parse_args()
+
+    all_results = {}
+    for name in args.backends:
+        all_results[name] = await bench_backend(name, args.runs, args.headless)
+    for name, results in all_results.items():
+        summarize(name, results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(all_results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
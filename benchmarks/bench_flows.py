@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Сквозной замер заданий проверки и бронирования (automation/jobs.py) на локальном стенде
+# сайта (mocks/vfs_site.py) с проверкой на регрессии.
+#
+# Запуск:
+#   python benchmarks/bench_flows.py --runs 5 --headless                        # стенд в этом процессе
+#   python benchmarks/bench_flows.py --runs 5 --headless --save-baseline benchmarks/flows_baseline.json
+#   python benchmarks/bench_flows.py --runs 5 --headless --baseline benchmarks/flows_baseline.json
+#   python benchmarks/bench_flows.py --base-url http://127.0.0.1:8765/blr/ru/pol  # уже запущенный стенд
+#
+# Для каждого задания выводится время этапов (медиана, p90, максимум): запуск браузера,
+# этапы CheckFlow (login, form, calendar, date, booking) и закрытие. С --baseline медиана
+# этапа сравнивается с сохраненной: если она больше базовой на --tolerance (доля) и
+# --min-delta (секунды), или если прогон не удался, скрипт завершается с кодом 1.
+# Бюджеты ожиданий (wait_budget.py) берутся по умолчанию и не сохраняются, чтобы
+# замеры на стенде не смешивались с замерами живого сайта.
+
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import statistics
+import urllib.request
+from urllib.parse import urlsplit, urlencode
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BOT_DIR, "automation"))
+sys.path.insert(0, os.path.join(BOT_DIR, "mocks"))
+
+import vfs_site
+
+FLOWS = ("check", "book")
+
+
+class BenchPool:
+    """Источник драйверов для заданий: новый браузер на каждое задание, время запуска и закрытия замеряется."""
+
+    exclusive = False
+
+    def __init__(self, setup_driver, headless, timings, clock):
+        self.setup_driver = setup_driver
+        self.headless = headless
+        self.timings = timings
+        self.clock = clock
+
+    def acquire(self):
+        started = time.perf_counter()
+        driver = self.setup_driver(headless=self.headless)
+        self.timings["launch"] = time.perf_counter() - started
+        return driver
+
+    def release(self, driver, failed=False):
+        # Этап, выполнявшийся до закрытия, завершается здесь, чтобы закрытие не попало в его время
+        self.clock.stop()
+        started = time.perf_counter()
+        try:
+            driver.quit()
+        finally:
+            self.timings["close"] = time.perf_counter() - started
+
+
+class StageClock:
+    """Функция progress для заданий: время этапа - от его начала до начала следующего."""
+
+    def __init__(self, timings):
+        self.timings = timings
+        self.current = None
+        self.started = None
+
+    def __call__(self, stage, detail=None):
+        self.stop()
+        self.current = stage
+        self.started = time.perf_counter()
+
+    def stop(self):
+        if self.current is not None:
+            # Повтор этапа (check_flow.STAGE_RETRIES) добавляется к его времени
+            self.timings[self.current] = self.timings.get(self.current, 0.0) + time.perf_counter() - self.started
+            self.current = None
+
+
+def set_scenario(server, base_url, scenario):
+    """Включает сценарий календаря на стенде: напрямую или через /__mock."""
+    if server is not None:
+        server.settings.update({"scenario": scenario})
+        return
+    parts = urlsplit(base_url)
+    with urllib.request.urlopen(f"{parts.scheme}://{parts.netloc}/__mock?{urlencode({'scenario': scenario})}",
+                                timeout=10) as response:
+        response.read()
+
+
+def run_flow(flow, setup_driver, headless):
+    """
+    Выполняет одно задание на новом браузере.
+
+    Returns:
+        dict: success, error и timings (секунды по этапам и total)
+    """
+    from jobs import check_job, book_job
+
+    timings = {}
+    clock = StageClock(timings)
+    pool = BenchPool(setup_driver, headless, timings, clock)
+    started = time.perf_counter()
+    try:
+        if flow == "check":
+            result = check_job(pool, clock)
+            success = result["success"] and bool(result.get("dates"))
+        else:
+            result = book_job(pool, clock)
+            success = result["success"]
+    except Exception as e:
+        result = {"error": str(e)}
+        success = False
+    clock.stop()
+    timings["total"] = time.perf_counter() - started
+    return {"success": success, "error": None if success else result.get("error") or result.get("reason"),
+            "timings": timings}
+
+
+def summarize(results):
+    """
+    Сводка по этапам одного задания.
+
+    Returns:
+        dict: этап -> {"median", "p90", "max"} в порядке выполнения этапов
+    """
+    stages = []
+    for result in results:
+        for stage in result["timings"]:
+            if stage not in stages:
+                stages.append(stage)
+
+    summary = {}
+    for stage in stages:
+        values = sorted(result["timings"][stage] for result in results if stage in result["timings"])
+        summary[stage] = {"median": statistics.median(values),
+                          "p90": values[math.ceil(0.9 * len(values)) - 1],
+                          "max": values[-1]}
+    return summary
+
+
+def print_summary(flow, summary, results):
+    print(f"\n=== {flow} ===")
+    print(f"{'этап':<10} {'медиана, с':>11} {'p90, с':>8} {'максимум, с':>12}")
+    for stage, values in summary.items():
+        print(f"{stage:<10} {values['median']:>11.2f} {values['p90']:>8.2f} {values['max']:>12.2f}")
+    print(f"успешных прогонов: {sum(1 for result in results if result['success'])}/{len(results)}")
+
+
+def find_regressions(summaries, baseline, tolerance, min_delta):
+    """
+    Сравнивает медианы этапов с базовыми.
+
+    Returns:
+        list: Строки с описанием регрессий
+    """
+    regressions = []
+    for flow, summary in summaries.items():
+        for stage, values in summary.items():
+            base = baseline.get("flows", {}).get(flow, {}).get(stage)
+            if not base:
+                continue
+            limit = base["median"] * (1 + tolerance) + min_delta
+            if values["median"] > limit:
+                regressions.append(f"{flow}.{stage}: медиана {values['median']:.2f} с > {limit:.2f} с "
+                                   f"(база {base['median']:.2f} с)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сквозной замер заданий на локальном стенде сайта")
+    parser.add_argument("--flows", nargs="+", choices=FLOWS, default=list(FLOWS))
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--headless", action="store_true", help="Браузер без окна")
+    parser.add_argument("--base-url", help="Адрес уже запущенного стенда; по умолчанию стенд поднимается здесь")
+    parser.add_argument("--latency", type=float, default=0.0, help="Задержка ответа стенда, секунды")
+    parser.add_argument("--ui-delay", type=float, default=0.3, help="Задержка отрисовки на стенде, секунды")
+    parser.add_argument("--baseline", help="Файл с базовыми результатами для проверки регрессий")
+    parser.add_argument("--save-baseline", help="Сохранить результаты как базовые")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Допустимый рост медианы этапа, доля")
+    parser.add_argument("--min-delta", type=float, default=0.5, help="Допустимый рост медианы этапа, секунды")
+    parser.add_argument("--json", help="Сохранить сырые результаты в файл")
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.base_url
+    if not base_url:
+        server = vfs_site.start_in_thread(latency=args.latency, ui_delay=args.ui_delay)
+        base_url = server.base_url
+        print(f"Стенд VFS: {base_url}")
+
+    # Адрес сайта и учетные данные читаются при импорте модулей automation/.
+    # Настоящие учетные данные из .env стенду не отправляются.
+    os.environ["VFS_BASE_URL"] = base_url
+    os.environ["VFS_EMAIL"] = "bench@example.com"
+    os.environ["VFS_PASSWORD"] = "bench-password"
+
+    from log_setup import setup_logging
+    from browser import setup_driver
+    from wait_budget import wait_budget
+    setup_logging()
+    wait_budget.state_file = None
+    for samples in wait_budget.samples.values():
+        samples.clear()
+
+    all_results = {}
+    summaries = {}
+    failed = []
+    try:
+        for flow in args.flows:
+            set_scenario(server, base_url, "available")
+            results = []
+            for run in range(1, args.runs + 1):
+                result = run_flow(flow, setup_driver, args.headless)
+                results.append(result)
+                status = "ok" if result["success"] else f"ошибка: {result['error']}"
+                print(f"[{flow}] прогон {run}/{args.runs}: {status}, {result['timings']['total']:.1f} с")
+                if not result["success"]:
+                    failed.append(f"{flow} #{run}: {result['error']}")
+            all_results[flow] = results
+            summaries[flow] = summarize(results)
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    for flow, summary in summaries.items():
+        print_summary(flow, summary, all_results[flow])
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(all_results, f, ensure_ascii=False, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump({"runs": args.runs, "latency": args.latency, "ui_delay": args.ui_delay, "flows": summaries},
+                      f, ensure_ascii=False, indent=2)
+        print(f"\nБазовые результаты сохранены: {args.save_baseline}")
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = find_regressions(summaries, json.load(f), args.tolerance, args.min_delta)
+        print("\n=== Сравнение с базой ===")
+        print("\n".join(regressions) if regressions else "Регрессий нет")
+    if failed:
+        print("\nНеудачные прогоны:\n" + "\n".join(failed))
+    sys.exit(1 if regressions or failed else 0)
+
+
+if __name__ == "__main__":
+    main()
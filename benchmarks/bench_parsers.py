@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Проверка и замер разборщиков страниц (automation/page_parsers.py) без браузера.
+#
+# Запуск:
+#   python benchmarks/bench_parsers.py                          # logs/screenshots/*_source_*.html
+#   python benchmarks/bench_parsers.py saved/*.html --repeat 50
+#
+# Страницы стенда (mocks/vfs_site.py) разбираются и сверяются с известным ответом,
+# сохраненные страницы - разбираются обоими способами (lxml и html.parser), результаты
+# должны совпасть. Затем каждый способ прогоняется по всем страницам --repeat раз:
+# выводятся страниц в секунду, МБ/с и время разбора страницы (p50, p99).
+# При расхождениях скрипт завершается с кодом 1.
+
+import os
+import sys
+import glob
+import math
+import time
+import argparse
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BOT_DIR, "automation"))
+sys.path.insert(0, os.path.join(BOT_DIR, "mocks"))
+
+import vfs_site
+from page_parsers import LXML_AVAILABLE, parse_page
+
+DEFAULT_PATTERN = os.path.join(BOT_DIR, "logs", "screenshots", "*_source_*.html")
+
+
+def mock_fixtures():
+    """
+    Отрисованные страницы стенда и ожидаемые значения разбора.
+
+    Returns:
+        list: [(имя, HTML в байтах, {ключ parse_page: значение})]
+    """
+    settings = vfs_site.MockSettings(slots=5)
+    center = vfs_site.CENTERS[0]
+    label, days, _ = vfs_site.available_dates(settings, center)
+    title, content, times = vfs_site.calendar_page(settings, {"center": center})
+    first_date = sorted(times)[0]
+    menu = ('<div id="time-slots">' + "".join(f'<button type="button" class="time-slot">{slot}</button>'
+                                              for slot in times[first_date]) + "</div>")
+    fixtures = [
+        ("calendar", vfs_site.rendered_page(title, content),
+         {"calendar": True, "no_slots": None, "dates": [f"{day} {label}" for day in days], "time_menu": False}),
+        ("calendar_time_menu", vfs_site.rendered_page(title, content, menu),
+         {"calendar": True, "time_menu": True, "time_slots": times[first_date]}),
+    ]
+
+    settings.scenario = "none"
+    fixtures.append(("no_slots", vfs_site.rendered_page(*vfs_site.calendar_page(settings, {})[:2]),
+                     {"no_slots": vfs_site.NO_SLOTS_TEXT, "calendar": False, "dates": []}))
+    settings.scenario = "empty"
+    fixtures.append(("empty_calendar", vfs_site.rendered_page(*vfs_site.calendar_page(settings, {})[:2]),
+                     {"no_slots": None, "calendar": True, "dates": [], "labels": []}))
+    settings.scenario = "available"
+
+    query = {"date": first_date, "time": times[first_date][0], "center": center}
+    fixtures += [
+        ("login", vfs_site.rendered_page(*vfs_site.login_page(settings)[:2]),
+         {"no_slots": None, "calendar": False, "confirmation": None, "success": None}),
+        ("booking_form", vfs_site.rendered_page(*vfs_site.booking_form_page(settings, {})[:2]),
+         {"no_slots": None, "calendar": False, "continue_buttons": ["Продолжить"], "success": None}),
+        ("review", vfs_site.rendered_page(*vfs_site.review_page(settings, query)[:2]),
+         {"confirmation": "Подтверждение", "final_buttons": ["Подтвердить бронирование"]}),
+        ("confirmation", vfs_site.rendered_page(*vfs_site.confirmation_page(settings, {"code": "MOCK-1"})[:2]),
+         {"success": "Ваша запись подтверждена. Код бронирования: MOCK-1", "final_buttons": []}),
+    ]
+    return [(name, page.encode("utf-8"), expected) for name, page, expected in fixtures]
+
+
+def load_pages(patterns):
+    """Сохраненные страницы: [(имя файла, байты)]."""
+    paths = sorted({path for pattern in patterns for path in glob.glob(pattern) if os.path.isfile(path)})
+    pages = []
+    for path in paths:
+        with open(path, "rb") as f:
+            pages.append((os.path.basename(path), f.read()))
+    return pages
+
+
+def backends():
+    return ["lxml", "html.parser"] if LXML_AVAILABLE else ["html.parser"]
+
+
+def check(fixtures, saved):
+    """
+    Сверяет разбор с ожидаемым и способы разбора между собой.
+
+    Returns:
+        list: Строки с описанием расхождений
+    """
+    problems = []
+    for name, page, expected in fixtures:
+        for backend in backends():
+            result = parse_page(page, backend)
+            for key, value in expected.items():
+                if result[key] != value:
+                    problems.append(f"{name} [{backend}] {key}: {result[key]!r}, ожидалось {value!r}")
+    if LXML_AVAILABLE:
+        for name, page in saved:
+            lxml_result = parse_page(page, "lxml")
+            stdlib_result = parse_page(page, "html.parser")
+            for key in lxml_result:
+                if lxml_result[key] != stdlib_result[key]:
+                    problems.append(f"{name} {key}: lxml {lxml_result[key]!r}, html.parser {stdlib_result[key]!r}")
+    return problems
+
+
+def bench(pages, backend, repeat):
+    """
+    Разбирает все страницы repeat раз.
+
+    Returns:
+        dict: pages_per_second, mb_per_second, p50_us, p99_us
+    """
+    durations = []
+    size = sum(len(page) for page in pages) * repeat
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            page_started = time.perf_counter()
+            parse_page(page, backend)
+            durations.append(time.perf_counter() - page_started)
+    elapsed = time.perf_counter() - started
+    durations.sort()
+    return {
+        "pages_per_second": len(durations) / elapsed,
+        "mb_per_second": size / elapsed / (1024 * 1024),
+        "p50_us": durations[len(durations) // 2] * 1e6,
+        "p99_us": durations[math.ceil(0.99 * len(durations)) - 1] * 1e6,
+    }
+
+
+def describe(saved):
+    """Сколько сохраненных страниц какого вида (по результату разбора)."""
+    kinds = {}
+    for _, page in saved:
+        result = parse_page(page)
+        if result["no_slots"]:
+            kind = "нет слотов"
+        elif result["dates"] or result["labels"]:
+            kind = "календарь с датами"
+        elif result["calendar"]:
+            kind = "пустой календарь"
+        elif result["success"]:
+            kind = "бронь подтверждена"
+        elif result["confirmation"]:
+            kind = "подтверждение"
+        else:
+            kind = "прочие"
+        kinds[kind] = kinds.get(kind, 0) + 1
+    return kinds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка и замер разборщиков страниц")
+    parser.add_argument("paths", nargs="*", help=f"Файлы или шаблоны (по умолчанию {DEFAULT_PATTERN})")
+    parser.add_argument("--repeat", type=int, default=20, help="Сколько раз разобрать каждую страницу")
+    args = parser.parse_args()
+
+    fixtures = mock_fixtures()
+    saved = load_pages(args.paths or [DEFAULT_PATTERN])
+    print(f"Страниц стенда: {len(fixtures)}, сохраненных страниц: {len(saved)}"
+          f" ({sum(len(page) for _, page in saved) / (1024 * 1024):.1f} МБ)")
+    if saved:
+        print("Виды страниц: " + ", ".join(f"{kind} {count}" for kind, count in sorted(describe(saved).items())))
+    if not LXML_AVAILABLE:
+        print("lxml не установлен: замеряется только html.parser (pip install lxml)")
+
+    problems = check(fixtures, saved)
+    print("\n=== Проверка разбора ===")
+    print("\n".join(problems) if problems else "Расхождений нет")
+
+    pages = [page for _, page in saved] or [page for _, page, _ in fixtures]
+    print(f"\n=== Скорость ({'сохраненные страницы' if saved else 'страницы стенда'}, ×{args.repeat}) ===")
+    print(f"{'способ':<12} {'страниц/с':>10} {'МБ/с':>8} {'p50, мкс':>10} {'p99, мкс':>10}")
+    for backend in backends():
+        result = bench(pages, backend, args.repeat)
+        print(f"{backend:<12} {result['pages_per_second']:>10.0f} {result['mb_per_second']:>8.1f} "
+              f"{result['p50_us']:>10.0f} {result['p99_us']:>10.0f}")
+
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
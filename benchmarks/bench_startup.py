@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Замеры запуска бота (main.py): время импортов и время до первого ответа в Telegram.
+#
+# Запуск:
+#   python benchmarks/bench_startup.py
+#   python benchmarks/bench_startup.py --repeat 5 --top 25
+#   python benchmarks/bench_startup.py --no-preload        # AUTOMATION_PRELOAD=0
+#   python benchmarks/bench_startup.py --imports-only      # без запуска бота
+#
+# Импорты: "python -X importtime -c 'import main; main.load_automation()'" в отдельном
+# процессе. Импорты до строки main - то, что бот ждет до начала опроса; импорты
+# load_automation - модули автоматизации, которые загружаются в фоне после подключения
+# к Telegram. Выводятся итоги обеих частей, самые долгие модули по собственному
+# времени и сумма собственного времени по пакетам верхнего уровня.
+#
+# Запуск: бот стартует на заглушке Bot API (mocks/telegram_api.py) с SLOT_SOURCE=synthetic,
+# а /start уже ждет в очереди обновлений. От запуска процесса замеряются: первый
+# getUpdates, ответ на /start и конец загрузки модулей автоматизации (по логу бота).
+# С --repeat выводятся медианы.
+
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import statistics
+import threading
+import subprocess
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BOT_DIR, "mocks"))
+
+import telegram_api
+
+FAKE_TOKEN = "123456789:bench-token"
+START_USER_ID = 1_000_000
+
+# Строка лога main.load_automation
+AUTOMATION_LOADED_TEXT = "Модули автоматизации загружены"
+
+IMPORT_SCRIPT = "import main; main.load_automation()"
+
+
+def bot_env(**extra):
+    """Окружение бота без сайта, метрик и планировщика."""
+    return dict(os.environ,
+                TELEGRAM_BOT_TOKEN=FAKE_TOKEN,
+                SLOT_SOURCE="synthetic",
+                METRICS_PORT="0",
+                DAILY_CHECK_BUDGET="0",
+                NOTIFY_CHAT_IDS="",
+                TELEGRAM_UPDATE_MODE="polling",
+                **extra)
+
+
+def parse_importtime(output):
+    """
+    Разбирает вывод -X importtime.
+
+    Returns:
+        list: (имя, глубина, собственное время мкс, накопленное время мкс) в порядке вывода
+    """
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((name.strip(), depth, int(fields[0]), int(fields[1])))
+    return entries
+
+
+def split_phases(entries):
+    """Делит импорты на импорт main (вместе с ним) и загрузку автоматизации после него."""
+    for index, (name, depth, _, _) in enumerate(entries):
+        if name == "main" and depth == 0:
+            return entries[:index + 1], entries[index + 1:]
+    return entries, []
+
+
+def phase_summary(entries, top):
+    total = sum(cumulative for _, depth, _, cumulative in entries if depth == 0)
+    packages = {}
+    for name, _, own, _ in entries:
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + own
+    slowest = sorted(entries, key=lambda entry: entry[2], reverse=True)[:top]
+    return {
+        "total_ms": total / 1000,
+        "modules": len(entries),
+        "slowest": [{"name": name, "self_ms": own / 1000, "cumulative_ms": cumulative / 1000}
+                    for name, _, own, cumulative in slowest],
+        "packages": [{"name": name, "self_ms": own / 1000}
+                     for name, own in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]],
+    }
+
+
+def profile_imports(top):
+    """Один прогон -X importtime; None, если процесс завершился с ошибкой."""
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", IMPORT_SCRIPT], cwd=BOT_DIR,
+                               env=bot_env(), capture_output=True, text=True)
+    if completed.returncode != 0:
+        print(completed.stderr[-2000:])
+        return None
+    startup, automation = split_phases(parse_importtime(completed.stderr))
+    return {"startup": phase_summary(startup, top), "automation": phase_summary(automation, top)}
+
+
+class LogWatcher(threading.Thread):
+    """Читает вывод бота и отмечает время строки AUTOMATION_LOADED_TEXT."""
+
+    def __init__(self, stream, started, output=None):
+        super().__init__(daemon=True)
+        self.stream = stream
+        self.started = started
+        self.output = output
+        self.loaded = None
+
+    def run(self):
+        for line in iter(self.stream.readline, b""):
+            if self.loaded is None and AUTOMATION_LOADED_TEXT.encode("utf-8") in line:
+                self.loaded = time.perf_counter() - self.started
+            if self.output:
+                self.output.write(line)
+
+
+def measure_start(args):
+    """
+    Запускает бота и замеряет время от запуска процесса до первых событий.
+
+    Returns:
+        dict: ready_s (первый getUpdates), start_reply_s (ответ на /start),
+            automation_s (модули автоматизации загружены); None - не дождались
+    """
+    server = telegram_api.start_in_thread(global_rate=0, chat_rate=0)
+    state = server.state
+    replied = threading.Event()
+    reply_time = []
+
+    def on_call(call):
+        if call["method"] == "sendMessage" and call["chat_id"] == START_USER_ID and not replied.is_set():
+            reply_time.append(call["time"])
+            replied.set()
+
+    state.listeners.append(on_call)
+    state.push(telegram_api.message_update(START_USER_ID, "/start"))
+
+    env = bot_env(TELEGRAM_API_BASE_URL=server.base_url,
+                  AUTOMATION_PRELOAD="0" if args.no_preload else "1")
+    output = open(args.bot_output, "ab") if args.bot_output else None
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, os.path.join(BOT_DIR, "main.py")], cwd=BOT_DIR, env=env,
+                               stdout=subprocess.PIPE, stderr=subprocess.STDOUT, start_new_session=True)
+    watcher = LogWatcher(process.stdout, started, output)
+    watcher.start()
+
+    result = {"ready_s": None, "start_reply_s": None, "automation_s": None}
+    deadline = started + args.timeout
+    try:
+        while time.perf_counter() < deadline and process.poll() is None:
+            if result["ready_s"] is None and state.methods.get("getUpdates"):
+                result["ready_s"] = time.perf_counter() - started
+            if replied.is_set() and result["ready_s"] is not None and (args.no_preload or watcher.loaded):
+                break
+            time.sleep(0.005)
+        if reply_time:
+            result["start_reply_s"] = reply_time[0] - started
+    finally:
+        if process.poll() is None:
+            process.send_signal(signal.SIGINT)
+            try:
+                process.wait(30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        watcher.join(5)
+        if output:
+            output.close()
+        server.shutdown()
+        server.server_close()
+    result["automation_s"] = watcher.loaded
+    return result
+
+
+def median(values):
+    values = [value for value in values if value is not None]
+    return statistics.median(values) if values else None
+
+
+def print_phase(title, phase):
+    print(f"\n=== {title}: {phase['total_ms']:.0f} мс, модулей {phase['modules']} ===")
+    if not phase["modules"]:
+        return
+    print(f"{'модуль':<48} {'свое':>8} {'всего':>9}  (мс)")
+    for entry in phase["slowest"]:
+        print(f"{entry['name']:<48} {entry['self_ms']:>8.1f} {entry['cumulative_ms']:>9.1f}")
+    print(f"\n{'пакет':<48} {'свое':>8}  (мс)")
+    for entry in phase["packages"]:
+        print(f"{entry['name']:<48} {entry['self_ms']:>8.1f}")
+
+
+def format_seconds(value):
+    return "нет" if value is None else f"{value:.2f} с"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замеры запуска бота: импорты и время до первого ответа")
+    parser.add_argument("--repeat", type=int, default=3, help="Сколько прогонов (выводятся медианы)")
+    parser.add_argument("--top", type=int, default=15, help="Сколько модулей и пакетов выводить")
+    parser.add_argument("--imports-only", action="store_true", help="Только профиль импортов, без запуска бота")
+    parser.add_argument("--no-preload", action="store_true",
+                        help="AUTOMATION_PRELOAD=0: модули автоматизации не загружаются до первого задания")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Сколько ждать ответа на /start, секунды")
+    parser.add_argument("--bot-output", help="Файл для stdout/stderr бота (по умолчанию не сохраняется)")
+    parser.add_argument("--json", help="Сохранить сводку в файл")
+    args = parser.parse_args()
+
+    # Первый прогон прогревает кэш байткода и файлов; в замеры не входит
+    if profile_imports(args.top) is None:
+        print("Импорт main завершился с ошибкой")
+        sys.exit(1)
+    profiles = [profile_imports(args.top) for _ in range(args.repeat)]
+    if None in profiles:
+        sys.exit(1)
+    # Таблицы - из прогона с медианным временем импорта main
+    profiles.sort(key=lambda profile: profile["startup"]["total_ms"])
+    summary = {"imports": profiles[len(profiles) // 2]}
+    print_phase("Импорт main (до начала опроса)", summary["imports"]["startup"])
+    print_phase("load_automation (в фоне после запуска)", summary["imports"]["automation"])
+
+    failed = False
+    if not args.imports_only:
+        runs = [measure_start(args) for _ in range(args.repeat)]
+        summary["start"] = {key: median([run[key] for run in runs]) for key in runs[0]}
+        summary["start"]["runs"] = runs
+        start = summary["start"]
+        print(f"\n=== Запуск бота (медиана {args.repeat}, AUTOMATION_PRELOAD={0 if args.no_preload else 1}) ===")
+        print(f"Первый getUpdates:            {format_seconds(start['ready_s'])}")
+        print(f"Ответ на /start:              {format_seconds(start['start_reply_s'])}")
+        print(f"Модули автоматизации готовы:  {format_seconds(start['automation_s'])}")
+        failed = start["start_reply_s"] is None
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+    if failed:
+        print(f"\nБот не ответил на /start за {args.timeout:.0f} с")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
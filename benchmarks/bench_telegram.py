@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Нагрузочный прогон Telegram-слоя бота (main.py) на локальной заглушке Bot API
+# (mocks/telegram_api.py) без Telegram и без сайта.
+#
+# Запуск:
+#   python benchmarks/bench_telegram.py --users 1000 --concurrency 200
+#   python benchmarks/bench_telegram.py --global-rate 0 --chat-rate 0     # без лимитов: предел обработчиков
+#   python benchmarks/bench_telegram.py --mode webhook                    # обновления через webhook
+#   python benchmarks/bench_telegram.py --api-port 8081 --no-bot          # бот запущен отдельно
+#
+# Бот запускается отдельным процессом с TELEGRAM_API_BASE_URL на заглушку и источником
+# слотов SLOT_SOURCE=synthetic (automation/slot_sources.py); --mode webhook запускает его
+# с TELEGRAM_UPDATE_MODE=webhook, и заглушка доставляет обновления на слушатель бота
+# вместо ответа на getUpdates. Синтетические пользователи
+# проходят разговор /start -> тип визы -> город -> тип приглашения -> ФИО -> дата
+# рождения -> подтверждение, нажимая кнопки из клавиатур бота, а пачки /check
+# (--check-bursts по --burst-size пользователей) приходят одновременно с разговорами.
+# Следующий шаг пользователя отправляется, когда бот закончил ответ на предыдущий.
+#
+# Выводятся по шагам: время от обновления до первого ответа бота и до конца ответа
+# (p50, p99), отказы заглушки (429 - лимит частоты, 400) и таймауты; обновлений в секунду;
+# вызовы методов Bot API; RSS процесса бота (с процессами-исполнителями) до, в пике и
+# после прогона. Если бот завершился или шаг не дождался ответа за --step-timeout,
+# код выхода 1.
+
+import os
+import sys
+import json
+import time
+import random
+import signal
+import socket
+import asyncio
+import secrets
+import argparse
+import threading
+import subprocess
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BOT_DIR, "automation"))
+sys.path.insert(0, os.path.join(BOT_DIR, "mocks"))
+
+import telegram_api
+from telegram_api import percentile
+from memory_watchdog import get_process_tree_rss
+
+FAKE_TOKEN = "123456789:bench-token"
+
+# ID пользователей: разговоры и пачки /check не пересекаются
+CONVERSATION_USER_BASE = 1_000_000
+CHECK_USER_BASE = 2_000_000
+
+# Последнее сообщение обработчика /check (main.check_visa_slots)
+CHECK_DONE_TEXT = "Проверка завершена"
+
+STEPS = ("start", "visa_type", "city", "invitation", "full_name", "birthdate", "confirm", "check")
+
+
+def has_keyboard(call):
+    return bool((call["reply_markup"] or {}).get("inline_keyboard"))
+
+
+def is_edit(call):
+    return call["method"] == "editMessageText"
+
+
+def is_send(call):
+    return call["method"] == "sendMessage"
+
+
+def is_check_done(call):
+    return is_send(call) and CHECK_DONE_TEXT in (call["text"] or "")
+
+
+def buttons(call):
+    """callback_data кнопок клавиатуры из ответа бота."""
+    return [button["callback_data"] for row in (call["reply_markup"] or {}).get("inline_keyboard", [])
+            for button in row if "callback_data" in button]
+
+
+class Waiter:
+    """Ожидание ответа бота на шаг одного пользователя."""
+
+    def __init__(self, predicate, future):
+        self.predicate = predicate
+        self.future = future
+        self.first = None
+
+
+class TrafficGenerator:
+    """
+    Отправляет обновления синтетических пользователей в заглушку и ждет ответов бота.
+
+    Шаг завершается вызовом бота, подходящим под условие шага, или первым отказом
+    заглушки (429/400) в этом чате; время берется из записи вызова в заглушке.
+
+    Args:
+        state (telegram_api.FakeState): Состояние заглушки
+        step_timeout (float): Сколько ждать ответа на шаг, секунды
+    """
+
+    def __init__(self, state, step_timeout):
+        self.state = state
+        self.step_timeout = step_timeout
+        self.loop = None
+        self.waiters = {}
+        self.steps = {name: {"first": [], "done": [], "rejected": 0, "timeouts": 0} for name in STEPS}
+        self.conversations = {"done": 0, "aborted": 0}
+
+    def attach(self):
+        self.loop = asyncio.get_running_loop()
+        self.state.listeners.append(self.on_call)
+
+    def detach(self):
+        self.state.listeners.remove(self.on_call)
+
+    def on_call(self, call):
+        # Поток сервера заглушки
+        self.loop.call_soon_threadsafe(self._dispatch, call)
+
+    def _dispatch(self, call):
+        waiter = self.waiters.get(call["chat_id"])
+        if waiter is None or waiter.future.done():
+            return
+        if waiter.first is None:
+            waiter.first = call["time"]
+        if call["status"] != 200 or waiter.predicate(call):
+            waiter.future.set_result(call)
+
+    async def step(self, name, chat_id, update, predicate):
+        """
+        Отправляет обновление и ждет ответа бота.
+
+        Returns:
+            dict: Вызов, завершивший шаг (успешный), или None при отказе и таймауте
+        """
+        waiter = Waiter(predicate, self.loop.create_future())
+        self.waiters[chat_id] = waiter
+        stats = self.steps[name]
+        started = time.perf_counter()
+        self.state.push(update)
+        try:
+            call = await asyncio.wait_for(waiter.future, self.step_timeout)
+        except asyncio.TimeoutError:
+            stats["timeouts"] += 1
+            return None
+        finally:
+            del self.waiters[chat_id]
+
+        stats["first"].append(waiter.first - started)
+        stats["done"].append(call["time"] - started)
+        if call["status"] != 200:
+            stats["rejected"] += 1
+            return None
+        return call
+
+    async def conversation(self, user_id, rng, think_time):
+        """Разговор /start ... подтверждение одного пользователя; True, если бот ответил на все шаги."""
+        async def think():
+            if think_time:
+                await asyncio.sleep(rng.uniform(0, 2 * think_time))
+
+        def press(call, data=None):
+            return telegram_api.callback_update(user_id, data or rng.choice(buttons(call)), call)
+
+        call = await self.step("start", user_id, telegram_api.message_update(user_id, "/start"), has_keyboard)
+        for name, predicate in (("visa_type", has_keyboard), ("city", has_keyboard), ("invitation", is_edit)):
+            if call is None:
+                break
+            await think()
+            call = await self.step(name, user_id, press(call), predicate)
+        for name, text, predicate in (("full_name", f"IVANOV IVAN {user_id}", is_send),
+                                      ("birthdate", "01.01.1990", has_keyboard)):
+            if call is None:
+                break
+            await think()
+            call = await self.step(name, user_id, telegram_api.message_update(user_id, text), predicate)
+        if call is not None:
+            await think()
+            message_id = call["message_id"]
+            # Итог проверки приходит правкой отдельного сообщения о ходе проверки
+            call = await self.step("confirm", user_id, press(call, "confirm_yes"),
+                                   lambda reply: is_edit(reply) and reply["message_id"] != message_id)
+
+        self.conversations["done" if call is not None else "aborted"] += 1
+        return call is not None
+
+    async def check_burst(self, user_ids):
+        """Одновременные /check от всех user_ids."""
+        await asyncio.gather(*(self.step("check", user_id, telegram_api.message_update(user_id, "/check"),
+                                         is_check_done)
+                               for user_id in user_ids))
+
+
+class MemorySampler:
+    """Фоновый замер RSS процесса бота и его потомков."""
+
+    def __init__(self, pid, interval=0.5):
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        rss, _ = get_process_tree_rss(self.pid)
+        self.peak = max(self.peak, rss)
+        return rss
+
+    def start(self):
+        def run():
+            while not self._stop.wait(self.interval):
+                self.sample()
+        self._thread = threading.Thread(target=run, name="bench-memory", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_bot(base_url, args):
+    """Запускает main.py с адресом заглушки, режимом обновлений --mode и источником слотов без сайта."""
+    env = dict(os.environ,
+               TELEGRAM_BOT_TOKEN=FAKE_TOKEN,
+               TELEGRAM_API_BASE_URL=base_url,
+               SLOT_SOURCE=args.slot_source,
+               SLOT_SOURCE_LATENCY=str(args.check_latency),
+               SLOT_SYNTHETIC_SEED=str(args.seed),
+               METRICS_PORT="0",
+               DAILY_CHECK_BUDGET="0",
+               NOTIFY_CHAT_IDS="",
+               TELEGRAM_UPDATE_MODE=args.mode)
+    if args.mode == "webhook":
+        port = free_port()
+        env.update(WEBHOOK_URL=f"http://127.0.0.1:{port}/telegram", WEBHOOK_LISTEN="127.0.0.1",
+                   WEBHOOK_PORT=str(port), WEBHOOK_SECRET=secrets.token_urlsafe(16))
+    output = open(args.bot_output, "ab") if args.bot_output else subprocess.DEVNULL
+    return subprocess.Popen([sys.executable, os.path.join(BOT_DIR, "main.py")], cwd=BOT_DIR, env=env,
+                            stdout=output, stderr=subprocess.STDOUT, start_new_session=True)
+
+
+def wait_ready(server, process, timeout):
+    """
+    Ждет, пока бот начнет получать обновления: первый getUpdates или setWebhook.
+
+    Returns:
+        str: "webhook" или "polling"; None, если бот завершился или не успел
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.state.webhook:
+            return "webhook"
+        if server.state.methods.get("getUpdates"):
+            return "polling"
+        if process is not None and process.poll() is not None:
+            return None
+        time.sleep(0.1)
+    return None
+
+
+def stop_bot(process, timeout=30):
+    """Останавливает бота как Ctrl+C (post_shutdown выполняется), при зависании - kill."""
+    if process.poll() is not None:
+        return
+    process.send_signal(signal.SIGINT)
+    try:
+        process.wait(timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+async def run_traffic(generator, args):
+    generator.attach()
+    rng = random.Random(args.seed)
+    slots = asyncio.Semaphore(args.concurrency)
+
+    async def user(number):
+        async with slots:
+            await generator.conversation(CONVERSATION_USER_BASE + number, rng, args.think_time)
+
+    async def bursts():
+        user_ids = [CHECK_USER_BASE + number for number in range(args.burst_size)]
+        for burst in range(args.check_bursts):
+            if burst:
+                await asyncio.sleep(args.burst_interval)
+            await generator.check_burst(user_ids)
+
+    try:
+        await asyncio.gather(bursts(), *(user(number) for number in range(args.users)))
+    finally:
+        # Запоздавшие ответы бота приходят и после прогона
+        generator.detach()
+
+
+def summarize(generator, elapsed, stats, memory):
+    """
+    Сводка прогона.
+
+    Returns:
+        dict: steps (шаг -> счетчики и перцентили, мс), updates, throughput, api, memory
+    """
+    steps = {}
+    for name, values in generator.steps.items():
+        first, done = sorted(values["first"]), sorted(values["done"])
+        if not done and not values["timeouts"]:
+            continue
+        steps[name] = {"count": len(done) + values["timeouts"], "rejected": values["rejected"],
+                       "timeouts": values["timeouts"],
+                       "first_p50_ms": (percentile(first, 0.5) or 0) * 1000,
+                       "first_p99_ms": (percentile(first, 0.99) or 0) * 1000,
+                       "done_p50_ms": (percentile(done, 0.5) or 0) * 1000,
+                       "done_p99_ms": (percentile(done, 0.99) or 0) * 1000}
+    answered = sum(len(values["done"]) for values in generator.steps.values())
+    return {
+        "steps": steps,
+        "conversations": dict(generator.conversations),
+        "elapsed": elapsed,
+        "updates": stats["updates"]["pushed"],
+        "updates_per_second": stats["updates"]["pushed"] / elapsed if elapsed else 0,
+        "answered_per_second": answered / elapsed if elapsed else 0,
+        "api": {"methods": stats["methods"], "errors": stats["errors"]},
+        "memory": memory,
+    }
+
+
+def print_summary(summary):
+    print(f"\n=== Шаги ===")
+    print(f"{'шаг':<11} {'число':>6} {'429/400':>8} {'таймауты':>9} "
+          f"{'1-й ответ p50':>14} {'p99':>8} {'ответ p50':>10} {'p99':>8}  (мс)")
+    for name, values in summary["steps"].items():
+        print(f"{name:<11} {values['count']:>6} {values['rejected']:>8} {values['timeouts']:>9} "
+              f"{values['first_p50_ms']:>14.1f} {values['first_p99_ms']:>8.1f} "
+              f"{values['done_p50_ms']:>10.1f} {values['done_p99_ms']:>8.1f}")
+
+    conversations = summary["conversations"]
+    print(f"\nРазговоров до конца: {conversations['done']}/{conversations['done'] + conversations['aborted']}")
+    print(f"Обновлений ({summary['mode']}): {summary['updates']} за {summary['elapsed']:.1f} с — "
+          f"{summary['updates_per_second']:.0f} обновлений/с, {summary['answered_per_second']:.0f} ответов/с")
+    print("Вызовы Bot API: " + ", ".join(f"{method} {count}"
+                                         for method, count in sorted(summary["api"]["methods"].items())))
+    if summary["api"]["errors"]:
+        print("Отказы заглушки: " + ", ".join(f"{status}: {count}"
+                                             for status, count in sorted(summary["api"]["errors"].items())))
+
+    memory = summary["memory"]
+    if memory:
+        mb = 1024 * 1024
+        print(f"RSS бота: до {memory['before'] / mb:.1f} МБ, пик {memory['peak'] / mb:.1f} МБ, "
+              f"после {memory['after'] / mb:.1f} МБ (рост {memory['growth'] / mb:+.1f} МБ, "
+              f"{memory['growth_per_1000_users'] / 1024:+.0f} КБ на 1000 пользователей)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон Telegram-слоя бота на заглушке Bot API")
+    parser.add_argument("--users", type=int, default=1000, help="Сколько пользователей проходят разговор /start")
+    parser.add_argument("--concurrency", type=int, default=200, help="Сколько разговоров идут одновременно")
+    parser.add_argument("--think-time", type=float, default=1.0,
+                        help="Средняя пауза пользователя между шагами, секунды (0 - без пауз)")
+    parser.add_argument("--check-bursts", type=int, default=3, help="Сколько пачек /check")
+    parser.add_argument("--burst-size", type=int, default=300, help="Пользователей в пачке /check")
+    parser.add_argument("--burst-interval", type=float, default=5.0, help="Пауза между пачками /check, секунды")
+    parser.add_argument("--step-timeout", type=float, default=30.0, help="Сколько ждать ответа на шаг, секунды")
+    parser.add_argument("--mode", choices=("polling", "webhook"), default="polling",
+                        help="TELEGRAM_UPDATE_MODE бота: опрос getUpdates или webhook")
+    parser.add_argument("--slot-source", default="synthetic", help="SLOT_SOURCE бота (synthetic, replay, mock)")
+    parser.add_argument("--check-latency", type=float, default=0.0, help="SLOT_SOURCE_LATENCY бота, секунды")
+    parser.add_argument("--global-rate", type=float, default=30.0, help="Лимит сообщений в секунду на все чаты (0 - нет)")
+    parser.add_argument("--global-burst", type=int, default=30)
+    parser.add_argument("--chat-rate", type=float, default=1.0, help="Лимит сообщений в секунду в чат (0 - нет)")
+    parser.add_argument("--chat-burst", type=int, default=3)
+    parser.add_argument("--api-latency", type=float, default=0.0, help="Задержка ответа заглушки, секунды")
+    parser.add_argument("--api-port", type=int, default=0, help="Порт заглушки (0 - любой свободный)")
+    parser.add_argument("--no-bot", action="store_true", help="Не запускать бота: он запущен отдельно на --api-port")
+    parser.add_argument("--bot-output", help="Файл для stdout/stderr бота (по умолчанию не сохраняется)")
+    parser.add_argument("--ready-timeout", type=float, default=60.0, help="Сколько ждать начала опроса, секунды")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Сохранить сводку в файл")
+    args = parser.parse_args()
+
+    server = telegram_api.start_in_thread(port=args.api_port, global_rate=args.global_rate,
+                                          global_burst=args.global_burst, chat_rate=args.chat_rate,
+                                          chat_burst=args.chat_burst, latency=args.api_latency)
+    print(f"Заглушка Bot API: {server.base_url}")
+
+    process = None
+    if args.no_bot:
+        print(f"Ожидаю бота с TELEGRAM_API_BASE_URL={server.base_url}")
+    else:
+        process = start_bot(server.base_url, args)
+        print(f"Бот запущен (PID {process.pid}), SLOT_SOURCE={args.slot_source}")
+
+    sampler = None
+    summary = None
+    try:
+        started = time.perf_counter()
+        mode = wait_ready(server, process, args.ready_timeout)
+        if mode is None:
+            print("Бот не начал получать обновления" + (f" (код выхода {process.returncode})"
+                                                        if process is not None and process.returncode is not None
+                                                        else ""))
+            sys.exit(1)
+        print(f"Бот готов за {time.perf_counter() - started:.1f} с, обновления: {mode}")
+        if mode != args.mode and not args.no_bot:
+            print(f"Внимание: запрошен режим {args.mode}, бот работает в режиме {mode} (см. лог бота)")
+
+        if process is not None:
+            sampler = MemorySampler(process.pid)
+            before = sampler.sample()
+            sampler.start()
+
+        generator = TrafficGenerator(server.state, args.step_timeout)
+        started = time.perf_counter()
+        asyncio.run(run_traffic(generator, args))
+        elapsed = time.perf_counter() - started
+
+        memory = None
+        if sampler is not None:
+            sampler.stop()
+            after = sampler.sample()
+            users = args.users + (args.burst_size if args.check_bursts else 0)
+            memory = {"before": before, "peak": sampler.peak, "after": after, "growth": after - before,
+                      "growth_per_1000_users": (after - before) / users * 1000 if users else 0}
+        summary = summarize(generator, elapsed, server.state.stats(), memory)
+        summary["mode"] = mode
+    finally:
+        crashed = process is not None and process.poll() is not None
+        if process is not None:
+            stop_bot(process)
+        server.shutdown()
+        server.server_close()
+
+    print_summary(summary)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+    timeouts = sum(values["timeouts"] for values in summary["steps"].values())
+    if crashed:
+        print(f"\nБот завершился во время прогона (код выхода {process.returncode})")
+    if timeouts:
+        print(f"\nШагов без ответа за {args.step_timeout:.0f} с: {timeouts}")
+    sys.exit(1 if crashed or timeouts else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,20 @@ load_dotenv()
 
 # Настройки Telegram бота
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+# Адрес Bot API без токена: пусто - api.telegram.org; для прогонов - локальный
+# сервер Bot API или заглушка mocks/telegram_api.py (http://127.0.0.1:8081/bot)
+TELEGRAM_API_BASE_URL = os.getenv("TELEGRAM_API_BASE_URL")
+
+# Получение обновлений: "polling" - долгий опрос getUpdates, "webhook" - Telegram
+# присылает обновления на WEBHOOK_URL, бот слушает HTTP на WEBHOOK_LISTEN:WEBHOOK_PORT
+# (TLS - на обратном прокси перед ботом)
+TELEGRAM_UPDATE_MODE = os.getenv("TELEGRAM_UPDATE_MODE", "polling")
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")  # Публичный адрес, на который Telegram отправляет обновления
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "127.0.0.1")  # Адрес локального слушателя
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))  # Порт локального слушателя
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH")  # Путь у слушателя; по умолчанию - путь из WEBHOOK_URL
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")  # Секрет заголовка X-Telegram-Bot-Api-Secret-Token; пусто - случайный
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))  # Одновременных доставок от Telegram
 
 # Настройки для VFS Global
 VFS_EMAIL = os.getenv("VFS_EMAIL")
@@ -19,6 +33,34 @@ VISA_TYPE = os.getenv("VISA_TYPE", "Шенген виза")
 # Настройки для проверки слотов
 CHECK_INTERVAL = int(os.getenv("CHECK_INTERVAL", "60"))  # Интервал между проверками в минутах
 MAX_DATES_TO_SHOW = int(os.getenv("MAX_DATES_TO_SHOW", "5"))  # Максимальное количество дат для отображения
+# Города для /check_cities через запятую (проверяются в одной сессии); пусто - все города из CITIES в main.py
+CHECK_CITIES = [city.strip() for city in os.getenv("CHECK_CITIES", "").split(",") if city.strip()]
+
+# Пользователи с доступом к служебным командам (/stats)
+ADMIN_IDS = [int(user_id) for user_id in os.getenv("ADMIN_IDS", "").split(",") if user_id.strip()]
+
+# Чаты, которым планировщик (automation/check_scheduler.py) сообщает о найденных датах
+NOTIFY_CHAT_IDS = [int(chat_id) for chat_id in os.getenv("NOTIFY_CHAT_IDS", "").split(",") if chat_id.strip()]
+
+# Режим работы браузера: "process" - отдельный Chrome на драйвер,
+# "contexts" - изолированные контексты внутри одного общего Chrome
+BROWSER_MODE = os.getenv("BROWSER_MODE", "process")
+
+# Режим автоматизации проверки: "sync" - Selenium в потоках,
+# "async" - Chrome DevTools Protocol прямо на event loop бота (automation/cdp_backend.py)
+AUTOMATION_MODE = os.getenv("AUTOMATION_MODE", "sync")
+
+# Где выполняются задания браузера в режиме sync: "process" - в процессах-исполнителях
+# с жестким лимитом времени (automation/supervisor.py), "thread" - в потоках бота
+JOB_ISOLATION = os.getenv("JOB_ISOLATION", "process")
+
+# Загружать модули автоматизации (Selenium, задания браузера) в фоне сразу после запуска бота:
+# "1" - первая проверка не ждет импорта, "0" - только перед первым заданием
+AUTOMATION_PRELOAD = os.getenv("AUTOMATION_PRELOAD", "1") == "1"
+
+# Источник результатов проверки слотов (automation/slot_sources.py): "live" - сайт,
+# "mock" - локальный стенд по HTTP, "replay" - записанная история, "synthetic" - случайные
+SLOT_SOURCE = os.getenv("SLOT_SOURCE", "live")
 
 # Данные пользователя KANOPLICH NADZEYA
 USER_FIRST_NAME = "NADZEYA"
@@ -6,8 +6,12 @@ import logging
 import datetime
 import time
 import json
+import asyncio
 import shutil
-from threading import Thread
+import socket
+import secrets
+from threading import Thread, Lock
+from urllib.parse import urlsplit
 from dotenv import load_dotenv
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
@@ -23,32 +27,15 @@ from telegram.ext import (
 # Импортируем конфигурационные данные
 import config
 
-# Попытка импорта Selenium для веб-автоматизации
-try:
-    from selenium import webdriver
-    from selenium.webdriver.common.by import By
-    from selenium.webdriver.support.ui import WebDriverWait
-    from selenium.webdriver.support import expected_conditions as EC
-    from selenium.common.exceptions import TimeoutException, NoSuchElementException
-    SELENIUM_AVAILABLE = True
-except ImportError:
-    SELENIUM_AVAILABLE = False
-    logging.warning("Selenium не установлен. Функции автоматизации браузера не будут работать.")
-
-# Попытка импорта модулей автоматизации
-try:
-    import sys
-    automation_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "automation")
-    if automation_dir not in sys.path:
-        sys.path.append(automation_dir)
-    from browser import setup_driver, login_vfs_global, start_new_appointment, check_available_dates
-    from date_selector import select_available_date, complete_booking
-    AUTOMATION_AVAILABLE = True
-except ImportError as e:
-    AUTOMATION_AVAILABLE = False
-    logging.warning(f"Не удалось импортировать модули автоматизации: {str(e)}")
-
-# Настройка логирования
+# Модули автоматизации импортируются из automation/ без пакета
+import sys
+automation_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "automation")
+if automation_dir not in sys.path:
+    sys.path.append(automation_dir)
+
+# Настройка логирования: до остальных импортов, чтобы их предупреждения попали в файлы
+from log_setup import setup_logging
+
 log_dir = os.path.dirname(os.path.abspath(__file__))
 log_file = os.path.join(log_dir, "visa_bot.log")
 
@@ -59,16 +46,20 @@ try:
 except:
     log_file = "/tmp/visa_bot.log"
 
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO,
-    handlers=[
-        logging.FileHandler(log_file),
-        logging.StreamHandler()
-    ]
-)
+setup_logging(main_file=log_file)
 logger = logging.getLogger(__name__)
 
+# Предохранитель общий для всех заданий, обращающихся к сайту, и не зависит от Selenium
+from circuit_breaker import CircuitBreaker
+# Планировщик проверок и история появления слотов тоже работают без Selenium
+from check_scheduler import DAILY_CHECK_BUDGET, plan_day
+from history_store import history, HistoryStore, LOGS_DIR
+# Источник результатов проверки: сайт, стенд, записанная история или случайные (SLOT_SOURCE)
+from slot_sources import create_slot_source
+# Метрики этапов и обработчиков: HTTP в формате Prometheus и команда /stats
+import metrics
+from metrics import timed_handler
+
 # Загрузка переменных окружения
 load_dotenv()
 TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
@@ -80,6 +71,95 @@ TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 # Глобальные данные пользователей
 user_data_global = {}
 
+# Модули автоматизации (Selenium, задания браузера, исполнители, CDP) импортируются не при
+# запуске, а в фоне после подключения к Telegram (AUTOMATION_PRELOAD) или перед первым
+# заданием: бот отвечает на /start, пока они загружаются (load_automation)
+AUTOMATION_AVAILABLE = False
+ASYNC_AUTOMATION_AVAILABLE = False
+automation_loaded = False
+automation_lock = Lock()
+JOBS = None
+hot_sessions = None
+WaitBudget = None
+wait_budget = None
+
+# Задания браузера (jobs.py) по умолчанию выполняются в процессах-исполнителях с жестким
+# лимитом времени (JOB_ISOLATION=process). В режиме "thread" - в потоках бота, как раньше:
+# драйвер переиспользуется между проверками и пересоздается по лимитам памяти/сессий,
+# а в режиме BROWSER_MODE=contexts задания получают контексты внутри одного общего Chrome.
+job_supervisor = None
+driver_recycler = None
+
+# Если сайт деградировал (капча, таймауты), задания не запускаются до следующей пробы
+site_breaker = CircuitBreaker()
+
+# В режиме AUTOMATION_MODE=async проверки выполняются прямо на event loop бота через CDP
+async_sessions = None
+
+def load_automation():
+    """
+    Импортирует модули автоматизации и создает исполнителей заданий (один раз).
+
+    Вызывается из потока (ensure_automation), чтобы импорт Selenium не останавливал
+    event loop; повторные и параллельные вызовы ждут первой загрузки.
+
+    Returns:
+        bool: Доступны ли задания браузера
+    """
+    global AUTOMATION_AVAILABLE, ASYNC_AUTOMATION_AVAILABLE, automation_loaded
+    global JOBS, hot_sessions, WaitBudget, wait_budget, job_supervisor, driver_recycler, async_sessions
+
+    with automation_lock:
+        if automation_loaded:
+            return AUTOMATION_AVAILABLE
+
+        started = time.monotonic()
+        try:
+            from jobs import JOBS, create_driver_pool, hot_sessions
+            from supervisor import JobSupervisor
+            from wait_budget import WaitBudget, wait_budget
+            AUTOMATION_AVAILABLE = True
+        except ImportError as e:
+            logger.warning(f"Не удалось импортировать модули автоматизации: {str(e)}")
+
+        # Асинхронный режим автоматизации (CDP поверх websockets) не требует Selenium
+        try:
+            from cdp_backend import AsyncSessionManager
+            ASYNC_AUTOMATION_AVAILABLE = True
+        except ImportError as e:
+            if config.AUTOMATION_MODE == "async":
+                logger.warning(f"Асинхронный режим автоматизации недоступен: {str(e)}")
+
+        if AUTOMATION_AVAILABLE and config.JOB_ISOLATION == "process":
+            job_supervisor = JobSupervisor(browser_mode=config.BROWSER_MODE)
+        elif AUTOMATION_AVAILABLE:
+            driver_recycler = create_driver_pool(config.BROWSER_MODE)
+            # Фоновые замеры памяти браузеров (в режиме process их ведут исполнители)
+            driver_recycler.watchdog.start()
+
+        if ASYNC_AUTOMATION_AVAILABLE and config.AUTOMATION_MODE == "async":
+            async_sessions = AsyncSessionManager()
+
+        automation_loaded = True
+        logger.info(f"Модули автоматизации загружены за {time.monotonic() - started:.2f} с")
+        return AUTOMATION_AVAILABLE
+
+async def ensure_automation():
+    """Дожидается загрузки модулей автоматизации, не останавливая event loop."""
+    if not automation_loaded:
+        await asyncio.to_thread(load_automation)
+
+# Сообщения о ходе заданий по этапам (jobs.py и flows.run_check_flow)
+STAGE_MESSAGES = {
+    "login": "🔐 Выполняю вход в VFS Global...",
+    "form": "📝 Заполняю форму заявки...",
+    "calendar": "📅 Проверяю доступные даты...",
+    "city": "🏙 Проверяю визовый центр в городе {detail}...",
+    "hot": "⚡️ Продолжаю открытую сессию с календарем...",
+    "date": "🎉 Найдены доступные даты! Пытаюсь выбрать и забронировать слот...",
+    "booking": "✅ {detail}\n\nЗавершаю процесс бронирования...",
+}
+
 # Опции для выбора
 VISA_TYPES = ["Туристическая виза", "Рабочая виза", "Национальная виза", "Шенген виза"]
 CITIES = ["Минск", "Брест", "Гродно", "Могилев", "Витебск", "Гомель"]
@@ -93,6 +173,7 @@ def create_menu_keyboard(options):
     return InlineKeyboardMarkup(keyboard)
 
 # Команда /start
+@timed_handler
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     user = update.message.from_user
     logger.info(f"Пользователь {user.username} ({user.id}) запустил бота")
@@ -119,6 +200,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     return CHOOSE_VISA_TYPE
 
 # Обработчик выбора типа визы
+@timed_handler
 async def visa_type_selected(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer()
@@ -141,6 +223,7 @@ async def visa_type_selected(update: Update, context: ContextTypes.DEFAULT_TYPE)
     return CHOOSE_CITY
 
 # Обработчик выбора города
+@timed_handler
 async def city_selected(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer()
@@ -163,6 +246,7 @@ async def city_selected(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
     return CHOOSE_INVITATION
 
 # Обработчик выбора типа приглашения
+@timed_handler
 async def invitation_selected(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer()
@@ -183,6 +267,7 @@ async def invitation_selected(update: Update, context: ContextTypes.DEFAULT_TYPE
     return ENTER_FULL_NAME
 
 # Обработчик ввода ФИО
+@timed_handler
 async def full_name_entered(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     user_id = update.effective_user.id
     full_name = update.message.text
@@ -198,6 +283,7 @@ async def full_name_entered(update: Update, context: ContextTypes.DEFAULT_TYPE)
     return ENTER_BIRTHDATE
 
 # Обработчик ввода даты рождения
+@timed_handler
 async def birthdate_entered(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     user_id = update.effective_user.id
     birthdate = update.message.text
@@ -234,6 +320,7 @@ async def birthdate_entered(update: Update, context: ContextTypes.DEFAULT_TYPE)
     return CONFIRMATION
 
 # Обработчик подтверждения данных
+@timed_handler
 async def confirmation_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer()
@@ -251,61 +338,66 @@ async def confirmation_handler(update: Update, context: ContextTypes.DEFAULT_TYP
             parse_mode='Markdown'
         )
         
-        # Запускаем поиск слотов в отдельном потоке
         progress_message = await context.bot.send_message(
             chat_id=query.message.chat_id,
-            text="⏳ Проверяю доступность слотов... (0%)"
+            text="⏳ Проверяю доступность слотов..."
         )
         
-        # Имитация прогресса (в реальном приложении здесь будет реальная проверка)
-        for progress in range(10, 101, 10):
-            await asyncio.sleep(1)  # Имитация задержки
+        # Проверяем слоты для выбранных пользователем города и типа визы
+        city = user_data_global.get(user_id, {}).get('city', config.CITY)
+        visa_type = user_data_global.get(user_id, {}).get('visa_type', config.VISA_TYPE)
+        if slot_source.live:
+            # Форма записи на сайте заполняется категорией VISA_TYPE: показываем и
+            # записываем в историю ту пару, которая действительно проверена
+            visa_type = config.VISA_TYPE
+        if not await site_available(context, query.message.chat_id, source_breaker):
+            return ConversationHandler.END
+        result = await check_slots(city, visa_type)
+        record_check_result(city, visa_type, result)
+        available_dates = result.get("dates") or []
+        
+        if not result["success"]:
             await context.bot.edit_message_text(
                 chat_id=query.message.chat_id,
                 message_id=progress_message.message_id,
-                text=f"⏳ Проверяю доступность слотов... ({progress}%)"
+                text=f"⚠️ *Ошибка:* {result['error']}",
+                parse_mode='Markdown'
             )
-        
-        # Имитация успешного результата (в реальном приложении здесь будет результат проверки)
-        # Здесь будет вызов функции check_available_slots
-        if not SELENIUM_AVAILABLE:
-            # Если Selenium не установлен, показываем сообщение об ошибке
+        elif available_dates and slot_source.live:
+            # Доступные слоты найдены: кнопка даты запускает бронирование на сайте (date_selected)
+            date_buttons = []
+            for date in available_dates[:config.MAX_DATES_TO_SHOW]:
+                date_buttons.append([InlineKeyboardButton(date, callback_data=f"date_{date}")])
+            
+            slot_keyboard = InlineKeyboardMarkup(date_buttons)
+            
             await context.bot.edit_message_text(
                 chat_id=query.message.chat_id,
                 message_id=progress_message.message_id,
-                text="⚠️ *Ошибка:* Функции автоматизации браузера недоступны. "
-                     "Пожалуйста, обратитесь к администратору бота.",
+                text=f"✅ *Найдены доступные слоты!*\n\n"
+                     f"📍 {city}, {visa_type}\n\n"
+                     "Выберите предпочтительную дату:",
+                reply_markup=slot_keyboard,
                 parse_mode='Markdown'
             )
+        elif available_dates:
+            # Даты не с сайта (SLOT_SOURCE) забронировать нельзя: только список
+            dates_text = "\n".join(f"• {date}" for date in available_dates[:config.MAX_DATES_TO_SHOW])
+            await context.bot.edit_message_text(
+                chat_id=query.message.chat_id,
+                message_id=progress_message.message_id,
+                text=f"✅ Найдены доступные слоты (источник {slot_source.name}, не сайт VFS Global)\n\n"
+                     f"📍 {city}, {visa_type}\n\n{dates_text}"
+            )
         else:
-            # Имитация нахождения слота (в будущем замените на реальную проверку)
-            available_dates = ["25.05.2025", "27.05.2025", "02.06.2025"]
-            
-            if available_dates:
-                # Доступные слоты найдены
-                date_buttons = []
-                for date in available_dates:
-                    date_buttons.append([InlineKeyboardButton(date, callback_data=f"date_{date}")])
-                
-                slot_keyboard = InlineKeyboardMarkup(date_buttons)
-                
-                await context.bot.edit_message_text(
-                    chat_id=query.message.chat_id,
-                    message_id=progress_message.message_id,
-                    text="✅ *Найдены доступные слоты!*\n\n"
-                         "Выберите предпочтительную дату:",
-                    reply_markup=slot_keyboard,
-                    parse_mode='Markdown'
-                )
-            else:
-                # Доступных слотов не найдено
-                await context.bot.edit_message_text(
-                    chat_id=query.message.chat_id,
-                    message_id=progress_message.message_id,
-                    text="😔 *К сожалению, доступных слотов не найдено.*\n\n"
-                         "Попробуйте выбрать другой город или повторите попытку позже.",
-                    parse_mode='Markdown'
-                )
+            # Доступных слотов не найдено
+            await context.bot.edit_message_text(
+                chat_id=query.message.chat_id,
+                message_id=progress_message.message_id,
+                text="😔 *К сожалению, доступных слотов не найдено.*\n\n"
+                     "Попробуйте выбрать другой город или повторите попытку позже.",
+                parse_mode='Markdown'
+            )
         
         return ConversationHandler.END
     
@@ -327,60 +419,48 @@ async def confirmation_handler(update: Update, context: ContextTypes.DEFAULT_TYP
         return CHOOSE_VISA_TYPE
 
 # Обработчик выбора даты (после подтверждения)
-async def date_selected(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+@timed_handler
+async def date_selected(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Бронирует дату, выбранную после проверки в /start, в городе из анкеты пользователя."""
     query = update.callback_query
     await query.answer()
     
+    chat_id = query.message.chat_id
     user_id = update.effective_user.id
-    selected_date = query.data.replace("date_", "")
-    user_data_global[user_id]['selected_date'] = selected_date
+    selected_date = query.data.replace("date_", "", 1)
+    city = user_data_global.get(user_id, {}).get('city', config.CITY)
+    user_data_global.setdefault(user_id, {})['selected_date'] = selected_date
     
-    logger.info(f"Пользователь {query.from_user.username} ({user_id}) выбрал дату: {selected_date}")
+    logger.info(f"Пользователь {query.from_user.username} ({user_id}) выбрал дату: {selected_date} ({city})")
     
-    # Здесь в реальном приложении будет логика бронирования слота
-    # Имитация процесса бронирования
-    await query.edit_message_text(
-        f"🗓️ Выбрана дата: *{selected_date}*\n\n"
-        "🔄 Оформляю бронирование...",
-        parse_mode='Markdown'
-    )
+    await query.edit_message_reply_markup(reply_markup=None)
+    if not await site_available(context, chat_id):
+        return
+    await context.bot.send_message(chat_id=chat_id, text=f"🗓️ Бронирую дату {selected_date} в городе {city}...")
     
-    # Имитация задержки бронирования
-    booking_message = await context.bot.send_message(
-        chat_id=query.message.chat_id,
-        text="⏳ Оформляю бронирование... (0%)"
-    )
-    
-    for progress in range(20, 101, 20):
-        await asyncio.sleep(1)  # Имитация задержки
-        await context.bot.edit_message_text(
-            chat_id=query.message.chat_id,
-            message_id=booking_message.message_id,
-            text=f"⏳ Оформляю бронирование... ({progress}%)"
+    try:
+        await ensure_automation()
+        if not AUTOMATION_AVAILABLE:
+            site_breaker.release_probe()
+            await context.bot.send_message(
+                chat_id=chat_id,
+                text="⚠️ Функции автоматизации браузера недоступны. Пожалуйста, обратитесь к администратору."
+            )
+            return
+
+        result = await run_browser_job("book", stage_notifier(context, chat_id),
+                                       chat_id=chat_id, selected_date=selected_date, city=city)
+        await send_booking_result(context, chat_id, result, city=city)
+    except Exception as e:
+        site_breaker.release_probe()
+        logger.error(f"Ошибка при бронировании даты {selected_date}: {str(e)}")
+        await context.bot.send_message(
+            chat_id=chat_id,
+            text=f"❌ Произошла ошибка при бронировании слота: {str(e)}"
         )
-    
-    # Имитация успешного бронирования с получением ссылки
-    unique_code = f"VFS-{user_id}-{int(time.time())}"
-    booking_url = f"https://visa.vfsglobal.com/blr/ru/pol/book-an-appointment/confirmation?code={unique_code}"
-    
-    await context.bot.edit_message_text(
-        chat_id=query.message.chat_id,
-        message_id=booking_message.message_id,
-        text="✅ *Бронирование успешно оформлено!*\n\n"
-             f"🔗 *Ваша ссылка для завершения процесса:*\n{booking_url}\n\n"
-             "⚠️ *Важно:* Пройдите по ссылке в течение 15 минут для завершения бронирования.\n\n"
-             "📝 *Инструкция:*\n"
-             "1. Перейдите по ссылке\n"
-             "2. Войдите в свой аккаунт VFS Global\n"
-             "3. Проверьте и подтвердите информацию\n"
-             "4. Завершите процесс бронирования\n\n"
-             "*Ваш код бронирования:* `" + unique_code + "`",
-        parse_mode='Markdown'
-    )
-    
-    return ConversationHandler.END
 
 # Обработчик отмены
+@timed_handler
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     user = update.message.from_user
     logger.info(f"Пользователь {user.username} ({user.id}) отменил разговор")
@@ -391,66 +471,207 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     
     return ConversationHandler.END
 
-# Функция для проверки доступных слотов через браузер
-def check_available_slots(user_data):
+# Сообщение об ошибке при неверном вводе
+async def invalid_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.message.reply_text(
+        "⚠️ Извините, я не понимаю этот ввод. Пожалуйста, следуйте инструкциям."
+    )
+
+
+async def send_check_result(context, chat_id, success, result, hold=None):
     """
-    Проверяет наличие доступных слотов на сайте VFS Global
-    
+    Отправляет пользователю результат проверки дат.
+
     Args:
-        user_data: Словарь с данными пользователя
-    
+        context (ContextTypes.DEFAULT_TYPE): Контекст обработчика
+        chat_id (int): ID чата
+        success (bool): Успешно ли прошла проверка
+        result: Список дат или текст ошибки
+        hold (int): Сколько секунд удерживается сессия с календарем (кнопки дат для брони)
+    """
+    if success:
+        if isinstance(result, list) and result:
+            # Нашли доступные даты
+            dates_text = "🎉 *Доступные даты для записи:*\n\n"
+            for date in result[:config.MAX_DATES_TO_SHOW]:
+                dates_text += f"• {date}\n"
+
+            if len(result) > config.MAX_DATES_TO_SHOW:
+                dates_text += f"\n...и еще {len(result) - config.MAX_DATES_TO_SHOW} дат(ы)"
+
+            reply_markup = None
+            if hold:
+                # Сессия с открытым календарем удерживается: дату можно забронировать сразу
+                dates_text += f"\n\n⚡️ *Срочно!* Календарь открыт еще {hold} с — выберите дату или отправьте /book"
+                keyboard = [[InlineKeyboardButton(f"📅 {date}", callback_data=f"hotdate_{date}")]
+                            for date in result[:config.MAX_DATES_TO_SHOW]]
+                reply_markup = InlineKeyboardMarkup(keyboard)
+            else:
+                dates_text += "\n\n⚡️ *Срочно!* Зайдите на сайт VFS Global, чтобы забронировать удобную дату!"
+
+            await context.bot.send_message(
+                chat_id=chat_id,
+                text=dates_text,
+                parse_mode='Markdown',
+                reply_markup=reply_markup
+            )
+        else:
+            # Нет доступных дат
+            await context.bot.send_message(
+                chat_id=chat_id,
+                text=f"😔 Нет доступных слотов для {config.VISA_TYPE} в городе {config.CITY}."
+            )
+    else:
+        # Произошла ошибка при проверке
+        await context.bot.send_message(
+            chat_id=chat_id,
+            text=f"❌ Произошла ошибка при проверке доступных дат:\n{result}"
+        )
+
+def stage_notifier(context, chat_id):
+    """Возвращает корутину on_progress(stage, detail), сообщающую пользователю о ходе задания."""
+    async def on_progress(stage, detail=None):
+        if stage in STAGE_MESSAGES:
+            await context.bot.send_message(chat_id=chat_id, text=STAGE_MESSAGES[stage].format(detail=detail))
+    return on_progress
+
+async def run_browser_job(name, on_progress, **kwargs):
+    """
+    Выполняет задание браузера из jobs.JOBS.
+
+    Args:
+        name (str): Имя задания ("check", "check_cities", "book")
+        on_progress: Корутина on_progress(stage, detail)
+        **kwargs: Аргументы задания (chat_id, selected_date, cities)
+
     Returns:
-        list: Список доступных дат или пустой список, если слоты не найдены
+        dict: Результат задания (success, stage, reason, dates, error, ...)
     """
-    if not SELENIUM_AVAILABLE:
-        logger.error("Selenium не установлен, невозможно проверить доступные слоты")
-        return []
-    
     try:
-        # Настройка браузера
-        options = webdriver.ChromeOptions()
-        options.add_argument('--headless')
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
-        
-        driver = webdriver.Chrome(options=options)
-        
-        # Посещаем сайт VFS Global
-        driver.get("https://visa.vfsglobal.com/blr/ru/pol/login")
-        
-        # Создаем новый аккаунт или входим в существующий
-        # (Здесь нужно добавить реальную логику авторизации)
-        
-        # Переходим на страницу бронирования
-        driver.get("https://visa.vfsglobal.com/blr/ru/pol/book-an-appointment")
-        
-        # Выбираем тип визы, город и др.
-        # (Здесь нужно добавить реальную логику выбора опций)
-        
-        # Проверяем доступные слоты
-        # (Здесь нужно добавить реальную логику проверки слотов)
-        
-        # Возвращаем пример доступных дат
-        return ["25.05.2025", "27.05.2025", "02.06.2025"]
-    
-    except Exception as e:
-        logger.error(f"Ошибка при проверке доступных слотов: {str(e)}")
-        return []
-    
-    finally:
-        if 'driver' in locals():
-            driver.quit()
+        await ensure_automation()
+    except Exception:
+        site_breaker.release_probe()
+        raise
+    try:
+        if job_supervisor is not None:
+            result = await job_supervisor.run(name, on_progress=on_progress, **kwargs)
+        else:
+            loop = asyncio.get_running_loop()
 
-# Сообщение об ошибке при неверном вводе
-async def invalid_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await update.message.reply_text(
-        "⚠️ Извините, я не понимаю этот ввод. Пожалуйста, следуйте инструкциям."
-    )
+            def progress(stage, detail=None):
+                asyncio.run_coroutine_threadsafe(on_progress(stage, detail), loop)
 
-# Импорт asyncio для имитации асинхронных задержек
-import asyncio
+            try:
+                result = await asyncio.to_thread(JOBS[name], driver_recycler, progress, **kwargs)
+            finally:
+                wait_budget.flush()
+                logger.info(f"Память браузеров:\n{driver_recycler.watchdog.format_report()}")
+    except Exception:
+        site_breaker.record(False, "error")
+        raise
+
+    site_breaker.record_result(result)
+    return result
+
+def record_check_result(city, visa_type, result, source="manual"):
+    """Записывает результат проверки в историю (automation/history_store.py), не дожидаясь записи на диск."""
+    dates = result.get("dates") or []
+    if result.get("success") or result.get("reason") == "no_slots":
+        history.record(city, visa_type, True, len(dates), source, dates=dates)
+    elif result.get("reason") not in ("cancelled", "busy", "unavailable"):
+        history.record(city, visa_type, False, 0, source, reason=result.get("reason"))
+
+async def site_available(context, chat_id, breaker=None):
+    """
+    Проверяет предохранитель перед запуском задания.
+
+    Args:
+        breaker (CircuitBreaker): Предохранитель задания; по умолчанию site_breaker (сайт VFS Global)
+
+    Returns:
+        bool: True, если задание можно запускать; иначе пользователь сразу получает ответ
+    """
+    breaker = breaker or site_breaker
+    allowed, next_probe = breaker.allow()
+    if not allowed:
+        logger.info(f"Задание для чата {chat_id} не запущено: предохранитель {breaker.format_status()}")
+        await context.bot.send_message(
+            chat_id=chat_id,
+            text=f"⚠️ Сайт VFS Global сейчас работает нестабильно, проверки временно приостановлены.\n\n"
+                 f"🕐 Следующая проверка доступности сайта в {next_probe:%H:%M}."
+        )
+    return allowed
+
+async def no_progress(stage, detail=None):
+    """on_progress без сообщений (плановые проверки)."""
+
+async def run_live_check(chat_id=None, on_progress=None, city=None):
+    """
+    Проверка слотов на сайте: в асинхронном режиме все этапы выполняются на event loop
+    бота (ее можно остановить командой /stop), иначе - задание браузера "check".
+
+    Args:
+        chat_id (int): Чат проверки; None - плановая проверка
+        on_progress: Корутина on_progress(stage, detail)
+        city (str): Город визового центра; по умолчанию CITY
+
+    Returns:
+        dict: Результат проверки (success, stage, reason, dates, error, hold)
+    """
+    on_progress = on_progress or no_progress
+    await ensure_automation()
+    if async_sessions is not None:
+        result = await async_sessions.run_check("scheduler" if chat_id is None else chat_id,
+                                                on_stage=on_progress, city=city)
+        site_breaker.record_result(result)
+        timings = ", ".join(f"{stage}={seconds:.1f}с" for stage, seconds in result["timings"].items())
+        logger.info(f"Асинхронная проверка для чата {chat_id or 'scheduler'}: {result['reason'] or 'ok'} ({timings})")
+        return result
+
+    if not AUTOMATION_AVAILABLE:
+        # До сайта дело не дошло: проба предохранителя (если была занята) освобождается
+        site_breaker.release_probe()
+        return {"success": False, "stage": "launch", "reason": "unavailable", "dates": [],
+                "error": "⚠️ Функции автоматизации браузера недоступны. Пожалуйста, обратитесь к администратору."}
+    kwargs = {"city": city or config.CITY}
+    if chat_id is not None:
+        kwargs["chat_id"] = chat_id
+    return await run_browser_job("check", on_progress, **kwargs)
+
+# Источник результатов проверки (SLOT_SOURCE): обработчики, планировщик, история и
+# уведомления работают одинаково с сайтом, стендом, записанной историей и случайными данными
+slot_source = create_slot_source(config.SLOT_SOURCE, run_live_check)
+if not slot_source.live:
+    # Результаты без сайта пишутся в свою историю и не смешиваются с настоящими проверками
+    history = HistoryStore(os.path.join(LOGS_DIR, f"history_{slot_source.name}.sqlite3"))
+    logger.warning(f"Источник слотов: {slot_source.name} (не сайт VFS Global)")
+# Ошибки источников без сайта не размыкают предохранитель сайта: у них свой со своим файлом состояния
+source_breaker = site_breaker if slot_source.live else CircuitBreaker(
+    state_file=os.path.join(LOGS_DIR, f"circuit_breaker_{slot_source.name}.json"))
+
+async def check_slots(city, visa_type, chat_id=None, on_progress=None):
+    """
+    Проверяет слоты через источник SLOT_SOURCE.
+
+    Returns:
+        dict: Результат проверки (success, stage, reason, dates, error, hold)
+    """
+    try:
+        result = await slot_source.check(city, visa_type, chat_id=chat_id, on_progress=on_progress)
+    except Exception:
+        if slot_source.live:
+            # Ошибку задания браузера учитывает run_browser_job; до задания проба просто освобождается
+            source_breaker.release_probe()
+        else:
+            source_breaker.record(False, "error")
+        raise
+    if not slot_source.live:
+        # Живая проверка учитывает результат в предохранителе сайта сама
+        source_breaker.record_result(result)
+    return result
 
 # Обработчик команды /check для проверки доступных слотов
+@timed_handler
 async def check_visa_slots(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Обработчик команды /check
@@ -465,81 +686,28 @@ async def check_visa_slots(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     logger.info(f"Пользователь {user.id} запустил проверку слотов для города {config.CITY}")
 
+    if not await site_available(context, chat_id, source_breaker):
+        return
+
     await context.bot.send_message(
         chat_id=chat_id,
         text=f"🔍 Начинаю проверку доступных слотов в городе {config.CITY} для {config.VISA_TYPE}..."
     )
 
-    driver = None
-    profile_dir = None
     try:
-        if not AUTOMATION_AVAILABLE:
-            await context.bot.send_message(
-                chat_id=chat_id,
-                text="⚠️ Функции автоматизации браузера недоступны. Пожалуйста, обратитесь к администратору."
-            )
-            return
-
-        # Настройка драйвера
-        driver = setup_driver()
-        if not driver:
-            await context.bot.send_message(
-                chat_id=chat_id,
-                text="❌ Не удалось инициализировать браузер. Пожалуйста, попробуйте позже."
-            )
-            return
-
-        # Вход в аккаунт
-        await context.bot.send_message(chat_id=chat_id, text="🔐 Выполняю вход в VFS Global...")
-        if not login_vfs_global(driver):
-            await context.bot.send_message(
-                chat_id=chat_id,
-                text="❌ Не удалось войти в аккаунт VFS Global. Попробуйте позже."
-            )
-            return
-
-        # Начинаем новую запись
-        await context.bot.send_message(chat_id=chat_id, text="📝 Заполняю форму заявки...")
-        if not start_new_appointment(driver):
-            await context.bot.send_message(
-                chat_id=chat_id,
-                text="❌ Не удалось заполнить форму записи. Попробуйте позже."
-            )
-            return
-
-        # Проверяем доступные даты
-        await context.bot.send_message(chat_id=chat_id, text="📅 Проверяю доступные даты...")
-        success, result = check_available_dates(driver)
-
-        if success:
-            if isinstance(result, list) and result:
-                # Нашли доступные даты
-                dates_text = "🎉 *Доступные даты для записи:*\n\n"
-                for date in result[:config.MAX_DATES_TO_SHOW]:
-                    dates_text += f"• {date}\n"
-
-                if len(result) > config.MAX_DATES_TO_SHOW:
-                    dates_text += f"\n...и еще {len(result) - config.MAX_DATES_TO_SHOW} дат(ы)"
-
-                dates_text += "\n\n⚡️ *Срочно!* Зайдите на сайт VFS Global, чтобы забронировать удобную дату!"
-
-                await context.bot.send_message(
-                    chat_id=chat_id,
-                    text=dates_text,
-                    parse_mode='Markdown'
-                )
-            else:
-                # Нет доступных дат
-                await context.bot.send_message(
-                    chat_id=chat_id,
-                    text=f"😔 Нет доступных слотов для {config.VISA_TYPE} в городе {config.CITY}."
-                )
+        result = await check_slots(config.CITY, config.VISA_TYPE, chat_id=chat_id,
+                                   on_progress=stage_notifier(context, chat_id))
+        record_check_result(config.CITY, config.VISA_TYPE, result)
+        if result["reason"] == "cancelled":
+            await context.bot.send_message(chat_id=chat_id, text="⏹ Проверка остановлена.")
+        elif result["reason"] == "busy":
+            await context.bot.send_message(chat_id=chat_id, text="⏳ Проверка для этого чата уже выполняется. Остановить: /stop")
+        elif result["reason"] == "unavailable":
+            await context.bot.send_message(chat_id=chat_id, text=result["error"])
+        elif result["success"]:
+            await send_check_result(context, chat_id, True, result["dates"], hold=result.get("hold"))
         else:
-            # Произошла ошибка при проверке
-            await context.bot.send_message(
-                chat_id=chat_id,
-                text=f"❌ Произошла ошибка при проверке доступных дат:\n{result}"
-            )
+            await context.bot.send_message(chat_id=chat_id, text=f"❌ {result['error']}")
 
     except Exception as e:
         logger.error(f"Ошибка при проверке слотов: {str(e)}")
@@ -549,31 +717,43 @@ async def check_visa_slots(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
 
     finally:
-        # Закрываем драйвер, если он был создан
-        if driver is not None:
-            try:
-                driver.quit()
-            except:
-                pass
-
-            # Удаляем временную директорию профиля, если она была создана
-            if profile_dir and os.path.exists(profile_dir):
-                try:
-                    shutil.rmtree(profile_dir, ignore_errors=True)
-                except:
-                    pass
-
         # Отправляем завершающее сообщение
         await context.bot.send_message(
             chat_id=chat_id,
             text=f"✅ Проверка завершена.\n\n🔁 Чтобы проверить снова, используйте команду /check через {config.CHECK_INTERVAL} минут."
         )
 
-# Обработчик команды бронирования слота
-async def book_slot(update: Update, context: ContextTypes.DEFAULT_TYPE):
+def format_city_results(cities, result):
     """
-    Обработчик команды /book
-    Ищет и бронирует первый доступный слот
+    Текст результатов проверки городов (задание "check_cities").
+
+    Args:
+        cities (list): Города в порядке проверки
+        result (dict): Результат задания (jobs.check_cities_job)
+    """
+    lines = [f"🏙 Результаты проверки по городам ({config.VISA_TYPE}):", ""]
+    for city in cities:
+        checked = result["cities"].get(city)
+        if checked is None:
+            lines.append(f"⏭ {city}: не проверен")
+        elif not checked["success"]:
+            lines.append(f"❌ {city}: {checked['error']}")
+        elif not checked["dates"]:
+            lines.append(f"😔 {city}: нет доступных слотов")
+        else:
+            dates = checked["dates"]
+            shown = ", ".join(dates[:config.MAX_DATES_TO_SHOW])
+            more = f" и еще {len(dates) - config.MAX_DATES_TO_SHOW}" if len(dates) > config.MAX_DATES_TO_SHOW else ""
+            lines.append(f"🎉 {city}: {shown}{more}")
+    return "\n".join(lines)
+
+# Обработчик команды /check_cities
+@timed_handler
+async def check_cities_slots(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Обработчик команды /check_cities
+    Проверяет визовые центры городов CHECK_CITIES в одной сессии браузера: вход
+    выполняется один раз, затем для каждого города выбирается его центр
 
     Args:
         update (Update): Объект обновления Telegram
@@ -581,109 +761,97 @@ async def book_slot(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     chat_id = update.effective_chat.id
     user = update.effective_user
+    cities = [city for city in config.CHECK_CITIES or CITIES if city in CITIES]
+    skipped = [city for city in config.CHECK_CITIES if city not in CITIES]
+    if skipped:
+        logger.warning(f"Города без визового центра пропущены: {', '.join(skipped)}")
 
-    logger.info(f"Пользователь {user.id} запустил бронирование слота для {config.VISA_TYPE} в {config.CITY}")
+    logger.info(f"Пользователь {user.id} запустил проверку городов: {', '.join(cities)}")
+
+    if not cities:
+        await update.message.reply_text(f"⚠️ В CHECK_CITIES нет известных городов. Доступные: {', '.join(CITIES)}")
+        return
+    if not await site_available(context, chat_id):
+        return
 
     await context.bot.send_message(
         chat_id=chat_id,
-        text=f"🔍 Начинаю процесс бронирования слота для {config.VISA_TYPE} в {config.CITY}...\n\n"
-             f"⚠️ Важно: Оставайтесь в чате и не закрывайте это окно. Процесс может занять некоторое время."
+        text=f"🔍 Проверяю доступные слоты для {config.VISA_TYPE} в городах: {', '.join(cities)}..."
     )
 
-    driver = None
-    profile_dir = None
-
     try:
+        await ensure_automation()
         if not AUTOMATION_AVAILABLE:
+            site_breaker.release_probe()
             await context.bot.send_message(
                 chat_id=chat_id,
                 text="⚠️ Функции автоматизации браузера недоступны. Пожалуйста, обратитесь к администратору."
             )
             return
 
-        # Настройка драйвера
-        driver = setup_driver()
-        if not driver:
-            await context.bot.send_message(
-                chat_id=chat_id,
-                text="❌ Не удалось инициализировать браузер. Пожалуйста, попробуйте позже."
-            )
-            return
-
-        # Вход в аккаунт
-        await context.bot.send_message(chat_id=chat_id, text="🔐 Выполняю вход в VFS Global...")
-        if not login_vfs_global(driver):
-            await context.bot.send_message(
-                chat_id=chat_id,
-                text="❌ Не удалось войти в аккаунт VFS Global. Попробуйте позже."
-            )
-            return
-
-        # Начинаем новую запись
-        await context.bot.send_message(chat_id=chat_id, text="📝 Заполняю форму заявки...")
-        if not start_new_appointment(driver):
-            await context.bot.send_message(
-                chat_id=chat_id,
-                text="❌ Не удалось заполнить форму записи. Попробуйте позже."
-            )
-            return
-
-        # Проверяем доступные даты
-        await context.bot.send_message(chat_id=chat_id, text="📅 Проверяю доступные даты...")
-        success, result = check_available_dates(driver)
+        notify = stage_notifier(context, chat_id)
 
-        if not success:
-            await context.bot.send_message(
-                chat_id=chat_id,
-                text=f"❌ Произошла ошибка при проверке доступных дат:\n{result}"
-            )
-            return
+        async def on_progress(stage, detail=None):
+            # Вход - один раз, дальше одно сообщение на город вместо сообщений о форме и календаре
+            if stage in ("login", "city"):
+                await notify(stage, detail)
 
-        if not result or len(result) == 0:
-            await context.bot.send_message(
-                chat_id=chat_id,
-                text=f"😔 Нет доступных слотов для {config.VISA_TYPE} в {config.CITY}."
-            )
-            return
+        result = await run_browser_job("check_cities", on_progress, cities=cities, chat_id=chat_id)
+        for city, checked in result.get("cities", {}).items():
+            record_check_result(city, config.VISA_TYPE, checked)
+        if not result.get("cities"):
+            await context.bot.send_message(chat_id=chat_id, text=f"❌ {result['error']}")
+        else:
+            await context.bot.send_message(chat_id=chat_id, text=format_city_results(cities, result))
 
-        # Есть доступные даты, пытаемся выбрать и забронировать
+    except Exception as e:
+        site_breaker.release_probe()
+        logger.error(f"Ошибка при проверке городов: {str(e)}")
         await context.bot.send_message(
             chat_id=chat_id,
-            text=f"🎉 Найдены доступные даты! Пытаюсь выбрать и забронировать слот..."
+            text=f"❌ Произошла ошибка при проверке городов: {str(e)}"
         )
 
-        # Выбираем первую доступную дату
-        booking_success, booking_result = select_available_date(driver)
+# Обработчик команды бронирования слота
+@timed_handler
+async def book_slot(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Обработчик команды /book
+    Ищет и бронирует первый доступный слот
 
-        if not booking_success:
-            await context.bot.send_message(
-                chat_id=chat_id,
-                text=f"❌ Не удалось выбрать дату: {booking_result}"
-            )
-            return
+    Args:
+        update (Update): Объект обновления Telegram
+        context (ContextTypes.DEFAULT_TYPE): Контекст обработчика
+    """
+    chat_id = update.effective_chat.id
+    user = update.effective_user
 
-        await context.bot.send_message(
-            chat_id=chat_id,
-            text=f"✅ {booking_result}\n\nЗавершаю процесс бронирования..."
-        )
+    logger.info(f"Пользователь {user.id} запустил бронирование слота для {config.VISA_TYPE} в {config.CITY}")
 
-        # Завершаем процесс бронирования
-        complete_success, complete_result = complete_booking(driver)
+    if not await site_available(context, chat_id):
+        return
 
-        if complete_success:
-            await context.bot.send_message(
-                chat_id=chat_id,
-                text=f"🎊 УСПЕШНО: {complete_result}\n\n"
-                     f"📱 Пожалуйста, проверьте свой аккаунт VFS Global для подтверждения бронирования и дополнительных деталей."
-            )
-        else:
+    await context.bot.send_message(
+        chat_id=chat_id,
+        text=f"🔍 Начинаю процесс бронирования слота для {config.VISA_TYPE} в {config.CITY}...\n\n"
+             f"⚠️ Важно: Оставайтесь в чате и не закрывайте это окно. Процесс может занять некоторое время."
+    )
+
+    try:
+        await ensure_automation()
+        if not AUTOMATION_AVAILABLE:
+            site_breaker.release_probe()
             await context.bot.send_message(
                 chat_id=chat_id,
-                text=f"⚠️ {complete_result}\n\n"
-                     f"📱 Пожалуйста, проверьте свой аккаунт VFS Global, возможно, бронирование все равно было успешным."
+                text="⚠️ Функции автоматизации браузера недоступны. Пожалуйста, обратитесь к администратору."
             )
+            return
+
+        result = await run_browser_job("book", stage_notifier(context, chat_id), chat_id=chat_id)
+        await send_booking_result(context, chat_id, result)
 
     except Exception as e:
+        site_breaker.release_probe()
         logger.error(f"Ошибка при бронировании слота: {str(e)}")
         await context.bot.send_message(
             chat_id=chat_id,
@@ -691,31 +859,242 @@ async def book_slot(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
 
     finally:
-        # Закрываем драйвер, если он был создан
-        if driver is not None:
-            try:
-                driver.quit()
-            except:
-                pass
-
-            # Удаляем временную директорию профиля, если она была создана
-            if profile_dir and os.path.exists(profile_dir):
-                try:
-                    shutil.rmtree(profile_dir, ignore_errors=True)
-                except:
-                    pass
-
         # Отправляем завершающее сообщение
         await context.bot.send_message(
             chat_id=chat_id,
             text=f"✅ Процесс бронирования завершен.\n\n"
                  f"Доступные команды:\n"
                  f"/check - Проверить наличие свободных слотов\n"
+                 f"/check_cities - Проверить все города из CHECK_CITIES за один вход\n"
                  f"/book - Попытаться забронировать слот\n"
+                 f"/stop - Остановить выполняющуюся проверку\n"
                  f"/register_now - Зарегистрировать новый аккаунт VFS Global"
         )
 
+# Обработчик кнопки даты из результата проверки с удерживаемой сессией
+@timed_handler
+async def hot_date_selected(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Бронирует выбранную дату в сессии, где /check только что открыл календарь."""
+    query = update.callback_query
+    await query.answer()
+
+    chat_id = query.message.chat_id
+    selected_date = query.data.replace("hotdate_", "", 1)
+    logger.info(f"Пользователь {query.from_user.id} выбрал дату {selected_date} в удерживаемой сессии")
+
+    await query.edit_message_reply_markup(reply_markup=None)
+    if not await site_available(context, chat_id):
+        return
+    await context.bot.send_message(chat_id=chat_id, text=f"🗓️ Бронирую дату {selected_date}...")
+
+    try:
+        result = await run_browser_job("book", stage_notifier(context, chat_id),
+                                       chat_id=chat_id, selected_date=selected_date)
+        await send_booking_result(context, chat_id, result)
+    except Exception as e:
+        site_breaker.release_probe()
+        logger.error(f"Ошибка при бронировании даты {selected_date}: {str(e)}")
+        await context.bot.send_message(
+            chat_id=chat_id,
+            text=f"❌ Произошла ошибка при бронировании слота: {str(e)}"
+        )
+
+def format_time_slots(result):
+    """Все свободное время выбранной даты из результата бронирования (выбранное отмечено)."""
+    slots = result.get("time_slots")
+    if not slots:
+        return ""
+    marked = [f"{slot} ✅" if slot == result.get("selected_time") else slot for slot in slots]
+    return f"\n\n🕐 Свободное время на выбранную дату: {', '.join(marked)}"
+
+async def send_booking_result(context, chat_id, result, city=None):
+    """
+    Отправляет пользователю результат задания бронирования.
+
+    Args:
+        context (ContextTypes.DEFAULT_TYPE): Контекст обработчика
+        chat_id (int): ID чата
+        result (dict): Результат задания "book" (jobs.book_job)
+        city (str): Город бронирования; по умолчанию CITY
+    """
+    if result.get("reason") == "no_slots":
+        await context.bot.send_message(
+            chat_id=chat_id,
+            text=f"😔 Нет доступных слотов для {config.VISA_TYPE} в {city or config.CITY}."
+        )
+    elif result["stage"] != "booking":
+        await context.bot.send_message(chat_id=chat_id, text=f"❌ {result['error']}")
+    elif result["success"]:
+        await context.bot.send_message(
+            chat_id=chat_id,
+            text=f"🎊 УСПЕШНО: {result['message']}{format_time_slots(result)}\n\n"
+                 f"📱 Пожалуйста, проверьте свой аккаунт VFS Global для подтверждения бронирования и дополнительных деталей."
+        )
+    else:
+        await context.bot.send_message(
+            chat_id=chat_id,
+            text=f"⚠️ {result.get('message') or result['error']}{format_time_slots(result)}\n\n"
+                 f"📱 Пожалуйста, проверьте свой аккаунт VFS Global, возможно, бронирование все равно было успешным."
+        )
+
+# Обработчик команды /stop
+@timed_handler
+async def stop_check(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Останавливает выполняющуюся асинхронную проверку для текущего чата."""
+    await ensure_automation()
+    if async_sessions is None:
+        await update.message.reply_text("⚠️ Остановка доступна только в режиме AUTOMATION_MODE=async.")
+        return
+
+    if not async_sessions.cancel(update.effective_chat.id):
+        await update.message.reply_text("ℹ️ Для этого чата нет выполняющейся проверки.")
+
+# Даты, о которых планировщик уже сообщил, по парам (город, тип визы)
+notified_dates = {}
+
+@timed_handler
+async def scheduled_check(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Плановая проверка слотов (job_queue).
+
+    Результат пополняет историю появления слотов; о новых датах
+    сообщается чатам из NOTIFY_CHAT_IDS.
+    """
+    city, visa_type = context.job.data
+    allowed, _ = source_breaker.allow()
+    if not allowed:
+        logger.info(f"Плановая проверка {city} / {visa_type} пропущена: предохранитель {source_breaker.format_status()}")
+        return
+
+    try:
+        result = await check_slots(city, visa_type)
+        if result["reason"] == "unavailable":
+            return
+    except Exception as e:
+        logger.error(f"Ошибка плановой проверки {city} / {visa_type}: {str(e)}")
+        return
+
+    record_check_result(city, visa_type, result, source="scheduler")
+    logger.info(f"Плановая проверка {city} / {visa_type}: {result['reason'] or 'ok'}, "
+                f"дат: {len(result.get('dates') or [])}")
+
+    # Неудачная проверка ничего не говорит о датах: уже отправленные не сбрасываются,
+    # иначе следующая удачная проверка разослала бы их повторно
+    if not result["success"]:
+        return
+    dates = result.get("dates") or []
+    new_dates = [date for date in dates if date not in notified_dates.get((city, visa_type), set())]
+    notified_dates[(city, visa_type)] = set(dates)
+    if new_dates:
+        for chat_id in config.NOTIFY_CHAT_IDS:
+            await send_check_result(context, chat_id, True, dates)
+
+async def plan_scheduled_checks(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Планирует проверки до конца суток по бюджету DAILY_CHECK_BUDGET и истории слотов."""
+    job_queue = context.job_queue
+    for job in job_queue.jobs():
+        if job.name and job.name.startswith("check:"):
+            job.schedule_removal()
+
+    now = datetime.datetime.now()
+    for city, visa_type in [(config.CITY, config.VISA_TYPE)]:
+        # План строится по истории того же источника, куда пишутся результаты проверок
+        for moment in plan_day(city, visa_type, now, store=history):
+            # Относительная задержка: job_queue не путает местное время с UTC
+            job_queue.run_once(scheduled_check, when=(moment - now).total_seconds(),
+                               data=(city, visa_type), name=f"check:{city}:{visa_type}")
+
+async def preload_automation():
+    """Загружает модули автоматизации и запускает исполнители, готовящие запасные браузеры."""
+    await ensure_automation()
+    if job_supervisor is not None:
+        await job_supervisor.warm_up()
+
+async def start_background_loading(application: Application) -> None:
+    """Начинает загрузку модулей автоматизации, не задерживая прием обновлений."""
+    if config.AUTOMATION_PRELOAD:
+        application.create_task(preload_automation())
+
+async def shutdown_workers(application: Application) -> None:
+    """Останавливает процессы-исполнители и асинхронные сессии при остановке бота."""
+    if automation_lock.locked():
+        # Фоновая загрузка еще идет: дожидаемся ее, чтобы созданные исполнители тоже остановились
+        await ensure_automation()
+    if job_supervisor is not None:
+        await job_supervisor.shutdown()
+    if async_sessions is not None:
+        await async_sessions.shutdown()
+    await slot_source.close()
+    await asyncio.to_thread(history.close)
+
+# Обработчик команды /history
+@timed_handler
+async def history_report(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Показывает последние проверки и итоги за неделю для текущих города и типа визы."""
+    city, visa_type = config.CITY, config.VISA_TYPE
+    summary, recent = await asyncio.gather(
+        asyncio.to_thread(history.summary, city, visa_type, 7),
+        asyncio.to_thread(history.recent, city, visa_type, 10),
+    )
+    if not summary["checks"]:
+        await update.message.reply_text(f"ℹ️ Проверок для {visa_type} в городе {city} еще не было.")
+        return
+
+    last_hit = f"{summary['last_hit']:%d.%m %H:%M}" if summary["last_hit"] else "не было"
+    text = (f"📜 История проверок: {visa_type}, {city}\n\n"
+            f"За 7 дней: проверок {summary['checks']}, дошли до календаря {summary['successes']}, "
+            f"со слотами {summary['hits']}\n"
+            f"Последние слоты: {last_hit}\n\n"
+            f"Последние проверки:\n")
+    for moment, success, slots, source, reason, dates in recent:
+        if not success:
+            outcome = f"❌ {reason or 'ошибка'}"
+        elif slots:
+            outcome = f"🎉 {slots}: {', '.join(dates[:3])}{'…' if len(dates) > 3 else ''}"
+        else:
+            outcome = "нет слотов"
+        text += f"• {moment:%d.%m %H:%M} ({source}) — {outcome}\n"
+    await update.message.reply_text(text)
+
+# Обработчик команды /memory
+@timed_handler
+async def memory_report(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Показывает потребление памяти браузерами по сессиям."""
+    await ensure_automation()
+    if not AUTOMATION_AVAILABLE:
+        await update.message.reply_text("⚠️ Функции автоматизации браузера недоступны.")
+        return
+
+    if job_supervisor is not None:
+        report = job_supervisor.format_report()
+    else:
+        report = driver_recycler.watchdog.format_report()
+    await update.message.reply_text(f"🧠 Память браузеров:\n\n{report}")
+
+# Обработчик команды /timeouts
+@timed_handler
+async def timeouts_report(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Показывает обученные по замерам бюджеты ожиданий элементов (automation/wait_budget.py)."""
+    await ensure_automation()
+    if not AUTOMATION_AVAILABLE:
+        await update.message.reply_text("⚠️ Функции автоматизации браузера недоступны.")
+        return
+
+    # Замеры ведут исполнители и сохраняют в logs/wait_budget.json, поэтому читаем файл заново
+    await update.message.reply_text(f"⏱ Бюджеты ожиданий:\n\n{WaitBudget().format_report()}")
+
+# Обработчик команды /stats
+@timed_handler
+async def stats_report(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Показывает сводку метрик этапов и обработчиков (только для ADMIN_IDS)."""
+    if update.effective_user.id not in config.ADMIN_IDS:
+        logger.warning(f"Пользователь {update.effective_user.id} запросил /stats без прав администратора")
+        return
+
+    await update.message.reply_text(f"📊 Статистика:\n\n{metrics.format_stats()}")
+
 # Обработчик команды регистрации
+@timed_handler
 async def register_now(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Обрабатывает команду /register_now для регистрации нового аккаунта в VFS Global."""
     user = update.message.from_user
@@ -730,7 +1109,6 @@ async def register_now(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     try:
         # Создаем необходимые директории
         import os
-        import subprocess
         import sys
         import time
         import random
@@ -766,7 +1144,7 @@ async def register_now(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
                     sys.path.append(automation_dir)
                 
                 # Импортируем модуль регистрации
-                from register_account import register_account, cleanup_chrome
+                from register_account import register_account
                 logger.info("Модуль регистрации успешно импортирован")
                 use_simulation = False
             except ImportError as e:
@@ -777,23 +1155,10 @@ async def register_now(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
                 )
                 use_simulation = True
         
-        # Очищаем процессы Chrome перед запуском
-        await update.message.reply_text("🧹 Очищаю процессы Chrome и временные файлы...")
-        
-        if use_simulation:
-            # Очистка в режиме симуляции
-            try:
-                subprocess.run(['killall', '-9', 'chrome'], stderr=subprocess.DEVNULL)
-                subprocess.run(['killall', '-9', 'chromedriver'], stderr=subprocess.DEVNULL)
-                subprocess.run(['pkill', '-9', '-f', 'chrome'], stderr=subprocess.DEVNULL)
-                subprocess.run(['rm', '-rf', '/tmp/chrome_*'], stderr=subprocess.DEVNULL)
-                subprocess.run(['rm', '-rf', '/tmp/.com.google.Chrome.*'], stderr=subprocess.DEVNULL)
-            except Exception as e:
-                logger.warning(f"Ошибка при очистке Chrome: {str(e)}")
-        else:
-            # Используем функцию очистки из модуля регистрации
-            cleanup_chrome()
-        
+        # Процессы Chrome не очищаются: в них идут задания других чатов, запасные
+        # и общий браузер. Регистрация запускает свой Chrome с временным профилем
+        # и закрывает его сама (register_account.launch_chrome/close_chrome)
+
         # Создаем сообщение с прогрессом
         progress_message = await update.message.reply_text("⏳ Регистрация аккаунта: 0%")
         
@@ -826,8 +1191,9 @@ async def register_now(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
                 text="⏳ Регистрация аккаунта: запуск браузера..."
             )
             
-            # Запускаем процесс регистрации
-            result = register_account(max_selenium_retries=1, max_undetected_retries=1)
+            # Запускаем процесс регистрации в потоке: Selenium блокирует, а event loop
+            # обслуживает остальные чаты все время регистрации
+            result = await asyncio.to_thread(register_account, max_selenium_retries=1, max_undetected_retries=1)
             
             # Обновляем сообщение о результате
             if result["success"]:
@@ -874,13 +1240,85 @@ async def register_now(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
             "Пожалуйста, попробуйте позже или обратитесь к администратору."
         )
 
+def run_updates(application):
+    """
+    Получает обновления в режиме TELEGRAM_UPDATE_MODE до остановки бота.
+
+    В режиме webhook Telegram сам присылает обновления на WEBHOOK_URL: нет постоянных
+    запросов getUpdates и задержки опроса. Слушатель - HTTP без TLS на WEBHOOK_LISTEN,
+    запросы без верного X-Telegram-Bot-Api-Secret-Token отклоняются (403). Если webhook
+    не настроен, не установлен tornado или адрес слушателя занят (проверяется перед
+    запуском), бот работает опросом. Переключение режимов
+    безопасно: опрос при запуске удаляет webhook, webhook при запуске заменяет опрос,
+    накопленные обновления не сбрасываются.
+
+    Args:
+        application (Application): Приложение бота
+    """
+    mode = config.TELEGRAM_UPDATE_MODE
+    if mode not in ("polling", "webhook"):
+        logger.warning(f"Неизвестный режим TELEGRAM_UPDATE_MODE={mode}, используется polling")
+        mode = "polling"
+    if mode == "webhook" and not config.WEBHOOK_URL:
+        logger.warning("TELEGRAM_UPDATE_MODE=webhook без WEBHOOK_URL, используется polling")
+        mode = "polling"
+    if mode == "webhook":
+        try:
+            import tornado  # Слушатель run_webhook
+        except ImportError:
+            logger.warning("Режим webhook недоступен: установите python-telegram-bot[webhooks]; используется polling")
+            mode = "polling"
+    if mode == "webhook":
+        # Пробная привязка: ошибка внутри run_webhook останавливает приложение
+        # (post_shutdown закрывает историю и исполнителей), и перейти к опросу уже нельзя
+        try:
+            with socket.create_server((config.WEBHOOK_LISTEN, config.WEBHOOK_PORT)):
+                pass
+        except OSError as e:
+            logger.warning(f"Слушатель webhook {config.WEBHOOK_LISTEN}:{config.WEBHOOK_PORT} недоступен "
+                           f"({str(e)}), используется polling")
+            mode = "polling"
+
+    if mode == "polling":
+        logger.info("Обновления: опрос getUpdates")
+        application.run_polling(drop_pending_updates=False)
+        return
+
+    url_path = config.WEBHOOK_PATH if config.WEBHOOK_PATH is not None else urlsplit(config.WEBHOOK_URL).path
+    # Случайный секрет действует до перезапуска: setWebhook при запуске передает новый
+    secret_token = config.WEBHOOK_SECRET or secrets.token_urlsafe(32)
+    logger.info(f"Обновления: webhook {config.WEBHOOK_URL}, слушатель "
+                f"http://{config.WEBHOOK_LISTEN}:{config.WEBHOOK_PORT}/{url_path.lstrip('/')}")
+    application.run_webhook(
+        listen=config.WEBHOOK_LISTEN,
+        port=config.WEBHOOK_PORT,
+        url_path=url_path.lstrip("/"),
+        webhook_url=config.WEBHOOK_URL,
+        secret_token=secret_token,
+        max_connections=config.WEBHOOK_MAX_CONNECTIONS,
+        drop_pending_updates=False,
+    )
+
 # Основная функция
 def main():
     """Запуск бота"""
     # Создаем приложение с использованием токена
-    application = Application.builder().token(TOKEN).build()
+    # Обновления разбираются по очереди, а обработчики с block=False выполняются задачами,
+    # поэтому проверки разных чатов идут параллельно
+    builder = (
+        Application.builder()
+        .token(TOKEN)
+        .post_init(start_background_loading)
+        .post_shutdown(shutdown_workers)
+    )
+    if config.TELEGRAM_API_BASE_URL:
+        # Локальный сервер Bot API или заглушка для нагрузочных прогонов (benchmarks/bench_telegram.py)
+        builder = builder.base_url(config.TELEGRAM_API_BASE_URL)
+    application = builder.build()
     
-    # Определяем обработчик разговора
+    # Определяем обработчик разговора. block=False: шаг разговора (с проверкой при
+    # подтверждении) не задерживает другие чаты, а пока он выполняется, повторные
+    # нажатия того же чата отбрасываются (состояние разговора ожидает завершения шага)
     conv_handler = ConversationHandler(
         entry_points=[CommandHandler("start", start)],
         states={
@@ -892,21 +1330,46 @@ def main():
             CONFIRMATION: [CallbackQueryHandler(confirmation_handler)],
         },
         fallbacks=[CommandHandler("cancel", cancel)],
+        block=False,
     )
     
     # Добавляем обработчик для выбора даты
-    application.add_handler(CallbackQueryHandler(date_selected, pattern=r"^date_"))
+    application.add_handler(CallbackQueryHandler(date_selected, pattern=r"^date_", block=False))
+    application.add_handler(CallbackQueryHandler(hot_date_selected, pattern=r"^hotdate_", block=False))
 
     # Добавляем обработчики команд
-    application.add_handler(CommandHandler("register_now", register_now))
-    application.add_handler(CommandHandler("check", check_visa_slots))
-    application.add_handler(CommandHandler("book", book_slot))
+    application.add_handler(CommandHandler("register_now", register_now, block=False))
+    application.add_handler(CommandHandler("check", check_visa_slots, block=False))
+    application.add_handler(CommandHandler("check_cities", check_cities_slots, block=False))
+    application.add_handler(CommandHandler("book", book_slot, block=False))
+    application.add_handler(CommandHandler("memory", memory_report, block=False))
+    application.add_handler(CommandHandler("timeouts", timeouts_report, block=False))
+    application.add_handler(CommandHandler("stats", stats_report, block=False))
+    application.add_handler(CommandHandler("history", history_report, block=False))
+    application.add_handler(CommandHandler("stop", stop_check, block=False))
 
     # Добавляем обработчик разговора
     application.add_handler(conv_handler)
 
+    # Планировщик проверок: план на остаток суток сразу и новый план сразу после полуночи
+    if DAILY_CHECK_BUDGET > 0:
+        if application.job_queue is None:
+            logger.warning("Планировщик проверок отключен: установите python-telegram-bot[job-queue]")
+        else:
+            application.job_queue.run_once(plan_scheduled_checks, when=1, name="plan")
+            midnight = datetime.time(0, 0, 30, tzinfo=datetime.datetime.now().astimezone().tzinfo)
+            application.job_queue.run_daily(plan_scheduled_checks, time=midnight, name="plan")
+
+    # Локальный HTTP с метриками Prometheus (METRICS_PORT=0 - отключен)
+    metrics.start_http_server()
+
     # Запускаем бота
-    application.run_polling()
+    try:
+        run_updates(application)
+    finally:
+        if driver_recycler is not None:
+            hot_sessions.release_all()
+            driver_recycler.shutdown()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,687 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Локальная заглушка Telegram Bot API для нагрузочных прогонов бота без Telegram.
+#
+# Запуск:
+#   python mocks/telegram_api.py --port 8081
+#   TELEGRAM_API_BASE_URL=http://127.0.0.1:8081/bot TELEGRAM_BOT_TOKEN=123:fake python main.py
+#
+# Отвечает на методы, которые вызывает бот (getMe, getUpdates с долгим опросом,
+# sendMessage, editMessageText, editMessageReplyMarkup, answerCallbackQuery, deleteWebhook
+# и т.п.), записывает каждый вызов с временем и ограничивает частоту сообщений как Telegram:
+# общий лимит бота (--global-rate, в секунду) и лимит одного чата (--chat-rate), сверх
+# лимита - ответ 429 с retry_after. Правка сообщения тем же текстом дает 400
+# "message is not modified", правка неизвестного сообщения - 400 "message to edit not found".
+#
+# Обновления (сообщения и нажатия кнопок пользователей) добавляются в очередь getUpdates:
+# в процессе - server.state.push(message_update(...)), снаружи - POST /__fake/updates
+# с JSON-обновлением или списком обновлений (update_id назначается заглушкой).
+# После setWebhook обновления из очереди не отдаются getUpdates (409, как у Telegram),
+# а доставляются POST-запросами на адрес webhook с секретом из secret_token;
+# deleteWebhook возвращает очередь опросу.
+# GET /__fake возвращает настройки и счетчики в JSON (параметры запроса меняют настройки),
+# GET /__fake/calls?since=N - записанные вызовы начиная с номера N.
+# Задержка от добавления обновления до первого ответа бота в тот же чат копится
+# в счетчиках (first_reply_ms) - это время реакции обработчиков.
+
+import sys
+import json
+import math
+import time
+import argparse
+import threading
+import http.client
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+PREFIX = "/bot"
+
+BOT_USER = {"id": 100000001, "is_bot": True, "first_name": "VisaBot", "username": "visa_fake_bot",
+            "can_join_groups": True, "can_read_all_group_messages": False, "supports_inline_queries": False}
+
+# Методы, на которые действуют лимиты частоты сообщений
+LIMITED_METHODS = {"sendMessage", "editMessageText", "editMessageReplyMarkup", "sendPhoto", "sendDocument"}
+# Методы без состояния: всегда успешный ответ
+TRUE_METHODS = {"setMyCommands", "deleteMyCommands", "setChatMenuButton", "sendChatAction", "close", "logOut"}
+
+WEBHOOK_TIMEOUT = 60  # Сколько ждать ответа бота на доставку обновления, секунды
+WEBHOOK_RETRY_DELAY = 1.0  # Пауза перед повтором неудачной доставки, секунды
+MAX_CALLS = 1_000_000  # Сколько последних вызовов хранится для /__fake/calls
+LATENCY_SAMPLES = 100_000  # Сколько последних замеров first_reply хранится для перцентилей
+
+
+def percentile(values, q):
+    """Перцентиль q (0..1) отсортированного списка; None для пустого."""
+    if not values:
+        return None
+    return values[max(math.ceil(q * len(values)) - 1, 0)]
+
+
+def user(user_id):
+    """Пользователь Telegram для обновлений."""
+    return {"id": user_id, "is_bot": False, "first_name": f"User{user_id}", "username": f"user{user_id}",
+            "language_code": "ru"}
+
+
+def _chat(chat_id):
+    return {"id": chat_id, "type": "private", "first_name": f"User{chat_id}", "username": f"user{chat_id}"}
+
+
+def message_update(user_id, text, message_id=None):
+    """
+    Обновление с текстовым сообщением пользователя в личном чате.
+
+    Команда в начале текста (/start, /check) размечается как bot_command,
+    чтобы ее разобрал CommandHandler.
+
+    Args:
+        user_id (int): ID пользователя (он же ID чата)
+        text (str): Текст сообщения
+        message_id (int): ID сообщения; None - назначит заглушка
+
+    Returns:
+        dict: Обновление без update_id
+    """
+    message = {"message_id": message_id, "date": int(time.time()), "chat": _chat(user_id),
+               "from": user(user_id), "text": text}
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return {"message": message}
+
+
+def callback_update(user_id, data, message):
+    """
+    Обновление с нажатием inline-кнопки.
+
+    Args:
+        user_id (int): ID пользователя (он же ID чата)
+        data (str): callback_data кнопки
+        message (dict): Сообщение бота с клавиатурой (message_id, text)
+
+    Returns:
+        dict: Обновление без update_id
+    """
+    return {"callback_query": {
+        "id": None, "from": user(user_id), "chat_instance": str(user_id), "data": data,
+        "message": {"message_id": message["message_id"], "date": int(time.time()), "chat": _chat(user_id),
+                    "from": BOT_USER, "text": message.get("text") or ""},
+    }}
+
+
+def _update_chat(update):
+    if "message" in update:
+        return update["message"]["chat"]["id"]
+    if "callback_query" in update:
+        return update["callback_query"]["message"]["chat"]["id"]
+    return None
+
+
+class TokenBucket:
+    """Лимит частоты: rate событий в секунду с запасом burst; rate 0 - без лимита."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def take(self, now):
+        """
+        Забирает одно событие.
+
+        Returns:
+            float: 0, если событие укладывается в лимит; иначе сколько секунд ждать
+        """
+        if self.rate <= 0:
+            return 0
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class FakeSettings:
+    """
+    Настройки заглушки; меняются на лету через /__fake.
+
+    Args:
+        global_rate (float): Сообщений бота в секунду на все чаты (0 - без лимита)
+        global_burst (int): Запас общего лимита
+        chat_rate (float): Сообщений бота в секунду в один чат (0 - без лимита)
+        chat_burst (int): Запас лимита чата
+        latency (float): Задержка ответа на вызов метода (кроме getUpdates), секунды
+        token (str): Токен бота; None - принимается любой
+    """
+
+    FIELDS = {"global_rate": float, "global_burst": int, "chat_rate": float, "chat_burst": int,
+              "latency": float, "token": str}
+
+    def __init__(self, global_rate=30.0, global_burst=30, chat_rate=1.0, chat_burst=3, latency=0.0, token=None):
+        self.global_rate = global_rate
+        self.global_burst = global_burst
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.latency = latency
+        self.token = token
+
+    def update(self, values):
+        """Применяет параметры запроса /__fake; неизвестные и неверные значения пропускаются."""
+        for name, kind in self.FIELDS.items():
+            if name in values:
+                try:
+                    setattr(self, name, kind(values[name]))
+                except ValueError:
+                    continue
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+
+class FakeState:
+    """
+    Очередь обновлений, сообщения чатов, лимиты и записанные вызовы заглушки.
+
+    listeners - функции listener(call), вызываемые в потоке сервера после записи
+    каждого вызова метода (call - словарь, как в /__fake/calls).
+    """
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.lock = threading.Lock()
+        self.arrived = threading.Condition(self.lock)
+        self.updates = deque()
+        self.next_update_id = 1
+        self.next_callback_id = 1
+        self.message_ids = {}
+        self.texts = {}
+        self.callbacks = {}
+        self.webhook = None
+        self.webhook_secret = None
+        self.webhook_generation = 0
+        self.webhook_errors = 0
+        self.webhook_last_error = None
+        self.global_bucket = None
+        self.chat_buckets = {}
+        self.calls = deque(maxlen=MAX_CALLS)
+        self.call_count = 0
+        self.methods = {}
+        self.errors = {}
+        self.pushed = 0
+        self.delivered = 0
+        self.pending = {}
+        self.first_reply = deque(maxlen=LATENCY_SAMPLES)
+        self.listeners = []
+
+    # --- обновления ---
+
+    def _message_id(self, chat_id):
+        self.message_ids[chat_id] = self.message_ids.get(chat_id, 0) + 1
+        return self.message_ids[chat_id]
+
+    def push(self, update):
+        """
+        Добавляет обновление в очередь getUpdates.
+
+        Args:
+            update (dict): Обновление (message_update, callback_update); update_id,
+                пустые message_id и id нажатия назначаются здесь
+
+        Returns:
+            int: update_id
+        """
+        chat_id = _update_chat(update)
+        with self.lock:
+            update = dict(update, update_id=self.next_update_id)
+            self.next_update_id += 1
+            if "message" in update and update["message"].get("message_id") is None:
+                update["message"] = dict(update["message"], message_id=self._message_id(chat_id))
+            if "callback_query" in update:
+                query = dict(update["callback_query"])
+                if query.get("id") is None:
+                    query["id"] = str(self.next_callback_id)
+                    self.next_callback_id += 1
+                self.callbacks[query["id"]] = chat_id
+                update["callback_query"] = query
+            self.updates.append(update)
+            self.pushed += 1
+            if chat_id is not None:
+                self.pending[chat_id] = time.perf_counter()
+            self.arrived.notify_all()
+        return update["update_id"]
+
+    def get_updates(self, offset, limit, timeout):
+        """Обновления с update_id >= offset; ждет до timeout секунд, пока они появятся (долгий опрос)."""
+        deadline = time.monotonic() + timeout
+        with self.lock:
+            while self.updates and self.updates[0]["update_id"] < offset:
+                self.updates.popleft()
+            while not self.updates:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                self.arrived.wait(remaining)
+            batch = [update for _, update in zip(range(limit), self.updates)]
+            self.delivered += len(batch)
+            return batch
+
+    # --- webhook ---
+
+    def set_webhook(self, url, secret_token=None, max_connections=40, drop_pending_updates=False):
+        """
+        Включает доставку обновлений POST-запросами на url (как Telegram после setWebhook).
+
+        Обновления доставляются max_connections потоками с заголовком
+        X-Telegram-Bot-Api-Secret-Token; ответ не 2xx или ошибка соединения -
+        повтор того же обновления через WEBHOOK_RETRY_DELAY.
+        """
+        with self.lock:
+            self.webhook = url
+            self.webhook_secret = secret_token
+            self.webhook_generation += 1
+            generation = self.webhook_generation
+            if drop_pending_updates:
+                self.updates.clear()
+            self.arrived.notify_all()
+        for number in range(max(max_connections, 1)):
+            threading.Thread(target=self._deliver, args=(generation,), name=f"telegram-fake-webhook-{number}",
+                             daemon=True).start()
+
+    def delete_webhook(self, drop_pending_updates=False):
+        """Отключает доставку; недоставленные обновления снова отдает getUpdates."""
+        with self.lock:
+            self.webhook = None
+            self.webhook_secret = None
+            self.webhook_generation += 1
+            if drop_pending_updates:
+                self.updates.clear()
+            self.arrived.notify_all()
+
+    def _deliver(self, generation):
+        connection = None
+        while True:
+            with self.lock:
+                while self.webhook_generation == generation and not self.updates:
+                    self.arrived.wait()
+                if self.webhook_generation != generation:
+                    break
+                update = self.updates.popleft()
+                url, secret_token = urlsplit(self.webhook), self.webhook_secret
+
+            error = None
+            try:
+                if connection is None:
+                    kind = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+                    connection = kind(url.hostname, url.port, timeout=WEBHOOK_TIMEOUT)
+                headers = {"Content-Type": "application/json"}
+                if secret_token:
+                    headers["X-Telegram-Bot-Api-Secret-Token"] = secret_token
+                connection.request("POST", url.path or "/", json.dumps(update, ensure_ascii=False).encode("utf-8"),
+                                   headers)
+                response = connection.getresponse()
+                response.read()
+                if not 200 <= response.status < 300:
+                    error = f"Wrong response from the webhook: {response.status} {response.reason}"
+            except (OSError, http.client.HTTPException) as e:
+                error = f"Connection failed: {str(e)}"
+                if connection is not None:
+                    connection.close()
+                connection = None
+
+            with self.lock:
+                if error is None:
+                    self.delivered += 1
+                    continue
+                self.webhook_errors += 1
+                self.webhook_last_error = error
+                self.updates.appendleft(update)
+            time.sleep(WEBHOOK_RETRY_DELAY)
+        if connection is not None:
+            connection.close()
+
+    # --- вызовы методов ---
+
+    def count(self, method):
+        with self.lock:
+            self.methods[method] = self.methods.get(method, 0) + 1
+
+    def throttle(self, method, chat_id):
+        """Проверяет лимиты частоты; возвращает секунды до повтора или 0."""
+        if method not in LIMITED_METHODS:
+            return 0
+        settings = self.settings
+        now = time.monotonic()
+        with self.lock:
+            if self.global_bucket is None or self.global_bucket.rate != settings.global_rate:
+                self.global_bucket = TokenBucket(settings.global_rate, settings.global_burst)
+            bucket = self.chat_buckets.get(chat_id)
+            if bucket is None or bucket.rate != settings.chat_rate:
+                bucket = self.chat_buckets[chat_id] = TokenBucket(settings.chat_rate, settings.chat_burst)
+            # Сообщение, не прошедшее лимит чата, не расходует общий лимит
+            wait = bucket.take(now)
+            return wait or self.global_bucket.take(now)
+
+    def record(self, method, chat_id, status, message_id=None, text=None, reply_markup=None):
+        """Записывает вызов метода и замер first_reply; уведомляет listeners."""
+        now = time.perf_counter()
+        with self.lock:
+            call = {"number": self.call_count, "time": now, "method": method, "chat_id": chat_id,
+                    "status": status, "message_id": message_id, "text": text, "reply_markup": reply_markup}
+            self.call_count += 1
+            self.calls.append(call)
+            if status != 200:
+                self.errors[status] = self.errors.get(status, 0) + 1
+            pushed = self.pending.pop(chat_id, None)
+            if pushed is not None:
+                self.first_reply.append(now - pushed)
+        for listener in list(self.listeners):
+            listener(call)
+        return call
+
+    def send_message(self, chat_id, text, reply_markup=None):
+        with self.lock:
+            message_id = self._message_id(chat_id)
+            self.texts[(chat_id, message_id)] = (text, reply_markup)
+        return message_id
+
+    def edit_message(self, chat_id, message_id, text=None, reply_markup=None, markup_only=False):
+        """
+        Меняет текст или клавиатуру сообщения бота.
+
+        Returns:
+            tuple: (текст, клавиатура) после правки или (None, описание ошибки 400)
+        """
+        with self.lock:
+            current = self.texts.get((chat_id, message_id))
+            if current is None:
+                return None, "Bad Request: message to edit not found"
+            new = (current[0], reply_markup) if markup_only else (text, reply_markup)
+            if new == current:
+                return None, "Bad Request: message is not modified"
+            self.texts[(chat_id, message_id)] = new
+            return new
+
+    def stats(self):
+        """Счетчики заглушки для /__fake и отчетов."""
+        with self.lock:
+            first_reply = sorted(self.first_reply)
+            return {
+                "updates": {"pushed": self.pushed, "delivered": self.delivered, "queued": len(self.updates)},
+                "calls": self.call_count,
+                "methods": dict(self.methods),
+                "errors": {str(status): count for status, count in self.errors.items()},
+                "chats": len(self.message_ids),
+                "webhook": {"url": self.webhook, "errors": self.webhook_errors,
+                            "last_error": self.webhook_last_error},
+                "first_reply_ms": {"count": len(first_reply),
+                                   "p50": (percentile(first_reply, 0.5) or 0) * 1000,
+                                   "p99": (percentile(first_reply, 0.99) or 0) * 1000},
+            }
+
+
+class FakeBotAPIHandler(BaseHTTPRequestHandler):
+    """Обработчик вызовов Bot API; настройки и состояние - в self.server."""
+
+    server_version = "FakeBotAPI/1.0"
+    # Клиент бота (httpx) держит соединения открытыми; без Nagle заголовки и тело
+    # ответа не ждут подтверждения (иначе +40 мс на вызов)
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    # --- служебное ---
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            sys.stderr.write(f"{self.address_string()} - {format % args}\n")
+
+    def _send(self, status, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _ok(self, result):
+        self._send(200, {"ok": True, "result": result})
+
+    def _error(self, status, description, **parameters):
+        payload = {"ok": False, "error_code": status, "description": description}
+        if parameters:
+            payload["parameters"] = parameters
+        self._send(status, payload)
+
+    def _params(self, query):
+        """Параметры вызова: строка запроса, форма или JSON (как их отправляет клиент Bot API)."""
+        params = {name: items[0] for name, items in parse_qs(query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        content_type = self.headers.get("Content-Type", "")
+        if body and content_type.startswith("application/json"):
+            params.update(json.loads(body))
+        elif body and content_type.startswith("application/x-www-form-urlencoded"):
+            params.update({name: items[0] for name, items in parse_qs(body.decode("utf-8")).items()})
+        elif body:
+            raise ValueError(f"неподдерживаемый Content-Type: {content_type}")
+        return params
+
+    @staticmethod
+    def _json_param(params, name):
+        # Вложенные объекты (reply_markup) в форме приходят строкой JSON
+        value = params.get(name)
+        return json.loads(value) if isinstance(value, str) else value
+
+    def _message(self, chat_id, message_id, text, reply_markup):
+        message = {"message_id": message_id, "date": int(time.time()), "chat": _chat(chat_id), "from": BOT_USER}
+        if text is not None:
+            message["text"] = text
+        if reply_markup:
+            message["reply_markup"] = reply_markup
+        return message
+
+    # --- маршруты ---
+
+    def do_GET(self):
+        self.route()
+
+    def do_POST(self):
+        self.route()
+
+    def route(self):
+        url = urlsplit(self.path)
+        if url.path.startswith("/__fake"):
+            self.control(url)
+            return
+
+        token, _, method = url.path[len(PREFIX):].partition("/") if url.path.startswith(PREFIX) else ("", "", "")
+        try:
+            params = self._params(url.query)
+        except ValueError as e:
+            self._error(400, f"Bad Request: {str(e)}")
+            return
+        if not method:
+            self._error(404, "Not Found")
+            return
+        if self.server.settings.token and token != self.server.settings.token:
+            self._error(401, "Unauthorized")
+            return
+        self.server.state.count(method)
+        if method != "getUpdates" and self.server.settings.latency > 0:
+            time.sleep(self.server.settings.latency)
+
+        handler = getattr(self, f"method_{method}", None)
+        if handler is not None:
+            handler(params)
+        elif method in TRUE_METHODS:
+            self._ok(True)
+        else:
+            self._error(404, "Not Found: method not found")
+
+    def control(self, url):
+        state = self.server.state
+        if url.path == "/__fake/updates" and self.command == "POST":
+            length = int(self.headers.get("Content-Length") or 0)
+            updates = json.loads(self.rfile.read(length) or b"[]")
+            ids = [state.push(update) for update in (updates if isinstance(updates, list) else [updates])]
+            self._send(200, {"update_ids": ids})
+        elif url.path == "/__fake/calls":
+            since = int(parse_qs(url.query).get("since", ["0"])[0])
+            with state.lock:
+                calls = [call for call in state.calls if call["number"] >= since]
+            self._send(200, {"calls": calls})
+        elif url.path == "/__fake":
+            self.server.settings.update({name: items[0] for name, items in parse_qs(url.query).items()})
+            self._send(200, {"settings": self.server.settings.as_dict(), "state": state.stats()})
+        else:
+            self._error(404, "Not Found")
+
+    # --- методы Bot API ---
+
+    def method_getMe(self, params):
+        self._ok(BOT_USER)
+
+    def method_getUpdates(self, params):
+        state = self.server.state
+        if state.webhook:
+            self._error(409, "Conflict: can't use getUpdates method while webhook is active; "
+                             "use deleteWebhook to delete the webhook first")
+            return
+        updates = state.get_updates(int(params.get("offset") or 0), int(params.get("limit") or 100),
+                                    float(params.get("timeout") or 0))
+        self._ok(updates)
+
+    def method_setWebhook(self, params):
+        state = self.server.state
+        drop = str(params.get("drop_pending_updates")).lower() == "true"
+        if not params.get("url"):
+            state.delete_webhook(drop)
+        else:
+            state.set_webhook(params["url"], params.get("secret_token"), int(params.get("max_connections") or 40), drop)
+        self._ok(True)
+
+    def method_deleteWebhook(self, params):
+        self.server.state.delete_webhook(str(params.get("drop_pending_updates")).lower() == "true")
+        self._ok(True)
+
+    def method_getWebhookInfo(self, params):
+        state = self.server.state
+        info = {"url": state.webhook or "", "has_custom_certificate": False,
+                "pending_update_count": len(state.updates)}
+        if state.webhook_last_error:
+            info["last_error_message"] = state.webhook_last_error
+        self._ok(info)
+
+    def _limited(self, method, chat_id):
+        retry_after = self.server.state.throttle(method, chat_id)
+        if not retry_after:
+            return False
+        self.server.state.record(method, chat_id, 429)
+        seconds = math.ceil(retry_after)
+        self._error(429, f"Too Many Requests: retry after {seconds}", retry_after=seconds)
+        return True
+
+    def method_sendMessage(self, params):
+        chat_id = int(params["chat_id"])
+        text = params.get("text")
+        reply_markup = self._json_param(params, "reply_markup")
+        if self._limited("sendMessage", chat_id):
+            return
+        if not text:
+            self.server.state.record("sendMessage", chat_id, 400)
+            self._error(400, "Bad Request: message text is empty")
+            return
+        message_id = self.server.state.send_message(chat_id, text, reply_markup)
+        self.server.state.record("sendMessage", chat_id, 200, message_id, text, reply_markup)
+        self._ok(self._message(chat_id, message_id, text, reply_markup))
+
+    def _edit(self, method, params, markup_only):
+        chat_id = int(params["chat_id"])
+        message_id = int(params["message_id"])
+        text = params.get("text")
+        reply_markup = self._json_param(params, "reply_markup")
+        if self._limited(method, chat_id):
+            return
+        text, result = self.server.state.edit_message(chat_id, message_id, text, reply_markup, markup_only)
+        if text is None:
+            self.server.state.record(method, chat_id, 400, message_id)
+            self._error(400, result)
+            return
+        self.server.state.record(method, chat_id, 200, message_id, text, result)
+        self._ok(self._message(chat_id, message_id, text, result))
+
+    def method_editMessageText(self, params):
+        self._edit("editMessageText", params, markup_only=False)
+
+    def method_editMessageReplyMarkup(self, params):
+        self._edit("editMessageReplyMarkup", params, markup_only=True)
+
+    def method_answerCallbackQuery(self, params):
+        with self.server.state.lock:
+            chat_id = self.server.state.callbacks.pop(str(params.get("callback_query_id")), None)
+        if chat_id is None:
+            self._error(400, "Bad Request: query is too old and response timeout expired or query ID is invalid")
+            return
+        self.server.state.record("answerCallbackQuery", chat_id, 200)
+        self._ok(True)
+
+
+def make_server(host="127.0.0.1", port=0, verbose=False, **settings):
+    """
+    Создает сервер заглушки (не запускает его).
+
+    Args:
+        host (str): Адрес
+        port (int): Порт; 0 - любой свободный
+        verbose (bool): Писать запросы в stderr
+        **settings: Параметры FakeSettings
+
+    Returns:
+        ThreadingHTTPServer: Сервер с атрибутами settings, state и base_url
+    """
+    server = ThreadingHTTPServer((host, port), FakeBotAPIHandler)
+    server.daemon_threads = True
+    server.settings = FakeSettings(**settings)
+    server.state = FakeState(server.settings)
+    server.verbose = verbose
+    server.base_url = f"http://{host}:{server.server_address[1]}{PREFIX}"
+    return server
+
+
+def start_in_thread(host="127.0.0.1", port=0, **settings):
+    """Запускает заглушку в фоновом потоке; адрес для TELEGRAM_API_BASE_URL - server.base_url."""
+    server = make_server(host, port, **settings)
+    threading.Thread(target=server.serve_forever, name="telegram-fake", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальная заглушка Telegram Bot API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--global-rate", type=float, default=30.0, help="Сообщений в секунду на все чаты (0 - без лимита)")
+    parser.add_argument("--global-burst", type=int, default=30)
+    parser.add_argument("--chat-rate", type=float, default=1.0, help="Сообщений в секунду в один чат (0 - без лимита)")
+    parser.add_argument("--chat-burst", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.0, help="Задержка ответа на вызов, секунды")
+    parser.add_argument("--token", help="Принимать только этот токен")
+    parser.add_argument("--verbose", action="store_true", help="Писать запросы в stderr")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, verbose=args.verbose, global_rate=args.global_rate,
+                         global_burst=args.global_burst, chat_rate=args.chat_rate, chat_burst=args.chat_burst,
+                         latency=args.latency, token=args.token)
+    print(f"Заглушка Bot API: {server.base_url}<токен>/<метод>")
+    print(f"TELEGRAM_API_BASE_URL={server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
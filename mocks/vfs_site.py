@@ -0,0 +1,544 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Локальный стенд сайта VFS Global для прогонов без живого сайта.
+#
+# Запуск:
+#   python mocks/vfs_site.py --port 8765 --scenario available --latency 0.2
+#   VFS_BASE_URL=http://127.0.0.1:8765/blr/ru/pol python automation/browser.py
+#
+# Повторяет то, на что опираются сценарии automation/: форму входа (mat-input-0/1),
+# dashboard с кнопкой записи, форму с выпадающими списками Angular Material,
+# календарь с ячейками дат и временем, сообщение об отсутствии слотов, страницу
+# личных данных и подтверждение брони. Содержимое страниц вставляется скриптом
+# после UI-задержки, как у SPA, поэтому ожидания элементов работают как на сайте.
+#
+# Сценарии календаря (--scenario или GET /__mock?scenario=...):
+#   available - есть даты (--slots), none - сообщение об отсутствии слотов,
+#   empty - календарь без доступных дат, captcha - капча на странице входа,
+#   mixed - даты есть с вероятностью --slot-probability.
+# GET /__mock возвращает настройки и счетчики в JSON; параметры запроса меняют настройки.
+# Параметр render=static у страниц после входа отдает готовую разметку без скрипта.
+
+import sys
+import html
+import json
+import time
+import random
+import secrets
+import argparse
+import datetime
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, urlencode
+
+PREFIX = "/blr/ru/pol"
+SESSION_COOKIE = "vfs_session"
+
+SCENARIOS = ("available", "none", "empty", "captcha", "mixed")
+
+CENTERS = (
+    "Poland Visa Application Center-Minsk",
+    "Poland Visa Application Center-Grodno",
+    "Poland Visa Application Center-Brest",
+    "Poland Visa Application Center-Gomel",
+    "Poland Visa Application Center-Mogilev",
+    "Poland Visa Application Center-Vitebsk",
+)
+CATEGORIES = ("National Visa D", "Schengen Visa C")
+SUBCATEGORIES = ("Praca - Oswiadczenie", "Praca - Zezwolenie", "Studia", "Rodzina")
+TIMES = ("09:00", "09:30", "10:15", "11:00", "13:45", "15:30")
+
+MONTHS = ("January", "February", "March", "April", "May", "June", "July",
+          "August", "September", "October", "November", "December")
+
+NO_SLOTS_TEXT = "Приносим извинения, в настоящее время нет доступных слотов для записи"
+
+STYLE = """
+body { font-family: sans-serif; margin: 24px; }
+mat-form-field { display: block; margin: 12px 0; }
+mat-select { display: inline-block; min-width: 320px; padding: 8px; border: 1px solid #888; cursor: pointer; }
+.cdk-overlay-pane { position: fixed; top: 60px; left: 40px; z-index: 10; background: #fff; border: 1px solid #888; }
+mat-option { display: block; padding: 8px 16px; cursor: pointer; }
+.mat-calendar-body td { width: 40px; height: 32px; text-align: center; }
+.mat-calendar-body-cell { cursor: pointer; background: #dfd; }
+.mat-calendar-body-disabled { cursor: default; background: #eee; color: #999; }
+.mat-calendar-body-active { outline: 2px solid #060; }
+.time-slot { margin: 4px; }
+"""
+
+SCRIPT = """
+var UI_DELAY = __UI_DELAY__;
+var CONTENT = __CONTENT__;
+var OPTIONS = __OPTIONS__;
+var SLOT_TIMES = __TIMES__;
+
+setTimeout(function () { document.getElementById('app').innerHTML = CONTENT; }, UI_DELAY);
+
+function closeOverlay() {
+  document.querySelectorAll('.cdk-overlay-pane').forEach(function (pane) { pane.remove(); });
+}
+
+function openSelect(select) {
+  closeOverlay();
+  var name = select.getAttribute('formcontrolname');
+  setTimeout(function () {
+    var pane = document.createElement('div');
+    pane.className = 'cdk-overlay-pane';
+    OPTIONS[name].forEach(function (text) {
+      var option = document.createElement('mat-option');
+      var label = document.createElement('span');
+      label.textContent = text;
+      option.appendChild(label);
+      option.onclick = function (event) {
+        event.stopPropagation();
+        select.querySelector('.mat-select-value').textContent = text;
+        document.querySelector('input[name="' + name + '"]').value = text;
+        closeOverlay();
+      };
+      pane.appendChild(option);
+    });
+    document.body.appendChild(pane);
+  }, UI_DELAY / 2);
+}
+
+function pickDate(cell) {
+  document.querySelectorAll('.mat-calendar-body-active').forEach(function (active) {
+    active.classList.remove('mat-calendar-body-active');
+  });
+  cell.classList.add('mat-calendar-body-active');
+  var date = cell.getAttribute('data-date');
+  document.getElementById('slot-date').value = date;
+  document.getElementById('confirm-slot').style.display = 'none';
+  setTimeout(function () {
+    document.getElementById('time-slots').innerHTML = SLOT_TIMES[date].map(function (time) {
+      return '<button type="button" class="time-slot" onclick="pickTime(this)">' + time + '</button>';
+    }).join('');
+  }, UI_DELAY / 2);
+}
+
+function pickTime(button) {
+  document.getElementById('slot-time').value = button.textContent;
+  document.getElementById('confirm-slot').style.display = 'inline-block';
+}
+"""
+
+
+def _js(value):
+    # JSON внутри <script>: "</" не должен закрыть тег
+    return json.dumps(value, ensure_ascii=False).replace("</", "<\\/")
+
+
+def _hidden(**fields):
+    return "".join(f'<input type="hidden" name="{name}" value="{html.escape(str(value))}">'
+                   for name, value in fields.items())
+
+
+class MockSettings:
+    """
+    Настройки стенда; меняются на лету через /__mock.
+
+    Args:
+        scenario (str): Сценарий календаря (SCENARIOS)
+        slots (int): Сколько дат доступно в сценариях available и mixed
+        latency (float): Задержка ответа сервера, секунды
+        jitter (float): Случайная добавка к задержке, секунды
+        ui_delay (float): Задержка отрисовки содержимого страниц и списков в браузере, секунды
+        slot_probability (float): Вероятность дат в сценарии mixed
+        seed (int): Зерно генератора дат (одинаковые даты между прогонами)
+    """
+
+    FIELDS = {"scenario": str, "slots": int, "latency": float, "jitter": float,
+              "ui_delay": float, "slot_probability": float, "seed": int}
+
+    def __init__(self, scenario="available", slots=5, latency=0.0, jitter=0.0, ui_delay=0.3,
+                 slot_probability=0.3, seed=1):
+        self.scenario = scenario
+        self.slots = slots
+        self.latency = latency
+        self.jitter = jitter
+        self.ui_delay = ui_delay
+        self.slot_probability = slot_probability
+        self.seed = seed
+
+    def update(self, values):
+        """Применяет параметры запроса /__mock; неизвестные и неверные значения пропускаются."""
+        for name, kind in self.FIELDS.items():
+            if name in values:
+                try:
+                    value = kind(values[name])
+                except ValueError:
+                    continue
+                if name == "scenario" and value not in SCENARIOS:
+                    continue
+                setattr(self, name, value)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+
+class MockState:
+    """Сессии, счетчики страниц и оформленные брони стенда."""
+
+    def __init__(self):
+        self.sessions = set()
+        self.requests = {}
+        self.logins = 0
+        self.bookings = []
+        self.lock = threading.Lock()
+
+    def count(self, page):
+        with self.lock:
+            self.requests[page] = self.requests.get(page, 0) + 1
+
+    def as_dict(self):
+        with self.lock:
+            return {"requests": dict(self.requests), "logins": self.logins, "sessions": len(self.sessions),
+                    "bookings": list(self.bookings)}
+
+
+def available_dates(settings, center):
+    """
+    Доступные даты следующего месяца для центра: одинаковы при одном зерне.
+
+    Returns:
+        tuple: (подпись месяца, [дни месяца], datetime.date первого дня)
+    """
+    today = datetime.date.today()
+    first = (today.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+    label = f"{MONTHS[first.month - 1]} {first.year}"
+    scenario = settings.scenario
+    if scenario == "mixed":
+        scenario = "available" if random.random() < settings.slot_probability else "none"
+    if scenario in ("none", "empty"):
+        return label, ([] if scenario == "empty" else None), first
+    rng = random.Random(f"{settings.seed}:{center}")
+    days = sorted(rng.sample(range(1, 29), min(max(settings.slots, 0), 28)))
+    return label, days, first
+
+
+# --- страницы: (заголовок, содержимое, время по датам) ---
+
+def login_page(settings, error=None):
+    captcha = ('<div class="g-recaptcha" data-sitekey="mock">Подтвердите, что вы не робот (captcha)</div>'
+               if settings.scenario == "captcha" else "")
+    message = f'<div class="errorMessage">{html.escape(error)}</div>' if error else ""
+    return "Вход", f"""
+<h1>Вход в аккаунт</h1>{message}
+<form method="post" action="{PREFIX}/login">
+  <mat-form-field><input id="mat-input-0" name="email" type="email" placeholder="Email"></mat-form-field>
+  <mat-form-field><input id="mat-input-1" name="password" type="password" placeholder="Пароль"></mat-form-field>
+  {captcha}
+  <button type="submit" class="mat-raised-button">Войти</button>
+</form>""", None
+
+
+def dashboard_page(settings, query):
+    return "Dashboard", f"""
+<h1>Личный кабинет</h1>
+<div class="appointments">Записи на прием отсутствуют</div>
+<button type="button" class="mat-raised-button" onclick="location.href='{PREFIX}/book-an-appointment'">Записаться на прием</button>""", None
+
+
+def booking_form_page(settings, query):
+    def dropdown(name, number, placeholder):
+        return (f'<mat-form-field><mat-select aria-labelledby="mat-form-field-label-{number}" '
+                f'formcontrolname="{name}" onclick="openSelect(this)">'
+                f'<span class="mat-select-value">{placeholder}</span></mat-select></mat-form-field>')
+
+    return "Запись на прием", f"""
+<h1>Запись на прием</h1>
+<form method="post" action="{PREFIX}/book-an-appointment">
+  <div>Выберите свой Центр приложений</div>
+  {dropdown("center", 1, "Центр")}
+  <div>Выберите категорию записи</div>
+  {dropdown("category", 3, "Категория")}
+  <div>Выберите подкатегорию</div>
+  {dropdown("subCategory", 5, "Подкатегория")}
+  {_hidden(center="", category="", subCategory="")}
+  <mat-form-field><input formcontrolname="dateOfBirth" name="dateOfBirth" placeholder="ДД/ММ/ГГГГ"></mat-form-field>
+  <button type="submit" class="mat-raised-button">Продолжить</button>
+</form>""", None
+
+
+def calendar_page(settings, query):
+    center = query.get("center") or CENTERS[0]
+    label, days, first = available_dates(settings, center)
+    if days is None:
+        return "Запись на прием", f"""
+<h1>Запись на прием</h1>
+<div class="alert alert-info">{NO_SLOTS_TEXT}</div>
+<button type="button" onclick="location.href='{PREFIX}/dashboard'">Вернуться</button>""", None
+
+    available = set(days)
+    times = {}
+    rows = []
+    week = []
+    for day in range(1, 29):
+        date = first.replace(day=day).isoformat()
+        if day in available:
+            times[date] = sorted(random.Random(f"{settings.seed}:{center}:{date}").sample(TIMES, 3))
+            week.append(f'<td class="mat-calendar-body-cell" data-date="{date}" onclick="pickDate(this)">'
+                        f'<div class="mat-calendar-body-cell-content">{day}</div></td>')
+        else:
+            week.append(f'<td class="mat-calendar-body-cell mat-calendar-body-disabled">'
+                        f'<div class="mat-calendar-body-cell-content">{day}</div></td>')
+        if len(week) == 7:
+            rows.append("<tr>" + "".join(week) + "</tr>")
+            week = []
+
+    return "Выбор даты", f"""
+<h1>Выберите дату и время</h1>
+<div class="center-name">{html.escape(center)}</div>
+<mat-calendar>
+  <button type="button" class="mat-calendar-period-button">{label}</button>
+  <table class="mat-calendar-table"><tbody class="mat-calendar-body">{"".join(rows)}</tbody></table>
+</mat-calendar>
+<div id="time-slots"></div>
+<form method="get" action="{PREFIX}/book-an-appointment/review">
+  <input type="hidden" id="slot-date" name="date"><input type="hidden" id="slot-time" name="time">
+  {_hidden(center=center)}
+  <button type="submit" id="confirm-slot" style="display:none">Подтвердить</button>
+</form>""", times
+
+
+def applicant_page(settings, query):
+    fields = {name: query.get(name, "") for name in ("date", "time", "center")}
+    return "Данные заявителя", f"""
+<h1>Данные заявителя</h1>
+<form method="get" action="{PREFIX}/book-an-appointment/review">
+  {_hidden(**fields)}
+  <mat-form-field><input formcontrolname="firstName" name="firstName" placeholder="Имя"></mat-form-field>
+  <mat-form-field><input formcontrolname="lastName" name="lastName" placeholder="Фамилия"></mat-form-field>
+  <mat-form-field><input formcontrolname="dateOfBirth" name="dateOfBirth" class="mat-datepicker-input"
+    placeholder="ДД.ММ.ГГГГ"></mat-form-field>
+  <button type="submit" class="mat-raised-button">Продолжить</button>
+</form>""", None
+
+
+def review_page(settings, query):
+    fields = {name: query.get(name, "") for name in ("date", "time", "center")}
+    return "Подтверждение", f"""
+<h1>Подтверждение</h1>
+<p class="summary">{html.escape(fields["center"])}: {html.escape(fields["date"])} {html.escape(fields["time"])}</p>
+<form method="post" action="{PREFIX}/book-an-appointment/confirmation">
+  {_hidden(**fields)}
+  <button type="submit" class="mat-raised-button">Подтвердить бронирование</button>
+</form>""", None
+
+
+def confirmation_page(settings, query):
+    return "Бронирование завершено", f"""
+<h2>Бронирование завершено</h2>
+<div class="confirmation">Ваша запись подтверждена. Код бронирования: {html.escape(query.get("code", ""))}</div>""", None
+
+
+# Страницы, требующие входа: путь после PREFIX -> функция страницы
+PAGES = {
+    "dashboard": dashboard_page,
+    "book-an-appointment": booking_form_page,
+    "book-an-appointment/calendar": calendar_page,
+    "book-an-appointment/applicant": applicant_page,
+    "book-an-appointment/review": review_page,
+    "book-an-appointment/confirmation": confirmation_page,
+}
+
+
+def rendered_page(title, content, extra=""):
+    """
+    HTML страницы после отрисовки в браузере (как driver.page_source), без скрипта.
+
+    Нужен для разбора страниц стенда без браузера (benchmarks/bench_parsers.py).
+
+    Args:
+        extra (str): Что дописать в конец содержимого (например, открытое меню выбора времени)
+    """
+    return (f"<!DOCTYPE html><html lang=\"ru\"><head><meta charset=\"utf-8\"><title>{html.escape(title)}</title>"
+            f"<style>{STYLE}</style></head><body><div id=\"app\">{content}{extra}</div></body></html>")
+
+
+class VFSMockHandler(BaseHTTPRequestHandler):
+    """Обработчик страниц стенда; настройки и состояние - в self.server."""
+
+    server_version = "VFSMock/1.0"
+
+    # --- служебное ---
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            sys.stderr.write(f"{self.address_string()} - {format % args}\n")
+
+    def _session(self):
+        for part in self.headers.get("Cookie", "").split(";"):
+            name, _, value = part.strip().partition("=")
+            if name == SESSION_COOKIE and value in self.server.state.sessions:
+                return value
+        return None
+
+    def _delay(self):
+        settings = self.server.settings
+        delay = settings.latency + (random.uniform(0, settings.jitter) if settings.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _send(self, status, body, content_type="text/html; charset=utf-8", headers=()):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Cache-Control", "no-store")
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _redirect(self, path, headers=()):
+        self.send_response(303)
+        self.send_header("Location", path)
+        self.send_header("Content-Length", "0")
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+
+    def _page(self, title, content, times=None):
+        script = (SCRIPT.replace("__UI_DELAY__", str(int(self.server.settings.ui_delay * 1000)))
+                  .replace("__CONTENT__", _js(content))
+                  .replace("__OPTIONS__", _js({"center": CENTERS, "category": CATEGORIES,
+                                               "subCategory": SUBCATEGORIES}))
+                  .replace("__TIMES__", _js(times or {})))
+        self._send(200, f"<!DOCTYPE html><html lang=\"ru\"><head><meta charset=\"utf-8\">"
+                        f"<title>{html.escape(title)}</title><style>{STYLE}</style></head>"
+                        f"<body><div id=\"app\"><div class=\"spinner\">Загрузка...</div></div>"
+                        f"<script>{script}</script></body></html>")
+
+    def _form(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        values = parse_qs(self.rfile.read(length).decode("utf-8")) if length else {}
+        return {name: items[0] for name, items in values.items()}
+
+    # --- маршруты ---
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {name: items[0] for name, items in parse_qs(url.query).items()}
+        if url.path == "/__mock":
+            self.server.settings.update(query)
+            self._send(200, json.dumps({"settings": self.server.settings.as_dict(),
+                                        "state": self.server.state.as_dict()}, ensure_ascii=False),
+                       "application/json; charset=utf-8")
+            return
+
+        page = url.path[len(PREFIX):].strip("/") if url.path.startswith(PREFIX) else None
+        self.server.state.count(page or url.path)
+        self._delay()
+        if page == "login":
+            self._page(*login_page(self.server.settings))
+        elif not page or self._session() is None:
+            self._redirect(f"{PREFIX}/login")
+        elif page in PAGES:
+            title, content, times = PAGES[page](self.server.settings, query)
+            if query.get("render") == "static":
+                # Готовая разметка без скрипта - для клиентов без браузера (automation/slot_sources.py)
+                self._send(200, rendered_page(title, content))
+            else:
+                self._page(title, content, times)
+        else:
+            self._send(404, "<h1>404</h1>")
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        page = url.path[len(PREFIX):].strip("/") if url.path.startswith(PREFIX) else None
+        self.server.state.count(f"POST {page or url.path}")
+        self._delay()
+        form = self._form()
+        if page == "login":
+            self.login_submit(form)
+        elif self._session() is None:
+            self._redirect(f"{PREFIX}/login")
+        elif page == "book-an-appointment":
+            fields = {name: form.get(name, "") for name in ("center", "category", "subCategory", "dateOfBirth")}
+            self._redirect(f"{PREFIX}/book-an-appointment/calendar?{urlencode(fields)}")
+        elif page == "book-an-appointment/confirmation":
+            self.confirm_submit(form)
+        else:
+            self._send(404, "<h1>404</h1>")
+
+    def login_submit(self, form):
+        if self.server.settings.scenario == "captcha":
+            self._page(*login_page(self.server.settings, "Проверка captcha не пройдена"))
+            return
+        if not form.get("email") or not form.get("password"):
+            self._page(*login_page(self.server.settings, "Введите email и пароль"))
+            return
+        token = secrets.token_hex(16)
+        with self.server.state.lock:
+            self.server.state.sessions.add(token)
+            self.server.state.logins += 1
+        self._redirect(f"{PREFIX}/dashboard", [("Set-Cookie", f"{SESSION_COOKIE}={token}; Path=/; HttpOnly")])
+
+    def confirm_submit(self, form):
+        code = f"MOCK-{secrets.token_hex(4).upper()}"
+        with self.server.state.lock:
+            self.server.state.bookings.append({"code": code, "center": form.get("center", ""),
+                                               "date": form.get("date", ""), "time": form.get("time", "")})
+        self._redirect(f"{PREFIX}/book-an-appointment/confirmation?{urlencode({'code': code})}")
+
+
+def make_server(host="127.0.0.1", port=0, verbose=False, **settings):
+    """
+    Создает сервер стенда (не запускает его).
+
+    Args:
+        host (str): Адрес
+        port (int): Порт; 0 - любой свободный
+        verbose (bool): Писать запросы в stderr
+        **settings: Параметры MockSettings
+
+    Returns:
+        ThreadingHTTPServer: Сервер с атрибутами settings, state и base_url
+    """
+    server = ThreadingHTTPServer((host, port), VFSMockHandler)
+    server.daemon_threads = True
+    server.settings = MockSettings(**settings)
+    server.state = MockState()
+    server.verbose = verbose
+    server.base_url = f"http://{host}:{server.server_address[1]}{PREFIX}"
+    return server
+
+
+def start_in_thread(host="127.0.0.1", port=0, **settings):
+    """Запускает стенд в фоновом потоке и возвращает сервер; адрес для VFS_BASE_URL - server.base_url."""
+    server = make_server(host, port, **settings)
+    threading.Thread(target=server.serve_forever, name="vfs-mock", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальный стенд сайта VFS Global")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--scenario", choices=SCENARIOS, default="available")
+    parser.add_argument("--slots", type=int, default=5, help="Сколько дат доступно")
+    parser.add_argument("--latency", type=float, default=0.0, help="Задержка ответа, секунды")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Случайная добавка к задержке, секунды")
+    parser.add_argument("--ui-delay", type=float, default=0.3, help="Задержка отрисовки в браузере, секунды")
+    parser.add_argument("--slot-probability", type=float, default=0.3, help="Вероятность дат в сценарии mixed")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--verbose", action="store_true", help="Писать запросы в stderr")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, verbose=args.verbose, scenario=args.scenario, slots=args.slots,
+                         latency=args.latency, jitter=args.jitter, ui_delay=args.ui_delay,
+                         slot_probability=args.slot_probability, seed=args.seed)
+    print(f"Стенд VFS: {server.base_url}/login (сценарий {args.scenario})")
+    print(f"VFS_BASE_URL={server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import os
+import sys
+import random
+import datetime
+
+import pytest
+
+BOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BOT_DIR, "automation"))
+
+from check_scheduler import hourly_weights, plan_checks
+
+START = datetime.datetime(2025, 5, 1)
+DAY = datetime.timedelta(days=1)
+
+
+def test_weights_without_history_are_uniform():
+    weights = hourly_weights([0] * 24, [0] * 24)
+    assert len(weights) == 24
+    assert all(weight == pytest.approx(weights[0]) for weight in weights)
+    assert weights[0] > 0
+
+
+def test_weights_follow_hit_rate():
+    hits = [0] * 24
+    checks = [10] * 24
+    hits[9] = 8
+    weights = hourly_weights(hits, checks)
+    assert max(range(24), key=weights.__getitem__) == 9
+    # Сглаживание: часы без слотов сохраняют положительный вес
+    assert min(weights) > 0
+    assert weights[9] < 8 / 10
+
+
+def test_uniform_plan_puts_one_check_per_hour():
+    planned = plan_checks(24, [1.0] * 24, START, START + DAY, datetime.timedelta(minutes=15), jitter=0)
+    assert planned == [START + datetime.timedelta(hours=hour, minutes=30) for hour in range(24)]
+
+
+def test_plan_follows_weights():
+    weights = [1.0] * 24
+    weights[9] = 50.0
+    planned = plan_checks(24, weights, START, START + DAY, datetime.timedelta(minutes=1), jitter=0)
+    in_peak = [moment for moment in planned if moment.hour == 9]
+    assert len(in_peak) > len(planned) / 2
+
+
+def test_min_interval_and_end_bound():
+    end = START + datetime.timedelta(hours=1)
+    min_interval = datetime.timedelta(minutes=15)
+    planned = plan_checks(10, [1.0] * 24, START, end, min_interval, jitter=0)
+    assert len(planned) == 4
+    assert all(later - earlier >= min_interval for earlier, later in zip(planned, planned[1:]))
+    assert all(START <= moment < end for moment in planned)
+
+
+def test_jitter_keeps_order_and_bounds():
+    planned = plan_checks(48, [1.0] * 24, START, START + DAY, datetime.timedelta(minutes=10),
+                          jitter=0.5, rng=random.Random(7))
+    assert planned == sorted(planned)
+    assert all(START <= moment < START + DAY for moment in planned)
+    assert all(later - earlier >= datetime.timedelta(minutes=10) for earlier, later in zip(planned, planned[1:]))
+
+
+def test_empty_plan():
+    assert plan_checks(0, [1.0] * 24, START, START + DAY, datetime.timedelta(minutes=15)) == []
+    assert plan_checks(5, [1.0] * 24, START, START, datetime.timedelta(minutes=15)) == []
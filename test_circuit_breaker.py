@@ -0,0 +1,107 @@
+import os
+import sys
+import time
+
+import pytest
+
+BOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BOT_DIR, "automation"))
+
+from circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+
+
+@pytest.fixture
+def breaker(tmp_path):
+    return CircuitBreaker(threshold=3, base_delay=10, max_delay=25, state_file=str(tmp_path / "breaker.json"))
+
+
+def expire(breaker):
+    # Пауза разомкнутой цепи истекла
+    breaker.open_until = time.time() - 1
+
+
+def test_trips_after_threshold_site_failures(breaker):
+    breaker.record(False, "timeout")
+    breaker.record(False, "error")
+    assert breaker.state == CLOSED
+    assert breaker.allow() == (True, None)
+    breaker.record(False, "timeout")
+    assert breaker.state == OPEN
+    allowed, next_probe = breaker.allow()
+    assert not allowed
+    assert next_probe == breaker.next_probe_at
+
+
+def test_captcha_trips_immediately(breaker):
+    breaker.record(False, "captcha")
+    assert breaker.state == OPEN
+    assert breaker.last_reason == "captcha"
+
+
+def test_non_site_failures_and_success_reset(breaker):
+    for _ in range(5):
+        breaker.record(False, "credentials")
+    assert breaker.state == CLOSED
+    assert breaker.failures == 0
+    breaker.record(False, "timeout")
+    breaker.record(False, "timeout")
+    breaker.record(True)
+    assert breaker.failures == 0
+    breaker.record(False, "timeout")
+    assert breaker.state == CLOSED
+
+
+def test_no_slots_result_counts_as_success(breaker):
+    breaker.record(False, "timeout")
+    breaker.record_result({"success": False, "reason": "no_slots"})
+    assert breaker.failures == 0
+
+
+def test_half_open_allows_single_probe(breaker):
+    breaker.record(False, "captcha")
+    expire(breaker)
+    assert breaker.allow() == (True, None)
+    assert breaker.state == HALF_OPEN
+    allowed, _ = breaker.allow()
+    assert not allowed
+    breaker.record(True)
+    assert breaker.state == CLOSED
+    assert breaker.allow() == (True, None)
+
+
+def test_release_probe_lets_next_job_probe(breaker):
+    breaker.record(False, "captcha")
+    expire(breaker)
+    assert breaker.allow()[0]
+    assert not breaker.allow()[0]
+    breaker.release_probe()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()[0]
+
+
+def test_failed_probe_doubles_delay_up_to_max(breaker):
+    breaker.record(False, "captcha")
+    assert breaker.open_until - time.time() == pytest.approx(10, abs=1)
+    expire(breaker)
+    breaker.allow()
+    breaker.record(False, "timeout")
+    assert breaker.state == OPEN
+    assert breaker.open_until - time.time() == pytest.approx(20, abs=1)
+    expire(breaker)
+    breaker.allow()
+    breaker.record(False, "timeout")
+    assert breaker.open_until - time.time() == pytest.approx(25, abs=1)
+
+
+def test_state_survives_restart(breaker):
+    breaker.record(False, "cloudflare")
+    restored = CircuitBreaker(state_file=breaker.state_file)
+    assert restored.state == OPEN
+    assert restored.last_reason == "cloudflare"
+    assert restored.open_until == pytest.approx(breaker.open_until)
+
+    # Пробная проверка, прерванная перезапуском, не считается идущей
+    expire(restored)
+    restored.allow()
+    restored.record(False, "credentials")
+    assert CircuitBreaker(state_file=breaker.state_file).state == OPEN
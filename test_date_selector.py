@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+BOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BOT_DIR, "automation"))
+
+from date_selector import rank_time_slots
+
+SLOTS = ["14:00 - 14:15", "09:30", "по записи", "11:00"]
+
+
+def test_earliest_first_untimed_last():
+    assert rank_time_slots(SLOTS, "earliest") == ["09:30", "11:00", "14:00 - 14:15", "по записи"]
+
+
+def test_latest_first():
+    assert rank_time_slots(SLOTS, "latest") == ["14:00 - 14:15", "11:00", "09:30", "по записи"]
+
+
+def test_window_first_then_ascending():
+    assert rank_time_slots(SLOTS, "10:00-12:00") == ["11:00", "09:30", "14:00 - 14:15", "по записи"]
+    # Граница окна входит в окно, время с точкой тоже распознается
+    assert rank_time_slots(["08.00", "09.30", "12.00"], "12:00-13:00") == ["12.00", "08.00", "09.30"]
+
+
+@pytest.mark.parametrize("preference", [None, "", "  EARLIEST ", "после обеда"])
+def test_unknown_or_empty_preference_is_earliest(preference):
+    assert rank_time_slots(SLOTS, preference) == ["09:30", "11:00", "14:00 - 14:15", "по записи"]
+
+
+def test_no_slots():
+    assert rank_time_slots([], "latest") == []
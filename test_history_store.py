@@ -0,0 +1,112 @@
+import os
+import sys
+import time
+import datetime
+
+import pytest
+
+BOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BOT_DIR, "automation"))
+
+from history_store import HistoryStore, _connect
+
+INSERT = ("INSERT INTO checks (ts, city, visa_type, success, slots, source, reason, dates) "
+          "VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(path=str(tmp_path / "history.sqlite3"), retention_days=1)
+    store._ensure_schema()
+    yield store
+    store.close()
+
+
+def old_hour():
+    # Начало часа трое суток назад: старше срока хранения
+    return int((time.time() - 3 * 86400) // 3600) * 3600
+
+
+def insert(store, rows):
+    with _connect(store.path) as connection:
+        connection.executemany(INSERT, rows)
+
+
+def rollup(store):
+    connection = _connect(store.path)
+    try:
+        store._rollup(connection)
+    finally:
+        connection.close()
+
+
+def table(store, sql):
+    connection = _connect(store.path)
+    try:
+        return connection.execute(sql).fetchall()
+    finally:
+        connection.close()
+
+
+def test_rollup_moves_old_checks_to_hourly(store):
+    hour = old_hour()
+    recent = time.time() - 60
+    insert(store, [
+        (hour + 60, "Москва", "D", 1, 2, "scheduler", None, None),
+        (hour + 120, "Москва", "D", 0, 0, "scheduler", "timeout", None),
+        (hour + 600, "Москва", "D", 1, 5, "manual", None, None),
+        (hour + 3600, "Москва", "D", 1, 0, "manual", None, None),
+        (recent, "Москва", "D", 1, 1, "manual", None, None),
+    ])
+    rollup(store)
+
+    assert table(store, "SELECT ts FROM checks") == [(recent,)]
+    assert table(store, "SELECT hour_ts, checks, successes, hits, max_slots FROM hourly ORDER BY hour_ts") == [
+        (hour, 3, 2, 2, 5),
+        (hour + 3600, 1, 1, 0, 0),
+    ]
+
+
+def test_repeated_rollup_merges_into_same_hour(store):
+    hour = old_hour()
+    insert(store, [(hour + 60, "Москва", "D", 1, 2, "scheduler", None, None)])
+    rollup(store)
+    insert(store, [(hour + 120, "Москва", "D", 1, 7, "scheduler", None, None),
+                   (hour + 180, "Москва", "D", 0, 0, "scheduler", "error", None)])
+    rollup(store)
+    assert table(store, "SELECT checks, successes, hits, max_slots FROM hourly") == [(3, 2, 2, 7)]
+    assert table(store, "SELECT COUNT(*) FROM checks") == [(0,)]
+
+
+def test_summary_and_hourly_counts_include_rolled_up_hours(store):
+    hour = old_hour()
+    insert(store, [
+        (hour + 60, "Москва", "D", 1, 3, "scheduler", None, None),
+        (hour + 120, "Москва", "D", 1, 0, "scheduler", None, None),
+        (hour + 180, "Москва", "C", 1, 4, "scheduler", None, None),
+    ])
+    rollup(store)
+    store.record("Москва", "D", True, 0, source="manual")
+    store.record("Москва", "D", False, 0, source="manual", reason="timeout")
+    store.flush()
+
+    summary = store.summary("Москва", "D", days=7)
+    assert summary == {"checks": 4, "successes": 3, "hits": 1,
+                       "last_hit": datetime.datetime.fromtimestamp(hour)}
+
+    hits, checks = store.hourly_slot_counts("Москва", "D", days=7)
+    local_hour = datetime.datetime.fromtimestamp(hour).hour
+    assert hits[local_hour] == 1
+    assert sum(hits) == 1
+    assert sum(checks) == 3
+
+
+def test_record_and_recent(store):
+    store.record("Москва", "D", True, 2, source="scheduler", dates=["12.06.2025", "13.06.2025"])
+    store.record("Москва", "D", False, 0, reason="captcha")
+    store.flush()
+    recent = store.recent("Москва", "D")
+    assert [(success, slots, source, reason, dates) for _, success, slots, source, reason, dates in recent] == [
+        (False, 0, "manual", "captcha", []),
+        (True, 2, "scheduler", None, ["12.06.2025", "13.06.2025"]),
+    ]
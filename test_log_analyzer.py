@@ -0,0 +1,114 @@
+import os
+import sys
+import gzip
+import json
+
+import pytest
+
+BOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BOT_DIR, "tools"))
+
+from log_analyzer import LogHistogram, Report, analyze, expand_paths, normalize, parse_line
+
+LOG = """2025-05-11 16:58:41,675 - check_flow - INFO - Этап login: 12.50 с (ok)
+2025-05-11 16:59:02,001 - check_flow - INFO - Этап calendar: 3.25 с (timeout)
+2025-05-11 17:01:10,100 - jobs - ERROR - Ошибка при проверке города 'Москва': код 500
+Traceback (most recent call last):
+  File "/root/package/automation/jobs.py", line 10, in check_job
+    raise ValueError("bad")
+ValueError: bad
+
+During handling of the above exception, another exception occurred:
+
+Traceback (most recent call last):
+  File "/root/package/automation/jobs.py", line 12, in check_job
+selenium.common.exceptions.TimeoutException: Message: timeout
+2025-05-11 17:02:00,000 - jobs - WARNING - Ошибка при проверке города 'Казань': код 502
+2025-05-12 09:00:00,000 - __main__ - INFO - Асинхронная проверка для чата 42: timeout (launch=1.50с, login=60.00с, close=0.20с)
+"""
+
+
+def write_log(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return str(path)
+
+
+def test_parse_text_line():
+    assert parse_line("2025-05-11 16:58:41,675 - httpx - INFO - HTTP Request: POST - ok\n") == (
+        "2025-05-11 16:58:41", "httpx", "INFO", "HTTP Request: POST - ok")
+    assert parse_line("Traceback (most recent call last):\n") is None
+    assert parse_line("  File \"x.py\", line 1\n") is None
+
+
+def test_parse_json_line():
+    line = json.dumps({"ts": "2025-05-11T16:58:41.675", "level": "ERROR", "logger": "jobs",
+                       "message": "Сбой", "exc": "ValueError: bad"}, ensure_ascii=False)
+    assert parse_line(line) == ("2025-05-11 16:58:41", "jobs", "ERROR", "Сбой\nValueError: bad")
+    assert parse_line("{не json") is None
+
+
+def test_normalize_groups_similar_messages():
+    first = normalize("Ошибка при проверке города 'Москва': код 500, https://visa.vfsglobal.com/x?a=1")
+    second = normalize("Ошибка при проверке города 'Казань': код 502, https://visa.vfsglobal.com/y")
+    assert first == second == "Ошибка при проверке города '…': код N, <url>"
+    assert normalize("Файл /tmp/chrome_profile_12/Default не найден") == "Файл <path> не найден"
+
+
+def test_histogram_quantiles():
+    histogram = LogHistogram()
+    for value in range(1, 1001):
+        histogram.add(value / 100)
+    assert histogram.count == 1000
+    assert histogram.quantile(0.5) == pytest.approx(5.0, rel=0.03)
+    assert histogram.quantile(0.99) == pytest.approx(9.9, rel=0.03)
+    assert histogram.quantile(1.0) <= histogram.max == 10.0
+
+
+def test_analyze_report(tmp_path):
+    report = Report()
+    analyze([write_log(tmp_path / "visa_bot.log", LOG)], report)
+
+    assert report.records == 5
+    assert report.levels == {"INFO": 3, "ERROR": 1, "WARNING": 1}
+    assert report.first == "2025-05-11 16:58:41"
+    assert report.last == "2025-05-12 09:00:00"
+    assert report.outcomes["login"] == {"ok": 1}
+    assert report.outcomes["calendar"] == {"timeout": 1}
+    assert report.stages["login"].quantile(0.5) == pytest.approx(12.5, rel=0.03)
+    # Асинхронная проверка: неудачной считается последняя стадия до закрытия браузера
+    assert report.outcomes["async_launch"] == {"ok": 1}
+    assert report.outcomes["async_login"] == {"timeout": 1}
+    assert report.outcomes["async_close"] == {"ok": 1}
+    # Из цепочки исключений учитывается последнее
+    assert report.exceptions == {"selenium.common.exceptions.TimeoutException": 1}
+    assert report.errors == {"ERROR jobs: Ошибка при проверке города '…': код N": 1,
+                             "WARNING jobs: Ошибка при проверке города '…': код N": 1}
+    assert report.buckets["2025-05-11 17"] == [2, 1, 1, 0]
+
+
+def test_analyze_filters(tmp_path):
+    path = write_log(tmp_path / "visa_bot.log", LOG)
+    report = Report(bucket="day")
+    analyze([path], report, since="2025-05-11 17:00", until="2025-05-12", logger_prefix="jobs")
+    assert report.records == 2
+    assert list(report.buckets) == ["2025-05-11"]
+
+    report = Report()
+    analyze([path], report, grep="Казань")
+    assert report.records == 1
+    assert report.exceptions == {}
+
+
+def test_rotated_files_read_oldest_first(tmp_path):
+    write_log(tmp_path / "visa_bot.log", LOG)
+    write_log(tmp_path / "visa_bot.log.1", LOG)
+    with gzip.open(tmp_path / "visa_bot.log.2.gz", "wt", encoding="utf-8") as f:
+        f.write(LOG)
+    paths = expand_paths([str(tmp_path / "visa_bot.log*")])
+    assert [os.path.basename(path) for path in paths] == ["visa_bot.log.2.gz", "visa_bot.log.1", "visa_bot.log"]
+
+    report = Report()
+    analyze(paths, report)
+    assert report.files == 3
+    assert report.records == 15
@@ -0,0 +1,62 @@
+import os
+import sys
+import logging
+
+BOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BOT_DIR, "automation"))
+
+from log_setup import RateLimitFilter
+
+HTTPX_FORMAT = 'HTTP Request: %s %s "%s %d %s"'
+
+
+def httpx_record(method, level=logging.INFO):
+    url = f"https://api.telegram.org/bot123:token/{method}"
+    return logging.LogRecord("httpx", level, __file__, 0, HTTPX_FORMAT, ("POST", url, "HTTP/1.1", 200, "OK"), None)
+
+
+def next_minute(limiter):
+    # Окно ключа началось минуту назад
+    limiter._windows = {key: (started - 61, passed, dropped) for key, (started, passed, dropped) in limiter._windows.items()}
+
+
+def test_limits_lines_per_method():
+    limiter = RateLimitFilter(per_minute=2)
+    assert [limiter.filter(httpx_record("getUpdates")) for _ in range(4)] == [True, True, False, False]
+    # Другой метод Bot API считается отдельно
+    assert limiter.filter(httpx_record("sendMessage"))
+
+
+def test_warnings_and_other_loggers_pass():
+    limiter = RateLimitFilter(per_minute=1)
+    limiter.filter(httpx_record("getUpdates"))
+    assert limiter.filter(httpx_record("getUpdates", logging.WARNING))
+    other = logging.LogRecord("jobs", logging.INFO, __file__, 0, "Задание завершено", None, None)
+    assert all(limiter.filter(other) for _ in range(5))
+
+
+def test_dropped_count_reported_next_minute():
+    limiter = RateLimitFilter(per_minute=1)
+    for _ in range(4):
+        limiter.filter(httpx_record("getUpdates"))
+    next_minute(limiter)
+    record = httpx_record("getUpdates")
+    assert limiter.filter(record)
+    assert record.getMessage().endswith("(пропущено похожих строк: 3)")
+
+    # Счетчик сбрасывается после отчета
+    next_minute(limiter)
+    record = httpx_record("getUpdates")
+    assert limiter.filter(record)
+    assert "пропущено" not in record.getMessage()
+
+
+def test_records_without_args_keyed_by_message():
+    limiter = RateLimitFilter(names=("httpcore",), per_minute=1)
+
+    def record(message):
+        return logging.LogRecord("httpcore.connection", logging.DEBUG, __file__, 0, message, None, None)
+
+    assert limiter.filter(record("connect_tcp.started"))
+    assert not limiter.filter(record("connect_tcp.started"))
+    assert limiter.filter(record("start_tls.started"))
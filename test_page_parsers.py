@@ -0,0 +1,120 @@
+import os
+import sys
+
+import pytest
+
+BOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BOT_DIR, "automation"))
+
+import page_parsers
+from page_parsers import PageSnapshot, parse_calendar, parse_time_slots, parse_booking_page, parse_page
+
+# Разбор проверяется на обоих деревьях: html.parser из стандартной библиотеки и lxml (если установлен)
+BACKENDS = [
+    "html.parser",
+    pytest.param("lxml", marks=pytest.mark.skipif(not page_parsers.LXML_AVAILABLE, reason="lxml не установлен")),
+]
+
+CALENDAR_PAGE = """<!DOCTYPE html>
+<html><head>
+<script>var cell = '<td class="mat-calendar-body-cell"><div class="mat-calendar-body-cell-content">9</div></td>';</script>
+<style>.mat-calendar-body-cell { color: green; }</style>
+</head><body>
+<mat-calendar>
+  <button class="mat-calendar-period-button">МАЙ 2025</button>
+  <table class="mat-calendar-body"><tr>
+    <td class="mat-calendar-body-cell mat-calendar-body-disabled"><div class="mat-calendar-body-cell-content">1</div></td>
+    <td class="mat-calendar-body-cell"><div class="mat-calendar-body-cell-content"> 2 </div></td>
+    <td class="mat-calendar-body-cell"><div class="mat-calendar-body-cell-content">15</div></td>
+  </tr></table>
+</mat-calendar>
+<div id="time-slots">
+  <button class="time-slot">09:00</button>
+  <span class="time-slot disabled">09:30</span>
+  <button class="time-slot">10:15</button>
+</div>
+</body></html>"""
+
+NO_SLOTS_PAGE = """<html><body>
+<div class="alert">Приносим извинения, в настоящее время нет доступных слотов для записи</div>
+</body></html>"""
+
+LOOSE_DATES_PAGE = """<html><body>
+<div class="calendar-container">
+  <span class="date-item">12.06.2025</span>
+  <span class="date-item disabled">13.06.2025</span>
+  <span class="date-item">нет</span>
+</div>
+</body></html>"""
+
+CONFIRMATION_PAGE = """<html><body>
+<h1>Подтверждение</h1>
+<div>Ваше бронирование</div>
+<button>Продолжить</button>
+<button>Завершить</button>
+</body></html>"""
+
+SUCCESS_PAGE = """<html><body>
+<div>Спасибо! Ваше бронирование принято</div>
+</body></html>"""
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_calendar_cells_and_month(backend):
+    result = parse_calendar(PageSnapshot(CALENDAR_PAGE, backend))
+    assert result["calendar"] is True
+    assert result["no_slots"] is None
+    assert result["month"] == "МАЙ 2025"
+    # Недоступная ячейка и разметка внутри <script> не учитываются
+    assert result["days"] == ["2", "15"]
+    assert result["dates"] == ["2 МАЙ 2025", "15 МАЙ 2025"]
+    assert result["labels"] == []
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_time_slots_skip_disabled(backend):
+    result = parse_time_slots(PageSnapshot(CALENDAR_PAGE, backend))
+    assert result == {"menu": True, "slots": ["09:00", "10:15"]}
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_no_slots_message(backend):
+    result = parse_calendar(PageSnapshot(NO_SLOTS_PAGE, backend))
+    assert result["no_slots"] == "Приносим извинения, в настоящее время нет доступных слотов для записи"
+    assert result["calendar"] is False
+    assert result["dates"] == []
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_loose_date_labels_when_no_cells(backend):
+    result = parse_calendar(PageSnapshot(LOOSE_DATES_PAGE, backend))
+    assert result["calendar"] is True
+    assert result["dates"] == []
+    assert result["labels"] == ["12.06.2025"]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_booking_confirmation_page(backend):
+    result = parse_booking_page(PageSnapshot(CONFIRMATION_PAGE, backend))
+    assert result["confirmation"] == "Подтверждение"
+    assert result["continue_buttons"] == ["Продолжить"]
+    assert result["final_buttons"] == ["Завершить"]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_booking_success_requires_all_words(backend):
+    result = parse_booking_page(PageSnapshot(SUCCESS_PAGE, backend))
+    assert result["success"] == "Спасибо! Ваше бронирование принято"
+    assert parse_booking_page(PageSnapshot("<div>Спасибо</div>", backend))["success"] is None
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_empty_and_bytes_input(backend):
+    assert parse_calendar(PageSnapshot("", backend))["calendar"] is False
+    assert parse_time_slots(PageSnapshot(CALENDAR_PAGE.encode("utf-8"), backend))["slots"] == ["09:00", "10:15"]
+
+
+@pytest.mark.skipif(not page_parsers.LXML_AVAILABLE, reason="lxml не установлен")
+@pytest.mark.parametrize("html", [CALENDAR_PAGE, NO_SLOTS_PAGE, LOOSE_DATES_PAGE, CONFIRMATION_PAGE, SUCCESS_PAGE])
+def test_backends_agree(html):
+    assert parse_page(html, "lxml") == parse_page(html, "html.parser")
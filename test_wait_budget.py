@@ -0,0 +1,103 @@
+import os
+import sys
+
+import pytest
+
+BOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BOT_DIR, "automation"))
+
+from wait_budget import WaitBudget, WAIT_MIN_SAMPLES, percentile
+
+WAITS = {
+    "page": (15, 0.99, False),
+    "button": (5, 0.95, True),
+}
+
+
+def make_budget(state_file=None, **kwargs):
+    kwargs.setdefault("save_interval", 3600)
+    return WaitBudget(waits=WAITS, state_file=state_file, low=1, high=30, margin=1.5, history_size=100, **kwargs)
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile([3], 0.99) == 3
+
+
+def test_default_until_enough_samples():
+    budget = make_budget()
+    for _ in range(WAIT_MIN_SAMPLES - 1):
+        budget.record("page", 2.0)
+    assert budget.budget("page") == 15
+    budget.record("page", 2.0)
+    assert budget.budget("page") == pytest.approx(3.0)
+
+
+def test_budget_clamped_to_bounds():
+    budget = make_budget()
+    for _ in range(WAIT_MIN_SAMPLES):
+        budget.record("page", 0.1)
+        budget.record("button", 100.0)
+    assert budget.budget("page") == 1
+    assert budget.budget("button") == 30
+
+
+def test_required_timeouts_grow_budget():
+    budget = make_budget()
+    for _ in range(50):
+        budget.record("page", 2.0)
+    before = budget.budget("page")
+    for _ in range(3):
+        budget.record("page", timed_out=True)
+    assert budget.timeouts["page"] == 3
+    # Цензурированный замер равен бюджету, при котором случился таймаут
+    assert budget.budget("page") > before
+
+
+def test_optional_timeouts_only_counted():
+    budget = make_budget()
+    for _ in range(50):
+        budget.record("button", 1.0)
+    before = budget.budget("button")
+    for _ in range(150):
+        budget.record("button", before, timed_out=True)
+    assert budget.budget("button") == before
+    assert len(budget.samples["button"]) == 50
+    assert budget.timeouts["button"] == 100
+
+
+def test_flush_merges_samples_of_other_processes(tmp_path):
+    state_file = str(tmp_path / "wait_budget.json")
+    first = make_budget(state_file)
+    second = make_budget(state_file)
+    for _ in range(3):
+        first.record("page", 1.0)
+    first.record("page", timed_out=True)
+    first.flush()
+    for _ in range(2):
+        second.record("page", 2.0)
+    second.record("button", timed_out=True)
+    second.flush()
+
+    restored = make_budget(state_file)
+    assert sorted(restored.samples["page"]) == [1.0, 1.0, 1.0, 2.0, 2.0, 15.0]
+    assert restored.timeouts == {"page": 1, "button": 1}
+    assert [name for name in os.listdir(tmp_path)] == ["wait_budget.json"]
+
+
+def test_record_saves_after_interval(tmp_path):
+    state_file = str(tmp_path / "wait_budget.json")
+    budget = make_budget(state_file, save_interval=0)
+    budget.record("page", 1.0)
+    assert list(make_budget(state_file).samples["page"]) == [1.0]
+
+
+def test_without_state_file_nothing_is_written(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    budget = make_budget(None, save_interval=0)
+    budget.record("page", 1.0)
+    budget.flush()
+    assert os.listdir(tmp_path) == []
+    assert list(budget.samples["page"]) == [1.0]
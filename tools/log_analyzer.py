@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Потоковый разбор логов бота: длительности этапов, классы ошибок, гистограммы по времени.
+#
+# Запуск:
+#   python tools/log_analyzer.py                          # visa_bot.log* и logs/*.log* (с ротацией и .gz)
+#   python tools/log_analyzer.py logs/browser.log* --since 2025-05-01 --bucket day
+#   python tools/log_analyzer.py visa_bot.log --grep "Критическая ошибка при инициализации"
+#
+# Файлы читаются построчно, память не зависит от их размера: перцентили считаются
+# по логарифмическим корзинам (точность ~2%), классы ошибок - по нормализованному
+# тексту сообщения. Время записи не разбирается в datetime: строки ISO сравниваются
+# и группируются как есть. Понимает текстовый формат log_setup.TEXT_FORMAT и LOG_FORMAT=json.
+
+import os
+import re
+import sys
+import glob
+import gzip
+import json
+import math
+import argparse
+import datetime
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_PATTERNS = ("visa_bot.log*", os.path.join("logs", "*.log*"))
+
+# Строки с длительностями этапов
+STAGE_LINE = re.compile(r"^Этап (\S+): ([\d.]+) с \((\w+)\)")  # metrics.timed_stage
+ASYNC_LINE = re.compile(r"^Асинхронная проверка для чата \S+: (\S+) \((.*)\)$")  # main.run_async_check
+ASYNC_TIMING = re.compile(r"(\w+)=([\d.]+)с")
+# Итоговая строка трассировки: "selenium.common.exceptions.TimeoutException: Message: ..."
+EXCEPTION_LINE = re.compile(r"^((?:[A-Za-z_]\w*\.)+[A-Za-z_]\w*|[A-Za-z_]\w*(?:Error|Exception|Exit|Interrupt))(?::|$)")
+
+MAX_ERROR_CLASSES = 5000  # Дальше новые классы ошибок считаются вместе как "(прочие)"
+
+
+class LogHistogram:
+    """Гистограмма с логарифмическими корзинами: постоянная память, квантили с точностью ~2%."""
+
+    RATIO = 1.02
+    FLOOR = 0.001
+
+    def __init__(self):
+        self.bins = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        index = int(math.log(max(value, self.FLOOR) / self.FLOOR, self.RATIO))
+        self.bins[index] = self.bins.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        passed = 0
+        for index in sorted(self.bins):
+            passed += self.bins[index]
+            if passed >= rank:
+                # Середина корзины в логарифмической шкале
+                return min(self.FLOOR * self.RATIO ** (index + 0.5), self.max)
+        return self.max
+
+
+def normalize(message, width=110):
+    """Класс ошибки: текст сообщения без чисел, путей, URL и содержимого кавычек."""
+    message = re.sub(r"https?://\S+", "<url>", message)
+    message = re.sub(r"(/[\w.\-]+){2,}", "<path>", message)
+    message = re.sub(r"'[^']*'|\"[^\"]*\"", "'…'", message)
+    message = re.sub(r"0x[0-9a-fA-F]+|\d+", "N", message)
+    message = message.split("\n", 1)[0].strip()
+    return message[:width] + ("…" if len(message) > width else "")
+
+
+def expand_paths(patterns):
+    """Раскрывает шаблоны; ротированные файлы идут от старых к новым (.5, .4, ..., основной)."""
+    def rotation_key(path):
+        base = path[:-3] if path.endswith(".gz") else path
+        suffix = base.rsplit(".", 1)[-1]
+        return (re.sub(r"\.(\d+|\d{4}-\d{2}-\d{2}(_\d{2}-\d{2}(-\d{2})?)?)$", "", base),
+                -int(suffix) if suffix.isdigit() else 0, base)
+
+    paths = set()
+    for pattern in patterns:
+        matched = glob.glob(pattern if os.path.isabs(pattern) else os.path.join(BOT_DIR, pattern)) or glob.glob(pattern)
+        paths.update(path for path in matched if os.path.isfile(path))
+    return sorted(paths, key=rotation_key)
+
+
+def open_log(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, encoding="utf-8", errors="replace", buffering=1024 * 1024)
+
+
+def parse_line(line):
+    """
+    Разбирает начало записи лога.
+
+    Returns:
+        tuple: ("ГГГГ-ММ-ДД ЧЧ:ММ:СС", logger, level, message) или None для строки-продолжения (трассировка)
+    """
+    if line.startswith("{"):
+        try:
+            entry = json.loads(line)
+            return (entry["ts"][:19].replace("T", " "), entry["logger"], entry["level"],
+                    entry["message"] + ("\n" + entry["exc"] if entry.get("exc") else ""))
+        except (ValueError, KeyError, TypeError):
+            return None
+    # "2025-05-11 16:58:41,675 - httpx - INFO - HTTP Request: ..."
+    if len(line) < 27 or line[4] != "-" or line[10] != " " or line[23:26] != " - " or not line[:4].isdigit():
+        return None
+    parts = line[26:].split(" - ", 2)
+    if len(parts) < 3:
+        return None
+    return line[:19], parts[0], parts[1], parts[2].rstrip("\n")
+
+
+class Report:
+    """Агрегаты по всем записям: все поля ограничены по размеру независимо от объема логов."""
+
+    def __init__(self, bucket="hour"):
+        # Ключ корзины - префикс времени записи: "ГГГГ-ММ-ДД ЧЧ" или "ГГГГ-ММ-ДД"
+        self.bucket_width = 13 if bucket == "hour" else 10
+        self.files = 0
+        self.lines = 0
+        self.records = 0
+        self.first = None
+        self.last = None
+        self.levels = {}
+        self.stages = {}
+        self.outcomes = {}
+        self.errors = {}
+        self.exceptions = {}
+        self.buckets = {}
+
+    def _count_error(self, key):
+        if key not in self.errors and len(self.errors) >= MAX_ERROR_CLASSES:
+            key = "(прочие)"
+        self.errors[key] = self.errors.get(key, 0) + 1
+
+    def add_stage(self, stage, seconds, outcome):
+        self.stages.setdefault(stage, LogHistogram()).add(seconds)
+        outcomes = self.outcomes.setdefault(stage, {})
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    def add(self, timestamp, name, level, message):
+        self.records += 1
+        self.first = self.first or timestamp
+        self.last = timestamp
+        self.levels[level] = self.levels.get(level, 0) + 1
+        bucket = self.buckets.get(timestamp[:self.bucket_width])
+        if bucket is None:
+            bucket = self.buckets[timestamp[:self.bucket_width]] = [0, 0, 0, 0]
+        bucket[0] += 1
+
+        if message.startswith("Этап "):
+            match = STAGE_LINE.match(message)
+            if match:
+                self.add_stage(match.group(1), float(match.group(2)), match.group(3))
+                bucket[3] += 1
+        elif message.startswith("Асинхронная проверка"):
+            match = ASYNC_LINE.match(message)
+            if match:
+                # Неудачной считается последняя выполнявшаяся стадия (close - закрытие браузера)
+                reason = match.group(1)
+                timings = [(stage, float(seconds)) for stage, seconds in ASYNC_TIMING.findall(match.group(2))]
+                failed = [stage for stage, _ in timings if stage != "close"][-1:] if reason != "ok" else []
+                for stage, seconds in timings:
+                    self.add_stage(f"async_{stage}", seconds, reason if stage in failed else "ok")
+                bucket[3] += 1
+
+        if level == "ERROR" or level == "CRITICAL":
+            bucket[1] += 1
+            self._count_error(f"{level} {name}: {normalize(message)}")
+        elif level == "WARNING":
+            bucket[2] += 1
+            self._count_error(f"{level} {name}: {normalize(message)}")
+
+    def add_exception(self, exception):
+        self.exceptions[exception] = self.exceptions.get(exception, 0) + 1
+
+
+def analyze(paths, report, since=None, until=None, logger_prefix=None, grep=None):
+    """Читает файлы построчно и накапливает Report."""
+    for path in paths:
+        report.files += 1
+        in_error = False
+        exception = None
+        with open_log(path) as f:
+            for line in f:
+                report.lines += 1
+                parsed = parse_line(line)
+                if parsed is None:
+                    # Продолжение записи ошибки: в цепочке исключений учитывается последнее
+                    if in_error and not line.startswith((" ", "\t", "Traceback")):
+                        match = EXCEPTION_LINE.match(line)
+                        if match:
+                            exception = match.group(1)
+                    continue
+                if exception:
+                    report.add_exception(exception)
+                    exception = None
+                timestamp, name, level, message = parsed
+                in_error = False
+                if (since and timestamp < since) or (until and timestamp >= until):
+                    continue
+                if logger_prefix and not name.startswith(logger_prefix):
+                    continue
+                if grep and grep not in message:
+                    continue
+                report.add(timestamp, name, level, message)
+                in_error = level in ("ERROR", "CRITICAL")
+        if exception:
+            report.add_exception(exception)
+
+
+def print_report(report, top):
+    if not report.records:
+        print("Записей не найдено")
+        return
+    print(f"Файлов: {report.files}, строк: {report.lines}, записей: {report.records}")
+    print(f"Период: {report.first} — {report.last}")
+    print("Уровни: " + ", ".join(f"{level} {count}" for level, count in sorted(report.levels.items(), key=lambda item: -item[1])))
+
+    if report.stages:
+        print("\n=== Длительность этапов (секунды) ===")
+        print(f"{'этап':<26}{'число':>7}{'p50':>8}{'p90':>8}{'p95':>8}{'p99':>8}{'max':>8}  исходы")
+        for stage, histogram in sorted(report.stages.items(), key=lambda item: -item[1].total):
+            outcomes = ", ".join(f"{outcome} {count}" for outcome, count in sorted(report.outcomes[stage].items()))
+            print(f"{stage:<26}{histogram.count:>7}"
+                  + "".join(f"{histogram.quantile(q):>8.2f}" for q in (0.5, 0.9, 0.95, 0.99))
+                  + f"{histogram.max:>8.2f}  {outcomes}")
+
+    if report.errors:
+        print(f"\n=== Классы ошибок и предупреждений (топ {top}) ===")
+        for key, count in sorted(report.errors.items(), key=lambda item: -item[1])[:top]:
+            print(f"{count:>7}  {key}")
+
+    if report.exceptions:
+        print("\n=== Исключения в трассировках ===")
+        for exception, count in sorted(report.exceptions.items(), key=lambda item: -item[1])[:top]:
+            print(f"{count:>7}  {exception}")
+
+    print("\n=== По времени (записи / ошибки / предупреждения / этапы) ===")
+    peak = max(bucket[0] for bucket in report.buckets.values())
+    for key in sorted(report.buckets):
+        records, errors, warnings, stages = report.buckets[key]
+        bar = "█" * max(1, round(30 * records / peak))
+        label = f"{key}:00" if len(key) == 13 else key
+        print(f"{label}  {records:>7} {errors:>6} {warnings:>6} {stages:>6}  {bar}")
+
+
+def parse_date(value):
+    """Дата или время из командной строки в формате времени записей лога."""
+    return datetime.datetime.fromisoformat(value).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Потоковый разбор логов бота")
+    parser.add_argument("paths", nargs="*", help="Файлы или шаблоны (по умолчанию visa_bot.log* и logs/*.log*)")
+    parser.add_argument("--since", type=parse_date, help="Начало периода, например 2025-05-01 или 2025-05-01T12:00")
+    parser.add_argument("--until", type=parse_date, help="Конец периода (не включая)")
+    parser.add_argument("--logger", help="Только логгеры с этим префиксом (browser, register_account, ...)")
+    parser.add_argument("--grep", help="Только записи, содержащие подстроку")
+    parser.add_argument("--bucket", choices=["hour", "day"], default="hour", help="Шаг гистограммы по времени")
+    parser.add_argument("--top", type=int, default=15, help="Сколько классов ошибок показать")
+    args = parser.parse_args()
+
+    paths = expand_paths(args.paths or DEFAULT_PATTERNS)
+    if not paths:
+        print("Файлы логов не найдены", file=sys.stderr)
+        sys.exit(1)
+
+    report = Report(args.bucket)
+    analyze(paths, report, args.since, args.until, args.logger, args.grep)
+    print_report(report, args.top)
+
+
+if __name__ == "__main__":
+    main()